@@ -601,6 +601,8 @@ class AccountingDB(DB):
         Do the real insert and delete from the in buffer table
         """
         self.log.verbose("Received bundle to process", "of %s elements" % len(recordTuples))
+        if self.getCSOption("PreAggregateBuckets", True):
+            recordTuples = self.__insertAggregatedFromINTable(recordTuples)
         for record in recordTuples:
             iD, typeName, startTime, endTime, valuesList, insertionEpoch = record
             result = self.insertRecordDirectly(typeName, startTime, endTime, valuesList)
@@ -612,6 +614,133 @@ class AccountingDB(DB):
             if not result["OK"]:
                 self.log.error("Can't delete row from the IN table", result["Message"])
 
+    def __insertAggregatedFromINTable(self, recordTuples):
+        """
+        Insert the records of the in buffer table type by type, with one write per bucket row
+
+        :return: list of the records to insert one by one, because their type could not be inserted in one go
+        """
+        recordsByType = {}
+        for record in recordTuples:
+            recordsByType.setdefault(record[1], []).append(record)
+        remainingRecords = []
+        for typeName, typeRecords in recordsByType.items():
+            inTableName = _getTableName("in", typeName)
+            idList = ", ".join(str(record[0]) for record in typeRecords)
+            result = self.insertRecordBundleDirectly(typeName, [record[2:5] for record in typeRecords])
+            if not result["OK"]:
+                # One bad record should not block the others: they are inserted one by one
+                self.log.warn("Can't insert the records in one go", "for %s: %s" % (typeName, result["Message"]))
+                remainingRecords.extend(typeRecords)
+                continue
+            result = self._update("DELETE FROM `%s` WHERE id in (%s)" % (inTableName, idList))
+            if not result["OK"]:
+                self.log.error("Can't delete rows from the IN table", result["Message"])
+        return remainingRecords
+
+    def insertRecordBundleDirectly(self, typeName, recordsList):
+        """
+        Add entries of a type to the type contents. The contributions of all the entries
+        to the same bucket and keys are summed, so that each bucket row is written only once.
+
+        :param str typeName: name of the type
+        :param list recordsList: list of (startTime, endTime, valuesList) tuples
+        :return: S_OK(dict) with the number of records, of bucket updates and of bucket rows written,
+                 the compression ratio and the records inserted per second
+        """
+        if self.__readOnly:
+            return S_ERROR("ReadOnly mode enabled. No modification allowed")
+        if typeName not in self.dbCatalog:
+            return S_ERROR("Type %s has not been defined in the db" % typeName)
+        start = time.time()
+        numKeys = len(self.dbCatalog[typeName]["keys"])
+        numValues = len(self.dbCatalog[typeName]["values"])
+        nowEpoch = int(TimeUtilities.toEpoch())
+        insertRows = []
+        bucketRows = {}
+        bucketUpdates = 0
+        for startTime, endTime, valuesList in recordsList:
+            if len(valuesList) != numKeys + numValues:
+                return S_ERROR(
+                    "Fields mismatch for record %s. %s fields and %s expected"
+                    % (typeName, len(valuesList), numKeys + numValues)
+                )
+            # Discover key indexes
+            keyIds = []
+            for keyPos, keyName in enumerate(self.dbCatalog[typeName]["keys"]):
+                retVal = self.__addKeyValue(typeName, keyName, valuesList[keyPos])
+                if not retVal["OK"]:
+                    return retVal
+                keyIds.append(retVal["Value"])
+            insertRows.append(keyIds + list(valuesList[numKeys:]) + [startTime, endTime])
+            # Sum the contributions of the record to each bucket, plus one more value to count the entries
+            for bStartTime, bProportion, bLength in self.calculateBuckets(typeName, startTime, endTime, nowEpoch):
+                bucketUpdates += 1
+                bucketKey = tuple([bStartTime, bLength] + keyIds)
+                bucketValues = bucketRows.get(bucketKey)
+                if bucketValues is None:
+                    bucketValues = bucketRows[bucketKey] = [0.0] * (numValues + 1)
+                for valPos in range(numValues):
+                    bucketValues[valPos] += float(valuesList[numKeys + valPos]) * bProportion
+                bucketValues[-1] += bProportion
+        if not insertRows:
+            return S_OK({"Records": 0, "BucketUpdates": 0, "BucketRows": 0, "Compression": 1.0, "RecordsPerSecond": 0})
+
+        retVal = self._escapeValues(insertRows)
+        if not retVal["OK"]:
+            return retVal
+        insertCmd = "INSERT INTO `%s` ( %s ) VALUES %s" % (
+            _getTableName("type", typeName),
+            ", ".join("`%s`" % field for field in self.dbCatalog[typeName]["typeFields"]),
+            ", ".join(retVal["Value"]),
+        )
+        # Same layout as the rows written by __writeBuckets: start, length, entries, keys and values
+        sqlRows = [
+            list(bucketKey[:2]) + [bucketValues[-1]] + list(bucketKey[2:]) + bucketValues[:-1]
+            for bucketKey, bucketValues in bucketRows.items()
+        ]
+        retVal = self._getConnection()
+        if not retVal["OK"]:
+            return retVal
+        connObj = retVal["Value"]
+        try:
+            retVal = self.__startTransaction(connObj)
+            if not retVal["OK"]:
+                return retVal
+            retVal = self._update(insertCmd, conn=connObj)
+            if retVal["OK"]:
+                retVal = self.__writeBucketRows(typeName, sqlRows, connObj=connObj)
+            if not retVal["OK"]:
+                self.__rollbackTransaction(connObj)
+                return retVal
+            retVal = self.__commitTransaction(connObj)
+            if not retVal["OK"]:
+                return retVal
+        finally:
+            connObj.close()
+
+        elapsed = max(time.time() - start, 1e-6)
+        stats = {
+            "Records": len(insertRows),
+            "BucketUpdates": bucketUpdates,
+            "BucketRows": len(sqlRows),
+            "Compression": float(bucketUpdates) / len(sqlRows),
+            "RecordsPerSecond": len(insertRows) / elapsed,
+        }
+        self.log.info(
+            "Inserted records",
+            "for type %s: %d records, %d bucket updates in %d rows (compression %.1f), %.1f records/s"
+            % (
+                typeName,
+                stats["Records"],
+                bucketUpdates,
+                stats["BucketRows"],
+                stats["Compression"],
+                stats["RecordsPerSecond"],
+            ),
+        )
+        return S_OK(stats)
+
     def insertRecordDirectly(self, typeName, startTime, endTime, valuesList):
         """
         Add an entry to the type contents
@@ -841,17 +970,7 @@ class AccountingDB(DB):
 
     def __writeBuckets(self, typeName, buckets, keyValues, valuesList, connObj=False):
         """Insert or update a bucket"""
-        #     tableName = _getTableName( "bucket", typeName )
-        # INSERT PART OF THE QUERY
-        sqlFields = ["`startTime`", "`bucketLength`", "`entriesInBucket`"]
-        for keyPos in range(len(self.dbCatalog[typeName]["keys"])):
-            sqlFields.append("`%s`" % self.dbCatalog[typeName]["keys"][keyPos])
-        sqlUpData = ["`entriesInBucket`=`entriesInBucket`+VALUES(`entriesInBucket`)"]
-        for valPos in range(len(self.dbCatalog[typeName]["values"])):
-            valueField = "`%s`" % self.dbCatalog[typeName]["values"][valPos]
-            sqlFields.append(valueField)
-            sqlUpData.append("%s=%s+VALUES(%s)" % (valueField, valueField, valueField))
-        valuesGroups = []
+        sqlRows = []
         for bucketInfo in buckets:
             bStartTime = bucketInfo[0]
             bProportion = bucketInfo[1]
@@ -862,7 +981,24 @@ class AccountingDB(DB):
             for valPos in range(len(self.dbCatalog[typeName]["values"])):
                 #         value = valuesList[ valPos ]
                 sqlValues.append("(%s*%s)" % (valuesList[valPos], bProportion))
-            valuesGroups.append("( %s )" % ",".join(str(val) for val in sqlValues))
+            sqlRows.append(sqlValues)
+        return self.__writeBucketRows(typeName, sqlRows, connObj=connObj)
+
+    def __writeBucketRows(self, typeName, sqlRows, connObj=False):
+        """
+        Insert or update bucket rows, given as lists of start time, bucket length, entries, keys and values
+        """
+        #     tableName = _getTableName( "bucket", typeName )
+        # INSERT PART OF THE QUERY
+        sqlFields = ["`startTime`", "`bucketLength`", "`entriesInBucket`"]
+        for keyPos in range(len(self.dbCatalog[typeName]["keys"])):
+            sqlFields.append("`%s`" % self.dbCatalog[typeName]["keys"][keyPos])
+        sqlUpData = ["`entriesInBucket`=`entriesInBucket`+VALUES(`entriesInBucket`)"]
+        for valPos in range(len(self.dbCatalog[typeName]["values"])):
+            valueField = "`%s`" % self.dbCatalog[typeName]["values"][valPos]
+            sqlFields.append(valueField)
+            sqlUpData.append("%s=%s+VALUES(%s)" % (valueField, valueField, valueField))
+        valuesGroups = ["( %s )" % ",".join(str(val) for val in sqlValues) for sqlValues in sqlRows]
 
         cmd = "INSERT INTO `%s` ( %s ) " % (_getTableName("bucket", typeName), ", ".join(sqlFields))
         cmd += "VALUES %s " % ", ".join(valuesGroups)
@@ -3,9 +3,12 @@
 # pylint: disable=protected-access
 
 # imports
+import time
 import unittest
 from mock import MagicMock
 
+from DIRAC import S_OK
+
 import DIRAC.AccountingSystem.DB.AccountingDB as moduleTested
 
 
@@ -416,6 +419,47 @@ ORDER BY startTime"
         self.assertTrue(retVal)
         self.assertEqual(retVal, expectedQuery)
 
+    def test_insertRecordBundleDirectly(self):
+        """
+        Test that the records falling in the same bucket with the same keys are written in one bucket row
+        """
+        module = self.testClass()
+        module._AccountingDB__addToCatalog("Transfer", ["Site"], ["Size", "Time"], [(86400 * 30, 3600)])
+        keyIds = {"CERN": 1, "PIC": 2}
+        module._AccountingDB__addKeyValue = MagicMock(side_effect=lambda _type, _key, value: S_OK(keyIds[value]))
+        module._escapeValues = MagicMock(side_effect=lambda rows: S_OK([str(tuple(row)) for row in rows]))
+        module._getConnection = MagicMock(return_value=S_OK(MagicMock()))
+        module._query = MagicMock(return_value=S_OK())
+        module._update = MagicMock(return_value=S_OK(1))
+
+        bucketStart = int(time.time()) // 3600 * 3600 - 7200
+        records = [(bucketStart + 60 * i, bucketStart + 60 * i, ["CERN", 10, 1.5]) for i in range(50)]
+        records += [(bucketStart, bucketStart, ["PIC", 4, 2.0])]
+        # Half of this one in each of the two buckets
+        records += [(bucketStart + 1800, bucketStart + 5400, ["CERN", 100, 0.0])]
+
+        result = module.insertRecordBundleDirectly("Transfer", records)
+        self.assertTrue(result["OK"], result)
+        stats = result["Value"]
+        self.assertEqual(stats["Records"], 52)
+        self.assertEqual(stats["BucketUpdates"], 53)
+        self.assertEqual(stats["BucketRows"], 3)
+        self.assertAlmostEqual(stats["Compression"], 53 / 3.0)
+
+        # One insertion of the records, one of the buckets
+        self.assertEqual(module._update.call_count, 2)
+        bucketsCmd = module._update.call_args_list[1][0][0]
+        self.assertTrue(bucketsCmd.startswith("INSERT INTO `ac_bucket_Transfer`"))
+        self.assertIn("( %s,3600,50.5,1,550.0,75.0 )" % bucketStart, bucketsCmd)
+        self.assertIn("( %s,3600,1.0,2,4.0,2.0 )" % bucketStart, bucketsCmd)
+        self.assertIn("( %s,3600,0.5,1,50.0,0.0 )" % (bucketStart + 3600), bucketsCmd)
+        self.assertIn("ON DUPLICATE KEY UPDATE", bucketsCmd)
+
+        # A record with missing fields fails the whole bundle
+        result = module.insertRecordBundleDirectly("Transfer", records + [(bucketStart, bucketStart, ["CERN", 1])])
+        self.assertFalse(result["OK"])
+        self.assertEqual(module._update.call_count, 2)
+
 
 #############################################################################
 # Test Suite run
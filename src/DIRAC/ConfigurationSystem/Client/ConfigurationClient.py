@@ -38,6 +38,18 @@ class CSJSONClient(TornadoClient):
             retVal["Value"]["data"] = b64decode(retVal["Value"]["data"])
         return retVal
 
+    def getChangesIfNewer(self, sClientVersion):
+        """
+        Transmit request to service and get the modifications of the configuration,
+        or the whole configuration in base64, which is decoded before returning.
+
+        :returns: Configuration modifications or data, if changed
+        """
+        retVal = self.executeRPC("getChangesIfNewer", sClientVersion)
+        if retVal["OK"] and "data" in retVal["Value"]:
+            retVal["Value"]["data"] = b64decode(retVal["Value"]["data"])
+        return retVal
+
     def commitNewData(self, sData):
         """
         Transmit request to service by encoding data in base64.
@@ -5,6 +5,7 @@ import errno
 from DIRAC import S_OK, S_ERROR
 from DIRAC.ConfigurationSystem.Client.Config import gConfig
 from DIRAC.ConfigurationSystem.Client.Helpers.CSGlobals import getVO
+from DIRAC.ConfigurationSystem.private.RegistryIndex import getRegistryIndex, INDEXED_GROUP_OPTIONS
 
 ID_DN_PREFIX = "/O=DIRAC/CN="
 
@@ -23,10 +24,8 @@ def getUsernameForDN(dn, usersList=None):
     """
     dn = dn.strip()
     if not usersList:
-        result = gConfig.getSections("%s/Users" % gBaseRegistrySection)
-        if not result["OK"]:
-            return result
-        usersList = result["Value"]
+        username = getRegistryIndex().userForDN.get(dn)
+        return S_OK(username) if username else S_ERROR("No username found for dn %s" % dn)
     for username in usersList:
         if dn in gConfig.getValue("%s/Users/%s/DN" % (gBaseRegistrySection, username), []):
             return S_OK(username)
@@ -77,6 +76,9 @@ def __getGroupsWithAttr(attrName, value):
 
     :return: S_OK(list)/S_ERROR() -- contain list of groups
     """
+    if attrName in INDEXED_GROUP_OPTIONS:
+        groups = list(getRegistryIndex().groupsWithOption[attrName].get(value, []))
+        return S_OK(groups) if groups else S_ERROR("No groups found for %s=%s" % (attrName, value))
     result = gConfig.getSections("%s/Groups" % gBaseRegistrySection)
     if not result["OK"]:
         return result
@@ -131,14 +133,8 @@ def getHostnameForDN(dn):
     :return: S_OK()/S_ERROR()
     """
     dn = dn.strip()
-    result = gConfig.getSections("%s/Hosts" % gBaseRegistrySection)
-    if not result["OK"]:
-        return result
-    hostList = result["Value"]
-    for hostname in hostList:
-        if dn in gConfig.getValue("%s/Hosts/%s/DN" % (gBaseRegistrySection, hostname), []):
-            return S_OK(hostname)
-    return S_ERROR("No hostname found for dn %s" % dn)
+    hostname = getRegistryIndex().hostForDN.get(dn)
+    return S_OK(hostname) if hostname else S_ERROR("No hostname found for dn %s" % dn)
 
 
 def getDefaultUserGroup():
@@ -269,8 +265,10 @@ def getPropertiesForGroup(groupName, defaultValue=None):
 
     :return: defaultValue or list
     """
-    option = "%s/Groups/%s/Properties" % (gBaseRegistrySection, groupName)
-    return gConfig.getValue(option, [] if defaultValue is None else defaultValue)
+    properties = getRegistryIndex().groupProperties.get(groupName)
+    if properties is None:
+        return [] if defaultValue is None else defaultValue
+    return list(properties)
 
 
 def getPropertiesForHost(hostName, defaultValue=None):
@@ -281,8 +279,10 @@ def getPropertiesForHost(hostName, defaultValue=None):
 
     :return: defaultValue or list
     """
-    option = "%s/Hosts/%s/Properties" % (gBaseRegistrySection, hostName)
-    return gConfig.getValue(option, [] if defaultValue is None else defaultValue)
+    properties = getRegistryIndex().hostProperties.get(hostName)
+    if properties is None:
+        return [] if defaultValue is None else defaultValue
+    return list(properties)
 
 
 def getPropertiesForEntity(group, name="", dn="", defaultValue=None):
@@ -480,11 +480,7 @@ def getGroupsWithVOMSAttribute(vomsAttr):
 
     :return: list
     """
-    groups = []
-    for group in gConfig.getSections("%s/Groups" % (gBaseRegistrySection)).get("Value", []):
-        if vomsAttr == gConfig.getValue("%s/Groups/%s/VOMSRole" % (gBaseRegistrySection, group), ""):
-            groups.append(group)
-    return groups
+    return list(getRegistryIndex().groupsWithVOMSRole.get(vomsAttr, []))
 
 
 def getVOs():
@@ -0,0 +1,103 @@
+""" Test of the Registry helpers and of the index they use
+"""
+from diraccfg import CFG
+
+from DIRAC import gConfig
+from DIRAC.ConfigurationSystem.Client.Helpers import Registry
+from DIRAC.ConfigurationSystem.private.RegistryIndex import gRegistryIndexCache
+
+testRegistryCFG = """
+Registry
+{
+  Users
+  {
+    userA
+    {
+      DN = /DC=ch/CN=userA, /DC=ch/CN=userA2
+    }
+    userB
+    {
+      DN = /DC=ch/CN=userB
+    }
+  }
+  Hosts
+  {
+    host.ch
+    {
+      DN = /DC=ch/CN=host.ch
+      Properties = TrustedHost, CSAdministrator
+    }
+  }
+  Groups
+  {
+    group_b
+    {
+      Users = userA, userB
+      VO = testVO
+      Properties = NormalUser
+      VOMSRole = /testVO
+    }
+    group_a
+    {
+      Users = userA
+      VO = testVO
+      Properties = NormalUser, ProductionManagement
+      VOMSRole = /testVO/Role=production
+    }
+    group_c
+    {
+      Users = userB
+      VO = otherVO
+      VOMSRole = /testVO
+    }
+  }
+}
+"""
+
+
+def loadRegistry(cfgString):
+    cfg = CFG()
+    cfg.loadFromBuffer(cfgString)
+    gConfig.loadCFG(cfg)
+
+
+def test_lookups():
+    loadRegistry(testRegistryCFG)
+
+    assert Registry.getUsernameForDN(" /DC=ch/CN=userA2 ")["Value"] == "userA"
+    assert Registry.getUsernameForDN("/DC=ch/CN=userB", ["userA"])["OK"] is False
+    assert Registry.getUsernameForDN("/DC=ch/CN=unknown")["Message"] == "No username found for dn /DC=ch/CN=unknown"
+    assert Registry.getHostnameForDN("/DC=ch/CN=host.ch")["Value"] == "host.ch"
+    assert not Registry.getHostnameForDN("/DC=ch/CN=userA")["OK"]
+
+    assert Registry.getGroupsForUser("userA")["Value"] == ["group_a", "group_b"]
+    assert Registry.getGroupsForDN("/DC=ch/CN=userB")["Value"] == ["group_b", "group_c"]
+    assert Registry.getGroupsForUser("userC")["Message"] == "No groups found for Users=userC"
+    assert Registry.getGroupsWithProperty("NormalUser")["Value"] == ["group_a", "group_b"]
+    assert Registry.getGroupsWithVOMSAttribute("/testVO") == ["group_b", "group_c"]
+
+    assert Registry.getPropertiesForGroup("group_a") == ["NormalUser", "ProductionManagement"]
+    assert Registry.getPropertiesForGroup("group_c", ["Default"]) == ["Default"]
+    assert Registry.getPropertiesForEntity("hosts", dn="/DC=ch/CN=host.ch") == ["TrustedHost", "CSAdministrator"]
+
+    # The callers can modify what they get
+    Registry.getGroupsForUser("userA")["Value"].append("group_x")
+    Registry.getPropertiesForGroup("group_a").append("FullDelegation")
+    assert Registry.getGroupsForUser("userA")["Value"] == ["group_a", "group_b"]
+    assert Registry.getPropertiesForGroup("group_a") == ["NormalUser", "ProductionManagement"]
+
+
+def test_rebuild():
+    loadRegistry(testRegistryCFG)
+    Registry.getGroupsForUser("userA")
+    builds = gRegistryIndexCache.builds
+    for _ in range(10):
+        Registry.getUsernameForDN("/DC=ch/CN=userA")
+        Registry.getPropertiesForGroup("group_a")
+    assert gRegistryIndexCache.builds == builds
+
+    # Any change of the configuration is seen
+    loadRegistry("Registry\n{\nUsers\n{\nuserC\n{\nDN = /DC=ch/CN=userA\n}\n}\n}\n")
+    assert Registry.getUsernameForDN("/DC=ch/CN=userA")["Value"] in ("userA", "userC")
+    assert gRegistryIndexCache.builds == builds + 1
+    assert Registry.getUsernameForDN("/DC=ch/CN=userA", ["userC"])["Value"] == "userC"
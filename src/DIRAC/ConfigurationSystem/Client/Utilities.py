@@ -386,7 +386,8 @@ def getDBParameters(fullname):
            defaultQueueSize is the QueueSize to return if the option is not found in the CS
 
     :return: S_OK(dict)/S_ERROR() - dictionary with the keys: 'host', 'port', 'user', 'password',
-                                    'db' and 'queueSize'
+                                    'db' and 'queueSize', plus 'ConnectionPool' with the parameters
+                                    of the connection pool, which are common to all the databases
     """
 
     cs_path = getDatabaseSection(fullname)
@@ -443,6 +444,14 @@ def getDBParameters(fullname):
     dbName = result["Value"]
     parameters["DBName"] = dbName
 
+    # The connection pool is shared by all the databases of a server, so its parameters are only at the common place
+    parameters["ConnectionPool"] = {
+        "pingInterval": gConfig.getValue("/Systems/Databases/PingInterval", 0),
+        "cleanInterval": gConfig.getValue("/Systems/Databases/CleanInterval", 0),
+        "maxConnections": gConfig.getValue("/Systems/Databases/MaxConnections", 0),
+        "waitTimeout": gConfig.getValue("/Systems/Databases/ConnectionWaitTimeout", 30),
+    }
+
     return S_OK(parameters)
 
 
@@ -51,6 +51,23 @@ class ConfigurationHandler(RequestHandler):
             retDict["data"] = gServiceInterface.getCompressedConfigurationData()
         return S_OK(retDict)
 
+    types_getChangesIfNewer = [str]
+
+    @classmethod
+    def export_getChangesIfNewer(cls, sClientVersion):
+        """Get the modifications of the configuration since the client version if they are known,
+        the whole configuration otherwise
+        """
+        sVersion = gServiceInterface.getVersion()
+        retDict = {"newestVersion": sVersion}
+        if sClientVersion < sVersion:
+            changes = gServiceInterface.getConfigurationChanges(sClientVersion)
+            if changes is None:
+                retDict["data"] = gServiceInterface.getCompressedConfigurationData()
+            else:
+                retDict["changes"] = changes
+        return S_OK(retDict)
+
     types_publishSlaveServer = [str]
 
     @classmethod
@@ -57,6 +57,23 @@ class TornadoConfigurationHandler(TornadoService):
             retDict["data"] = b64encode(self.ServiceInterface.getCompressedConfigurationData()).decode()
         return S_OK(retDict)
 
+    def export_getChangesIfNewer(self, sClientVersion):
+        """
+        Returns the modifications of the configuration since the client version if they are known,
+        the whole configuration if not, or just the version if the client is up to date
+
+        :param sClientVersion: Version used by client
+        """
+        sVersion = self.ServiceInterface.getVersion()
+        retDict = {"newestVersion": sVersion}
+        if sClientVersion < sVersion:
+            changes = self.ServiceInterface.getConfigurationChanges(sClientVersion)
+            if changes is None:
+                retDict["data"] = b64encode(self.ServiceInterface.getCompressedConfigurationData()).decode()
+            else:
+                retDict["changes"] = changes
+        return S_OK(retDict)
+
     def export_publishSlaveServer(self, sURL):
         """
         Used by slave server to register as a slave server.
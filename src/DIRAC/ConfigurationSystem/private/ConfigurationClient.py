@@ -9,6 +9,9 @@ from DIRAC.ConfigurationSystem.Client.Helpers.Path import cfgPath
 from DIRAC.ConfigurationSystem.Client.ConfigurationData import gConfigurationData
 from DIRAC.ConfigurationSystem.private.Refresher import gRefresher
 
+# Maximum number of lookups cached for a version of the configuration
+MAX_CACHED_LOOKUPS = 20000
+
 
 class ConfigurationClient(object):
     def __init__(self, fileToLoadList=None):
@@ -132,8 +135,42 @@ class ConfigurationClient(object):
         :return: S_OK()/S_ERROR()
         """
         gRefresher.refreshConfigurationIfNeeded()
-        optionValue = gConfigurationData.extractOptionFromCFG(optionPath)
+        lookupCache = gConfigurationData.getLookupCache()
+        if not lookupCache:
+            return self.__convertOption(optionPath, gConfigurationData.extractOptionFromCFG(optionPath), typeValue)
+
+        mergedCFG, cachedLookups = lookupCache
+        requestedType = typeValue if typeValue is None or isinstance(typeValue, type) else type(typeValue)
+        cacheKey = ("Option", optionPath, requestedType)
+        result = cachedLookups.get(cacheKey)
+        if result is None:
+            optionValue = gConfigurationData.extractOptionFromCFG(optionPath, mergedCFG)
+            result = self.__convertOption(optionPath, optionValue, typeValue)
+            # The conversion errors depend on the default value
+            if result["OK"] or optionValue is None:
+                self.__cacheLookup(cachedLookups, cacheKey, result)
+        result = dict(result)
+        if result["OK"] and isinstance(result["Value"], (list, set, dict)):
+            result["Value"] = result["Value"].copy()
+        return result
+
+    @staticmethod
+    def __cacheLookup(cachedLookups, cacheKey, result):
+        """Remember the result of a lookup until the next change of the configuration"""
+        if len(cachedLookups) >= MAX_CACHED_LOOKUPS:
+            cachedLookups.clear()
+        cachedLookups[cacheKey] = result
+
+    @staticmethod
+    def __convertOption(optionPath, optionValue, typeValue):
+        """Convert the value of an option to the type of typeValue
 
+        :param str optionPath: option path
+        :param optionValue: option value, None if the option does not exist
+        :param typeValue: type of value
+
+        :return: S_OK()/S_ERROR()
+        """
         if optionValue is None:
             return S_ERROR(
                 "Path %s does not exist or it's not an option" % optionPath,
@@ -220,14 +257,22 @@ class ConfigurationClient(object):
         :return: S_OK(dict)/S_ERROR()
         """
         gRefresher.refreshConfigurationIfNeeded()
-        optionsDict = {}
-        optionList = gConfigurationData.getOptionsFromCFG(sectionPath)
-        if isinstance(optionList, list):
+        lookupCache = gConfigurationData.getLookupCache()
+        mergedCFG, cachedLookups = lookupCache if lookupCache else (gConfigurationData.mergedCFG, None)
+        cacheKey = ("OptionsDict", sectionPath)
+        optionsDict = cachedLookups.get(cacheKey) if cachedLookups is not None else None
+        if optionsDict is None:
+            optionList = gConfigurationData.getOptionsFromCFG(sectionPath, mergedCFG)
+            if not isinstance(optionList, list):
+                return S_ERROR("Path %s does not exist or it's not a section" % sectionPath)
+            optionsDict = {}
             for option in optionList:
-                optionsDict[option] = gConfigurationData.extractOptionFromCFG("%s/%s" % (sectionPath, option))
-            return S_OK(optionsDict)
-        else:
-            return S_ERROR("Path %s does not exist or it's not a section" % sectionPath)
+                optionsDict[option] = gConfigurationData.extractOptionFromCFG(
+                    "%s/%s" % (sectionPath, option), mergedCFG
+                )
+            if cachedLookups is not None:
+                self.__cacheLookup(cachedLookups, cacheKey, optionsDict)
+        return S_OK(dict(optionsDict))
 
     def getOptionsDictRecursively(self, sectionPath):
         """Get configuration options in dictionary recursively
@@ -7,6 +7,8 @@ import zipfile
 import _thread
 import time
 import datetime
+from collections import OrderedDict
+
 import DIRAC
 
 from diraccfg import CFG
@@ -27,11 +29,20 @@ class ConfigurationData(object):
             self.threadingEvent.set()
             self.threadingLock = lr.getLock()
             self.runningThreadsNumber = 0
+        envVar = os.environ.get("DIRAC_NO_CFG_LOOKUP_CACHE", "no").lower()
+        self.lookupCacheEnabled = envVar not in ("y", "yes", "t", "true", "on", "1")
+        # Results of the lookups in the merged CFG, valid as long as it is the same object
+        self.__lookupCache = (None, {})
 
         self.__compressedConfigurationData = None
         self.configurationPath = "/DIRAC/Configuration"
         self.backupsDir = os.path.join(DIRAC.rootPath, "etc", "csbackup")
         self._isService = False
+        # Modifications of the remote CFG between the last versions, kept by the services
+        # { version: (next version, modifications list) }
+        self.__versionChanges = OrderedDict()
+        self.__lastVersion = None
+        self.__lastVersionCFG = None
         self.localCFG = CFG()
         self.remoteCFG = CFG()
         self.mergedCFG = CFG()
@@ -63,6 +74,83 @@ class ConfigurationData(object):
             self.remoteServerList.extend(List.fromChar(remoteServers, ","))
         self.remoteServerList = List.uniqueElements(self.remoteServerList)
         self.__compressedConfigurationData = None
+        if self._isService:
+            self.__recordVersionChanges()
+
+    def __recordVersionChanges(self):
+        """Keep the modifications of the remote CFG since the previous version, if the version changed"""
+        version = self.getVersion()
+        if version == self.__lastVersion:
+            return
+        maxVersionChanges = self.getMaxVersionChanges()
+        if self.__lastVersionCFG is not None and maxVersionChanges > 0:
+            self.__versionChanges[self.__lastVersion] = (
+                version,
+                self.__lastVersionCFG.getModifications(self.remoteCFG),
+            )
+            while len(self.__versionChanges) > maxVersionChanges:
+                self.__versionChanges.popitem(last=False)
+        self.__lastVersion = version
+        self.__lastVersionCFG = self.remoteCFG.clone() if maxVersionChanges > 0 else None
+
+    def getRemoteCFGChanges(self, version):
+        """Get the modifications to apply to the remote CFG of a given version to get the current one
+
+        :param str version: version of the remote CFG
+        :return: list of modifications lists, to apply in order, or None if they are not all known
+        """
+        changes = []
+        currentVersion = self.__lastVersion
+        while version != currentVersion:
+            versionChanges = self.__versionChanges.get(version)
+            if not versionChanges or len(changes) >= len(self.__versionChanges):
+                return None
+            version, modList = versionChanges
+            changes.append(modList)
+        return changes
+
+    def applyRemoteCFGChanges(self, changesList, newVersion):
+        """Apply to the remote CFG the modifications sent by a configuration server
+
+        If they can not be applied, the version is reset so that the whole configuration is downloaded next time
+
+        :param list changesList: modifications lists, as returned by getRemoteCFGChanges
+        :param str newVersion: version expected once the modifications are applied
+        :return: S_OK()/S_ERROR()
+        """
+        self.lock()
+        try:
+            result = S_OK()
+            for modList in changesList:
+                result = self.remoteCFG.applyModifications(modList)
+                if not result["OK"]:
+                    break
+        except Exception as e:
+            result = S_ERROR("Cannot apply the modifications: %s" % repr(e))
+        finally:
+            self.unlock()
+        if result["OK"] and self.getVersion() != newVersion:
+            result = S_ERROR("Got version %s instead of %s" % (self.getVersion(), newVersion))
+        if not result["OK"]:
+            self.lock()
+            self.remoteCFG.setOption("%s/Version" % self.configurationPath, "0")
+            self.unlock()
+            return result
+        self.sync()
+        return result
+
+    def getLookupCache(self):
+        """Get the cache of the lookups in the merged CFG. A new one is used each time the merged CFG changes:
+        the lookups in it must be done in the merged CFG returned with it.
+
+        :return: tuple (merged CFG, dict), or None if disabled
+        """
+        if not self.lookupCacheEnabled:
+            return None
+        lookupCache = self.__lookupCache
+        if lookupCache[0] is not self.mergedCFG:
+            lookupCache = self.__lookupCache = (self.mergedCFG, {})
+        return lookupCache
 
     def loadFile(self, fileName):
         try:
@@ -247,6 +335,16 @@ class ConfigurationData(object):
         except Exception:
             return False
 
+    def getMaxVersionChanges(self):
+        try:
+            return int(self.extractOptionFromCFG("%s/MaxVersionChanges" % self.configurationPath, self.mergedCFG))
+        except Exception:
+            return 10
+
+    def incrementalRefreshEnabled(self):
+        value = self.extractOptionFromCFG("%s/IncrementalRefresh" % self.configurationPath, self.mergedCFG)
+        return bool(value) and value.lower() in ("yes", "true", "y")
+
     def getAutoPublish(self):
         value = self.extractOptionFromCFG("%s/AutoPublish" % self.configurationPath, self.localCFG)
         if value and value.lower() in ("no", "false", "n"):
@@ -16,6 +16,12 @@ def _updateFromRemoteLocation(serviceClient):
     """
     gLogger.debug("", "Trying to refresh from %s" % serviceClient.serverURL)
     localVersion = gConfigurationData.getVersion()
+    if gConfigurationData.incrementalRefreshEnabled() and localVersion != "0":
+        retVal = _applyChangesFromRemoteLocation(serviceClient, localVersion)
+        if retVal["OK"]:
+            return retVal
+        gLogger.verbose("Can't refresh incrementally, getting the whole configuration", retVal["Message"])
+        localVersion = gConfigurationData.getVersion()
     retVal = serviceClient.getCompressedDataIfNewer(localVersion)
     if retVal["OK"]:
         dataDict = retVal["Value"]
@@ -29,6 +35,30 @@ def _updateFromRemoteLocation(serviceClient):
     return retVal
 
 
+def _applyChangesFromRemoteLocation(serviceClient, localVersion):
+    """
+    Refresh the configuration with only the modifications since the local version,
+    or the whole configuration if the server does not have them
+    """
+    retVal = serviceClient.getChangesIfNewer(localVersion)
+    if not retVal["OK"]:
+        return retVal
+    dataDict = retVal["Value"]
+    newestVersion = dataDict["newestVersion"]
+    if localVersion < newestVersion:
+        if "changes" in dataDict:
+            gLogger.debug("New version available", "Applying %s modifications..." % len(dataDict["changes"]))
+            retVal = gConfigurationData.applyRemoteCFGChanges(dataDict["changes"], newestVersion)
+            if not retVal["OK"]:
+                return retVal
+        else:
+            gLogger.debug("New version available", "Updating to version %s..." % newestVersion)
+            gConfigurationData.loadRemoteCFGFromCompressedMem(dataDict["data"])
+        gLogger.debug("Updated to version %s" % gConfigurationData.getVersion())
+        gEventDispatcher.triggerEvent("CSNewVersion", newestVersion, threaded=True)
+    return S_OK()
+
+
 class RefresherBase(object):
     """
     Code factorisation for the refresher
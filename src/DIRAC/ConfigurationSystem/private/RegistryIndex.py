@@ -0,0 +1,123 @@
+""" Reverse indexes of the /Registry section
+
+The Registry helpers resolving the credentials (DN -> user, user -> groups, group -> properties...)
+are called on the authorization path of every request. Instead of walking all the users, hosts and groups
+of the configuration at each call, the helpers use the mappings built here.
+
+The indexes are built once from the merged configuration of gConfigurationData, and rebuilt when it changes:
+every change of the configuration, a new version from the server as well as a local modification,
+replaces gConfigurationData.mergedCFG by a new object.
+"""
+import threading
+
+from DIRAC.Core.Utilities import List
+from DIRAC.ConfigurationSystem.Client.ConfigurationData import gConfigurationData
+from DIRAC.ConfigurationSystem.private.Refresher import gRefresher
+
+# Group options for which the groups are indexed by value
+INDEXED_GROUP_OPTIONS = ("Users", "VO", "Properties")
+
+
+class RegistryIndex(object):
+    """Mappings of one version of the /Registry section. They must not be modified."""
+
+    def __init__(self, registryCFG=None):
+        """c'tor
+
+        :param registryCFG: CFG of the /Registry section, or None if there is none
+        """
+        # { DN: user name }, the first user with the DN in the order of the configuration
+        self.userForDN = {}
+        # { DN: host name }
+        self.hostForDN = {}
+        # { option: { value: sorted list of groups } } for the INDEXED_GROUP_OPTIONS
+        self.groupsWithOption = {option: {} for option in INDEXED_GROUP_OPTIONS}
+        # { VOMS role: list of groups, in the order of the configuration }
+        self.groupsWithVOMSRole = {}
+        # { group: list of properties } and { host: list of properties }, if defined
+        self.groupProperties = {}
+        self.hostProperties = {}
+        if registryCFG:
+            self.__build(registryCFG)
+
+    @staticmethod
+    def __getSections(cfg, name):
+        """Subsections of a section, in the order of the configuration"""
+        if not cfg.isSection(name):
+            return []
+        return [(subName, cfg[name][subName]) for subName in cfg[name].listSections(True)]
+
+    @staticmethod
+    def __getList(cfg, option):
+        """Value of a comma separated option, as gConfig.getValue( option, [] ) would return it"""
+        return List.fromChar(cfg[option], ",") if cfg.isOption(option) else None
+
+    def __build(self, registryCFG):
+        for userName, userCFG in self.__getSections(registryCFG, "Users"):
+            for dn in self.__getList(userCFG, "DN") or []:
+                self.userForDN.setdefault(dn, userName)
+
+        for hostName, hostCFG in self.__getSections(registryCFG, "Hosts"):
+            for dn in self.__getList(hostCFG, "DN") or []:
+                self.hostForDN.setdefault(dn, hostName)
+            properties = self.__getList(hostCFG, "Properties")
+            if properties is not None:
+                self.hostProperties[hostName] = properties
+
+        for groupName, groupCFG in self.__getSections(registryCFG, "Groups"):
+            for option in INDEXED_GROUP_OPTIONS:
+                for value in set(self.__getList(groupCFG, option) or []):
+                    self.groupsWithOption[option].setdefault(value, []).append(groupName)
+            properties = self.__getList(groupCFG, "Properties")
+            if properties is not None:
+                self.groupProperties[groupName] = properties
+            if groupCFG.isOption("VOMSRole"):
+                self.groupsWithVOMSRole.setdefault(groupCFG["VOMSRole"], []).append(groupName)
+
+        for groupsByValue in self.groupsWithOption.values():
+            for groups in groupsByValue.values():
+                groups.sort()
+
+
+class RegistryIndexCache(object):
+    """Keeps the index of the current configuration"""
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__cfg = None
+        self.__index = RegistryIndex()
+        self.builds = 0
+
+    def getIndex(self):
+        """Get the index of the current configuration, built if the configuration changed
+
+        :return: RegistryIndex
+        """
+        gRefresher.refreshConfigurationIfNeeded()
+        mergedCFG = gConfigurationData.mergedCFG
+        if mergedCFG is self.__cfg:
+            return self.__index
+        with self.__lock:
+            # Another thread may have built it meanwhile
+            if mergedCFG is not self.__cfg:
+                gConfigurationData.dangerZoneStart()
+                try:
+                    registryCFG = mergedCFG["Registry"] if mergedCFG.isSection("Registry") else None
+                    index = RegistryIndex(registryCFG)
+                finally:
+                    gConfigurationData.dangerZoneEnd()
+                self.__index = index
+                self.__cfg = mergedCFG
+                self.builds += 1
+            return self.__index
+
+
+gRegistryIndexCache = RegistryIndexCache()
+
+
+def getRegistryIndex():
+    """Get the index of the /Registry section of the current configuration
+
+    :return: RegistryIndex
+    """
+    return gRegistryIndexCache.getIndex()
@@ -254,6 +254,15 @@ class ServiceInterfaceBase(object):
     def getVersion(self):
         return gConfigurationData.getVersion()
 
+    def getConfigurationChanges(self, version):
+        """
+        Get the modifications of the configuration since a version
+
+        :param str version: version of the client
+        :return: list of modifications lists, or None if they are not known
+        """
+        return gConfigurationData.getRemoteCFGChanges(version)
+
     def getCommitHistory(self):
         files = self.__getCfgBackups(gConfigurationData.getBackupDir())
         backups = [".".join(fileName.split(".")[1:-1]).split("@") for fileName in files]
@@ -0,0 +1,65 @@
+""" Test of the cache of the lookups of the ConfigurationClient
+"""
+import pytest
+from diraccfg import CFG
+
+from DIRAC import gConfig
+from DIRAC.ConfigurationSystem.Client.ConfigurationData import gConfigurationData
+
+testCFG = """
+Operations
+{
+  Defaults
+  {
+    JobScheduling
+    {
+      CheckJobLimits = yes
+      MaxRescheduling = 3
+      Platforms = x86_64-el9, x86_64-el8
+      AllowedSites = CERN:1, IN2P3
+    }
+  }
+}
+"""
+
+
+@pytest.fixture(name="lookupCache", params=[True, False])
+def fixtureLookupCache(request):
+    cfg = CFG()
+    cfg.loadFromBuffer(testCFG)
+    gConfig.loadCFG(cfg)
+    gConfigurationData.lookupCacheEnabled = request.param
+    yield request.param
+    gConfigurationData.lookupCacheEnabled = True
+
+
+def test_getValue(lookupCache):
+    section = "/Operations/Defaults/JobScheduling"
+    for _ in range(2):
+        assert gConfig.getValue("%s/CheckJobLimits" % section, False) is True
+        assert gConfig.getValue("%s/MaxRescheduling" % section, 1) == 3
+        assert gConfig.getValue("%s/MaxRescheduling" % section) == "3"
+        assert gConfig.getValue("%s/MaxRescheduling" % section, 1.5) == 3.0
+        assert gConfig.getValue("%s/Platforms" % section, []) == ["x86_64-el9", "x86_64-el8"]
+        assert gConfig.getValue("%s/AllowedSites" % section, {}) == {"CERN": "1", "IN2P3": True}
+        assert gConfig.getValue("%s/Missing" % section, "default") == "default"
+        assert not gConfig.getOption("%s/Missing" % section)["OK"]
+        # The conversion errors depend on the default value
+        assert gConfig.getValue("%s/Platforms" % section, 2) == 2
+        assert gConfig.getValue("%s/Platforms" % section, 4) == 4
+
+    # What is returned can be modified
+    gConfig.getValue("%s/Platforms" % section, []).append("x86_64-el7")
+    assert gConfig.getValue("%s/Platforms" % section, []) == ["x86_64-el9", "x86_64-el8"]
+    gConfig.getOptionsDict(section)["Value"]["MaxRescheduling"] = "5"
+    assert gConfig.getOptionsDict(section)["Value"]["MaxRescheduling"] == "3"
+    assert not gConfig.getOptionsDict("%s/Missing" % section)["OK"]
+
+
+def test_invalidation(lookupCache):
+    path = "/Operations/Defaults/JobScheduling/MaxRescheduling"
+    assert gConfig.getValue(path, 1) == 3
+    gConfigurationData.setOptionInCFG(path, "4", gConfigurationData.localCFG)
+    assert gConfig.getValue(path, 1) == 4
+    assert gConfig.getOptionsDict("/Operations/Defaults/JobScheduling")["Value"]["MaxRescheduling"] == "4"
+    assert bool(gConfigurationData.getLookupCache()) is lookupCache
@@ -0,0 +1,118 @@
+""" Test of the incremental distribution of the configuration
+"""
+from unittest.mock import MagicMock
+
+from diraccfg import CFG
+
+from DIRAC import S_OK, S_ERROR
+from DIRAC.ConfigurationSystem.private import RefresherBase
+from DIRAC.ConfigurationSystem.private.ConfigurationData import ConfigurationData
+
+initialCFG = """
+DIRAC
+{
+  Configuration
+  {
+    Version = 2022-01-01
+    MaxVersionChanges = 2
+  }
+}
+Registry
+{
+  Users
+  {
+    userA
+    {
+      DN = /DC=ch/CN=userA
+    }
+  }
+}
+"""
+
+
+def getServer():
+    server = ConfigurationData(False)
+    server.setAsService()
+    server.loadRemoteCFGFromMem(initialCFG)
+    return server
+
+
+def getClient(incrementalRefresh=True):
+    client = ConfigurationData(False)
+    client.loadRemoteCFGFromMem(initialCFG)
+    if incrementalRefresh:
+        client.mergeWithLocal(CFG().loadFromBuffer("DIRAC\n{\nConfiguration\n{\nIncrementalRefresh = yes\n}\n}\n"))
+    return client
+
+
+def newVersion(server, version, path, value):
+    server.setOptionInCFG(path, value, server.remoteCFG)
+    server.setVersion(version)
+
+
+def test_changes():
+    server = getServer()
+    assert server.getRemoteCFGChanges("2022-01-01") == []
+    newVersion(server, "2022-01-02", "/Registry/Users/userA/DN", "/DC=ch/CN=userA2")
+    newVersion(server, "2022-01-03", "/Registry/Users/userB/DN", "/DC=ch/CN=userB")
+
+    client = getClient()
+    changes = server.getRemoteCFGChanges("2022-01-01")
+    assert len(changes) == 2
+    assert client.applyRemoteCFGChanges(changes, "2022-01-03")["OK"]
+    assert str(client.remoteCFG) == str(server.remoteCFG)
+    assert client.getVersion() == "2022-01-03"
+    assert client.extractOptionFromCFG("/Registry/Users/userB/DN") == "/DC=ch/CN=userB"
+
+    # Only the last versions are kept
+    newVersion(server, "2022-01-04", "/Registry/Users/userB/DN", "/DC=ch/CN=userB2")
+    assert server.getRemoteCFGChanges("2022-01-01") is None
+    assert len(server.getRemoteCFGChanges("2022-01-02")) == 2
+    assert server.getRemoteCFGChanges("2021-12-31") is None
+
+
+def test_applyFailure():
+    server = getServer()
+    newVersion(server, "2022-01-02", "/Registry/Users/userA/DN", "/DC=ch/CN=userA2")
+    changes = server.getRemoteCFGChanges("2022-01-01")
+
+    client = getClient()
+    client.remoteCFG.deleteKey("Registry")
+    result = client.applyRemoteCFGChanges(changes, "2022-01-02")
+    assert not result["OK"]
+    # The whole configuration is downloaded next time
+    assert client.getVersion() == "0"
+
+
+def test_updateFromRemoteLocation(mocker):
+    server = getServer()
+    newVersion(server, "2022-01-02", "/Registry/Users/userA/DN", "/DC=ch/CN=userA2")
+    mocker.patch.object(RefresherBase, "gEventDispatcher")
+    serviceClient = MagicMock()
+    serviceClient.getChangesIfNewer.return_value = S_OK(
+        {"newestVersion": "2022-01-02", "changes": server.getRemoteCFGChanges("2022-01-01")}
+    )
+    serviceClient.getCompressedDataIfNewer.return_value = S_OK({"newestVersion": "2022-01-02"})
+
+    client = mocker.patch.object(RefresherBase, "gConfigurationData", getClient())
+    assert RefresherBase._updateFromRemoteLocation(serviceClient)["OK"]
+    serviceClient.getChangesIfNewer.assert_called_once_with("2022-01-01")
+    serviceClient.getCompressedDataIfNewer.assert_not_called()
+    assert client.getVersion() == "2022-01-02"
+
+    # Servers without incremental refresh
+    client = mocker.patch.object(RefresherBase, "gConfigurationData", getClient())
+    serviceClient.getChangesIfNewer.return_value = S_ERROR("Unknown method")
+    serviceClient.getCompressedDataIfNewer.return_value = S_OK(
+        {"newestVersion": "2022-01-02", "data": server.getCompressedData()}
+    )
+    assert RefresherBase._updateFromRemoteLocation(serviceClient)["OK"]
+    serviceClient.getCompressedDataIfNewer.assert_called_once_with("2022-01-01")
+    assert str(client.remoteCFG) == str(server.remoteCFG)
+
+    # Disabled
+    serviceClient.reset_mock()
+    client = mocker.patch.object(RefresherBase, "gConfigurationData", getClient(incrementalRefresh=False))
+    assert RefresherBase._updateFromRemoteLocation(serviceClient)["OK"]
+    serviceClient.getChangesIfNewer.assert_not_called()
+    assert client.getVersion() == "2022-01-02"
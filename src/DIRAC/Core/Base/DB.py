@@ -31,6 +31,7 @@ class DB(DIRACDB, MySQL):
             dbName=self.dbName,
             port=self.dbPort,
             debug=debug,
+            connectionPoolParameters=dbParameters.get("ConnectionPool"),
             parentLogger=parentLogger,
         )
 
@@ -1,6 +1,7 @@
 """ This module exposes the BaseClient class,
     which serves as base for InnerRPCClient and TransferClient.
 """
+import os
 import time
 
 import _thread
@@ -14,7 +15,9 @@ from DIRAC.ConfigurationSystem.Client.Config import gConfig
 from DIRAC.ConfigurationSystem.Client.PathFinder import getServiceURL, getServiceFailoverURL
 from DIRAC.ConfigurationSystem.Client.Helpers import Registry
 from DIRAC.ConfigurationSystem.Client.Helpers.CSGlobals import skipCACheck
+from DIRAC.Core.DISET.private.PersistentConnectionPool import getGlobalPersistentConnectionPool
 from DIRAC.Core.DISET.private.TransportPool import getGlobalTransportPool
+from DIRAC.Core.Security import Locations
 from DIRAC.Core.DISET.ThreadConfig import ThreadConfig
 
 
@@ -38,6 +41,7 @@ class BaseClient(object):
     KW_PROXY_CHAIN = "proxyChain"
     KW_SKIP_CA_CHECK = "skipCACheck"
     KW_KEEP_ALIVE_LAPSE = "keepAliveLapse"
+    KW_PERSISTENT_CONNECTION = "persistentConnection"
 
     __threadConfig = ThreadConfig()
 
@@ -58,6 +62,8 @@ class BaseClient(object):
         :param proxyChain: Specify the proxy chain
         :param skipCACheck: Do not check the CA
         :param keepAliveLapse: Duration for keepAliveLapse (heartbeat like)
+        :param persistentConnection: Keep the connection open for the next calls, if the service allows it
+                                     (default /DIRAC/Connection/DISETPersistentConnections, False)
         """
 
         if not isinstance(serviceName, str):
@@ -68,6 +74,9 @@ class BaseClient(object):
         self._destinationSrv = str(serviceName)
         self._serviceName = str(serviceName)
         self.kwargs = kwargs
+        self.__persistentConnection = self.kwargs.pop(self.KW_PERSISTENT_CONNECTION, None)
+        if self.__persistentConnection is None:
+            self.__persistentConnection = gConfig.getValue("/DIRAC/Connection/DISETPersistentConnections", False)
         self.__useCertificates = None
         # The CS useServerCertificate option can be overridden by explicit argument
         self.__forceUseCertificates = self.kwargs.get(self.KW_USE_CERTIFICATES)
@@ -436,14 +445,17 @@ and this is thread %s
             gLogger.error("DISET client thread safety error", msgTxt)
             # raise Exception( msgTxt )
 
-    def _connect(self):
+    def _connect(self, reuseConnection=False):
         """Establish the connection.
         It uses the URL discovered in __discoverURL.
         In case the connection cannot be established, __discoverURL
         is called again, and _connect calls itself.
         We stop after trying self.__nbOfRetry * self.__nbOfUrls
 
-        :return: S_OK()/S_ERROR()
+        :param bool reuseConnection: use a persistent connection left open by a previous call if there is one.
+                                     The result then has reusedConnection set.
+
+        :return: S_OK((trid, transport))/S_ERROR()
         """
         # Check if the useServerCertificate configuration changed
         # Note: I am not really sure that  all this block makes
@@ -465,6 +477,15 @@ and this is thread %s
         if self.__enableThreadCheck:
             self.__checkThreadID()
 
+        # Reuse a connection kept open by a previous call
+        if reuseConnection and self.__persistentConnection:
+            transport = getGlobalPersistentConnectionPool().get(self.__getConnectionKey())
+            if transport:
+                gLogger.debug("Reusing connection to: %s" % self.serviceURL)
+                result = S_OK((getGlobalTransportPool().add(transport), transport))
+                result["reusedConnection"] = True
+                return result
+
         gLogger.debug("Trying to connect to: %s" % self.serviceURL)
         try:
             # Calls the transport method of the apropriate protocol.
@@ -512,7 +533,7 @@ and this is thread %s
                     # rediscover the URL
                     self.__discoverURL()
                     # try to reconnect
-                    return self._connect()
+                    return self._connect(reuseConnection)
                 else:
                     return retVal
         except Exception as e:
@@ -520,17 +541,72 @@ and this is thread %s
             return S_ERROR("Can't connect to %s: %s" % (self.serviceURL, repr(e)))
         # We add the connection to the transport pool
         gLogger.debug("Connected to: %s" % self.serviceURL)
+        if self.__persistentConnection:
+            getGlobalPersistentConnectionPool().addHandshake()
         trid = getGlobalTransportPool().add(transport)
 
         return S_OK((trid, transport))
 
-    def _disconnect(self, trid):
+    def _disconnect(self, trid, keepAlive=0):
         """Disconnect the connection.
 
         :param str trid: Transport ID in the transportPool
+        :param int keepAlive: seconds the server keeps the connection open, if it accepted to.
+                              The connection is then kept for the next calls instead of being closed.
         """
+        if keepAlive and self.__persistentConnection:
+            transport = getGlobalTransportPool().get(trid)
+            if transport:
+                getGlobalTransportPool().remove(trid)
+                getGlobalPersistentConnectionPool().put(self.__getConnectionKey(), transport, keepAlive)
+                return
         getGlobalTransportPool().close(trid)
 
+    def _discardConnection(self, trid):
+        """Close a reused connection which turned out to be closed by the server
+
+        :param str trid: Transport ID in the transportPool
+        """
+        transport = getGlobalTransportPool().get(trid)
+        getGlobalTransportPool().remove(trid)
+        if transport:
+            getGlobalPersistentConnectionPool().discard(transport)
+
+    def __getConnectionKey(self):
+        """Key of the persistent connections that can be used by this client:
+        the service URL, everything sent in the proposal and the credentials used for the handshake.
+        The size and modification time of the certificate or proxy file are part of the key,
+        so that a renewed proxy leads to new connections.
+
+        :return: tuple
+        """
+        credentialFiles = ()
+        proxyString = None
+        if self.__useCertificates:
+            credentialFiles = Locations.getHostCertificateAndKeyLocation() or ()
+        elif self.kwargs.get(self.KW_PROXY_STRING):
+            proxyString = hash(self.kwargs[self.KW_PROXY_STRING])
+        else:
+            credentialFiles = (self.kwargs.get(self.KW_PROXY_LOCATION) or Locations.getProxyLocation() or "",)
+        signature = []
+        for path in credentialFiles:
+            try:
+                fileStat = os.stat(path)
+                signature.append((fileStat.st_mtime, fileStat.st_size))
+            except OSError:
+                signature.append(None)
+        return (
+            self.serviceURL,
+            self.setup,
+            self.vo,
+            str(self.__extraCredentials),
+            bool(self.__useCertificates),
+            self.kwargs.get(self.KW_SKIP_CA_CHECK),
+            tuple(credentialFiles),
+            tuple(signature),
+            proxyString,
+        )
+
     @staticmethod
     def _serializeStConnectionInfo(stConnectionInfo):
         """We want to send tuple but we need to convert
@@ -540,7 +616,7 @@ and this is thread %s
 
         return serializedTuple
 
-    def _proposeAction(self, transport, action):
+    def _proposeAction(self, transport, action, keepAlive=False):
         """Proposes an action by sending a tuple containing
 
           * System/Component
@@ -558,6 +634,9 @@ and this is thread %s
         :param action: tuple (<action type>, <action name>). It depends on the
                        subclasses of BaseClient. <action type> can be for example
                        'RPC' or 'FileTransfer'
+        :param bool keepAlive: ask the server to keep the connection open after the action,
+                               if persistent connections are enabled. If it accepts,
+                               the returned value is a dict with the idle timeout in keepAlive
 
         :return: whatever the server sent back
 
@@ -565,6 +644,8 @@ and this is thread %s
         if not self.__initStatus["OK"]:
             return self.__initStatus
         stConnectionInfo = ((self.__URLTuple[3], self.setup, self.vo), action, self.__extraCredentials, DIRAC.version)
+        if keepAlive and self.__persistentConnection:
+            stConnectionInfo += ({"keepAlive": True},)
 
         # Send the connection info and get the answer back
         retVal = transport.sendData(S_OK(BaseClient._serializeStConnectionInfo(stConnectionInfo)))
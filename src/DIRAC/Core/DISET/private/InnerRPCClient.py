@@ -14,6 +14,9 @@ class InnerRPCClient(BaseClient):
       * sends the method parameters
       * retrieve the result
       * disconnect
+
+    With persistent connections, the connection is kept open after the call if the
+    service accepts it, and the next call starts by proposing the action on it.
     """
 
     # Number of times we retry the call.
@@ -31,7 +34,7 @@ class InnerRPCClient(BaseClient):
 
 
         """
-        retVal = self._connect()
+        retVal = self._connect(reuseConnection=True)
 
         # Generate the stub which contains all the connection and call options
         # JSON: cast args to list for serialization purposes
@@ -41,9 +44,21 @@ class InnerRPCClient(BaseClient):
             return retVal
         # Get the transport connection ID as well as the Transport object
         trid, transport = retVal["Value"]
+        reusedConnection = retVal.get("reusedConnection", False)
+        keepAlive = 0
         try:
             # Handshake to perform the RPC call for functionName
-            retVal = self._proposeAction(transport, ("RPC", functionName))
+            retVal = self._proposeAction(transport, ("RPC", functionName), keepAlive=True)
+            if not retVal["OK"] and reusedConnection and not cmpError(retVal, ENOAUTH):
+                # The server closed the idle connection, nothing was executed: try once on a new connection
+                self._discardConnection(trid)
+                trid = None
+                retVal = self._connect()
+                if not retVal["OK"]:
+                    retVal["rpcStub"] = stub
+                    return retVal
+                trid, transport = retVal["Value"]
+                retVal = self._proposeAction(transport, ("RPC", functionName), keepAlive=True)
             if not retVal["OK"]:
                 if cmpError(retVal, ENOAUTH):  # This query is unauthorized
                     retVal["rpcStub"] = stub
@@ -56,21 +71,30 @@ class InnerRPCClient(BaseClient):
                         retVal["rpcStub"] = stub
                         return retVal
 
+            if isinstance(retVal.get("Value"), dict):
+                keepAlive = retVal["Value"].get("keepAlive", 0)
+
             # Send the arguments to the function
             # Note: we need to convert the arguments to list
             # We do not need to deseralize it because variadic functions
             # can work with list too
             retVal = transport.sendData(S_OK(list(args)))
             if not retVal["OK"]:
+                keepAlive = 0
                 return retVal
 
             # Get the result of the call and append the stub to it
             # Note that the RPC timeout basically ticks here, since
             # the client waits for data for as long as the server side
             # processes the request.
+            # The connection stays open after an error returned by the service. After an error of the transport,
+            # it is closed or has unread data, and is not reused (see PersistentConnectionPool.get)
             receivedData = transport.receiveData()
             if isinstance(receivedData, dict):
                 receivedData["rpcStub"] = stub
+            else:
+                keepAlive = 0
             return receivedData
         finally:
-            self._disconnect(trid)
+            if trid:
+                self._disconnect(trid, keepAlive=keepAlive)
@@ -0,0 +1,154 @@
+"""
+    Client side pool of the idle persistent DISET connections
+
+    When a service accepts to keep a connection open after an RPC (see the PersistentConnectionTimeout
+    option of the services), the client puts the connection here instead of closing it, and the next RPC
+    to the same service with the same credentials uses it instead of doing a new SSL handshake.
+
+    A connection is used by only one call at a time: it is taken out of the pool during the call.
+    The connections are dropped a bit before the server closes them on its side, and a connection
+    which was closed by the server, or has data to read while no call is done on it, is not reused.
+"""
+import os
+import threading
+import time
+
+from DIRAC import gLogger
+
+
+class PersistentConnectionPool(object):
+    """Idle connections, per service URL and credentials"""
+
+    # Seconds before the server timeout after which a connection is not reused
+    SAFETY_MARGIN = 2
+
+    def __init__(self, maxIdleConnections=10):
+        """c'tor
+
+        :param int maxIdleConnections: maximum number of idle connections kept per service and credentials
+        """
+        self.maxIdleConnections = maxIdleConnections
+        self.log = gLogger.getSubLogger("PersistentConnectionPool")
+        self.__lock = threading.Lock()
+        # { key: [(transport, expirationTime)] }, most recently used last
+        self.__connections = {}
+        # The connections of a parent process must not be used after a fork
+        self.__pid = os.getpid()
+        self.__stats = dict.fromkeys(("Handshakes", "Reused", "Kept", "Expired", "Closed"), 0)
+
+    def __closeExpired(self, now):
+        """Close the connections the server may have closed, with the lock held"""
+        for key in list(self.__connections):
+            connections = self.__connections[key]
+            for transport, _expiration in [conn for conn in connections if conn[1] <= now]:
+                self.__closeTransport(transport)
+                self.__stats["Expired"] += 1
+            connections[:] = [conn for conn in connections if conn[1] > now]
+            if not connections:
+                del self.__connections[key]
+
+    @staticmethod
+    def __isIdle(transport):
+        """Check that a connection is open, without data to read
+
+        :return: bool
+        """
+        try:
+            return not transport.waitForData(0)
+        except Exception:  # pylint: disable=broad-except
+            return False
+
+    @staticmethod
+    def __closeTransport(transport):
+        try:
+            transport.close()
+        except Exception as e:  # pylint: disable=broad-except
+            gLogger.debug("Error closing an idle connection", repr(e))
+
+    def get(self, key):
+        """Take an idle connection out of the pool
+
+        :param key: service URL and credentials of the connection
+
+        :return: transport object or None
+        """
+        now = time.time()
+        with self.__lock:
+            if os.getpid() != self.__pid:
+                # Forked process: the connections belong to the parent
+                self.__connections = {}
+                self.__pid = os.getpid()
+            self.__closeExpired(now)
+            connections = self.__connections.get(key, [])
+            transport = None
+            while connections and transport is None:
+                transport = connections.pop()[0]
+                if not self.__isIdle(transport):
+                    self.__closeTransport(transport)
+                    self.__stats["Closed"] += 1
+                    transport = None
+            if key in self.__connections and not connections:
+                del self.__connections[key]
+            if transport is not None:
+                self.__stats["Reused"] += 1
+            return transport
+
+    def put(self, key, transport, serverTimeout):
+        """Put a connection back in the pool after a call
+
+        :param key: service URL and credentials of the connection
+        :param transport: transport object
+        :param int serverTimeout: seconds after which the server closes the connection if idle
+        """
+        expiration = time.time() + serverTimeout - self.SAFETY_MARGIN
+        if expiration <= time.time():
+            self.__closeTransport(transport)
+            return
+        with self.__lock:
+            connections = self.__connections.setdefault(key, [])
+            connections.append((transport, expiration))
+            self.__stats["Kept"] += 1
+            if len(connections) > self.maxIdleConnections:
+                self.__closeTransport(connections.pop(0)[0])
+
+    def addHandshake(self):
+        """Count a new connection"""
+        with self.__lock:
+            self.__stats["Handshakes"] += 1
+
+    def discard(self, transport):
+        """Close a connection taken from the pool which turned out to be unusable"""
+        self.__closeTransport(transport)
+        with self.__lock:
+            self.__stats["Reused"] -= 1
+
+    def clear(self):
+        """Close all the idle connections"""
+        with self.__lock:
+            for connections in self.__connections.values():
+                for transport, _expiration in connections:
+                    self.__closeTransport(transport)
+            self.__connections = {}
+
+    def getStats(self):
+        """Get the number of new connections, of reused ones, of the ones closed by the server, and of idle ones
+
+        :return: dict
+        """
+        with self.__lock:
+            stats = dict(self.__stats)
+            stats["Idle"] = sum(len(connections) for connections in self.__connections.values())
+        return stats
+
+
+gPersistentConnectionPool = None
+gPersistentConnectionPoolLock = threading.Lock()
+
+
+def getGlobalPersistentConnectionPool():
+    global gPersistentConnectionPool
+    if not gPersistentConnectionPool:
+        with gPersistentConnectionPoolLock:
+            if not gPersistentConnectionPool:
+                gPersistentConnectionPool = PersistentConnectionPool()
+    return gPersistentConnectionPool
@@ -8,6 +8,7 @@
 # pylint: skip-file
 # __searchInitFunctions gives RuntimeError: maximum recursion depth exceeded
 
+import errno
 import os
 import time
 import datetime
@@ -26,7 +27,7 @@ from DIRAC.Core.DISET.private.MessageBroker import MessageBroker, MessageSender
 from DIRAC.Core.DISET.AuthManager import AuthManager
 from DIRAC.Core.DISET.RequestHandler import getServiceOption
 from DIRAC.Core.Utilities import Network, TimeUtilities
-from DIRAC.Core.Utilities.DErrno import ENOAUTH
+from DIRAC.Core.Utilities.DErrno import ENOAUTH, cmpError
 from DIRAC.Core.Utilities.ReturnValues import isReturnStructure
 from DIRAC.Core.Utilities.ThreadScheduler import gThreadScheduler
 from DIRAC.FrameworkSystem.Client.SecurityLogClient import SecurityLogClient
@@ -59,6 +60,9 @@ class Service(object):
         self._standalone = serviceData["standalone"]
         self.__monitorLastStatsUpdate = time.time()
         self._stats = {"queries": 0, "connections": 0}
+        # Transport IDs of the persistent connections currently open
+        self.__persistentConnections = set()
+        self.__persistentLock = threading.Lock()
         self._authMgr = AuthManager("%s/Authorization" % PathFinder.getServiceSection(serviceData["loadName"]))
         self._transportPool = getGlobalTransportPool()
         self.__cloneId = 0
@@ -342,6 +346,9 @@ class Service(object):
             handlerObj = result["Value"]
             # Execute the action
             result = self._processProposal(trid, proposalTuple, handlerObj)
+            # Serve the next RPCs sent on a persistent connection, until it stays idle for too long
+            while result.get("keepAlive"):
+                result = self._processNextProposal(trid, clientTransport, proposalTuple)
             # Close the connection if required
             if result["closeTransport"] or not result["OK"]:
                 if not result["OK"]:
@@ -349,6 +356,8 @@ class Service(object):
                 self._transportPool.close(trid)
             return result
         finally:
+            with self.__persistentLock:
+                self.__persistentConnections.discard(trid)
             self._lockManager.unlockGlobal()
             if monReport:
                 self.__endReportToMonitoring(monReport[0], monReport[1])
@@ -378,13 +387,17 @@ class Service(object):
         proposalTuple = tuple(tuple(x) if isinstance(x, list) else x for x in serializedProposal)
         return proposalTuple
 
-    def _receiveAndCheckProposal(self, trid):
+    def _receiveAndCheckProposal(self, trid, idleConnection=False):
         clientTransport = self._transportPool.get(trid)
         # Get the peer credentials
         credDict = clientTransport.getConnectingCredentials()
         # Receive the action proposal
         retVal = clientTransport.receiveData(1024)
         if not retVal["OK"]:
+            # Closing a persistent connection is the normal way to end it
+            if idleConnection:
+                gLogger.debug("Persistent connection closed", retVal["Message"])
+                return S_ERROR(errno.ECONNRESET, retVal["Message"])
             gLogger.error(
                 "Invalid action proposal",
                 "%s %s" % (self._createIdentityString(credDict, clientTransport), retVal["Message"]),
@@ -501,9 +514,67 @@ class Service(object):
             return S_ERROR("Server error while loading handler")
         return S_OK(handlerInstance)
 
+    def _acceptPersistentConnection(self, trid, proposalTuple):
+        """Check if the connection can stay open for the next RPCs of the client, which has to ask for it
+        in the 5th element of the proposal. Each persistent connection keeps a thread busy while idle,
+        so their number is limited.
+
+        :param int trid: transport ID
+        :param tuple proposalTuple: tuple describing the proposed action
+
+        :return: bool
+        """
+        if proposalTuple[1][0] != "RPC" or len(proposalTuple) < 5 or not proposalTuple[4].get("keepAlive"):
+            return False
+        if self._cfg.getPersistentConnectionTimeout() <= 0:
+            return False
+        with self.__persistentLock:
+            if trid in self.__persistentConnections:
+                return True
+            if len(self.__persistentConnections) >= self._cfg.getMaxPersistentConnections():
+                return False
+            self.__persistentConnections.add(trid)
+        return True
+
+    def _processNextProposal(self, trid, clientTransport, firstProposalTuple):
+        """Wait for the next proposal on a persistent connection and process it
+
+        :param int trid: transport ID
+        :param clientTransport: transport of the connection
+        :param tuple firstProposalTuple: first proposal received on the connection
+
+        :return: S_OK/S_ERROR as _processProposal. Without keepAlive in it, the connection has to be closed.
+        """
+        if not clientTransport.waitForData(self._cfg.getPersistentConnectionTimeout()):
+            gLogger.debug("Closing idle persistent connection")
+            result = S_OK()
+            result["closeTransport"] = True
+            return result
+        result = self._receiveAndCheckProposal(trid, idleConnection=True)
+        if result["OK"]:
+            proposalTuple = result["Value"]
+            # The credentials are checked against the first proposal, they must not change
+            if proposalTuple[2] != firstProposalTuple[2] or proposalTuple[0] != firstProposalTuple[0]:
+                result = S_ERROR("The credentials can not change on a persistent connection")
+            else:
+                result = self._instantiateHandler(trid, proposalTuple)
+        if not result["OK"]:
+            if cmpError(result, errno.ECONNRESET):
+                result = S_OK()
+            else:
+                self._transportPool.send(trid, result)
+            result["closeTransport"] = True
+            return result
+        return self._processProposal(trid, proposalTuple, result["Value"])
+
     def _processProposal(self, trid, proposalTuple, handlerObj):
-        # Notify the client we're ready to execute the action
-        retVal = self._transportPool.send(trid, S_OK())
+        # Notify the client we're ready to execute the action,
+        # and for how long the connection will stay open after it
+        keepAlive = self._acceptPersistentConnection(trid, proposalTuple)
+        if keepAlive:
+            retVal = self._transportPool.send(trid, S_OK({"keepAlive": self._cfg.getPersistentConnectionTimeout()}))
+        else:
+            retVal = self._transportPool.send(trid, S_OK())
         if not retVal["OK"]:
             return retVal
 
@@ -535,6 +606,9 @@ class Service(object):
                 self._msgBroker.removeTransport(trid)
 
         result["closeTransport"] = not messageConnection or not result["OK"]
+        # result is the one of sending the reply: an error returned by the RPC has been sent to the client
+        # and keeps the connection open, only the failures of the transport or of the protocol close it
+        result["keepAlive"] = keepAlive and result["OK"]
         return result
 
     def _mbConnect(self, trid, handlerObj=None):
@@ -68,6 +68,20 @@ class ServiceConfiguration:
         except Exception:
             return 20
 
+    def getPersistentConnectionTimeout(self):
+        """Seconds a persistent connection can stay idle, 0 if they are not allowed"""
+        try:
+            return int(self.getOption("PersistentConnectionTimeout"))
+        except Exception:
+            return 0
+
+    def getMaxPersistentConnections(self):
+        """Maximum number of persistent connections, each of them keeps a thread busy"""
+        try:
+            return int(self.getOption("MaxPersistentConnections"))
+        except Exception:
+            return max(1, self.getMaxThreads() // 2)
+
     def getMaxThreadsForMethod(self, actionType, method):
         try:
             return int(self.getOption("ThreadLimit/%s/%s" % (actionType, method)))
@@ -144,6 +144,19 @@ class BaseTransport(object):
             return True
         return False
 
+    def waitForData(self, timeout):
+        """Wait for data to read, used between two requests on a persistent connection
+
+        :param timeout: maximum number of seconds to wait
+
+        :return: True if there is data to read (or the connection was closed by the peer)
+        """
+        if self.receivedMessages or self.byteStream:
+            return True
+        sel = selectors.DefaultSelector()
+        sel.register(self.oSocket, selectors.EVENT_READ)
+        return bool(sel.select(timeout=timeout))
+
     def _read(self, bufSize=4096, skipReadyCheck=False):
         try:
             if skipReadyCheck or self._readReady():
@@ -465,6 +465,18 @@ class SSLTransport(BaseTransport):
         except (socket.error, SSL.SSLError, SSLVerificationError) as e:
             return S_ERROR("Error in _read: %s %s" % (e, repr(e)))
 
+    def waitForData(self, timeout):
+        """Wait for data to read, also looking at the data already decrypted by OpenSSL,
+        which is not seen by select
+
+        :param timeout: maximum number of seconds to wait
+
+        :returns: True if there is data to read
+        """
+        if self.oSocket.pending():
+            return True
+        return BaseTransport.waitForData(self, timeout)
+
     def isLocked(self):
         """Returns if this instance is locked.
         Always returns false.
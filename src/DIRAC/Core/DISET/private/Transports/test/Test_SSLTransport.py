@@ -226,3 +226,12 @@ def test_getRemoteInfo(create_serverAndClient):
         assert peerCreds["x509Chain"].getNumCertsInChain()["Value"] == 2
         assert peerCreds["isProxy"] is True
         assert peerCreds["isLimitedProxy"] is False
+
+
+def test_waitForData(create_serverAndClient):
+    """Wait for the data sent by the server, as between two requests of a persistent connection"""
+    _serv, client = create_serverAndClient
+    assert not client.waitForData(0.1)
+    assert ping_server(client) == MAGIC_ANSWER
+    # The server closes the connection after the answer, which can be read
+    assert client.waitForData(5)
@@ -0,0 +1,142 @@
+""" Test of the persistent DISET connections: client pool and server side loop
+"""
+from unittest.mock import MagicMock
+
+from DIRAC import S_OK, S_ERROR
+from DIRAC.Core.DISET.private import PersistentConnectionPool as moduleTested
+from DIRAC.Core.DISET.private.InnerRPCClient import InnerRPCClient
+from DIRAC.Core.DISET.private.PersistentConnectionPool import PersistentConnectionPool
+from DIRAC.Core.DISET.private.Service import Service
+
+
+def test_pool(mocker):
+    now = [1000]
+    mocker.patch.object(moduleTested, "time").time.side_effect = lambda: now[0]
+    pool = PersistentConnectionPool(maxIdleConnections=2)
+    transports = [MagicMock(**{"waitForData.return_value": False}) for _ in range(4)]
+
+    assert pool.get("key") is None
+    pool.addHandshake()
+    pool.put("key", transports[0], 30)
+    assert pool.get("otherKey") is None
+    assert pool.get("key") is transports[0]
+    # Taken out of the pool while used
+    assert pool.get("key") is None
+
+    # Only the most recent connections are kept
+    for transport in transports[1:]:
+        pool.put("key", transport, 30)
+    transports[1].close.assert_called_once()
+    assert pool.get("key") is transports[3]
+
+    # Not reused when the server may have closed it
+    now[0] += 28
+    assert pool.get("key") is None
+    transports[2].close.assert_called_once()
+
+    # Not reused when closed by the server
+    pool.put("key", transports[0], 30)
+    pool.put("key", transports[1], 30)
+    transports[1].waitForData.return_value = True
+    assert pool.get("key") is transports[0]
+    assert transports[1].close.call_count == 2
+
+    stats = pool.getStats()
+    assert stats["Handshakes"] == 1
+    assert stats["Reused"] == 3
+    assert stats["Kept"] == 6
+    assert stats["Expired"] == 1
+    assert stats["Closed"] == 1
+    assert stats["Idle"] == 0
+
+
+def getService(mocker, timeout=30, maxConnections=1):
+    service = Service.__new__(Service)
+    service._Service__persistentConnections = set()
+    service._Service__persistentLock = MagicMock()
+    service._cfg = MagicMock()
+    service._cfg.getPersistentConnectionTimeout.return_value = timeout
+    service._cfg.getMaxPersistentConnections.return_value = maxConnections
+    service._transportPool = MagicMock()
+    service._transportPool.send.return_value = S_OK()
+    mocker.patch.object(service, "_executeAction", return_value=S_OK())
+    return service
+
+
+proposal = (("Framework/Dummy", "Setup", "VO"), ("RPC", "ping"), "", "v8r0", {"keepAlive": True})
+
+
+def test_processProposal(mocker):
+    service = getService(mocker)
+    result = service._processProposal(1, proposal, None)
+    assert result["keepAlive"]
+    service._transportPool.send.assert_called_once_with(1, S_OK({"keepAlive": 30}))
+
+    # Without asking for it, with too many persistent connections or if disabled, the connection is closed
+    assert not service._processProposal(1, proposal[:4], None)["keepAlive"]
+    assert not service._processProposal(2, proposal, None)["keepAlive"]
+    service = getService(mocker, timeout=0)
+    assert not service._processProposal(1, proposal, None)["keepAlive"]
+
+
+def test_processNextProposal(mocker):
+    service = getService(mocker)
+    transport = MagicMock()
+    mocker.patch.object(service, "_instantiateHandler", return_value=S_OK("handler"))
+    receive = mocker.patch.object(service, "_receiveAndCheckProposal", return_value=S_OK(proposal))
+
+    transport.waitForData.return_value = True
+    result = service._processNextProposal(1, transport, proposal)
+    assert result["OK"] and result["keepAlive"]
+
+    # The credentials can not change
+    receive.return_value = S_OK((proposal[0], proposal[1], "hosts") + proposal[3:])
+    result = service._processNextProposal(1, transport, proposal)
+    assert not result["OK"] and result["closeTransport"]
+
+    # Idle for too long
+    transport.waitForData.return_value = False
+    result = service._processNextProposal(1, transport, proposal)
+    assert result["OK"] and result["closeTransport"]
+    assert not result.get("keepAlive")
+
+
+def test_processProposal_rpcError(mocker):
+    """An error returned by the RPC is sent to the client and keeps the connection open"""
+    service = getService(mocker)
+    # The real _executeAction, with a mocked handler
+    service._executeAction = Service._executeAction.__get__(service)
+    service.activityMonitoring = False
+    handler = MagicMock()
+    # The RPC returned an error, which was sent
+    handler._rh_executeAction.return_value = S_OK([S_OK(), 0.1])
+    result = service._processProposal(1, proposal, handler)
+    assert result["keepAlive"]
+    # The arguments could not be received
+    handler._rh_executeAction.return_value = S_ERROR("Error while receiving arguments")
+    result = service._processProposal(1, proposal, handler)
+    assert not result["keepAlive"]
+
+
+def test_executeRPC_reusedConnectionClosed():
+    """A call whose proposal fails on a reused connection is done once more on a new connection"""
+    client = InnerRPCClient.__new__(InnerRPCClient)
+    oldTransport = MagicMock()
+    newTransport = MagicMock()
+    newTransport.sendData.return_value = S_OK()
+    newTransport.receiveData.return_value = S_ERROR("Error of the service")
+    reused = S_OK((1, oldTransport))
+    reused["reusedConnection"] = True
+    client._connect = MagicMock(side_effect=[reused, S_OK((2, newTransport))])
+    client._proposeAction = MagicMock(side_effect=[S_ERROR("Peer closed connection"), S_OK({"keepAlive": 30})])
+    client._discardConnection = MagicMock()
+    client._disconnect = MagicMock()
+    client._getBaseStub = MagicMock(return_value={})
+
+    result = client.executeRPC("ping", ())
+    assert result["Message"] == "Error of the service"
+    assert client._connect.call_count == 2
+    assert client._connect.call_args_list[1] == ((),)
+    client._discardConnection.assert_called_once_with(1)
+    # The error of the service does not close the connection
+    client._disconnect.assert_called_once_with(2, keepAlive=30)
@@ -0,0 +1,177 @@
+"""
+    Pool of requests sessions shared by all the TornadoBaseClient of a process
+
+    A bare ``requests.post`` opens a new TCP connection and does a new TLS handshake for each call.
+    Keeping one :py:class:`requests.Session` per (server, credentials) lets the calls to the same
+    server reuse the connections, see https://requests.readthedocs.io/en/latest/user/advanced/#session-objects
+
+    The sessions are keyed by the scheme and location of the URL, the CA location and the certificate used.
+    The modification time and size of the certificate files are remembered with the session: when a proxy
+    or a certificate is renewed, the sessions using the old one are closed and replaced.
+    The sessions not used for ``idleTime`` seconds are closed.
+"""
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+
+from DIRAC import gLogger
+from DIRAC.ConfigurationSystem.Client.Config import gConfig
+
+
+class SessionPool(object):
+    """Thread safe pool of requests sessions"""
+
+    def __init__(self, idleTime=60, maxSessions=100):
+        """c'tor
+
+        :param int idleTime: seconds after which an unused session is closed
+        :param int maxSessions: maximum number of sessions kept open
+        """
+        self.idleTime = idleTime
+        self.maxSessions = maxSessions
+        self.log = gLogger.getSubLogger("SessionPool")
+        self.__lock = threading.Lock()
+        # { (location, verify, cert): [session, certSignature, lastUsed] }
+        self.__sessions = {}
+        # The connections of a parent process must not be used after a fork
+        self.__pid = os.getpid()
+        self.__stats = dict.fromkeys(("Sessions", "Evicted", "Invalidated"), 0)
+        # Connections and requests of the sessions already closed
+        self.__closedConnections = 0
+        self.__closedRequests = 0
+
+    @staticmethod
+    def __getCertSignature(cert):
+        """Modification time and size of the certificate files, to detect their renewal"""
+        if not cert:
+            return None
+        signature = []
+        for path in cert if isinstance(cert, (list, tuple)) else [cert]:
+            try:
+                fileStat = os.stat(path)
+                signature.append((fileStat.st_mtime, fileStat.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    @staticmethod
+    def __getConnectionCounters(session):
+        """Number of connections opened and of requests sent by a session
+
+        :return: tuple (connections, requests)
+        """
+        connections = nbRequests = 0
+        for adapter in session.adapters.values():
+            pools = adapter.poolmanager.pools
+            for poolKey in pools.keys():
+                pool = pools.get(poolKey)
+                if pool:
+                    connections += pool.num_connections
+                    nbRequests += pool.num_requests
+        return connections, nbRequests
+
+    def __close(self, key):
+        """Close a session, with the lock held"""
+        session = self.__sessions.pop(key)[0]
+        connections, nbRequests = self.__getConnectionCounters(session)
+        self.__closedConnections += connections
+        self.__closedRequests += nbRequests
+        session.close()
+
+    def __evictIdle(self, now):
+        """Close the sessions not used for idleTime seconds, and the oldest ones to stay below maxSessions"""
+        for key in [key for key, entry in self.__sessions.items() if entry[2] < now - self.idleTime]:
+            self.__close(key)
+            self.__stats["Evicted"] += 1
+        if len(self.__sessions) >= self.maxSessions:
+            # Leave room for a new session
+            for key in sorted(self.__sessions, key=lambda key: self.__sessions[key][2])[
+                : len(self.__sessions) - self.maxSessions + 1
+            ]:
+                self.__close(key)
+                self.__stats["Evicted"] += 1
+
+    def getSession(self, url, verify=True, cert=None):
+        """Get the session to use for a URL and credentials
+
+        :param str url: URL of the service
+        :param verify: CA location, or a boolean, as given to requests
+        :param cert: certificate location, or tuple (certificate, key) locations, as given to requests
+
+        :return: requests.Session
+        """
+        parsedURL = urlparse(url)
+        key = ("%s://%s" % (parsedURL.scheme, parsedURL.netloc), verify, cert)
+        signature = self.__getCertSignature(cert)
+        now = time.time()
+        with self.__lock:
+            if os.getpid() != self.__pid:
+                # Forked process: forget about the sessions of the parent without closing them
+                self.__sessions = {}
+                self.__pid = os.getpid()
+            entry = self.__sessions.get(key)
+            if entry and entry[1] != signature:
+                self.log.debug("Credentials changed, closing the session to", key[0])
+                self.__close(key)
+                self.__stats["Invalidated"] += 1
+                entry = None
+            if not entry:
+                self.__evictIdle(now)
+                entry = self.__sessions[key] = [requests.Session(), signature, now]
+                self.__stats["Sessions"] += 1
+            entry[2] = now
+            return entry[0]
+
+    def invalidate(self, cert=None):
+        """Close the sessions using a certificate, or all of them
+
+        :param cert: certificate location, or tuple (certificate, key) locations. All the sessions if None.
+        """
+        with self.__lock:
+            for key in [key for key in self.__sessions if cert is None or key[2] == cert]:
+                self.__close(key)
+                self.__stats["Invalidated"] += 1
+
+    def getStats(self):
+        """Get the number of sessions and of connections opened and reused
+
+        * Sessions: number of sessions created
+        * OpenSessions: number of sessions in the pool
+        * Evicted, Invalidated: number of sessions closed because idle, or because the credentials changed
+        * Handshakes: number of connections opened
+        * Requests: number of requests sent
+        * Reused: number of requests sent over an already opened connection
+
+        :return: dict
+        """
+        with self.__lock:
+            stats = dict(self.__stats)
+            stats["OpenSessions"] = len(self.__sessions)
+            stats["Handshakes"] = self.__closedConnections
+            stats["Requests"] = self.__closedRequests
+            for session, _signature, _lastUsed in self.__sessions.values():
+                connections, nbRequests = self.__getConnectionCounters(session)
+                stats["Handshakes"] += connections
+                stats["Requests"] += nbRequests
+        stats["Reused"] = max(stats["Requests"] - stats["Handshakes"], 0)
+        return stats
+
+
+gSessionPool = None
+gSessionPoolLock = threading.Lock()
+
+
+def getGlobalSessionPool():
+    """Get the session pool of the process, or None if disabled by /DIRAC/Connection/HTTPSessionIdleTime = 0"""
+    global gSessionPool
+    if not gSessionPool:
+        idleTime = gConfig.getValue("/DIRAC/Connection/HTTPSessionIdleTime", 60)
+        if idleTime <= 0:
+            return None
+        with gSessionPoolLock:
+            if not gSessionPool:
+                gSessionPool = SessionPool(idleTime=idleTime)
+    return gSessionPool
@@ -6,6 +6,8 @@
     (For each URL requests manage retries himself, if it still fail, we try next url)
     KeepAlive lapse is also removed because managed by request,
     see https://requests.readthedocs.io/en/latest/user/advanced/#keep-alive
+    The calls go through the sessions of the :py:mod:`~DIRAC.Core.Tornado.Client.private.SessionPool`
+    shared by the whole process, so that the connections are kept alive between calls.
 
     If necessary this class can be modified to define number of retry in requests, documentation does not give
     lot of informations but you can see this simple solution from StackOverflow.
@@ -41,6 +43,7 @@ from DIRAC.ConfigurationSystem.Client.PathFinder import getServiceURLs, getGatew
 
 from DIRAC.Core.DISET.ThreadConfig import ThreadConfig
 from DIRAC.Core.Security import Locations
+from DIRAC.Core.Tornado.Client.private.SessionPool import getGlobalSessionPool
 from DIRAC.Core.Utilities import Network
 from DIRAC.Core.Utilities.JEncode import decode, encode
 
@@ -556,6 +559,7 @@ class TornadoBaseClient(object):
             fp = os.fdopen(tmpHandle, "w")
             fp.write(self.kwargs[self.KW_PROXY_STRING])
             fp.close()
+            auth = {"cert": cert}
 
         # CHRIS 04.02.21
         # TODO: add proxyLocation check ?
@@ -565,6 +569,13 @@ class TornadoBaseClient(object):
                 gLogger.error("No proxy found")
                 return S_ERROR("No proxy found")
 
+        # Reuse the connections, unless the credentials are in a file written for this call only
+        sessionPool = getGlobalSessionPool()
+        if sessionPool and not self.kwargs.get(self.KW_PROXY_STRING):
+            post = sessionPool.getSession(url, verify=verify, cert=auth.get("cert")).post
+        else:
+            post = requests.post
+
         # We have a try/except for all the exceptions
         # whose default behavior is to try again,
         # maybe to different server
@@ -576,7 +587,7 @@ class TornadoBaseClient(object):
 
                 # Default case, just return the result
                 if not outputFile:
-                    call = requests.post(url, data=kwargs, timeout=self.timeout, verify=verify, **auth)
+                    call = post(url, data=kwargs, timeout=self.timeout, verify=verify, **auth)
                     # raising the exception for status here
                     # means essentialy that we are losing here the information of what is returned by the server
                     # as error message, since it is not passed to the exception
@@ -595,8 +606,10 @@ class TornadoBaseClient(object):
                     rawText = None
                     # Stream download
                     # https://requests.readthedocs.io/en/latest/user/advanced/#body-content-workflow
-                    with requests.post(url, data=kwargs, timeout=self.timeout, verify=verify, stream=True, **auth) as r:
-                        rawText = r.text
+                    with post(url, data=kwargs, timeout=self.timeout, verify=verify, stream=True, **auth) as r:
+                        # Reading the text would load the whole content in memory, only do it for errors
+                        if not r.ok:
+                            rawText = r.text
                         r.raise_for_status()
 
                         if isinstance(outputFile, io.IOBase):
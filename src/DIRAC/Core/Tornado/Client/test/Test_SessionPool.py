@@ -0,0 +1,95 @@
+""" Test of the pool of requests sessions used by the TornadoBaseClient
+"""
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from DIRAC.Core.Tornado.Client.private import SessionPool as moduleTested
+from DIRAC.Core.Tornado.Client.private.SessionPool import SessionPool
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"OK")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(name="serverURL")
+def fixtureServerURL():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield "http://127.0.0.1:%s/Framework/Dummy" % server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+def test_reuse(serverURL):
+    pool = SessionPool()
+    for _ in range(5):
+        session = pool.getSession(serverURL)
+        assert session.post(serverURL, data={"method": "ping"}).text == "OK"
+    assert pool.getSession(serverURL.replace("Dummy", "Other")) is session
+
+    stats = pool.getStats()
+    assert stats["Sessions"] == 1
+    assert stats["OpenSessions"] == 1
+    assert stats["Handshakes"] == 1
+    assert stats["Requests"] == 5
+    assert stats["Reused"] == 4
+
+    # The counters of the closed sessions are kept
+    pool.invalidate()
+    stats = pool.getStats()
+    assert stats["OpenSessions"] == 0
+    assert stats["Invalidated"] == 1
+    assert stats["Requests"] == 5
+
+
+def test_credentials(tmp_path):
+    proxy = tmp_path / "proxy"
+    proxy.write_text("proxy")
+    pool = SessionPool()
+    session = pool.getSession("https://server:9135/Framework/Dummy", verify="/cas", cert=str(proxy))
+    assert pool.getSession("https://server:9135/Framework/Dummy", verify="/cas", cert=str(proxy)) is session
+    # Other credentials, other session
+    assert pool.getSession("https://server:9135/Framework/Dummy", verify="/cas", cert="/host") is not session
+
+    # Renewed proxy
+    proxy.write_text("new proxy")
+    os.utime(proxy, (0, 0))
+    assert pool.getSession("https://server:9135/Framework/Dummy", verify="/cas", cert=str(proxy)) is not session
+    assert pool.getStats()["Invalidated"] == 1
+
+    pool.invalidate(cert="/host")
+    stats = pool.getStats()
+    assert stats["Invalidated"] == 2
+    assert stats["OpenSessions"] == 1
+
+
+def test_eviction(mocker):
+    now = [1000]
+    mocker.patch.object(moduleTested, "time").time.side_effect = lambda: now[0]
+    pool = SessionPool(idleTime=60, maxSessions=2)
+    pool.getSession("https://server1/A")
+    now[0] += 30
+    pool.getSession("https://server2/A")
+    now[0] += 31
+    pool.getSession("https://server3/A")
+    # server1 was idle for too long
+    assert pool.getStats()["OpenSessions"] == 2
+    pool.getSession("https://server4/A")
+    # server2 is the least recently used
+    stats = pool.getStats()
+    assert stats["OpenSessions"] == 2
+    assert stats["Evicted"] == 2
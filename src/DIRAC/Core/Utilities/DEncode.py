@@ -10,8 +10,12 @@ Encoding and decoding for dirac, Ids:
  l -> list
  t -> tuple
  d -> dictionary
+
+The encoder and the decoder walk the data iteratively, with an explicit stack,
+so the nesting depth of the data is not limited by the recursion limit.
+The encoder builds its output in a single bytearray, and the decoder reads the
+strings from a memoryview of the data, without copying them first.
 """
-from past.builtins import long
 import six
 import datetime
 import os
@@ -21,34 +25,10 @@ import inspect
 import traceback
 
 from collections import defaultdict
+from itertools import chain
 from pprint import pprint
 
 
-def _ord(char):
-    """Convert a single character string to it's byte value
-
-    In Python 2 a single byte is represented as a string whereas in Python 3
-    it is an integer. This function converts it as appropriate.
-    """
-    return ord(char)
-
-
-# This is a hack for Python 3 to make it possible to import DEncode
-# There is not point in porting DEncode to Python 3 as it will be removed as
-# part of the HTTPS transition.
-class types(object):
-    IntType = int
-    LongType = int
-    FloatType = float
-    BooleanType = bool
-    StringType = str
-    UnicodeType = type("")
-    NoneType = type(None)
-    ListType = list
-    TupleType = tuple
-    DictType = dict
-
-
 # Setting this environment variable to any value will enable the dump of the debugging
 # call stack
 DIRAC_DEBUG_DENCODE_CALLSTACK = bool(os.environ.get("DIRAC_DEBUG_DENCODE_CALLSTACK", False))
@@ -221,312 +201,263 @@ _dateTimeType = type(_dateTimeObject)
 _dateType = type(_dateTimeObject.date())
 _timeType = type(_dateTimeObject.time())
 
-g_dEncodeFunctions = {}
-g_dDecodeFunctions = {}
-
-
-def encodeInt(iValue, eList):
-    """Encoding ints"""
-
-    eList.extend((b"i", str(iValue).encode(), b"e"))
+# Marks the end of a list, tuple or dict in the stack of the encoder
+_END = object()
 
+# Values of the type bytes, as found when indexing the encoded data
+_INT, _LONG, _FLOAT, _BOOL, _STRING, _UNICODE, _DATETIME, _NONE, _LIST, _TUPLE, _DICT, _END_BYTE = b"iIfbsuznltde"
+_PLUS_MINUS = b"+-"
+_FALSE = ord("0")
+_DATETIME_TYPES = {ord("a"): datetime.datetime, ord("d"): datetime.date, ord("t"): datetime.time}
+# Size from which the strings are decoded from a memoryview of the data rather than from a copy:
+# the copy is cheaper than the creation of the view for small strings
+_VIEW_MIN_SIZE = 65536
 
-def decodeInt(data, i):
-    """Decoding ints"""
 
-    i += 1
-    end = data.index(b"e", i)
-    value = int(data[i:end])
-    return (value, end + 1)
+# Encode function
+def encode(uObject):
+    """Generic encoding function
 
+    Only the exact types listed in the module documentation can be encoded,
+    KeyError is raised for any other type.
 
-g_dEncodeFunctions[types.IntType] = encodeInt
-g_dDecodeFunctions[_ord("i")] = decodeInt
+    :param uObject: object to encode
+    :return: bytes
+    """
+    eBuffer = bytearray()
+    write = eBuffer.extend
+    # Objects still to encode, the next one at the end
+    stack = [uObject]
+    pop = stack.pop
+    push = stack.append
+    extend = stack.extend
+    while stack:
+        obj = pop()
+        objType = type(obj)
+        if objType is str:
+            obj = obj.encode()
+            write(b"s%d:" % len(obj))
+            write(obj)
+        elif obj is _END:
+            write(b"e")
+        elif objType is int:
+            write(b"i%de" % obj)
+        elif objType is dict:
+            if DIRAC_DEBUG_DENCODE_CALLSTACK:
+                # If we have numbers as keys
+                if any(isinstance(x, six.integer_types + (float,)) for x in obj):
+                    printDebugCallstack("Encoding dict with numeric keys")
+            write(b"d")
+            push(_END)
+            # key1, value1, key2, value2... in reverse order
+            extend(chain.from_iterable(map(reversed, reversed(obj.items()))))
+        elif objType is list:
+            write(b"l")
+            push(_END)
+            extend(reversed(obj))
+        elif obj is None:
+            write(b"n")
+        elif objType is bool:
+            write(b"b1" if obj else b"b0")
+        elif objType is float:
+            write(b"f%se" % str(obj).encode())
+        elif objType is tuple:
+            if DIRAC_DEBUG_DENCODE_CALLSTACK:
+                printDebugCallstack("Encoding tuples")
+            write(b"t")
+            push(_END)
+            extend(reversed(obj))
+        elif objType is bytes:
+            write(b"s%d:" % len(obj))
+            write(obj)
+        # The date and times are encoded as the tuple of their fields
+        elif objType is _dateTimeType:
+            write(b"zat")
+            push(_END)
+            extend(
+                reversed((obj.year, obj.month, obj.day, obj.hour, obj.minute, obj.second, obj.microsecond, obj.tzinfo))
+            )
+        elif objType is _dateType:
+            write(b"zdt")
+            push(_END)
+            extend(reversed((obj.year, obj.month, obj.day)))
+        elif objType is _timeType:
+            write(b"ztt")
+            push(_END)
+            extend(reversed((obj.hour, obj.minute, obj.second, obj.microsecond, obj.tzinfo)))
+        else:
+            raise KeyError(objType)
+    return bytes(eBuffer)
 
 
-def encodeLong(iValue, eList):
-    """Encoding longs"""
+def decode(data):
+    """Generic decoding function
 
-    # corrected by KGG   eList.extend( ( "l", str( iValue ), "e" ) )
-    eList.extend((b"I", str(iValue).encode(), b"e"))
+    :param bytes data: encoded data
+    :return: tuple (decoded object, length of the encoded object)
+    """
+    if not data:
+        return data
+    if not isinstance(data, bytes):
+        raise NotImplementedError("This should never happen")
+    return _decodeFrom(data, 0)
 
 
-def decodeLong(data, i):
-    """Decoding longs"""
+def _decodeFrom(data, i):
+    """Decode the object starting at a given position of the data
 
-    i += 1
-    end = data.index(_ord("e"), i)
-    value = long(data[i:end])
-    return (value, end + 1)
+    :param bytes data: encoded data
+    :param int i: position of the object in the data
+    :return: tuple (decoded object, position following the object)
+    """
+    view = memoryview(data)
+    index = data.index
+    # Type, items and append method of the items of the container being decoded, None at the top level
+    containerType = items = append = None
+    # Type and items of the enclosing containers
+    stack = []
+    while True:
+        typeByte = data[i]
+        if typeByte == _STRING or typeByte == _UNICODE:
+            colon = index(b":", i + 1) + 1
+            i = colon + int(data[i + 1 : colon - 1])
+            if i - colon < _VIEW_MIN_SIZE:
+                value = data[colon:i].decode("utf-8", "surrogateescape")
+            else:
+                value = str(view[colon:i], "utf-8", "surrogateescape")
+        elif typeByte == _INT or typeByte == _LONG:
+            end = index(b"e", i + 1)
+            value = int(data[i + 1 : end])
+            i = end + 1
+        elif typeByte == _END_BYTE:
+            i += 1
+            if containerType == _LIST:
+                value = items
+            elif containerType == _DICT:
+                if DIRAC_DEBUG_DENCODE_CALLSTACK:
+                    # If we have numbers as keys
+                    if any(isinstance(x, six.integer_types + (float,)) for x in items[::2]):
+                        printDebugCallstack("Decoding dict with numeric keys")
+                itemsIter = iter(items)
+                value = dict(zip(itemsIter, itemsIter))
+            else:
+                value = tuple(items)
+            containerType, items = stack.pop()
+            if containerType == _DATETIME:
+                value = _DATETIME_TYPES[items](*value)
+                containerType, items = stack.pop()
+            elif DIRAC_DEBUG_DENCODE_CALLSTACK and isinstance(value, tuple):
+                printDebugCallstack("Decoding tuples")
+            if items is None:
+                return (value, i)
+            append = items.append
+        elif typeByte == _DICT or typeByte == _LIST or typeByte == _TUPLE:
+            stack.append((containerType, items))
+            containerType = typeByte
+            items = []
+            append = items.append
+            i += 1
+            continue
+        elif typeByte == _NONE:
+            value = None
+            i += 1
+        elif typeByte == _BOOL:
+            value = data[i + 1] != _FALSE
+            i += 2
+        elif typeByte == _FLOAT:
+            end = index(b"e", i + 1)
+            if end + 1 < len(data) and data[end + 1] in _PLUS_MINUS:
+                eI = end
+                end = index(b"e", end + 1)
+                value = float(data[i + 1 : eI].decode()) * 10 ** int(data[eI + 1 : end].decode())
+            else:
+                value = float(data[i + 1 : end].decode())
+            i = end + 1
+        elif typeByte == _DATETIME:
+            # The fields of the date or time follow, as a tuple
+            dataType = data[i + 1]
+            if dataType not in _DATETIME_TYPES:
+                raise Exception("Unexpected type %s while decoding a datetime object" % dataType)
+            if data[i + 2] not in (_TUPLE, _LIST):
+                raise Exception("Unexpected fields %s while decoding a datetime object" % data[i + 2])
+            stack.append((containerType, items))
+            containerType = typeByte
+            items = dataType
+            i += 2
+            continue
+        else:
+            raise KeyError(typeByte)
+
+        if append is None:
+            return (value, i)
+        append(value)
+
+
+# Functions per type, that encode an object in a list of bytes or decode it at a given position.
+# They are not used by encode and decode any more, and only kept for backward compatibility.
+# g_dEncodeFunctions also gives the types that can be encoded.
 
 
-g_dDecodeFunctions[_ord("I")] = decodeLong
+def encodeInt(iValue, eList):
+    """Encoding ints"""
+    eList.append(encode(iValue))
 
 
-def encodeFloat(iValue, eList):
+def encodeFloat(fValue, eList):
     """Encoding floats"""
-
-    eList.extend((b"f", str(iValue).encode(), b"e"))
-
-
-def decodeFloat(data, i):
-    """Decoding floats"""
-
-    i += 1
-    end = data.index(b"e", i)
-    if end + 1 < len(data) and data[end + 1] in (_ord("+"), _ord("-")):
-        eI = end
-        end = data.index(b"e", end + 1)
-        value = float(data[i:eI].decode()) * 10 ** int(data[eI + 1 : end].decode())
-    else:
-        value = float(data[i:end].decode())
-    return (value, end + 1)
-
-
-g_dEncodeFunctions[types.FloatType] = encodeFloat
-g_dDecodeFunctions[_ord("f")] = decodeFloat
+    eList.append(encode(fValue))
 
 
 def encodeBool(bValue, eList):
     """Encoding booleans"""
-
-    if bValue:
-        eList.append(b"b1")
-    else:
-        eList.append(b"b0")
-
-
-def decodeBool(data, i):
-    """Decoding booleans"""
-
-    if data[i + 1] == _ord("0"):
-        return (False, i + 2)
-    else:
-        return (True, i + 2)
-
-
-g_dEncodeFunctions[types.BooleanType] = encodeBool
-g_dDecodeFunctions[_ord("b")] = decodeBool
+    eList.append(encode(bValue))
 
 
 def encodeString(sValue, eList):
     """Encoding strings"""
-    if not isinstance(sValue, bytes):
-        sValue = sValue.encode()
-    eList.extend((b"s", str(len(sValue)).encode(), b":", sValue))
-
-
-def decodeString(data, i):
-    """Decoding strings"""
-    i += 1
-    colon = data.index(b":", i)
-    value = int(data[i:colon].decode())
-    colon += 1
-    end = colon + value
-    retVal = data[colon:end]
-    retVal = retVal.decode(errors="surrogateescape")
-    return (retVal, end)
-
-
-g_dEncodeFunctions[types.StringType] = encodeString
-g_dEncodeFunctions[bytes] = encodeString
-g_dDecodeFunctions[_ord("s")] = decodeString
-
-
-def encodeUnicode(sValue, eList):
-    """Encoding unicode strings"""
-    valueStr = sValue.encode("utf-8")
-    eList.extend((b"u", str(len(valueStr)).encode(), b":", valueStr))
-
-
-def decodeUnicode(data, i):
-    """Decoding unicode strings"""
-
-    i += 1
-    colon = data.index(b":", i)
-    value = int(data[i:colon])
-    colon += 1
-    end = colon + value
-    return (six.text_type(data[colon:end].decode("utf-8")), end)
-
-
-g_dDecodeFunctions[_ord("u")] = decodeString
+    eList.append(encode(sValue))
 
 
 def encodeDateTime(oValue, eList):
     """Encoding datetime"""
+    eList.append(encode(oValue))
 
-    if isinstance(oValue, _dateTimeType):
-        tDateTime = (
-            oValue.year,
-            oValue.month,
-            oValue.day,
-            oValue.hour,
-            oValue.minute,
-            oValue.second,
-            oValue.microsecond,
-            oValue.tzinfo,
-        )
-        eList.append(b"za")
-        # corrected by KGG encode( tDateTime, eList )
-        g_dEncodeFunctions[type(tDateTime)](tDateTime, eList)
-    elif isinstance(oValue, _dateType):
-        tData = (oValue.year, oValue.month, oValue.day)
-        eList.append(b"zd")
-        # corrected by KGG encode( tData, eList )
-        g_dEncodeFunctions[type(tData)](tData, eList)
-    elif isinstance(oValue, _timeType):
-        tTime = (oValue.hour, oValue.minute, oValue.second, oValue.microsecond, oValue.tzinfo)
-        eList.append(b"zt")
-        # corrected by KGG encode( tTime, eList )
-        g_dEncodeFunctions[type(tTime)](tTime, eList)
-    else:
-        raise Exception("Unexpected type %s while encoding a datetime object" % str(type(oValue)))
-
-
-def decodeDateTime(data, i):
-    """Decoding datetime"""
-
-    i += 1
-    dataType = data[i]
-    # corrected by KGG tupleObject, i = decode( data, i + 1 )
-    tupleObject, i = g_dDecodeFunctions[data[i + 1]](data, i + 1)
-    if dataType == _ord("a"):
-        dtObject = datetime.datetime(*tupleObject)
-    elif dataType == _ord("d"):
-        dtObject = datetime.date(*tupleObject)
-    elif dataType == _ord("t"):
-        dtObject = datetime.time(*tupleObject)
-    else:
-        raise Exception("Unexpected type %s while decoding a datetime object" % dataType)
-    return (dtObject, i)
-
-
-g_dEncodeFunctions[_dateTimeType] = encodeDateTime
-g_dEncodeFunctions[_dateType] = encodeDateTime
-g_dEncodeFunctions[_timeType] = encodeDateTime
-g_dDecodeFunctions[_ord("z")] = decodeDateTime
-
-
-def encodeNone(_oValue, eList):
-    """Encoding None"""
-
-    eList.append(b"n")
 
-
-def decodeNone(_data, i):
-    """Decoding None"""
-
-    return (None, i + 1)
-
-
-g_dEncodeFunctions[types.NoneType] = encodeNone
-g_dDecodeFunctions[_ord("n")] = decodeNone
+def encodeNone(oValue, eList):
+    """Encoding None"""
+    eList.append(encode(oValue))
 
 
 def encodeList(lValue, eList):
     """Encoding list"""
-
-    eList.append(b"l")
-    for uObject in lValue:
-        g_dEncodeFunctions[type(uObject)](uObject, eList)
-    eList.append(b"e")
+    eList.append(encode(lValue))
 
 
-def decodeList(data, i):
-    """Decoding list"""
-
-    oL = []
-    i += 1
-    while data[i] != _ord("e"):
-        ob, i = g_dDecodeFunctions[data[i]](data, i)
-        oL.append(ob)
-    return (oL, i + 1)
-
-
-g_dEncodeFunctions[types.ListType] = encodeList
-g_dDecodeFunctions[_ord("l")] = decodeList
-
-
-def encodeTuple(lValue, eList):
+def encodeTuple(tValue, eList):
     """Encoding tuple"""
-
-    if DIRAC_DEBUG_DENCODE_CALLSTACK:
-        printDebugCallstack("Encoding tuples")
-
-    eList.append(b"t")
-    for uObject in lValue:
-        g_dEncodeFunctions[type(uObject)](uObject, eList)
-    eList.append(b"e")
-
-
-def decodeTuple(data, i):
-    """Decoding tuple"""
-
-    if DIRAC_DEBUG_DENCODE_CALLSTACK:
-        printDebugCallstack("Decoding tuples")
-
-    oL, i = decodeList(data, i)
-    return (tuple(oL), i)
-
-
-g_dEncodeFunctions[types.TupleType] = encodeTuple
-g_dDecodeFunctions[_ord("t")] = decodeTuple
+    eList.append(encode(tValue))
 
 
 def encodeDict(dValue, eList):
     """Encoding dictionary"""
-
-    if DIRAC_DEBUG_DENCODE_CALLSTACK:
-        # If we have numbers as keys
-        if any([isinstance(x, six.integer_types + (float,)) for x in dValue]):
-            printDebugCallstack("Encoding dict with numeric keys")
-
-    eList.append(b"d")
-    for key in dValue:
-        g_dEncodeFunctions[type(key)](key, eList)
-        g_dEncodeFunctions[type(dValue[key])](dValue[key], eList)
-    eList.append(b"e")
-
-
-def decodeDict(data, i):
-    """Decoding dictionary"""
-
-    oD = {}
-    i += 1
-    while data[i] != _ord("e"):
-
-        if DIRAC_DEBUG_DENCODE_CALLSTACK:
-            # If we have numbers as keys
-            if data[i] in (_ord("i"), _ord("I"), _ord("f")):
-                printDebugCallstack("Decoding dict with numeric keys")
-
-        k, i = g_dDecodeFunctions[data[i]](data, i)
-        oD[k], i = g_dDecodeFunctions[data[i]](data, i)
-    return (oD, i + 1)
-
-
-g_dEncodeFunctions[types.DictType] = encodeDict
-g_dDecodeFunctions[_ord("d")] = decodeDict
-
-
-# Encode function
-def encode(uObject):
-    """Generic encoding function"""
-    eList = []
-    # print("ENCODE FUNCTION : %s" % g_dEncodeFunctions[ type( uObject ) ])
-    g_dEncodeFunctions[type(uObject)](uObject, eList)
-    return b"".join(eList)
-
-
-def decode(data):
-    """Generic decoding function"""
-    if not data:
-        return data
-    # print("DECODE FUNCTION : %s" % g_dDecodeFunctions[ sStream [ iIndex ] ])
-    if not isinstance(data, bytes):
-        raise NotImplementedError("This should never happen")
-    return g_dDecodeFunctions[data[0]](data, 0)
+    eList.append(encode(dValue))
+
+
+g_dEncodeFunctions = {
+    int: encodeInt,
+    float: encodeFloat,
+    bool: encodeBool,
+    str: encodeString,
+    bytes: encodeString,
+    _dateTimeType: encodeDateTime,
+    _dateType: encodeDateTime,
+    _timeType: encodeDateTime,
+    type(None): encodeNone,
+    list: encodeList,
+    tuple: encodeTuple,
+    dict: encodeDict,
+}
+g_dDecodeFunctions = dict.fromkeys(b"iIfbsuznltd", _decodeFrom)
 
 
 if __name__ == "__main__":
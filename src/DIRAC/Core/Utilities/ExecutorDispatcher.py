@@ -1,7 +1,10 @@
 """ Used by the executors for dispatching events (IIUC)
 """
+import heapq
+import itertools
 import threading
 import time
+from collections import OrderedDict
 
 from DIRAC import S_OK, S_ERROR, gLogger
 from DIRAC.Core.Utilities.ReturnValues import isReturnStructure
@@ -147,13 +150,14 @@ class ExecutorQueues(object):
         else:
             self.__log = gLogger
         self.__lock = threading.Lock()
+        # { eType: OrderedDict of the waiting taskIds }: pushed, popped and deleted in constant time
         self.__queues = {}
         self.__lastUse = {}
         self.__taskInQueue = {}
 
     def _internals(self):
         return {
-            "queues": dict(self.__queues),
+            "queues": {eType: list(queue) for eType, queue in self.__queues.items()},
             "lastUse": dict(self.__lastUse),
             "taskInQueue": dict(self.__taskInQueue),
             "locked": self.__lock.locked(),  # pylint: disable=no-member
@@ -176,12 +180,11 @@ class ExecutorQueues(object):
                     return 0
                 return len(self.__queues[eType])
             if eType not in self.__queues:
-                self.__queues[eType] = []
+                self.__queues[eType] = OrderedDict()
             self.__lastUse[eType] = time.time()
+            self.__queues[eType][taskId] = True
             if ahead:
-                self.__queues[eType].insert(0, taskId)
-            else:
-                self.__queues[eType].append(taskId)
+                self.__queues[eType].move_to_end(taskId, last=False)
             self.__taskInQueue[taskId] = eType
             return len(self.__queues[eType])
         finally:
@@ -191,21 +194,20 @@ class ExecutorQueues(object):
         if not isinstance(eTypes, (list, tuple)):
             eTypes = [eTypes]
         self.__lock.acquire()
-        for eType in eTypes:
-            try:
-                taskId = self.__queues[eType].pop(0)
-                del self.__taskInQueue[taskId]
-                # Found! release and return!
-                self.__lock.release()
+        try:
+            for eType in eTypes:
+                try:
+                    taskId = self.__queues[eType].popitem(last=False)[0]
+                    del self.__taskInQueue[taskId]
+                except KeyError:
+                    continue
+                # Found!
                 self.__lastUse[eType] = time.time()
                 self.__log.verbose("Popped task %s from executor %s waiting queue" % (taskId, eType))
                 return (taskId, eType)
-            except IndexError:
-                continue
-            except KeyError:
-                continue
-        self.__lock.release()
-        # Not found. release and return None
+        finally:
+            self.__lock.release()
+        # Not found
         return None
 
     def getState(self):
@@ -229,10 +231,9 @@ class ExecutorQueues(object):
             except KeyError:
                 return False
             try:
-                iPos = self.__queues[eType].index(taskId)
-            except ValueError:
+                del self.__queues[eType][taskId]
+            except KeyError:
                 return False
-            del self.__queues[eType][iPos]
             return True
         finally:
             self.__lock.release()
@@ -304,7 +305,12 @@ class ExecutorDispatcher(object):
         self.__freezerLock = threading.Lock()
         self.__tasks = {}
         self.__log = gLogger.getSubLogger(self.__class__.__name__)
-        self.__taskFreezer = []
+        # { taskId: (unfreeze time, sequence, taskId) } of the frozen tasks. The same entries are in a heap
+        # per eType, to find the tasks to unfreeze without going through the freezer. The tasks taken out
+        # of the freezer are only removed from the dictionary: their entries are skipped when popped from the heap
+        self.__taskFreezer = {}
+        self.__freezerHeaps = {}
+        self.__freezerSequence = itertools.count()
         self.__queues = ExecutorQueues(self.__log)
         self.__states = ExecutorState(self.__log)
         self.__cbHolder = ExecutorDispatcherCallbacks()
@@ -422,7 +428,9 @@ class ExecutorDispatcher(object):
             eTask.eType = eType
             isFrozen = False
             if eTask.frozenCount < 10:
-                self.__taskFreezer.append(taskId)
+                entry = (eTask.frozenSince + freezeTime, next(self.__freezerSequence), taskId)
+                self.__taskFreezer[taskId] = entry
+                heapq.heappush(self.__freezerHeaps.setdefault(eType, []), entry)
                 isFrozen = True
         finally:
             self.__freezerLock.release()
@@ -441,11 +449,8 @@ class ExecutorDispatcher(object):
     def __removeFromFreezer(self, taskId):
         self.__freezerLock.acquire()
         try:
-            try:
-                iP = self.__taskFreezer.index(taskId)
-            except ValueError:
+            if self.__taskFreezer.pop(taskId, None) is None:
                 return False
-            self.__taskFreezer.pop(iP)
             try:
                 eTask = self.__tasks[taskId]
             except KeyError:
@@ -455,35 +460,45 @@ class ExecutorDispatcher(object):
             self.__freezerLock.release()
         return True
 
+    def __popTasksToUnfreeze(self, eType=False):
+        """Take out of the freezer the tasks whose freeze time is over
+
+        :param eType: only the tasks frozen for this executor type, or all of them
+        :return: list of ETask
+        """
+        now = time.time()
+        eTasks = []
+        self.__freezerLock.acquire()
+        try:
+            for heapType in [eType] if eType else list(self.__freezerHeaps):
+                heap = self.__freezerHeaps.get(heapType, [])
+                while heap and heap[0][0] <= now:
+                    entry = heapq.heappop(heap)
+                    taskId = entry[2]
+                    if self.__taskFreezer.get(taskId) is not entry:
+                        # Already out of the freezer
+                        continue
+                    del self.__taskFreezer[taskId]
+                    try:
+                        eTasks.append(self.__tasks[taskId])
+                    except KeyError:
+                        self.__log.notice("Removing task %s from the freezer. Somebody has removed the task" % taskId)
+                if not heap:
+                    self.__freezerHeaps.pop(heapType, None)
+        finally:
+            self.__freezerLock.release()
+        return eTasks
+
     def __unfreezeTasks(self, eType=False):
-        iP = 0
-        while iP < len(self.__taskFreezer):
-            self.__freezerLock.acquire()
-            try:
-                try:
-                    taskId = self.__taskFreezer[iP]
-                except IndexError:
-                    return
-                try:
-                    eTask = self.__tasks[taskId]
-                except KeyError:
-                    self.__log.notice("Removing task %s from the freezer. Somebody has removed the task" % taskId)
-                    self.__taskFreezer.pop(iP)
-                    continue
-                # Current taskId/eTask is the one to defrost
-                if eType and eType != eTask.eType:
-                    iP += 1
-                    continue
-                if time.time() - eTask.frozenSince < eTask.freezeTime:
-                    iP += 1
-                    continue
-                self.__taskFreezer.pop(iP)
-            finally:
-                self.__freezerLock.release()
+        # The tasks frozen again with no freeze time are unfrozen again, until they are frozen too many times
+        eTasks = self.__popTasksToUnfreeze(eType)
+        while eTasks:
             # Out of the lock zone to minimize zone of exclusion
-            eTask.frozenTime += time.time() - eTask.frozenSince
-            self.__log.verbose("Unfreezed task %s" % taskId)
-            self.__dispatchTask(taskId, defrozeIfNeeded=False)
+            for eTask in eTasks:
+                eTask.frozenTime += time.time() - eTask.frozenSince
+                self.__log.verbose("Unfreezed task %s" % eTask.taskId)
+                self.__dispatchTask(eTask.taskId, defrozeIfNeeded=False)
+            eTasks = self.__popTasksToUnfreeze(eType)
 
     def __addTaskIfNew(self, taskId, taskObj):
         self.__tasksLock.acquire()
@@ -617,12 +632,7 @@ class ExecutorDispatcher(object):
         self.__states.removeTask(taskId)
         self.__freezerLock.acquire()
         try:
-            try:
-                self.__taskFreezer.pop(self.__taskFreezer.index(taskId))
-            except KeyError:
-                pass
-            except ValueError:
-                pass
+            self.__taskFreezer.pop(taskId, None)
         finally:
             self.__freezerLock.release()
         if eId:
@@ -5,14 +5,13 @@
     These are the coded methods:
 
 
-    __init__( host, user, passwd, name, [maxConnsInQueue=10] )
+    __init__( host, user, passwd, name, [port=3306], [debug=False], [connectionPoolParameters=None] )
 
     Initializes the Queue and tries to connect to the DB server,
     using the _connect method.
-    "maxConnsInQueue" defines the size of the Queue of open connections
-    that are kept for reuse. It also defined the maximum number of open
-    connections available from the object.
-    maxConnsInQueue = 0 means unlimited and it is not supported.
+    The connections are kept in a ConnectionPool shared by all the objects
+    connecting to the same server, "connectionPoolParameters" (pingInterval,
+    cleanInterval, maxConnections, waitTimeout) is used when creating it.
 
 
     _except( methodName, exception, errorMessage )
@@ -159,6 +158,8 @@ from DIRAC.Core.Utilities import DErrno
 gInstancesCount = 0
 MAXCONNECTRETRY = 10
 RETRY_SLEEP_DURATION = 5
+# CR_SERVER_GONE_ERROR, CR_SERVER_LOST
+LOST_CONNECTION_ERRORS = (2006, 2013)
 
 
 def _checkFields(inFields, inValues):
@@ -201,18 +202,59 @@ def _quotedList(fieldList=None):
 class ConnectionPool(object):
     """
     Management of connections per thread
+
+    By default every connection is pinged each time it is handed out and the
+    assigned connections are cleaned at every call. Busy servers can instead:
+
+      * only ping connections that have been idle for more than pingInterval seconds,
+      * clean the assigned connections at most every cleanInterval seconds,
+      * cap the number of open connections to maxConnections (0 means no limit),
+        threads asking for a connection when the cap is reached wait up to
+        waitTimeout seconds for one to be released.
     """
 
-    def __init__(self, host, user, passwd, port=3306, graceTime=600):
+    def __init__(
+        self,
+        host,
+        user,
+        passwd,
+        port=3306,
+        graceTime=600,
+        pingInterval=0,
+        cleanInterval=0,
+        maxConnections=0,
+        waitTimeout=30,
+    ):
         self.__host = host
         self.__user = user
         self.__passwd = passwd
         self.__port = port
         self.__graceTime = graceTime
+        self.__pingInterval = pingInterval
+        self.__cleanInterval = cleanInterval
+        self.__maxConnections = maxConnections
+        self.__waitTimeout = waitTimeout
         self.__spares = collections.deque()
         self.__maxSpares = 10
         self.__lastClean = 0
         self.__assigned = {}
+        self.__numConnections = 0
+        self.__released = threading.Condition()
+        self.__statsLock = threading.Lock()
+        self.__stats = {
+            "Checkouts": 0,
+            "Pings": 0,
+            "FailedPings": 0,
+            "NewConnections": 0,
+            "Reconnects": 0,
+            "Waits": 0,
+            "WaitTime": 0.0,
+            "Cleans": 0,
+        }
+
+    def __addStat(self, name, value=1):
+        with self.__statsLock:
+            self.__stats[name] += value
 
     @property
     def __thid(self):
@@ -233,7 +275,9 @@ class ConnectionPool(object):
 
     def get(self, dbName, retries=10):
         retries = max(0, min(MAXCONNECTRETRY, retries))
-        self.clean()
+        if time.time() - self.__lastClean >= self.__cleanInterval:
+            self.clean()
+        self.__addStat("Checkouts")
         return self.__getWithRetry(dbName, retries, retries)
 
     def __getWithRetry(self, dbName, totalRetries, retriesLeft):
@@ -241,17 +285,28 @@ class ConnectionPool(object):
         if sleepTime > 0:
             time.sleep(sleepTime)
         try:
-            conn, lastName, thid = self.__innerGet()
+            result = self.__innerGet()
         except MySQLdb.MySQLError as excp:
             if retriesLeft > 0:
                 return self.__getWithRetry(dbName, totalRetries, retriesLeft - 1)
             return S_ERROR(DErrno.EMYSQL, "Could not connect: %s" % excp)
+        if not result:
+            return S_ERROR(
+                DErrno.EMYSQL,
+                "Could not connect: all %s connections are in use after %s seconds"
+                % (self.__maxConnections, self.__waitTimeout),
+            )
+        conn, lastName, thid, idleTime = result
 
-        if not self.__ping(conn):
-            try:
-                self.__assigned.pop(thid)
-            except KeyError:
-                pass
+        if not conn.open:
+            # Closed by the code that used it: forget it and get another one
+            self.__forget(thid)
+            self.__addStat("Reconnects")
+            return self.__getWithRetry(dbName, totalRetries, retriesLeft)
+
+        if idleTime >= self.__pingInterval and not self.__ping(conn):
+            self.discard(thid)
+            self.__addStat("Reconnects")
             if retriesLeft > 0:
                 return self.__getWithRetry(dbName, totalRetries, retriesLeft)
             return S_ERROR(DErrno.EMYSQL, "Could not connect")
@@ -272,49 +327,138 @@ class ConnectionPool(object):
         return S_OK(conn)
 
     def __ping(self, conn):
+        self.__addStat("Pings")
         try:
             conn.ping(True)
             return True
         except Exception:
+            self.__addStat("FailedPings")
             return False
 
     def __innerGet(self):
+        """Get the connection of the current thread, a spare one or a new one
+
+        :return: (connection, dbName, thread, idle time) or None if the pool is exhausted
+        """
         thid = self.__thid
         now = time.time()
         if thid in self.__assigned:
             data = self.__assigned[thid]
-            conn = data[0]
+            idleTime = now - data[2]
             data[2] = now
-            return data[0], data[1], thid
+            return data[0], data[1], thid, idleTime
         # Not cached
         try:
-            conn, dbName = self.__spares.pop()
+            spare = self.__spares.pop()
         except IndexError:
-            conn = self.__newConn()
+            # True, or a spare released while waiting
+            spare = self.__reserveConnection()
+            if not spare:
+                return None
+            now = time.time()
+        if spare is True:
+            try:
+                conn = self.__newConn()
+            except Exception:
+                self.__releaseConnection()
+                raise
+            self.__addStat("NewConnections")
             dbName = ""
+            idleTime = 0
+        else:
+            conn, dbName, lastUsed = spare
+            idleTime = now - lastUsed
 
         self.__assigned[thid] = [conn, dbName, now]
-        return conn, dbName, thid
+        return conn, dbName, thid, idleTime
+
+    def __reserveConnection(self):
+        """Book a slot for a new connection, or take a spare one, waiting for a connection to be released
+        if the pool is full
+
+        :return: True if the slot was booked, a spare (connection, dbName, lastUsed),
+                 or False if the pool remained full for waitTimeout seconds
+        """
+        with self.__released:
+            if not self.__maxConnections or self.__numConnections < self.__maxConnections:
+                self.__numConnections += 1
+                return True
+        self.__addStat("Waits")
+        start = time.time()
+        try:
+            while time.time() - start < self.__waitTimeout:
+                # Connections are only released when cleaning: closed, or kept as spares
+                self.clean()
+                with self.__released:
+                    try:
+                        return self.__spares.pop()
+                    except IndexError:
+                        pass
+                    if self.__numConnections < self.__maxConnections:
+                        self.__numConnections += 1
+                        return True
+                    self.__released.wait(min(1, self.__waitTimeout))
+            return False
+        finally:
+            self.__addStat("WaitTime", time.time() - start)
+
+    def __releaseConnection(self):
+        with self.__released:
+            self.__numConnections -= 1
+            self.__released.notify()
+
+    def __close(self, conn):
+        self.__releaseConnection()
+        try:
+            conn.close()
+        except MySQLdb.ProgrammingError as exc:
+            gLogger.warn("ProgrammingError exception while closing MySQL connection: %s" % exc)
+        except Exception as exc:
+            gLogger.warn("Exception while closing MySQL connection: %s" % exc)
 
     def __pop(self, thid):
         try:
             data = self.__assigned.pop(thid)
-            if len(self.__spares) < self.__maxSpares:
-                self.__spares.append((data[0], data[1]))
-            else:
-                try:
-                    data[0].close()
-                except MySQLdb.ProgrammingError as exc:
-                    gLogger.warn("ProgrammingError exception while closing MySQL connection: %s" % exc)
-                except Exception as exc:
-                    gLogger.warn("Exception while closing MySQL connection: %s" % exc)
         except KeyError:
-            pass
+            return
+        if len(self.__spares) < self.__maxSpares:
+            self.__spares.append((data[0], data[1], data[2]))
+            # A spare connection can be taken by a waiting thread
+            with self.__released:
+                self.__released.notify()
+        else:
+            self.__close(data[0])
+
+    def release(self, thid=None):
+        """Give the connection assigned to a thread (the current one by default) back to the pool,
+        as a spare one or closed if there are enough spares
+        """
+        if thid is None:
+            thid = self.__thid
+        self.__pop(thid)
+
+    def __forget(self, thid):
+        """Release the slot of the connection assigned to a thread, which is already closed"""
+        if self.__assigned.pop(thid, None) is not None:
+            self.__releaseConnection()
+
+    def discard(self, thid=None):
+        """Close the connection assigned to a thread (the current one by default),
+        so that a new one is opened the next time it asks for a connection
+        """
+        if thid is None:
+            thid = self.__thid
+        try:
+            data = self.__assigned.pop(thid)
+        except KeyError:
+            return
+        self.__close(data[0])
 
     def clean(self, now=False):
         if not now:
             now = time.time()
         self.__lastClean = now
+        self.__addStat("Cleans")
         for thid in list(self.__assigned):
             if not thid.is_alive():
                 self.__pop(thid)
@@ -325,6 +469,18 @@ class ConnectionPool(object):
             if now - data[2] > self.__graceTime:
                 self.__pop(thid)
 
+    def getStats(self):
+        """Get the usage counters of the pool
+
+        :return: dict with the counters and the current number of connections
+        """
+        with self.__statsLock:
+            stats = dict(self.__stats)
+        stats["OpenConnections"] = self.__numConnections
+        stats["AssignedConnections"] = len(self.__assigned)
+        stats["SpareConnections"] = len(self.__spares)
+        return stats
+
     def transactionStart(self, dbName):
         result = self.get(dbName)
         if not result["OK"]:
@@ -367,11 +523,22 @@ class MySQL(object):
 
     __connectionPools = {}
 
-    def __init__(self, hostName="localhost", userName="dirac", passwd="dirac", dbName="", port=3306, debug=False):
+    def __init__(
+        self,
+        hostName="localhost",
+        userName="dirac",
+        passwd="dirac",
+        dbName="",
+        port=3306,
+        debug=False,
+        connectionPoolParameters=None,
+    ):
         """
         set MySQL connection parameters and try to connect
 
         :param debug: unused
+        :param dict connectionPoolParameters: keyword arguments of the ConnectionPool
+                                              (only used by the first instance connecting to a server)
         """
         global gInstancesCount
         gInstancesCount += 1
@@ -393,7 +560,7 @@ class MySQL(object):
         self.__port = port
         cKey = (self.__hostName, self.__userName, self.__passwd, self.__port)
         if cKey not in MySQL.__connectionPools:
-            MySQL.__connectionPools[cKey] = ConnectionPool(*cKey)
+            MySQL.__connectionPools[cKey] = ConnectionPool(*cKey, **(connectionPoolParameters or {}))
         self.__connectionPool = MySQL.__connectionPools[cKey]
 
         self.__initialized = True
@@ -417,6 +584,9 @@ class MySQL(object):
         try:
             raise x
         except MySQLdb.Error as e:
+            if isinstance(e, MySQLdb.OperationalError) and e.args and e.args[0] in LOST_CONNECTION_ERRORS:
+                # The connection is not usable anymore (it may not have been pinged), get a new one next time
+                self.__connectionPool.discard()
             if print:
                 self.log.error("%s (%s): %s" % (methodName, self._safeCmd(cmd), err), "%d: %s" % (e.args[0], e.args[1]))
             return S_ERROR(DErrno.EMYSQL, "%s: ( %d: %s )" % (err, e.args[0], e.args[1]))
@@ -926,6 +1096,19 @@ class MySQL(object):
 
         return self.__connectionPool.get(self.__dbName, retries)
 
+    def _releaseConnection(self):
+        """Give the connection of the current thread, as returned by _getConnection, back to the pool.
+        The next query of the thread takes a connection from the pool again.
+        """
+        self.__connectionPool.release()
+
+    def getConnectionPoolStats(self):
+        """Get the usage counters of the connection pool, which is shared by all the DBs of the same server
+
+        :return: S_OK(dict)
+        """
+        return S_OK(self.__connectionPool.getStats())
+
     ########################################################################################
     #
     #  Transaction functions
@@ -365,3 +365,40 @@ def test_nestedSerializable(data):
     subObj = Serializable(instAttr=data)
     objData = Serializable(instAttr=subObj)
     agnosticTestFunction(jsonTuple, objData)
+
+
+@parametrize(
+    "data, encodedData",
+    [
+        (1, b"i1e"),
+        (-12, b"i-12e"),
+        (2.0 * 10**20, b"f2e+20e"),
+        (0.5, b"f0.5e"),
+        (True, b"b1"),
+        (None, b"n"),
+        ("abc", b"s3:abc"),
+        ("é", b"s2:\xc3\xa9"),
+        ([1, "a"], b"li1es1:ae"),
+        ((1, None), b"ti1ene"),
+        ({"a": [], 2: {}}, b"ds1:alei2edee"),
+        (datetime.date(2022, 3, 14), b"zdti2022ei3ei14ee"),
+        (datetime.datetime(2022, 3, 14, 15, 9, 26, 5), b"zati2022ei3ei14ei15ei9ei26ei5ene"),
+        (datetime.time(15, 9, 26), b"ztti15ei9ei26ei0ene"),
+    ],
+)
+def test_DEncodeFormat(data, encodedData):
+    """The format of DEncode must not change, since it is shared with other versions"""
+    assert disetEncode(data) == encodedData
+    assert disetDecode(encodedData) == (data, len(encodedData))
+
+
+def test_DEncodeDeepNesting():
+    """DEncode does not recurse, so the nesting is not limited by the recursion limit"""
+    data = []
+    for i in range(sys.getrecursionlimit() * 2):
+        data = {i: (data,)}
+    encodedData = disetEncode(data)
+    decodedData, lenData = disetDecode(encodedData)
+    assert lenData == len(encodedData)
+    # Comparing the data would hit the recursion limit
+    assert disetEncode(decodedData) == encodedData
@@ -1,9 +1,12 @@
 """ py.test test of ExecutorDispatcher
 """
 # pylint: disable=protected-access
+from DIRAC import S_OK
 from DIRAC.Core.Utilities.ExecutorDispatcher import (
     ExecutorState,
     ExecutorQueues,
+    ExecutorDispatcher,
+    ExecutorDispatcherCallbacks,
 )
 
 
@@ -94,3 +97,50 @@ def test_execQueues():
     assert res_internals["taskInQueue"] == {}
 
     assert not eQ.deleteTask("t00")
+
+
+class Callbacks(ExecutorDispatcherCallbacks):
+    """Tasks going through type0 then type1"""
+
+    def __init__(self):
+        self.sent = []
+
+    def cbDispatch(self, taskId, taskObj, pathExecuted):
+        if len(pathExecuted) >= 2:
+            return S_OK()
+        return S_OK("type%s" % len(pathExecuted))
+
+    def cbSendTask(self, taskId, taskObj, eId, eType):
+        self.sent.append((taskId, eId))
+        return S_OK()
+
+    def cbDisconectExecutor(self, eId):
+        return S_OK()
+
+
+def test_freezer():
+    """test of the freezer of the ExecutorDispatcher"""
+    callbacks = Callbacks()
+    dispatcher = ExecutorDispatcher()
+    assert dispatcher.setCallbacks(callbacks)["OK"]
+    dispatcher.addExecutor("e0", ["type0"], maxTasks=5)
+
+    for taskId in range(3):
+        assert dispatcher.addTask(taskId, {})["OK"]
+    assert callbacks.sent == [(0, "e0"), (1, "e0"), (2, "e0")]
+    # Frozen for an hour
+    assert dispatcher.freezeTask("e0", 0, 3600)["OK"]
+    assert dispatcher._internals()["freezer"] == [0]
+    # Frozen until an executor of type1 connects
+    assert dispatcher.taskProcessed("e0", 1)["OK"]
+    assert dispatcher.taskProcessed("e0", 2)["OK"]
+    assert sorted(dispatcher._internals()["freezer"]) == [0, 1, 2]
+    # Removed while frozen
+    assert dispatcher.removeTask(2)["OK"]
+    assert sorted(dispatcher._internals()["freezer"]) == [0, 1]
+
+    dispatcher.addExecutor("e1", ["type1"])
+    assert callbacks.sent[3:] == [(1, "e1")]
+    assert dispatcher._internals()["freezer"] == [0]
+    assert dispatcher.taskProcessed("e1", 1)["OK"]
+    assert dispatcher.getTaskIds() == [0]
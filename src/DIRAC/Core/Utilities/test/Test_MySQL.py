@@ -0,0 +1,173 @@
+""" Unit tests of the MySQL ConnectionPool, with a mocked MySQLdb
+"""
+import threading
+import time
+
+import pytest
+
+from DIRAC.Core.Utilities import MySQL as moduleTested
+from DIRAC.Core.Utilities.MySQL import ConnectionPool
+
+
+@pytest.fixture
+def connect(mocker):
+    return mocker.patch.object(moduleTested.MySQLdb, "connect", side_effect=lambda **kwargs: mocker.MagicMock())
+
+
+def _getInThread(pool, dbName="aDB"):
+    """Get a connection in a new thread, which then finishes"""
+    results = []
+    thread = threading.Thread(target=lambda: results.append(pool.get(dbName)))
+    thread.start()
+    thread.join()
+    return results[0]
+
+
+def test_legacyPing(connect):
+    """By default, the connection is pinged each time"""
+    pool = ConnectionPool("host", "user", "passwd")
+    for _ in range(5):
+        result = pool.get("aDB")
+        assert result["OK"], result
+    conn = result["Value"]
+    assert connect.call_count == 1
+    assert conn.ping.call_count == 5
+    conn.select_db.assert_called_once_with("aDB")
+    stats = pool.getStats()
+    assert stats["Checkouts"] == 5
+    assert stats["Pings"] == 5
+    assert stats["Cleans"] == 5
+    assert stats["OpenConnections"] == stats["AssignedConnections"] == 1
+
+
+def test_pingInterval(connect, mocker):
+    """Only connections idle for more than pingInterval are pinged"""
+    now = [1000.0]
+    mocker.patch.object(moduleTested, "time").time.side_effect = lambda: now[0]
+    pool = ConnectionPool("host", "user", "passwd", pingInterval=60, cleanInterval=120)
+    conn = pool.get("aDB")["Value"]
+    for _ in range(5):
+        now[0] += 10
+        assert pool.get("aDB")["Value"] is conn
+    conn.ping.assert_not_called()
+
+    now[0] += 71
+    assert pool.get("aDB")["Value"] is conn
+    assert conn.ping.call_count == 1
+    stats = pool.getStats()
+    assert stats["Checkouts"] == 7
+    assert stats["Pings"] == 1
+    # Cleaned at the first call, then after 120 seconds
+    assert stats["Cleans"] == 2
+
+
+def test_failedPing(connect, mocker):
+    """A connection failing the ping is replaced"""
+    pool = ConnectionPool("host", "user", "passwd")
+    conn = pool.get("aDB")["Value"]
+    conn.ping.side_effect = Exception("MySQL server has gone away")
+    newConn = pool.get("aDB")["Value"]
+    assert newConn is not conn
+    conn.close.assert_called_once()
+    stats = pool.getStats()
+    assert stats["FailedPings"] == 1
+    assert stats["Reconnects"] == 1
+    assert stats["NewConnections"] == 2
+    assert stats["OpenConnections"] == 1
+
+
+def test_discard(connect):
+    pool = ConnectionPool("host", "user", "passwd", pingInterval=60)
+    conn = pool.get("aDB")["Value"]
+    pool.discard()
+    assert pool.getStats()["OpenConnections"] == 0
+    assert pool.get("aDB")["Value"] is not conn
+
+
+def test_closedConnection(connect):
+    """A connection closed by its user is replaced, even if it does not need to be pinged"""
+    pool = ConnectionPool("host", "user", "passwd", pingInterval=60)
+    conn = pool.get("aDB")["Value"]
+    conn.open = 0
+    newConn = pool.get("aDB")["Value"]
+    assert newConn is not conn
+    conn.ping.assert_not_called()
+    stats = pool.getStats()
+    assert stats["Reconnects"] == 1
+    assert stats["NewConnections"] == 2
+    assert stats["OpenConnections"] == 1
+
+
+def test_release(connect):
+    """A released connection is kept open as a spare, and reused"""
+    pool = ConnectionPool("host", "user", "passwd", pingInterval=60)
+    conn = pool.get("aDB")["Value"]
+    pool.release()
+    conn.close.assert_not_called()
+    stats = pool.getStats()
+    assert stats["OpenConnections"] == stats["SpareConnections"] == 1
+    assert stats["AssignedConnections"] == 0
+    assert pool.get("aDB")["Value"] is conn
+    assert pool.getStats()["NewConnections"] == 1
+
+
+def test_spares(connect):
+    """Connections of finished threads are reused"""
+    pool = ConnectionPool("host", "user", "passwd")
+    conn = _getInThread(pool)["Value"]
+    assert pool.getStats()["AssignedConnections"] == 1
+    assert pool.get("aDB")["Value"] is conn
+    stats = pool.getStats()
+    assert stats["NewConnections"] == 1
+    assert stats["SpareConnections"] == 0
+
+
+def test_maxConnections(connect, mocker):
+    """When the pool is full, wait for a connection to be released"""
+    pool = ConnectionPool("host", "user", "passwd", maxConnections=1, waitTimeout=0.5)
+    mainConn = pool.get("aDB")["Value"]
+    result = _getInThread(pool)
+    assert not result["OK"]
+    stats = pool.getStats()
+    assert stats["Waits"] == 1
+    assert stats["WaitTime"] >= 0.5
+    assert stats["OpenConnections"] == 1
+
+    # The connection of a finished thread can be reused
+    pool.discard()
+    mainConn.close.assert_called_once()
+    conn = _getInThread(pool)["Value"]
+    assert pool.get("aDB")["Value"] is conn
+    assert pool.getStats()["OpenConnections"] == 1
+
+
+def test_maxConnectionsSpare(connect):
+    """A thread waiting for a connection takes the one of a thread which finishes, kept as a spare"""
+    pool = ConnectionPool("host", "user", "passwd", maxConnections=1, waitTimeout=5)
+    release = threading.Event()
+    holderResults = []
+
+    def holder():
+        holderResults.append(pool.get("aDB"))
+        release.wait(5)
+
+    holderThread = threading.Thread(target=holder)
+    holderThread.start()
+    while not holderResults:
+        time.sleep(0.01)
+
+    results = []
+    waiter = threading.Thread(target=lambda: results.append(pool.get("aDB")))
+    waiter.start()
+    time.sleep(0.2)
+    release.set()
+    holderThread.join()
+    waiter.join()
+
+    assert results[0]["OK"], results[0]
+    assert results[0]["Value"] is holderResults[0]["Value"]
+    stats = pool.getStats()
+    assert stats["Waits"] == 1
+    assert stats["WaitTime"] < 5
+    assert stats["NewConnections"] == 1
+    assert stats["OpenConnections"] == 1
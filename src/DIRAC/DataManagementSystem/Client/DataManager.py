@@ -28,6 +28,7 @@ from DIRAC.Core.Security.ProxyInfo import getProxyInfo
 from DIRAC.ConfigurationSystem.Client.Helpers.Operations import Operations
 from DIRAC.MonitoringSystem.Client.DataOperationSender import DataOperationSender
 from DIRAC.DataManagementSystem.Utilities.DMSHelpers import DMSHelpers
+from DIRAC.DataManagementSystem.Utilities.ReplicaCache import getReplicaCache
 from DIRAC.Resources.Catalog.FileCatalog import FileCatalog
 from DIRAC.Resources.Storage.StorageElement import StorageElement
 from DIRAC.ResourceStatusSystem.Client.ResourceStatus import ResourceStatus
@@ -103,10 +104,33 @@ class DataManager(object):
         self.thirdPartyProtocols = self.dmsHelper.getThirdPartyProtocols()
         self.dataOpSender = DataOperationSender()
 
+        # Optional cache of the replicas, shared by all the DataManager objects
+        self.replicaCache = None
+        replicaCacheSize = Operations(vo=self.voName).getValue("DataManagement/ReplicaCacheSize", 0)
+        if replicaCacheSize:
+            replicaCacheLifetime = Operations(vo=self.voName).getValue("DataManagement/ReplicaCacheLifetime", 300)
+            self.replicaCache = getReplicaCache(replicaCacheSize, replicaCacheLifetime)
+        # The cached replicas depend on the catalogs they come from
+        self.__readCatalogNames = tuple(catalogName for catalogName, _, _ in self.fileCatalog.getReadCatalogs())
+
     def setAccountingClient(self, client):
         """Set Accounting Client instance"""
         self.accountingClient = client
 
+    def getReplicaCacheStats(self):
+        """Get the statistics of the replica cache
+
+        :return: S_OK(dict)/S_ERROR if the cache is not enabled
+        """
+        if not self.replicaCache:
+            return S_ERROR("The replica cache is not enabled")
+        return S_OK(self.replicaCache.getStats())
+
+    def __invalidateReplicaCache(self, lfns):
+        """Remove LFNs which were registered or removed from the replica cache"""
+        if self.replicaCache:
+            self.replicaCache.invalidate(lfns)
+
     def __hasAccess(self, opType, path):
         """Check if we have permission to execute given operation on the given file (if exists) or its directory"""
         if isinstance(path, six.string_types):
@@ -1048,6 +1072,7 @@ class DataManager(object):
             fileCatalog = self.fileCatalog
 
         res = fileCatalog.addFile(fileDict)
+        self.__invalidateReplicaCache(fileDict)
         if not res["OK"]:
             errStr = "Completely failed to register files."
             self.log.getSubLogger("__registerFile").debug(errStr, res["Message"])
@@ -1115,6 +1140,7 @@ class DataManager(object):
             res = fileCatalog.addReplica(replicaDict)
         else:
             res = self.fileCatalog.addReplica(replicaDict)
+        self.__invalidateReplicaCache(replicaDict)
         if not res["OK"]:
             errStr = "Completely failed to register replicas."
             log.debug(errStr, res["Message"])
@@ -1227,6 +1253,7 @@ class DataManager(object):
         completelyRemovedFiles = set(lfnDict) - set(failed)
         if completelyRemovedFiles:
             res = self.fileCatalog.removeFile(list(completelyRemovedFiles))
+            self.__invalidateReplicaCache(completelyRemovedFiles)
             if not res["OK"]:
                 failed.update(
                     dict.fromkeys(completelyRemovedFiles, "Failed to remove file from the catalog: %s" % res["Message"])
@@ -1422,6 +1449,7 @@ class DataManager(object):
         for lfn, pfn, se in replicaTuples:
             replicaDict[lfn] = {"SE": se, "PFN": pfn}
         res = self.fileCatalog.removeReplica(replicaDict)
+        self.__invalidateReplicaCache(replicaDict)
         endTime = datetime.utcnow()
         accountingDict = _initialiseAccountingDict("removeCatalogReplica", "", len(replicaTuples))
         accountingDict["RegistrationTime"] = time.time() - registrationStartTime
@@ -1689,9 +1717,16 @@ class DataManager(object):
         """
         catalogReplicas = {}
         failed = {}
+        if self.replicaCache:
+            if isinstance(lfns, str):
+                lfns = [lfns]
+            cacheKey = (self.__readCatalogNames, allStatus)
+            catalogReplicas, lfns = self.replicaCache.get(lfns, cacheKey)
         for lfnChunk in breakListIntoChunks(lfns, 1000):
             res = self.fileCatalog.getReplicas(lfnChunk, allStatus=allStatus)
             if res["OK"]:
+                if self.replicaCache:
+                    self.replicaCache.add(res["Value"]["Successful"], cacheKey)
                 catalogReplicas.update(res["Value"]["Successful"])
                 failed.update(res["Value"]["Failed"])
             else:
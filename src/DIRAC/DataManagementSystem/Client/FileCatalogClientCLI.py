@@ -2231,6 +2231,16 @@ class FileCatalogClientCLI(CLI):
             records.append((key, str(value)))
         printTable(fields, records)
 
+        try:
+            result = self.fc.getDirectoryCacheStats()
+        except AttributeError:
+            return
+        if result["OK"] and result["Value"]:
+            print("\nDirectory cache:")
+            fields = ["Counter", "Value"]
+            records = [(key, str(value)) for key, value in result["Value"].items()]
+            printTable(fields, records)
+
     def do_rebuild(self, _args):
         """Rebuild auxiliary tables keeping the directory usage data
 
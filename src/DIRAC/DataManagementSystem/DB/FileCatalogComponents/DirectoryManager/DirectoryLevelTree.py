@@ -6,6 +6,7 @@ import os
 
 from DIRAC import S_OK, S_ERROR
 from DIRAC.DataManagementSystem.DB.FileCatalogComponents.DirectoryManager.DirectoryTreeBase import DirectoryTreeBase
+from DIRAC.DataManagementSystem.DB.FileCatalogComponents.DirectoryManager.DirectoryPathCache import DirectoryPathCache
 
 MAX_LEVELS = 15
 
@@ -18,15 +19,34 @@ class DirectoryLevelTree(DirectoryTreeBase):
     def __init__(self, database=None):
         DirectoryTreeBase.__init__(self, database)
         self.treeTable = "FC_DirectoryLevelTree"
+        # Optional path <-> DirID cache, shared by all the threads
+        self.pathCache = None
+        cacheSize = getattr(database, "directoryCacheSize", 0)
+        if cacheSize:
+            self.pathCache = DirectoryPathCache(cacheSize, getattr(database, "directoryCacheLifetime", 3600))
 
     def getTreeType(self):
 
         return "Directory"
 
+    def getCacheStats(self):
+        """Get the statistics of the path <-> DirID cache"""
+        if not self.pathCache:
+            return S_OK({})
+        return S_OK(self.pathCache.getStats())
+
     def findDir(self, path, connection=False):
         """Find directory ID for the given path"""
 
-        dpath = self.db._escapeString(os.path.normpath(path))
+        normPath = os.path.normpath(path)
+        if self.pathCache:
+            cached = self.pathCache.getID(normPath)
+            if cached:
+                res = S_OK(cached[0])
+                res["Level"] = cached[1]
+                return res
+
+        dpath = self.db._escapeString(normPath)
         if not dpath["OK"]:
             return dpath
         dpath = dpath["Value"]
@@ -40,24 +60,35 @@ class DirectoryLevelTree(DirectoryTreeBase):
 
         res = S_OK(result["Value"][0][0])
         res["Level"] = result["Value"][0][1]
+        if self.pathCache:
+            self.pathCache.add(normPath, res["Value"], res["Level"])
         return res
 
     def findDirs(self, paths, connection=False):
         """Find DirIDs for the given path list"""
+        dirDict = {}
         dpathList = []
         for path in paths:
-            dpath = self.db._escapeString(os.path.normpath(path))
+            normPath = os.path.normpath(path)
+            cached = self.pathCache.getID(normPath) if self.pathCache else None
+            if cached:
+                dirDict[normPath] = cached[0]
+                continue
+            dpath = self.db._escapeString(normPath)
             if not dpath["OK"]:
                 return dpath
             dpathList.append(dpath["Value"])
+        if not dpathList:
+            return S_OK(dirDict)
         dpaths = ",".join(dpathList)
         req = "SELECT DirName,DirID from FC_DirectoryLevelTree WHERE DirName in (%s)" % dpaths
         result = self.db._query(req, connection)
         if not result["OK"]:
             return result
-        dirDict = {}
         for dirName, dirID in result["Value"]:
             dirDict[dirName] = dirID
+            if self.pathCache:
+                self.pathCache.add(dirName, dirID)
 
         return S_OK(dirDict)
 
@@ -75,6 +106,8 @@ class DirectoryLevelTree(DirectoryTreeBase):
         dirID = result["Value"]
         req = "DELETE FROM FC_DirectoryLevelTree WHERE DirID=%d" % dirID
         result = self.db._update(req)
+        if self.pathCache:
+            self.pathCache.invalidate(dirID=dirID)
         result["DirID"] = dirID
         return result
 
@@ -158,6 +191,8 @@ class DirectoryLevelTree(DirectoryTreeBase):
             else:
                 return result
         dirID = result["lastRowId"]
+        if self.pathCache:
+            self.pathCache.add(os.path.normpath(path), dirID, level)
 
         # Update the path number
         if parentDirID:
@@ -226,6 +261,10 @@ class DirectoryLevelTree(DirectoryTreeBase):
 
     def getDirectoryPath(self, dirID):
         """Get directory name by directory ID"""
+        if self.pathCache:
+            path = self.pathCache.getPath(int(dirID))
+            if path is not None:
+                return S_OK(path)
         req = "SELECT DirName FROM FC_DirectoryLevelTree WHERE DirID=%d" % int(dirID)
         result = self.db._query(req)
         if not result["OK"]:
@@ -233,6 +272,8 @@ class DirectoryLevelTree(DirectoryTreeBase):
         if not result["Value"]:
             return S_ERROR("Directory with id %d not found" % int(dirID))
 
+        if self.pathCache:
+            self.pathCache.add(result["Value"][0][0], int(dirID))
         return S_OK(result["Value"][0][0])
 
     def getDirectoryPaths(self, dirIDList):
@@ -244,17 +285,28 @@ class DirectoryLevelTree(DirectoryTreeBase):
         if not dirs:
             return S_OK({})
 
+        resultDict = {}
+        if self.pathCache:
+            for dirID in dirs:
+                path = self.pathCache.getPath(int(dirID))
+                if path is not None:
+                    resultDict[int(dirID)] = path
+            dirs = [dirID for dirID in dirs if int(dirID) not in resultDict]
+            if not dirs:
+                return S_OK(resultDict)
+
         dirListString = ",".join([str(d) for d in dirs])
         req = "SELECT DirID,DirName FROM FC_DirectoryLevelTree WHERE DirID in ( %s )" % dirListString
         result = self.db._query(req)
         if not result["OK"]:
             return result
-        if not result["Value"]:
+        if not result["Value"] and not resultDict:
             return S_ERROR("Directories not found: %s" % dirListString)
 
-        resultDict = {}
         for row in result["Value"]:
             resultDict[int(row[0])] = row[1]
+            if self.pathCache:
+                self.pathCache.add(row[1], int(row[0]))
 
         return S_OK(resultDict)
 
@@ -280,14 +332,24 @@ class DirectoryLevelTree(DirectoryTreeBase):
             pelements.append(dPath)
         pelements.append("/")
 
+        if self.pathCache:
+            cachedIDs = [self.pathCache.getID(p) for p in pelements]
+            if all(cachedIDs):
+                return S_OK(sorted(cached[0] for cached in cachedIDs))
+
         pathString = ["'" + p + "'" for p in pelements]
-        req = "SELECT DirID FROM FC_DirectoryLevelTree WHERE DirName in (%s) ORDER BY DirID" % ",".join(pathString)
+        req = "SELECT DirID,DirName FROM FC_DirectoryLevelTree WHERE DirName in (%s) ORDER BY DirID" % ",".join(
+            pathString
+        )
         result = self.db._query(req)
         if not result["OK"]:
             return result
         if not result["Value"]:
             return S_ERROR("Directory %s not found" % path)
 
+        if self.pathCache:
+            for dirID, dirName in result["Value"]:
+                self.pathCache.add(dirName, dirID)
         return S_OK([x[0] for x in result["Value"]])
 
     def getPathIDsByID_old(self, dirID):
@@ -443,6 +505,9 @@ class DirectoryLevelTree(DirectoryTreeBase):
 
     def recoverOrphanDirectories(self, credDict):
         """Recover orphan directories"""
+        # Directory IDs and parents are going to change
+        if self.pathCache:
+            self.pathCache.clear()
         # Find out orphan directories
         treeTable = "FC_DirectoryLevelTree"
         req = "SELECT DirID,Parent,Level FROM %s WHERE Parent NOT IN ( SELECT DirID from %s )" % (treeTable, treeTable)
@@ -513,6 +578,8 @@ class DirectoryLevelTree(DirectoryTreeBase):
             result = self.__rebuildLevelIndexes(parentID, connection)
             resUnlock = self.db._query("UNLOCK TABLES", connection)
 
+        if self.pathCache:
+            self.pathCache.clear()
         return S_OK()
 
     def _getConnection(self, connection=False):
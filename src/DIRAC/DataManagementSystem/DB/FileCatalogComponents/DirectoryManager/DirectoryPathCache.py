@@ -0,0 +1,124 @@
+""" Bounded in memory cache of the directory path <-> DirID mapping of the DirectoryManager
+
+    Directory paths almost never change, so resolving them is mostly the same queries over and over.
+    The cache is shared by all the threads of the service. Only the existing directories are cached,
+    and the directory manager invalidates the directories it removes. Since the changes done by
+    other instances of the service are not seen, the entries also have a lifetime.
+"""
+import collections
+import threading
+import time
+
+
+class DirectoryPathCache(object):
+    """LRU cache of path <-> (DirID, Level)"""
+
+    def __init__(self, maxSize=100000, lifetime=3600):
+        """c'tor
+
+        :param int maxSize: maximum number of directories in the cache
+        :param int lifetime: lifetime of the entries, in seconds
+        """
+        self.maxSize = maxSize
+        self.lifetime = lifetime
+        self.__lock = threading.Lock()
+        # { path: (dirID, level, expirationTime) }, least recently used first
+        self.__byPath = collections.OrderedDict()
+        # { dirID: path }
+        self.__byID = {}
+        self.__hits = 0
+        self.__misses = 0
+
+    def __remove(self, path):
+        """Remove a path, with the lock held"""
+        dirID = self.__byPath.pop(path)[0]
+        self.__byID.pop(dirID, None)
+
+    def __getEntry(self, path):
+        """Get a valid entry of a path, with the lock held, counting the hits and misses"""
+        entry = self.__byPath.get(path)
+        if entry and entry[2] < time.time():
+            self.__remove(path)
+            entry = None
+        if entry:
+            self.__byPath.move_to_end(path)
+            self.__hits += 1
+        else:
+            self.__misses += 1
+        return entry
+
+    def getID(self, path):
+        """Get the DirID and level of a directory
+
+        :param str path: normalized path of the directory
+
+        :return: tuple (dirID, level) or None if not in the cache
+        """
+        with self.__lock:
+            entry = self.__getEntry(path)
+        return entry[:2] if entry else None
+
+    def getPath(self, dirID):
+        """Get the path of a directory
+
+        :param int dirID: directory ID
+
+        :return: the path or None if not in the cache
+        """
+        with self.__lock:
+            path = self.__byID.get(dirID)
+            if path is None:
+                self.__misses += 1
+                return None
+            return path if self.__getEntry(path) else None
+
+    def add(self, path, dirID, level=None):
+        """Add a directory to the cache
+
+        :param str path: normalized path of the directory
+        :param int dirID: directory ID
+        :param int level: level of the directory, computed from the path if not given
+        """
+        if level is None:
+            level = 0 if path == "/" else path.count("/")
+        with self.__lock:
+            if path in self.__byPath:
+                self.__remove(path)
+            # A DirID can not be used by two paths
+            oldPath = self.__byID.get(dirID)
+            if oldPath is not None:
+                self.__remove(oldPath)
+            self.__byPath[path] = (dirID, level, time.time() + self.lifetime)
+            self.__byID[dirID] = path
+            while len(self.__byPath) > self.maxSize:
+                oldPath, (oldID, _level, _expiration) = self.__byPath.popitem(last=False)
+                self.__byID.pop(oldID, None)
+
+    def invalidate(self, path=None, dirID=None):
+        """Remove a directory from the cache, given by path or ID"""
+        with self.__lock:
+            if path is None:
+                path = self.__byID.get(dirID)
+            if path in self.__byPath:
+                self.__remove(path)
+
+    def clear(self):
+        """Empty the cache"""
+        with self.__lock:
+            self.__byPath.clear()
+            self.__byID.clear()
+
+    def getStats(self):
+        """Get the hits, misses, hit ratio and size of the cache
+
+        :return: dict
+        """
+        with self.__lock:
+            requests = self.__hits + self.__misses
+            return {
+                "Hits": self.__hits,
+                "Misses": self.__misses,
+                "HitRatio": float(self.__hits) / requests if requests else 0.0,
+                "Size": len(self.__byPath),
+                "MaxSize": self.maxSize,
+            }
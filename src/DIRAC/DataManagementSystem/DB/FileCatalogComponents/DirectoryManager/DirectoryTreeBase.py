@@ -70,6 +70,10 @@ class DirectoryTreeBase(object):
         """Get the string of the Directory Tree type"""
         return self.treeTable
 
+    def getCacheStats(self):
+        """Get the statistics of the directory cache, if the tree has one"""
+        return S_OK({})
+
     def setDatabase(self, database):
         self.db = database
 
@@ -1342,3 +1342,15 @@ class FileManagerBase(object):
         :returns: S_OK with list of tuples (SEName, lfn, checksum, size)
         """
         return S_ERROR("To be implemented on derived class")
+
+    def getSEDumpPage(self, seName, lastRepID=0, pageSize=10000):
+        """
+         Return a page of the files at a given SE, together with checksum and size
+
+        :param str seName: StorageElement name
+        :param int lastRepID: replica ID returned with the previous page, 0 for the first page
+        :param int pageSize: maximum number of files in the page
+
+        :returns: S_OK with a tuple (list of tuples (SEName, lfn, checksum, size), lastRepID)
+        """
+        return S_ERROR("To be implemented on derived class")
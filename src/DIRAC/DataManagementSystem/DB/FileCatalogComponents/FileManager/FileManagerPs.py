@@ -15,6 +15,8 @@ from DIRAC.Core.Utilities.List import stringListToString, intListToString, break
 class FileManagerPs(FileManagerBase):
     def __init__(self, database=None):
         super(FileManagerPs, self).__init__(database)
+        # False once the DB is found not to have the ps_get_se_dump_page procedure
+        self._hasSEDumpPageProcedure = True
 
     ######################################################
     #
@@ -941,3 +943,45 @@ class FileManagerPs(FileManagerBase):
         formatedSEIds = intListToString(seIDs)
 
         return self.db.executeStoredProcedureWithCursor("ps_get_se_dump", (formatedSEIds,))
+
+    def getSEDumpPage(self, seName, lastRepID=0, pageSize=10000):
+        """
+         Return a page of the files at a given SE, together with checksum and size.
+         The pages are sorted by replica ID: to get the next page, give the replica ID
+         returned with the previous one.
+
+        :param str seName: StorageElement name
+        :param int lastRepID: replica ID returned with the previous page, 0 for the first page
+        :param int pageSize: maximum number of files in the page
+
+        :returns: S_OK with a tuple (list of tuples (SEName, lfn, checksum, size), lastRepID).
+                  The list is empty when there are no more files
+        """
+        res = self.db.seManager.findSE(seName)
+        if not res["OK"]:
+            return res
+        seID = res["Value"]
+
+        res = S_ERROR()
+        if self._hasSEDumpPageProcedure:
+            res = self.db.executeStoredProcedureWithCursor("ps_get_se_dump_page", (seID, lastRepID, pageSize))
+            if not res["OK"] and "ps_get_se_dump_page does not exist" in res["Message"]:
+                # DB created before the procedure was added
+                self.db.log.warn(
+                    "Stored procedure ps_get_se_dump_page missing, using the equivalent query",
+                    "see the DFC documentation to add it",
+                )
+                self._hasSEDumpPageProcedure = False
+        if not self._hasSEDumpPageProcedure:
+            req = (
+                'SELECT r.RepID, CONCAT(d.Name, "/", f.FileName), f.Checksum, f.Size FROM FC_Replicas r '
+                "JOIN FC_Files f on f.FileID = r.FileID JOIN FC_DirectoryList d on d.DirID = f.DirID "
+                "WHERE r.SEID = %d AND r.RepID > %d ORDER BY r.RepID LIMIT %d" % (seID, lastRepID, pageSize)
+            )
+            res = self.db._query(req)
+        if not res["OK"]:
+            return res
+        rows = res["Value"]
+        if rows:
+            lastRepID = rows[-1][0]
+        return S_OK(([(seName, lfn, checksum, size) for _repID, lfn, checksum, size in rows], lastRepID))
@@ -7,12 +7,14 @@ from mock import MagicMock
 
 from DIRAC.DataManagementSystem.DB.FileCatalogComponents.DirectoryManager.DirectoryTreeBase import DirectoryTreeBase
 from DIRAC.DataManagementSystem.DB.FileCatalogComponents.DirectoryManager.DirectoryLevelTree import DirectoryLevelTree
+from DIRAC.DataManagementSystem.DB.FileCatalogComponents.DirectoryManager.DirectoryPathCache import DirectoryPathCache
 
 # from DIRAC.DataManagementSystem.DB.FileCatalogComponents.DirectorySimpleTree import DirectorySimpleTree
 # from DIRAC.DataManagementSystem.DB.FileCatalogComponents.DirectoryFlatTree import DirectoryFlatTree
 # from DIRAC.DataManagementSystem.DB.FileCatalogComponents.DirectoryNodeTree import DirectoryNodeTree
 
 from DIRAC.DataManagementSystem.DB.FileCatalogComponents.FileManager.FileManagerBase import FileManagerBase
+from DIRAC.DataManagementSystem.DB.FileCatalogComponents.FileManager.FileManagerPs import FileManagerPs
 
 dbMock = MagicMock()
 ugManagerMock = MagicMock()
@@ -44,6 +46,56 @@ def test_Level_makeDirectory():
     assert res["OK"] is True  # this will need to be implemented on a derived class
 
 
+def test_PathCache():
+    cache = DirectoryPathCache(maxSize=2, lifetime=3600)
+    cache.add("/a", 1)
+    cache.add("/a/b", 2)
+    assert cache.getID("/a/b") == (2, 2)
+    assert cache.getPath(1) == "/a"
+    # /a/b is now the least recently used
+    cache.add("/c", 3)
+    assert cache.getID("/a/b") is None
+    assert cache.getPath(2) is None
+    cache.invalidate(dirID=1)
+    assert cache.getID("/a") is None
+    stats = cache.getStats()
+    assert stats["Size"] == 1
+    assert stats["Hits"] == 2
+    assert stats["Misses"] == 3
+    assert stats["HitRatio"] == 0.4
+
+    cache.lifetime = -1
+    cache.add("/d", 4)
+    assert cache.getID("/d") is None
+
+
+def test_Level_pathCache():
+    db = MagicMock()
+    db.directoryCacheSize = 10
+    db.directoryCacheLifetime = 3600
+    db._escapeString.side_effect = lambda value: {"OK": True, "Value": "'%s'" % value}
+    db._query.return_value = {"OK": True, "Value": ((42, 2),)}
+    db._update.return_value = {"OK": True, "Value": 1}
+    tree = DirectoryLevelTree(db)
+
+    for _ in range(3):
+        res = tree.findDir("/vo/dir/")
+        assert res["OK"]
+        assert res["Value"] == 42
+        assert res["Level"] == 2
+    assert db._query.call_count == 1
+    assert tree.getDirectoryPath(42)["Value"] == "/vo/dir"
+    assert tree.findDirs(["/vo/dir"])["Value"] == {"/vo/dir": 42}
+    assert db._query.call_count == 1
+    assert tree.getCacheStats()["Value"]["Hits"] == 4
+
+    # Removing the directory invalidates it
+    assert tree.removeDir("/vo/dir")["OK"]
+    db._query.return_value = {"OK": True, "Value": ()}
+    assert tree.findDir("/vo/dir")["Value"] == ""
+    assert db._query.call_count == 2
+
+
 ####################################################################################
 # SimpleTree
 # FIXME: this fails... is it a genuine failure?
@@ -99,3 +151,27 @@ def test_Base_addFile():
     res = fmb.addFile({"aa": "aaa/bbb"}, {})
     assert res["OK"] is True  # this will need to be implemented on a derived class, but it anyway returns S_OK()
     assert "aa" in res["Value"]["Failed"]
+
+
+####################################################################################
+# FileManagerPs
+
+
+def test_Ps_getSEDumpPage_noProcedure():
+    """A DB without the ps_get_se_dump_page procedure is dumped with the equivalent query"""
+    db = MagicMock()
+    db.seManager.findSE.return_value = {"OK": True, "Value": 3}
+    db.executeStoredProcedureWithCursor.return_value = {
+        "OK": False,
+        "Message": "Execution failed.: ( 1305: PROCEDURE FileCatalogDB.ps_get_se_dump_page does not exist )",
+    }
+    db._query.return_value = {"OK": True, "Value": ((12, "/a/file", "ad", 10), (15, "/a/other", "cs", 20))}
+    fmps = FileManagerPs(db)
+
+    for _ in range(2):
+        res = fmps.getSEDumpPage("anSE", lastRepID=10, pageSize=2)
+        assert res["OK"], res
+        assert res["Value"] == ([("anSE", "/a/file", "ad", 10), ("anSE", "/a/other", "cs", 20)], 15)
+    assert "r.SEID = 3 AND r.RepID > 10 ORDER BY r.RepID LIMIT 2" in db._query.call_args[0][0]
+    # The procedure is only tried once
+    assert db.executeStoredProcedureWithCursor.call_count == 1
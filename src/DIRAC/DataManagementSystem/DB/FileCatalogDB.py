@@ -50,6 +50,9 @@ class FileCatalogDB(DB):
         self.validReplicaStatus = databaseConfig["ValidReplicaStatus"]
         self.visibleFileStatus = databaseConfig["VisibleFileStatus"]
         self.visibleReplicaStatus = databaseConfig["VisibleReplicaStatus"]
+        # Used by the directory managers which have a path cache
+        self.directoryCacheSize = databaseConfig.get("DirectoryCacheSize", 0)
+        self.directoryCacheLifetime = databaseConfig.get("DirectoryCacheLifetime", 3600)
 
         # Load the configured components
         for compAttribute, componentType in [
@@ -1140,6 +1143,10 @@ class FileCatalogDB(DB):
         counterDict.update(res["Value"])
         return S_OK(counterDict)
 
+    def getDirectoryCacheStats(self):
+        """Get the hits, misses and hit ratio of the directory cache"""
+        return self.dtree.getCacheStats()
+
     ########################################################################
     #
     #  Security based methods
@@ -1180,3 +1187,17 @@ class FileCatalogDB(DB):
         :returns: S_OK with list of tuples (SEName, lfn, checksum, size)
         """
         return self.fileManager.getSEDump(seNames)
+
+    def getSEDumpPage(self, seName, lastRepID=0, pageSize=10000):
+        """
+         Return a page of the files at a given SE, together with checksum and size.
+         Unlike getSEDump, this allows to dump an SE without loading all its files in memory.
+
+        :param str seName: StorageElement name
+        :param int lastRepID: replica ID returned with the previous page, 0 for the first page
+        :param int pageSize: maximum number of files in the page
+
+        :returns: S_OK with a tuple (list of tuples (SEName, lfn, checksum, size), lastRepID).
+                  The list is empty when there are no more files
+        """
+        return self.fileManager.getSEDumpPage(seName, lastRepID=lastRepID, pageSize=pageSize)
@@ -1967,6 +1967,33 @@ DELIMITER ;
 
 
 
+-- ps_get_se_dump_page : dump a page of the lfns in an SE, with checksum and size
+-- The replicas are sorted by RepID, and the page starts after the last RepID of the previous one,
+-- so that each page is a range scan of the SEID index, whatever the size of the SE
+-- se_id : storageElement ID
+-- last_rep_id : RepID of the last replica of the previous page (0 for the first page)
+-- page_size : maximum number of replicas returned
+-- output : RepID, LFN, Checksum, Size
+
+DROP PROCEDURE IF EXISTS ps_get_se_dump_page;
+DELIMITER //
+CREATE PROCEDURE ps_get_se_dump_page
+(IN se_id INT, IN last_rep_id INT, IN page_size INT)
+BEGIN
+
+  SELECT r.RepID, CONCAT(d.Name, "/", f.FileName), f.Checksum, f.Size
+  FROM FC_Replicas r
+  JOIN FC_Files f on f.FileID = r.FileID
+  JOIN FC_DirectoryList d on d.DirID = f.DirID
+  WHERE r.SEID = se_id AND r.RepID > last_rep_id
+  ORDER BY r.RepID
+  LIMIT page_size;
+
+END //
+DELIMITER ;
+
+
+
 -- Consistency checks
 
 
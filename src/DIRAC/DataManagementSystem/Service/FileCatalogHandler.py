@@ -4,9 +4,11 @@ in the DIRAC framework
 """
 
 import csv
+import gzip
+import io
 import json
 import os
-from io import StringIO
+import tempfile
 
 from DIRAC.Core.DISET.RequestHandler import RequestHandler, getServiceOption
 from DIRAC import S_OK, S_ERROR
@@ -56,6 +58,8 @@ class FileCatalogHandlerMixin:
             "ValidReplicaStatus": ["AprioriGood", "Trash", "Removing", "Probing"],
             "VisibleFileStatus": ["AprioriGood"],
             "VisibleReplicaStatus": ["AprioriGood"],
+            "DirectoryCacheSize": 0,
+            "DirectoryCacheLifetime": 3600,
         }
         for configKey in sorted(defaultConfig.keys()):
             defaultValue = defaultConfig[configKey]
@@ -64,6 +68,9 @@ class FileCatalogHandlerMixin:
             databaseConfig[configKey] = configValue
         res = cls.fileCatalogDB.setConfig(databaseConfig)
 
+        # Number of files read at once from the DB when dumping an SE
+        cls.seDumpPageSize = getServiceOption(serviceInfo, "SEDumpPageSize", 10000)
+
         return res
 
     ########################################################################
@@ -362,6 +369,12 @@ class FileCatalogHandlerMixin:
         """Get the number of registered directories, files and replicas in various tables"""
         return self.fileCatalogDB.getCatalogCounters(self.getRemoteCredentials())
 
+    types_getDirectoryCacheStats = []
+
+    def export_getDirectoryCacheStats(self):
+        """Get the hits, misses and hit ratio of the directory path cache"""
+        return self.fileCatalogDB.getDirectoryCacheStats()
+
     types_rebuildDirectoryUsage = []
 
     def export_rebuildDirectoryUsage(self):
@@ -632,43 +645,87 @@ class FileCatalogHandlerMixin:
         """
         return self.fileCatalogDB.getSEDump(seNames)
 
+    @staticmethod
+    def _parseSEDumpRequest(jsonRequest):
+        """Parse the request of a SE dump, as sent by the FileCatalogClient
+
+        :param str jsonRequest: json formated list of SE names, or dict with the keys
+                                SENames and Compressed
+
+        :returns: tuple (list of SE names, compressed flag)
+        """
+        request = json.loads(jsonRequest)
+        if isinstance(request, dict):
+            return request["SENames"], request.get("Compressed", False)
+        return request, False
+
+    def _dumpSEsToFile(self, seNames, compressed=False):
+        """Write the files at given SEs, together with checksum and size, in a temporary file
+        formated as CSV with '|' separation.
+        The files are read from the DB page by page, so that the memory used by the service
+        does not depend on the size of the SEs.
+
+        :param list seNames: StorageElement names
+        :param bool compressed: if True, the file is gzip compressed
+
+        :returns: S_OK with the temporary file, opened in binary mode and positioned at its start
+        """
+        dumpFile = tempfile.TemporaryFile()
+        try:
+            rawFile = gzip.GzipFile(fileobj=dumpFile, mode="wb") if compressed else dumpFile
+            csvFile = io.TextIOWrapper(rawFile, encoding="utf-8", newline="")
+            writer = csv.writer(csvFile, delimiter="|")
+            for seName in seNames:
+                lastRepID = 0
+                while True:
+                    res = self.fileCatalogDB.getSEDumpPage(seName, lastRepID=lastRepID, pageSize=self.seDumpPageSize)
+                    if not res["OK"]:
+                        dumpFile.close()
+                        return res
+                    files, lastRepID = res["Value"]
+                    if not files:
+                        break
+                    writer.writerows(files)
+            # Flush the CSV writer without closing the temporary file
+            csvFile.detach()
+            if compressed:
+                rawFile.close()
+        except Exception:
+            dumpFile.close()
+            raise
+        dumpFile.seek(0)
+        return S_OK(dumpFile)
+
 
 class FileCatalogHandler(FileCatalogHandlerMixin, RequestHandler):
     def transfer_toClient(self, jsonSENames, token, fileHelper):
         """This method used to transfer the SEDump to the client,
-        formated as CSV with '|' separation
+        formated as CSV with '|' separation, optionally gzip compressed
 
-        :param seName: name of the se to dump
+        :param jsonSENames: json formated names of the SEs to dump, or dict with the keys
+                            SENames and Compressed
 
         :returns: the result of the FileHelper
 
 
         """
 
-        seNames = json.loads(jsonSENames)
-        csvOutput = None
-        res = self.getSEDump(seNames)
+        dumpFile = None
 
         try:
+            seNames, compressed = self._parseSEDumpRequest(jsonSENames)
+            res = self._dumpSEsToFile(seNames, compressed=compressed)
             if not res["OK"]:
                 ret = fileHelper.stringToNetwork(json.dumps(res))
                 return ret
 
-            retVal = res["Value"]
-
-            csvOutput = StringIO()
-            writer = csv.writer(csvOutput, delimiter="|")
-            for lfn in retVal:
-                writer.writerow(lfn)
-
-            csvOutput.seek(0)
-
-            ret = fileHelper.DataSourceToNetwork(csvOutput)
+            dumpFile = res["Value"]
+            ret = fileHelper.DataSourceToNetwork(dumpFile)
             return ret
 
         except Exception as e:
             self.log.exception("Exception while sending seDump", repr(e))
             return S_ERROR("Exception while sending seDump: %s" % repr(e))
         finally:
-            if csvOutput is not None:
-                csvOutput.close()
+            if dumpFile is not None:
+                dumpFile.close()
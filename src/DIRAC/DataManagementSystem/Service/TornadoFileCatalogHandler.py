@@ -9,12 +9,6 @@
 :synopsis: FileCatalogHandler is a simple Replica and Metadata Catalog service
 
 """
-# imports
-import json
-import csv
-
-from io import StringIO
-
 # from DIRAC
 
 from DIRAC import S_ERROR
@@ -33,30 +27,25 @@ class TornadoFileCatalogHandler(FileCatalogHandlerMixin, TornadoService):
 
     def export_streamToClient(self, jsonSENames):
         """This method is used to transfer the SEDump to the client,
-        formated as CSV with '|' separation
+        formated as CSV with '|' separation, optionally gzip compressed
 
-        :param jsonSENames: json formated names of the SEs to dump
+        :param jsonSENames: json formated names of the SEs to dump, or dict with the keys
+                            SENames and Compressed
 
-        :returns: the result of the FileHelper
+        :returns: the content of the dump
 
 
         """
-        seNames = json.loads(jsonSENames)
-        csvOutput = None
+        dumpFile = None
 
         try:
-            retVal = returnValueOrRaise(self.getSEDump(seNames))
-
-            csvOutput = StringIO()
-            writer = csv.writer(csvOutput, delimiter="|")
-            writer.writerows(retVal)
-
-            ret = csvOutput.getvalue()
-            return ret
+            seNames, compressed = self._parseSEDumpRequest(jsonSENames)
+            dumpFile = returnValueOrRaise(self._dumpSEsToFile(seNames, compressed=compressed))
+            return dumpFile.read()
 
         except Exception as e:
             self.log.exception("Exception while sending seDump", repr(e))
             return S_ERROR("Exception while sendind seDump: %s" % repr(e))
         finally:
-            if csvOutput is not None:
-                csvOutput.close()
+            if dumpFile is not None:
+                dumpFile.close()
@@ -0,0 +1,61 @@
+""" Test of the SE dump of the FileCatalog service
+"""
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+from DIRAC import S_OK, S_ERROR
+from DIRAC.DataManagementSystem.Service.FileCatalogHandler import FileCatalogHandlerMixin
+
+seFiles = {
+    "SE1": [("SE1", "/lfn/%d" % i, "0000%d" % i, i) for i in range(5)],
+    "SE2": [("SE2", "/lfn/2", None, 2)],
+}
+
+
+def getSEDumpPage(seName, lastRepID=0, pageSize=10000):
+    """Mock of FileCatalogDB.getSEDumpPage, the replica ID being the index in seFiles"""
+    if seName not in seFiles:
+        return S_ERROR("Unknown SE")
+    files = seFiles[seName][lastRepID : lastRepID + pageSize]
+    return S_OK((files, lastRepID + len(files)))
+
+
+@pytest.fixture
+def handler(mocker):
+    handler = FileCatalogHandlerMixin()
+    handler.fileCatalogDB = mocker.MagicMock()
+    handler.fileCatalogDB.getSEDumpPage.side_effect = getSEDumpPage
+    handler.seDumpPageSize = 2
+    return handler
+
+
+def _readDump(dumpFile, compressed):
+    if compressed:
+        dumpFile = gzip.GzipFile(fileobj=dumpFile)
+    return [tuple(row) for row in csv.reader(io.TextIOWrapper(dumpFile, newline=""), delimiter="|")]
+
+
+@pytest.mark.parametrize("compressed", [False, True])
+def test_dumpSEsToFile(handler, compressed):
+    res = handler._dumpSEsToFile(["SE1", "SE2"], compressed=compressed)
+    assert res["OK"], res
+    rows = _readDump(res["Value"], compressed)
+    expected = [(se, lfn, checksum or "", str(size)) for se, lfn, checksum, size in seFiles["SE1"] + seFiles["SE2"]]
+    assert rows == expected
+    # 3 pages for SE1 plus the empty one, 1 for SE2 plus the empty one
+    assert handler.fileCatalogDB.getSEDumpPage.call_count == 6
+
+
+def test_dumpSEsToFileError(handler):
+    res = handler._dumpSEsToFile(["SE1", "SE3"])
+    assert not res["OK"]
+
+
+def test_parseSEDumpRequest():
+    assert FileCatalogHandlerMixin._parseSEDumpRequest(json.dumps(["SE1", "SE2"])) == (["SE1", "SE2"], False)
+    request = json.dumps({"SENames": ["SE1"], "Compressed": True})
+    assert FileCatalogHandlerMixin._parseSEDumpRequest(request) == (["SE1"], True)
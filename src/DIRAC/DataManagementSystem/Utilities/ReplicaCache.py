@@ -0,0 +1,143 @@
+"""
+  Bounded LRU cache, with a lifetime, of the replicas returned by the catalogs.
+
+  It is shared by all the DataManager objects of a process, and used by the DataManager
+  if the Operations option DataManagement/ReplicaCacheSize is set. The DataManager
+  invalidates the LFNs it registers or removes, but it can not know about the changes
+  done by other processes, hence the lifetime of the entries
+  (DataManagement/ReplicaCacheLifetime) should be short.
+"""
+import collections
+import threading
+import time
+
+gReplicaCache = None
+gReplicaCacheLock = threading.Lock()
+
+
+def getReplicaCache(maxSize, lifetime):
+    """Get the replica cache of the process, creating it if needed
+
+    :param int maxSize: maximum number of LFNs in the cache
+    :param int lifetime: lifetime of the entries, in seconds
+
+    :return: ReplicaCache
+    """
+    global gReplicaCache
+    with gReplicaCacheLock:
+        if gReplicaCache is None:
+            gReplicaCache = ReplicaCache(maxSize, lifetime)
+        else:
+            gReplicaCache.setParameters(maxSize, lifetime)
+    return gReplicaCache
+
+
+class ReplicaCache(object):
+    """Cache of the replicas of LFNs
+
+    For each LFN, the replicas are stored per key, the key describing how they
+    were obtained (e.g. catalogs used and allStatus flag). Invalidating an LFN
+    removes it for all the keys. The least recently used LFNs are evicted when
+    the cache is full.
+    """
+
+    def __init__(self, maxSize=10000, lifetime=300):
+        """c'tor
+
+        :param int maxSize: maximum number of LFNs in the cache
+        :param int lifetime: lifetime of the entries, in seconds
+        """
+        self.__maxSize = maxSize
+        self.__lifetime = lifetime
+        self.__lock = threading.Lock()
+        # { lfn: { key: (expirationTime, replicas) } }, least recently used first
+        self.__cache = collections.OrderedDict()
+        self.__stats = dict.fromkeys(("Hits", "Misses", "Expired", "Evictions", "Invalidations"), 0)
+
+    def setParameters(self, maxSize, lifetime):
+        """Change the size and lifetime of the cache
+
+        :param int maxSize: maximum number of LFNs in the cache
+        :param int lifetime: lifetime of the entries, in seconds
+        """
+        with self.__lock:
+            self.__maxSize = maxSize
+            self.__lifetime = lifetime
+            self.__evict()
+
+    def __evict(self):
+        """Remove the least recently used LFNs until the cache has the right size, with the lock held"""
+        while len(self.__cache) > self.__maxSize:
+            self.__cache.popitem(last=False)
+            self.__stats["Evictions"] += 1
+
+    def get(self, lfns, key):
+        """Get the cached replicas of a list of LFNs
+
+        :param lfns: iterable of LFNs
+        :param key: key of the replicas
+
+        :return: tuple (dict { lfn: replicas } of the cached LFNs, list of the LFNs not found)
+        """
+        found = {}
+        missing = []
+        now = time.time()
+        with self.__lock:
+            for lfn in lfns:
+                entry = self.__cache.get(lfn, {}).get(key)
+                if entry is None:
+                    missing.append(lfn)
+                    self.__stats["Misses"] += 1
+                elif entry[0] < now:
+                    missing.append(lfn)
+                    self.__stats["Expired"] += 1
+                    self.__stats["Misses"] += 1
+                    del self.__cache[lfn][key]
+                    if not self.__cache[lfn]:
+                        del self.__cache[lfn]
+                else:
+                    # The caller is free to modify the returned replicas
+                    found[lfn] = dict(entry[1])
+                    self.__cache.move_to_end(lfn)
+                    self.__stats["Hits"] += 1
+        return found, missing
+
+    def add(self, replicas, key):
+        """Add replicas to the cache
+
+        :param dict replicas: { lfn: { se: url } }
+        :param key: key of the replicas
+        """
+        expirationTime = time.time() + self.__lifetime
+        with self.__lock:
+            for lfn, seDict in replicas.items():
+                self.__cache.setdefault(lfn, {})[key] = (expirationTime, dict(seDict))
+                self.__cache.move_to_end(lfn)
+            self.__evict()
+
+    def invalidate(self, lfns):
+        """Remove LFNs from the cache
+
+        :param lfns: iterable of LFNs
+        """
+        with self.__lock:
+            for lfn in lfns:
+                if self.__cache.pop(lfn, None) is not None:
+                    self.__stats["Invalidations"] += 1
+
+    def clear(self):
+        """Empty the cache"""
+        with self.__lock:
+            self.__cache.clear()
+
+    def getStats(self):
+        """Get the statistics of the cache
+
+        :return: dict with the counters, the number of LFNs in the cache and the hit rate
+        """
+        with self.__lock:
+            stats = dict(self.__stats)
+            stats["Size"] = len(self.__cache)
+        requests = stats["Hits"] + stats["Misses"]
+        stats["HitRate"] = float(stats["Hits"]) / requests if requests else 0.0
+        return stats
@@ -0,0 +1,100 @@
+""" Test of the replica cache, and of its use in the DataManager
+"""
+import pytest
+
+from DIRAC import S_OK
+from DIRAC.DataManagementSystem.Utilities import ReplicaCache as moduleTested
+from DIRAC.DataManagementSystem.Utilities.ReplicaCache import ReplicaCache
+
+replicas = {"/lfn/1": {"SE1": "url1", "SE2": "url2"}, "/lfn/2": {"SE1": "url3"}}
+
+
+def test_getAndAdd():
+    cache = ReplicaCache(maxSize=10, lifetime=60)
+    found, missing = cache.get(["/lfn/1", "/lfn/2"], "key")
+    assert found == {}
+    assert missing == ["/lfn/1", "/lfn/2"]
+
+    cache.add(replicas, "key")
+    found, missing = cache.get(["/lfn/1", "/lfn/2", "/lfn/3"], "key")
+    assert found == replicas
+    assert missing == ["/lfn/3"]
+    # Other key
+    assert cache.get(["/lfn/1"], "otherKey") == ({}, ["/lfn/1"])
+
+    # The returned replicas can be modified
+    found["/lfn/1"].pop("SE1")
+    assert cache.get(["/lfn/1"], "key")[0] == {"/lfn/1": replicas["/lfn/1"]}
+
+    stats = cache.getStats()
+    assert stats["Hits"] == 3
+    assert stats["Misses"] == 4
+    assert stats["Size"] == 2
+    assert stats["HitRate"] == pytest.approx(3.0 / 7)
+
+
+def test_lifetime(mocker):
+    now = [1000]
+    mocker.patch.object(moduleTested, "time").time.side_effect = lambda: now[0]
+    cache = ReplicaCache(maxSize=10, lifetime=60)
+    cache.add(replicas, "key")
+    now[0] += 30
+    assert cache.get(["/lfn/1"], "key")[1] == []
+    now[0] += 31
+    assert cache.get(["/lfn/1"], "key")[1] == ["/lfn/1"]
+    stats = cache.getStats()
+    assert stats["Expired"] == 1
+    assert stats["Size"] == 1
+
+
+def test_lru():
+    cache = ReplicaCache(maxSize=2, lifetime=60)
+    cache.add(replicas, "key")
+    # /lfn/1 becomes the most recently used
+    cache.get(["/lfn/1"], "key")
+    cache.add({"/lfn/3": {"SE3": "url"}}, "key")
+    assert cache.get(["/lfn/1", "/lfn/2", "/lfn/3"], "key")[1] == ["/lfn/2"]
+    assert cache.getStats()["Evictions"] == 1
+
+    cache.setParameters(1, 60)
+    assert cache.getStats()["Size"] == 1
+
+
+def test_invalidate():
+    cache = ReplicaCache(maxSize=10, lifetime=60)
+    cache.add(replicas, "key")
+    cache.add(replicas, "otherKey")
+    cache.invalidate(["/lfn/1", "/lfn/3"])
+    assert cache.get(["/lfn/1", "/lfn/2"], "otherKey") == ({"/lfn/2": replicas["/lfn/2"]}, ["/lfn/1"])
+    assert cache.getStats()["Invalidations"] == 1
+
+
+def test_dataManager(mocker):
+    """The DataManager only asks the catalog for the LFNs not in the cache, and invalidates what it removes"""
+    from DIRAC.DataManagementSystem.Client import DataManager as dmModule
+
+    mocker.patch.object(dmModule, "DMSHelpers")
+    mocker.patch.object(dmModule, "DataOperationSender")
+    mocker.patch.object(dmModule, "ResourceStatus")
+    mocker.patch.object(moduleTested, "gReplicaCache", None)
+    operations = mocker.patch.object(dmModule, "Operations")
+    operations.return_value.getValue.side_effect = lambda option, default=None: {
+        "DataManagement/ReplicaCacheSize": 100,
+        "DataManagement/UseCatalogPFN": True,
+    }.get(option, default)
+    fileCatalog = mocker.patch.object(dmModule, "FileCatalog").return_value
+    fileCatalog.getReadCatalogs.return_value = [("FileCatalog", None, True)]
+    fileCatalog.getReplicas.side_effect = lambda lfns, allStatus=False: S_OK(
+        {"Successful": {lfn: dict(replicas[lfn]) for lfn in lfns if lfn in replicas}, "Failed": {}}
+    )
+    fileCatalog.removeReplica.return_value = S_OK({"Successful": {"/lfn/1": True}, "Failed": {}})
+
+    dm = dmModule.DataManager(vo="myVO")
+    assert dm.getReplicas(["/lfn/1"])["Value"]["Successful"] == {"/lfn/1": replicas["/lfn/1"]}
+    assert dm.getReplicas(["/lfn/1", "/lfn/2"])["Value"]["Successful"] == replicas
+    assert fileCatalog.getReplicas.call_args[0][0] == ["/lfn/2"]
+    assert dm.getReplicaCacheStats()["Value"]["Hits"] == 1
+
+    dm.removeReplicaFromCatalog("SE1", ["/lfn/1"])
+    dm.getReplicas(["/lfn/1", "/lfn/2"])
+    assert fileCatalog.getReplicas.call_args[0][0] == ["/lfn/1"]
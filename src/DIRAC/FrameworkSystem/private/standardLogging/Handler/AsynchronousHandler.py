@@ -0,0 +1,94 @@
+"""
+Asynchronous Handler
+"""
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+
+class _QueueListener(QueueListener):
+    """QueueListener waiting for room in the queue when it is stopped"""
+
+    def enqueue_sentinel(self):
+        """The records queued before the sentinel are handed over before stopping"""
+        self.queue.put(self._sentinel)
+
+
+class AsynchronousHandler(QueueHandler):
+    """
+    AsynchronousHandler puts the log records in a queue, and a thread hands them over to the handler of the backend.
+
+    It is useful for the backends which can be slow, like the ElasticSearchBackend, the MessageQueueBackend or
+    the FileBackend on a loaded file system: the threads logging a message never wait for them.
+    The level and the filters of the backend are applied before queuing the records.
+
+    The queue is bounded: when the backend can not keep up, the records which do not fit are dropped and counted.
+    The records still in the queue are handed over when the handler is closed, which logging does at exit.
+    """
+
+    def __init__(self, handler, queueSize=10000):
+        """
+        Initialization of the AsynchronousHandler.
+
+        :param handler: handler of the backend
+        :param int queueSize: maximum number of records waiting to be handled
+        """
+        super(AsynchronousHandler, self).__init__(queue.Queue(queueSize))
+        self.handler = handler
+        self.queueSize = queueSize
+        self.dropped = 0
+        self._listener = None
+        self._pid = None
+        self._startListener()
+
+    def _startListener(self):
+        """Start the thread handing over the records to the handler of the backend"""
+        self._pid = os.getpid()
+        # the level and the filters of the backend are already applied by this handler
+        self._listener = _QueueListener(self.queue, self.handler, respect_handler_level=False)
+        self._listener.start()
+
+    def setFormatter(self, fmt):
+        """
+        The records are formatted by the handler of the backend.
+
+        :param fmt: formatter
+        """
+        self.handler.setFormatter(fmt)
+
+    def prepare(self, record):
+        """
+        The records stay in the process: only fix their message, and keep the extra attributes and
+        the exception information for the formatter of the backend.
+
+        :param record: log record object
+        :return: the log record
+        """
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        """
+        Add the record to the queue, or drop it if the queue is full.
+
+        :param record: log record object
+        """
+        if os.getpid() != self._pid:
+            # forked process: the thread of the parent does not exist here
+            self.queue = queue.Queue(self.queueSize)
+            self._startListener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        """
+        Hand over the records still in the queue, then close the handler of the backend.
+        """
+        if self._listener is not None and os.getpid() == self._pid:
+            self._listener.stop()
+        self._listener = None
+        self.handler.close()
+        super(AsynchronousHandler, self).close()
@@ -265,15 +265,8 @@ class Logging(object):
 
         :return: boolean which give the answer
         """
-        # lock to prevent a level change
-        self._lockLevel.acquire()
-        try:
-            result = False
-            if levelName.upper() in LogLevels.getLevelNames():
-                result = LogLevels.getLevelValue(self.getLevel()) <= LogLevels.getLevelValue(levelName)
-            return result
-        finally:
-            self._lockLevel.release()
+        level = LogLevels.getLevelValue(levelName)
+        return level is not None and self._logger.isEnabledFor(level)
 
     @classmethod
     def getName(cls):
@@ -396,6 +389,10 @@ class Logging(object):
 
         :return: boolean representing the result of the log record creation
         """
+        # the logger would drop the record: do not build it.
+        # isEnabledFor reads the cache of the levels of 'logging', emptied at each level change, without lock
+        if not self._logger.isEnabledFor(level):
+            return False
 
         # lock to prevent a level change after that the log is sent.
         self._lockLevel.acquire()
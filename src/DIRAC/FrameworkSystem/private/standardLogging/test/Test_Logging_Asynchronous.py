@@ -0,0 +1,83 @@
+"""
+Test the level fast path and the asynchronous backends
+"""
+import logging
+import threading
+
+from DIRAC.FrameworkSystem.private.standardLogging.Handler.AsynchronousHandler import AsynchronousHandler
+from DIRAC.FrameworkSystem.private.standardLogging.test.TestLogUtilities import gLogger, gLoggerReset
+
+
+class RecordsHandler(logging.Handler):
+    """Keep the messages, after waiting for an event"""
+
+    def __init__(self):
+        super(RecordsHandler, self).__init__()
+        self.messages = []
+        self.canEmit = threading.Event()
+
+    def emit(self, record):
+        self.canEmit.wait()
+        self.messages.append(self.format(record))
+
+
+class VarMessage(object):
+    """Variable message counting its conversions"""
+
+    conversions = 0
+
+    def __str__(self):
+        VarMessage.conversions += 1
+        return "varmsg"
+
+
+def test_levelFastPath():
+    _, log, _ = gLoggerReset()
+    log.setLevel("notice")
+    varMessage = VarMessage()
+    assert log.debug("message", varMessage) is False
+    assert log.verbose("message", varMessage) is False
+    assert VarMessage.conversions == 0
+    assert log.notice("message", varMessage) is True
+    assert VarMessage.conversions == 1
+    assert not log.shown("info")
+    assert log.shown("Error")
+    assert not log.shown("unknown")
+
+
+def test_asynchronousHandler():
+    target = RecordsHandler()
+    handler = AsynchronousHandler(target, queueSize=2)
+    logger = logging.getLogger("test_asynchronousHandler")
+    logger.propagate = False
+    logger.addHandler(handler)
+
+    # The backend is blocked, but not the logging threads
+    for index in range(5):
+        logger.warning("message %s", index)
+    assert not target.messages
+    target.canEmit.set()
+    handler.close()
+    logger.removeHandler(handler)
+
+    # One record is handed over by the listener while the queue is full
+    assert target.messages[0] == "message 0"
+    assert len(target.messages) + handler.dropped == 5
+    assert handler.dropped >= 2
+
+
+def test_asynchronousBackend(tmp_path):
+    gLoggerReset()
+    fileName = str(tmp_path / "asynchronous.log")
+    gLogger.registerBackend("file", {"FileName": fileName, "Asynchronous": "yes"})
+    handler = gLogger._backendsList[-1].getHandler()  # pylint: disable=protected-access
+    assert isinstance(handler, AsynchronousHandler)
+
+    gLogger.notice("message", "varmessage")
+    gLogger.debug("hidden message")
+    handler.close()
+    with open(fileName) as logFile:
+        content = logFile.read()
+    assert "Framework NOTICE: message varmessage" in content
+    assert "hidden" not in content
+    gLoggerReset()
@@ -4,10 +4,16 @@ It uses an internal list which is used to keep messages in the memory.
 addRecord is used to insert messages to the internal queue. commit is used
 to insert the acumulated messages to elasticsearch.
 It provides two failover mechanism:
-1.) If the database is not available, the data will be kept in the memory.
-2.) If a MQ is available, we store the messages in MQ service.
+1.) If a MQ is available, we store the messages in MQ service.
+2.) Otherwise, or if the MQ is not available either, the messages are kept in a spool on disk.
+The spool is a directory of segment files, which survives the restarts, and is bounded in size.
+It is replayed by the next commits once the database is available again, with an increasing delay
+between the attempts while it is not.
+
+The messages waiting in the MQ are processed at most every __mqDrainInterval seconds.
 
 Note: In order to not send too many rows to the db we use  __maxRecordsInABundle.
+Above __maxRecordsInMemory records waiting for a commit, the oldest ones are moved to the spool.
 
 **Configuration Parameters**:
 
@@ -16,14 +22,17 @@ a MQ service is available, if the MQ is not working a failover will be performed
 
 """
 
+import os
 import threading
+import time
 import json
 
-from DIRAC import S_OK, S_ERROR, gLogger
+from DIRAC import S_OK, S_ERROR, gLogger, rootPath
 
 from DIRAC.Resources.MessageQueue.MQCommunication import createConsumer
 from DIRAC.Resources.MessageQueue.MQCommunication import createProducer
 from DIRAC.MonitoringSystem.Client.ServerUtils import getMonitoringDB
+from DIRAC.MonitoringSystem.private.DiskSpool import DiskSpool
 from DIRAC.ConfigurationSystem.Client.Config import gConfig
 
 
@@ -39,16 +48,39 @@ class MonitoringReporter:
     :param list __documents: contains the records which will be inserted to the db.
     :param str __monitoringType: type of the records which will be inserted to the db. For example: WMSHistory.
     :param str __failoverQueueName: the name of the messaging queue. For example: /queue/dirac.certification
+    :param DiskSpool __spool: records which could not be sent, by default in work/MonitoringSpool/<monitoringType>
+    :param int __mqDrainInterval: minimum time in seconds between two processings of the MQ messages
     """
 
-    def __init__(self, monitoringType="", failoverQueueName="dirac.monitoring"):
+    def __init__(
+        self,
+        monitoringType="",
+        failoverQueueName="dirac.monitoring",
+        spoolDirectory=None,
+        maxSpoolSize=100 * 1024 * 1024,
+        mqDrainInterval=300,
+    ):
 
         self.__maxRecordsInABundle = 5000
+        self.__maxRecordsInMemory = 10 * self.__maxRecordsInABundle
         self.__documentLock = threading.RLock()
         self.__documents = []
+        self.__droppedRecords = 0
         self.__monitoringType = monitoringType
         self.__failoverQueueName = failoverQueueName
         self.__defaultMQProducer = None
+        if spoolDirectory is None:
+            spoolDirectory = os.path.join(rootPath, "work", "MonitoringSpool", monitoringType or "Default")
+        self.__spool = DiskSpool(spoolDirectory, maxSpoolSize)
+        # Replay of the spool: at most __maxSegmentsPerReplay segments per commit, and after a failure
+        # not before __nextReplay, with a delay doubling up to __maxReplayDelay
+        self.__maxSegmentsPerReplay = 10
+        self.__minReplayDelay = 60
+        self.__maxReplayDelay = 3600
+        self.__replayDelay = self.__minReplayDelay
+        self.__nextReplay = 0
+        self.__mqDrainInterval = mqDrainInterval
+        self.__nextMQDrain = 0
         self.monitoringDB = getMonitoringDB()
 
     def __del__(self):
@@ -98,9 +130,14 @@ class MonitoringReporter:
 
         :param dict rec: it contains a key/value pair.
         """
-        self.__documentLock.acquire()
-        self.__documents.append(rec)
-        self.__documentLock.release()
+        toSpool = []
+        with self.__documentLock:
+            self.__documents.append(rec)
+            if len(self.__documents) >= self.__maxRecordsInMemory:
+                toSpool = self.__documents[: self.__maxRecordsInABundle]
+                del self.__documents[: self.__maxRecordsInABundle]
+        if toSpool:
+            self.__keepRecords(toSpool)
 
     def publishRecords(self, records, mqProducer=None):
         """
@@ -123,21 +160,22 @@ class MonitoringReporter:
     def commit(self):
         """
         It inserts the accumulated data to the db.
-        In case of failure it keeps in memory/MQ
+        In case of failure it keeps them in MQ, or in the spool
         """
-        # before we try to insert the data to the db, we process all the data
-        # which are already in the queue
+        # before we try to insert the data to the db, we process
+        # the data which are already in the queue, from time to time
         mqProducer = self.__getProducer()  # we are sure that we can connect to MQ
-        if mqProducer is not None:
+        if mqProducer is not None and time.time() >= self.__nextMQDrain:
+            self.__nextMQDrain = time.time() + self.__mqDrainInterval
             result = self.processRecords()
             if not result["OK"]:
                 gLogger.error("Unable to insert data to the db:", result["Message"])
 
-        self.__documentLock.acquire()
-        documents = self.__documents
-        self.__documents = []
-        self.__documentLock.release()
+        with self.__documentLock:
+            documents = self.__documents
+            self.__documents = []
         recordSent = 0
+        dbAvailable = True
         try:
             while documents:
                 recordsToSend = documents[: self.__maxRecordsInABundle]
@@ -146,25 +184,84 @@ class MonitoringReporter:
                     recordSent += len(recordsToSend)
                     del documents[: self.__maxRecordsInABundle]
                     gLogger.verbose(f"{recordSent} records inserted to MonitoringDB")
-                else:
-                    if mqProducer is not None:
-                        res = self.publishRecords(recordsToSend, mqProducer)
-                        if not res["OK"]:  # in case of MQ problem
-                            return res
+                    continue
+                dbAvailable = False
+                if mqProducer is not None:
+                    res = self.publishRecords(recordsToSend, mqProducer)
+                    if res["OK"]:
                         # if we managed to publish the records we can delete from the list
                         recordSent += len(recordsToSend)
                         del documents[: self.__maxRecordsInABundle]
-                    else:
-                        gLogger.warn("Failed to insert the records:", retVal["Message"])
+                        continue
+                    gLogger.warn("Failed to publish the records:", res["Message"])
+                else:
+                    gLogger.warn("Failed to insert the records:", retVal["Message"])
+                # the db is not available: the records are kept in the spool
+                records = documents[:]
+                del documents[:]
+                self.__keepRecords(records)
+                if mqProducer is not None:  # in case of MQ problem
+                    return res
         except Exception as e:  # pylint: disable=broad-except
             gLogger.exception("Error committing", lException=e)
             return S_ERROR(f"Error committing {repr(e).replace(',)',')')}")
         finally:
-            self.__documentLock.acquire()
-            self.__documents.extend(documents)
-            self.__documentLock.release()
+            with self.__documentLock:
+                self.__documents.extend(documents)
+        if dbAvailable:
+            recordSent += self.__replaySpool()
         return S_OK(recordSent)
 
+    def __keepRecords(self, records):
+        """
+        Write records to the spool, or if it is not possible keep them in memory,
+        dropping the oldest records above __maxRecordsInMemory.
+
+        :param list records: records to keep
+        """
+        for index in range(0, len(records), self.__maxRecordsInABundle):
+            result = self.__spool.put(records[index : index + self.__maxRecordsInABundle])
+            if not result["OK"]:
+                gLogger.error("Cannot spool the records:", result["Message"])
+                break
+        else:
+            return
+        with self.__documentLock:
+            self.__documents[:0] = records[index:]
+            toDrop = len(self.__documents) - self.__maxRecordsInMemory
+            if toDrop > 0:
+                del self.__documents[:toDrop]
+                self.__droppedRecords += toDrop
+                gLogger.warn(f"Dropped {toDrop} {self.__monitoringType} records ({self.__droppedRecords} so far)")
+
+    def __replaySpool(self):
+        """
+        Insert the records of the spool to the db, unless the last attempt failed recently.
+
+        :return: number of records inserted
+        """
+        if time.time() < self.__nextReplay:
+            return 0
+        recordSent = 0
+        for _ in range(self.__maxSegmentsPerReplay):
+            result = self.__spool.get()
+            if not result["OK"] or result["Value"] is None:
+                break
+            claimedPath, records = result["Value"]
+            retVal = self.monitoringDB.put(records, self.__monitoringType)
+            if not retVal["OK"]:
+                self.__spool.release(claimedPath)
+                self.__nextReplay = time.time() + self.__replayDelay
+                self.__replayDelay = min(2 * self.__replayDelay, self.__maxReplayDelay)
+                gLogger.warn("Failed to insert the spooled records:", retVal["Message"])
+                return recordSent
+            self.__spool.ack(claimedPath)
+            recordSent += len(records)
+        self.__replayDelay = self.__minReplayDelay
+        if recordSent:
+            gLogger.verbose(f"{recordSent} spooled records inserted to MonitoringDB")
+        return recordSent
+
     def __getProducer(self):
         """
         This method is used to get the default MQ producer or create it if needed.
@@ -0,0 +1,107 @@
+""" Test the failover of the MonitoringReporter: the spool on disk and the processing of the MQ messages
+"""
+# pylint: disable=protected-access
+import os
+
+import pytest
+
+from DIRAC import S_OK, S_ERROR
+from DIRAC.MonitoringSystem.Client import MonitoringReporter as moduleTested
+from DIRAC.MonitoringSystem.private.DiskSpool import DiskSpool
+
+
+class FakeMonitoringDB:
+    """MonitoringDB keeping the records, or failing"""
+
+    def __init__(self):
+        self.available = True
+        self.records = []
+
+    def put(self, records, monitoringType):
+        if not self.available:
+            return S_ERROR("Connection refused")
+        self.records.extend(records)
+        return S_OK()
+
+    def pingDB(self):
+        return S_OK(self.available)
+
+
+@pytest.fixture
+def monitoringDB(mocker):
+    db = FakeMonitoringDB()
+    mocker.patch.object(moduleTested, "getMonitoringDB", return_value=db)
+    mocker.patch.object(moduleTested.gConfig, "getConfigurationTree", return_value=S_ERROR("No MQ"))
+    return db
+
+
+def test_spool(monitoringDB, tmp_path):
+    reporter = moduleTested.MonitoringReporter("AgentMonitoring", spoolDirectory=str(tmp_path))
+    for index in range(12):
+        reporter.addRecord({"index": index})
+
+    # The db is down: the records go to the spool
+    monitoringDB.available = False
+    assert reporter.commit() == S_OK(0)
+    assert reporter._MonitoringReporter__documents == []
+    assert DiskSpool(str(tmp_path)).pendingRecords() == 12
+
+    # The next replay is delayed after a failure
+    assert reporter.commit() == S_OK(0)
+    monitoringDB.available = True
+    assert reporter.commit() == S_OK(0)
+    assert not monitoringDB.records
+
+    # After a restart, the spool is replayed with the new records
+    reporter = moduleTested.MonitoringReporter("AgentMonitoring", spoolDirectory=str(tmp_path))
+    reporter.addRecord({"index": 12})
+    assert reporter.commit() == S_OK(13)
+    assert sorted(record["index"] for record in monitoringDB.records) == list(range(13))
+    assert not os.listdir(str(tmp_path))
+
+
+def test_memoryBound(monitoringDB, tmp_path):
+    reporter = moduleTested.MonitoringReporter("AgentMonitoring", spoolDirectory=str(tmp_path))
+    reporter._MonitoringReporter__maxRecordsInABundle = 10
+    reporter._MonitoringReporter__maxRecordsInMemory = 30
+    for index in range(35):
+        reporter.addRecord({"index": index})
+    # The oldest records are moved to the spool
+    assert len(reporter._MonitoringReporter__documents) == 25
+    assert DiskSpool(str(tmp_path)).pendingRecords() == 10
+
+
+def test_diskSpool(tmp_path):
+    spool = DiskSpool(str(tmp_path / "spool"), maxSize=100)
+    assert spool.get() == S_OK(None)
+    for index in range(10):
+        assert spool.put([{"index": index}])["OK"]
+    # Only the newest segments are kept
+    assert 0 < spool.pendingRecords() < 10
+    assert spool.dropped + spool.pendingRecords() == 10
+
+    claimedPath, records = spool.get()["Value"]
+    assert records == [{"index": spool.dropped}]
+    spool.release(claimedPath)
+    claimedPath, records = spool.get()["Value"]
+    assert records == [{"index": spool.dropped}]
+
+    # The segments claimed by a process which died are given back
+    os.rename(claimedPath, claimedPath.replace(".%s." % os.getpid(), ".999999999."))
+    spool = DiskSpool(str(tmp_path / "spool"))
+    claimedPath, records = spool.get()["Value"]
+    spool.ack(claimedPath)
+    assert spool.pendingRecords() == 10 - records[0]["index"] - 1
+
+
+def test_mqDrainInterval(monitoringDB, tmp_path, mocker):
+    mocker.patch.object(moduleTested.gConfig, "getConfigurationTree", return_value=S_OK({}))
+    mocker.patch.object(moduleTested, "createProducer", return_value=S_OK(mocker.MagicMock()))
+    reporter = moduleTested.MonitoringReporter("AgentMonitoring", spoolDirectory=str(tmp_path))
+    processRecords = mocker.patch.object(reporter, "processRecords", return_value=S_OK())
+    reporter.commit()
+    reporter.commit()
+    assert processRecords.call_count == 1
+    reporter._MonitoringReporter__nextMQDrain = 0
+    reporter.commit()
+    assert processRecords.call_count == 2
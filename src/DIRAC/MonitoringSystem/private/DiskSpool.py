@@ -0,0 +1,198 @@
+"""
+DiskSpool keeps lists of records in segment files of a directory, until they can be sent.
+
+Each segment is a JSON file holding one list of records. Its name contains the time of its creation,
+the process which wrote it and the number of records, so that the segments are taken oldest first
+and the size of the spool is known without reading them.
+Several processes can use the same directory: a segment is claimed by renaming it before being read.
+The spool is bounded: when it is bigger than its maximum size, the oldest segments are dropped.
+"""
+import itertools
+import json
+import os
+import threading
+import time
+
+from DIRAC import S_OK, S_ERROR, gLogger
+from DIRAC.Core.Utilities.File import mkDir
+
+SEGMENT_EXTENSION = ".json"
+CLAIMED_EXTENSION = ".claimed"
+
+
+def _recordsInSegment(segmentName):
+    """Number of records of a segment, from its name <time>_<pid>_<sequence>_<records>.json"""
+    try:
+        return int(segmentName[: -len(SEGMENT_EXTENSION)].rsplit("_", 1)[1])
+    except (IndexError, ValueError):
+        return 0
+
+
+def _isProcessAlive(pid):
+    """Check if a process is running"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # it exists, but belongs to another user
+        return True
+    return True
+
+
+class DiskSpool:
+    """
+    .. class:: DiskSpool
+
+    :param str directory: directory of the segment files
+    :param int maxSize: maximum size of the segment files in bytes
+    :param int dropped: number of records dropped because the spool was full
+    """
+
+    def __init__(self, directory, maxSize=100 * 1024 * 1024):
+        self.directory = directory
+        self.maxSize = maxSize
+        self.dropped = 0
+        self.log = gLogger.getSubLogger("DiskSpool")
+        self.__sequence = itertools.count()
+        self.__lock = threading.Lock()
+        self.__staleClaimsReleased = False
+
+    def __listSegments(self):
+        """
+        :return: names of the unclaimed segments, oldest first
+        """
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        return sorted(name for name in names if name.endswith(SEGMENT_EXTENSION) and not name.startswith("."))
+
+    def pendingRecords(self):
+        """
+        :return: number of records in the unclaimed segments
+        """
+        return sum(_recordsInSegment(name) for name in self.__listSegments())
+
+    def put(self, records):
+        """
+        Write a list of records in a new segment, then drop the oldest segments if the spool is too big.
+
+        :param list records: records, which can be serialized in JSON
+        :return: S_OK()/S_ERROR()
+        """
+        if not records:
+            return S_OK()
+        segmentName = "%017.6f_%d_%d_%d%s" % (
+            time.time(),
+            os.getpid(),
+            next(self.__sequence),
+            len(records),
+            SEGMENT_EXTENSION,
+        )
+        segmentPath = os.path.join(self.directory, segmentName)
+        # Written under a hidden name first, so that the other processes never read a partial segment
+        tmpPath = os.path.join(self.directory, "." + segmentName)
+        try:
+            mkDir(self.directory)
+            with open(tmpPath, "w") as segmentFile:
+                json.dump(records, segmentFile)
+            os.rename(tmpPath, segmentPath)
+        except (OSError, TypeError, ValueError) as e:
+            try:
+                os.remove(tmpPath)
+            except OSError:
+                pass
+            return S_ERROR(f"Cannot write the segment {segmentPath}: {repr(e)}")
+        self.__enforceMaxSize()
+        return S_OK()
+
+    def __enforceMaxSize(self):
+        """Drop the oldest segments while the spool is bigger than its maximum size, keeping the newest one"""
+        with self.__lock:
+            segments = []
+            totalSize = 0
+            for name in self.__listSegments():
+                try:
+                    size = os.path.getsize(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                segments.append((name, size))
+                totalSize += size
+            for name, size in segments[:-1]:
+                if totalSize <= self.maxSize:
+                    break
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                totalSize -= size
+                self.dropped += _recordsInSegment(name)
+                self.log.warn("Spool full, dropping a segment", f"{name} in {self.directory}")
+
+    def __releaseStaleClaims(self):
+        """Give back the segments claimed by processes which do not exist any more"""
+        self.__staleClaimsReleased = True
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            if not name.endswith(CLAIMED_EXTENSION):
+                continue
+            segmentName, pid = name[: -len(CLAIMED_EXTENSION)].rsplit(".", 1)
+            try:
+                if _isProcessAlive(int(pid)):
+                    continue
+                os.rename(os.path.join(self.directory, name), os.path.join(self.directory, segmentName))
+            except (OSError, ValueError):
+                continue
+
+    def get(self):
+        """
+        Claim the oldest segment. It must then be given back to ack() or to release().
+
+        :return: S_OK((claimedPath, records)), or S_OK(None) if the spool is empty
+        """
+        if not self.__staleClaimsReleased:
+            self.__releaseStaleClaims()
+        for name in self.__listSegments():
+            segmentPath = os.path.join(self.directory, name)
+            claimedPath = f"{segmentPath}.{os.getpid()}{CLAIMED_EXTENSION}"
+            try:
+                os.rename(segmentPath, claimedPath)
+            except OSError:
+                # taken by another process
+                continue
+            try:
+                with open(claimedPath) as segmentFile:
+                    records = json.load(segmentFile)
+            except (OSError, ValueError) as e:
+                self.log.error("Cannot read a segment, removing it", f"{segmentPath}: {repr(e)}")
+                self.ack(claimedPath)
+                continue
+            return S_OK((claimedPath, records))
+        return S_OK(None)
+
+    def ack(self, claimedPath):
+        """
+        Remove a segment which was sent
+
+        :param str claimedPath: path returned by get()
+        """
+        try:
+            os.remove(claimedPath)
+        except OSError as e:
+            self.log.error("Cannot remove a segment", f"{claimedPath}: {repr(e)}")
+
+    def release(self, claimedPath):
+        """
+        Give back a segment which could not be sent
+
+        :param str claimedPath: path returned by get()
+        """
+        segmentPath = claimedPath[: -len(CLAIMED_EXTENSION)].rsplit(".", 1)[0]
+        try:
+            os.rename(claimedPath, segmentPath)
+        except OSError as e:
+            self.log.error("Cannot release a segment", f"{claimedPath}: {repr(e)}")
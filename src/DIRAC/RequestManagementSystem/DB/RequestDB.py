@@ -21,7 +21,7 @@ import random
 import datetime
 
 from sqlalchemy.orm.exc import NoResultFound
-from sqlalchemy.orm import relationship, backref, sessionmaker, joinedload, mapper
+from sqlalchemy.orm import relationship, backref, sessionmaker, joinedload, selectinload, mapper
 from sqlalchemy.sql import update
 from sqlalchemy import (
     create_engine,
@@ -36,6 +36,7 @@ from sqlalchemy import (
     Enum,
     TEXT,
     BigInteger,
+    Index,
     distinct,
 )
 
@@ -151,6 +152,8 @@ requestTable = Table(
     Column("RequestID", Integer, primary_key=True),
     Column("SourceComponent", String(255)),
     Column("NotBefore", DateTime),
+    # Used by the claims of the Waiting requests, which lock only the rows they scan
+    Index("StatusLastUpdateNotBefore", "Status", "LastUpdate", "NotBefore"),
     mysql_engine="InnoDB",
 )
 
@@ -185,6 +188,9 @@ class RequestDB(object):
     db holding requests
     """
 
+    # Whether the backend supports SELECT ... FOR UPDATE SKIP LOCKED, found at the first use
+    __skipLockedSupported = None
+
     def __getDBConnectionInfo(self, fullname):
         """Collect from the CS all the info needed to connect to the DB.
         This should be in a base class eventually
@@ -326,6 +332,71 @@ class RequestDB(object):
     #     finally:
     #       session.close()
 
+    def __supportsSkipLocked(self):
+        """Check if the requests can be claimed with SELECT ... FOR UPDATE SKIP LOCKED.
+        It is the case since MySQL 8.0.1 and MariaDB 10.6. The other backends (sqlite for the tests)
+        either support it or ignore the locking clause.
+
+        :returns: boolean
+        """
+        if self.__skipLockedSupported is None:
+            dialect = self.engine.dialect
+            if dialect.name != "mysql":
+                self.__skipLockedSupported = True
+            else:
+                if not dialect.server_version_info:
+                    # the version is known after the first connection
+                    with self.engine.connect():
+                        pass
+                version = tuple(dialect.server_version_info or ())
+                if getattr(dialect, "is_mariadb", False):
+                    self.__skipLockedSupported = version >= (10, 6)
+                else:
+                    self.__skipLockedSupported = version >= (8, 0, 1)
+            self.log.verbose("Requests claimed with SKIP LOCKED: %s" % self.__skipLockedSupported)
+        return self.__skipLockedSupported
+
+    def __claimRequests(self, session, numberOfRequest, log):
+        """Select Waiting requests, load them and set them Assigned, in one transaction.
+        The requests locked by the transaction of another executor are skipped instead of waited for,
+        and the operations and files of all the requests are loaded with one query each.
+
+        :param session: session, committed on success
+        :param int numberOfRequest: maximum number of requests to claim
+        :param log: logger
+
+        :returns: list of Request objects
+        """
+        now = datetime.datetime.utcnow().replace(microsecond=0)
+        requestIDs = (
+            session.query(Request.RequestID)
+            .filter(Request._Status == "Waiting")
+            .filter(Request._NotBefore < now)
+            .order_by(Request._LastUpdate)
+            .limit(numberOfRequest)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        requestIDs = [ridTuple[0] for ridTuple in requestIDs]
+        log.debug("Claimed request ids %s" % requestIDs)
+        if not requestIDs:
+            session.commit()
+            return []
+
+        requests = (
+            session.query(Request)
+            .options(selectinload("__operations__").selectinload("__files__"))
+            .filter(Request.RequestID.in_(requestIDs))
+            .all()
+        )
+        session.execute(
+            update(Request)
+            .where(Request.RequestID.in_(requestIDs))
+            .values({Request._Status: "Assigned", Request._LastUpdate: datetime.datetime.utcnow()})
+        )
+        session.commit()
+        return requests
+
     def getRequest(self, reqID=0, assigned=True):
         """read request for execution
 
@@ -356,6 +427,15 @@ class RequestDB(object):
                         "getRequest: status of request '%s' is 'Assigned', request cannot be selected" % reqID
                     )
 
+            elif assigned and self.__supportsSkipLocked():
+                requests = self.__claimRequests(session, 1, log)
+                if not requests:
+                    return S_OK()
+                request = requests[0]
+                log.verbose("selected request %s('%s') (Assigned)" % (request.RequestID, request.RequestName))
+                session.expunge_all()
+                return S_OK(request)
+
             else:
                 now = datetime.datetime.utcnow().replace(microsecond=0)
                 reqIDs = set()
@@ -442,6 +522,12 @@ class RequestDB(object):
         requestDict = {}
 
         try:
+            if assigned and self.__supportsSkipLocked():
+                requestDict = dict((req.RequestID, req) for req in self.__claimRequests(session, numberOfRequest, log))
+                log.debug("Got %s Request objects " % len(requestDict))
+                session.expunge_all()
+                return S_OK(requestDict)
+
             # If we are here, the request MUST exist, so no try catch
             # the joinedload is to force the non-lazy loading of all the attributes, especially _parent
             try:
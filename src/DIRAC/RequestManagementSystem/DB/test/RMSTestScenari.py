@@ -83,6 +83,44 @@ def test_stressBulk(reqDB):
         assert delete["OK"], delete
 
 
+def test_claim(reqDB):
+    """requests claimed only once, with their operations and files"""
+
+    reqIDs = []
+    for i in range(5):
+        request = Request({"RequestName": "claim-%d" % i})
+        for lfn in ("/a/b/c", "/a/b/d"):
+            op = Operation({"Type": "RemoveReplica", "TargetSE": "CERN-USER"})
+            op += File({"LFN": lfn})
+            request += op
+        put = reqDB.putRequest(request)
+        assert put["OK"], put
+        reqIDs.append(put["Value"])
+
+    time.sleep(1)
+    claimed = {}
+    for numberOfRequest in (3, 3):
+        get = reqDB.getBulkRequests(numberOfRequest, True)
+        assert get["OK"], get
+        assert not set(get["Value"]) & set(claimed)
+        claimed.update(get["Value"])
+    assert set(claimed) == set(reqIDs)
+    for request in claimed.values():
+        assert [op[0].LFN for op in request] == ["/a/b/c", "/a/b/d"]
+
+    # Nothing left to claim
+    get = reqDB.getBulkRequests(3, True)
+    assert get["OK"], get
+    assert get["Value"] == {}
+    get = reqDB.getRequest()
+    assert get["OK"], get
+    assert get["Value"] is None
+
+    for reqID in reqIDs:
+        delete = reqDB.deleteRequest(reqID)
+        assert delete["OK"], delete
+
+
 def test_scheduled(reqDB):
     """scheduled request r/w"""
 
@@ -17,6 +17,13 @@
 
     For the "read" methods plug-ins are called one by one, starting with the Master
     plug-in if declared, until getting a successful result.
+    If the Operations option Services/Catalogs/ParallelRead is True, the "read" plug-ins
+    are called concurrently, each of them with a timeout (Services/Catalogs/ReadTimeout,
+    which can be overwritten per catalog by Services/Catalogs/<CatalogName>/ReadTimeout).
+    The results are merged with the same precedence as when calling them one by one.
+    If Services/Catalogs/ReadEarlyStop is True, the results of the lower priority
+    plug-ins are not waited for (or not even asked for) as soon as all the LFNs were
+    successfully resolved by the higher priority ones.
 
     Most of the catalog plug-in methods are taking the first argument which represents
     the required LFNS. The LFNs argument can have one of the following forms:
@@ -43,10 +50,15 @@
     the documentation of the respective FileCatalog plug-ins ( client classes )
 
 """
+import errno
 import six
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
 
 from DIRAC import gLogger, gConfig, S_OK, S_ERROR
+from DIRAC.Core.DISET.ThreadConfig import ThreadConfig
 from DIRAC.Core.Utilities import DErrno
 from DIRAC.ConfigurationSystem.Client.Helpers.Operations import Operations
 from DIRAC.Core.Security.ProxyInfo import getVOfromProxyGroup
@@ -54,6 +66,33 @@ from DIRAC.Resources.Catalog.Utilities import checkArgumentFormat
 from DIRAC.Resources.Catalog.FileCatalogFactory import FileCatalogFactory
 from DIRAC.Resources.Catalog.FCConditionParser import FCConditionParser
 
+# Threads shared by all the FileCatalog objects to call the read catalogs concurrently
+MAX_READ_THREADS = 20
+gReadExecutor = None
+gReadExecutorLock = threading.Lock()
+
+
+def _getReadExecutor():
+    """Get the thread pool used for the concurrent read calls, creating it if needed"""
+    global gReadExecutor
+    with gReadExecutorLock:
+        if gReadExecutor is None:
+            gReadExecutor = ThreadPoolExecutor(max_workers=MAX_READ_THREADS, thread_name_prefix="FileCatalogRead")
+    return gReadExecutor
+
+
+def _callWithThreadConfig(threadConfig, method, parms, kws):
+    """Call a catalog method in a thread of the pool, on behalf of the same identity as the caller
+
+    :param tuple threadConfig: the ThreadConfig dump of the calling thread
+    """
+    tc = ThreadConfig()
+    tc.load(threadConfig)
+    try:
+        return method(*parms, **kws)
+    finally:
+        tc.reset()
+
 
 class FileCatalog(object):
     def __init__(self, catalogs=None, vo=None):
@@ -73,6 +112,10 @@ class FileCatalog(object):
 
         self.opHelper = Operations(vo=self.vo)
 
+        self.parallelRead = self.opHelper.getValue("/Services/Catalogs/ParallelRead", False)
+        self.readTimeout = self.opHelper.getValue("/Services/Catalogs/ReadTimeout", self.timeout)
+        self.readEarlyStop = self.opHelper.getValue("/Services/Catalogs/ReadEarlyStop", False)
+
         catalogList = []
         if isinstance(catalogs, six.string_types):
             catalogList = [catalogs]
@@ -293,31 +336,84 @@ class FileCatalog(object):
             return masterResult
 
     def r_execute(self, *parms, **kws):
-        """Read method executor."""
-        successful = {}
-        failed = {}
-        for _catalogName, oCatalog, _master in self.readCatalogs:
+        """Read method executor.
 
+        The catalogs are called one by one, or concurrently if parallelRead is set.
+        For each LFN, the result of the first catalog (in the order of self.readCatalogs)
+        giving it as successful is returned.
+        """
+        call = self.call
+        catalogs = [
+            (catalogName, getattr(oCatalog, call))
+            for catalogName, oCatalog, _master in self.readCatalogs
             # Skip if the method is not implemented in this catalog
-            if not oCatalog.hasCatalogMethod(self.call):
-                continue
+            if oCatalog.hasCatalogMethod(call)
+        ]
 
-            method = getattr(oCatalog, self.call)
-            res = method(*parms, **kws)
+        # The LFNs to resolve before stopping early, if possible
+        lfns = None
+        if self.readEarlyStop and parms:
+            res = checkArgumentFormat(parms[0])
             if res["OK"]:
-                if "Successful" in res["Value"]:
-                    for key, item in res["Value"]["Successful"].items():
-                        successful.setdefault(key, item)
-                        failed.pop(key, None)
-                    for key, item in res["Value"]["Failed"].items():
-                        if key not in successful:
-                            failed[key] = item
-                else:
-                    return res
+                lfns = set(res["Value"])
+
+        if self.parallelRead and len(catalogs) > 1:
+            results = self.__parallelRead(call, catalogs, parms, kws)
+        else:
+            results = ((catalogName, method(*parms, **kws)) for catalogName, method in catalogs)
+
+        successful = {}
+        failed = {}
+        try:
+            for _catalogName, res in results:
+                if res["OK"]:
+                    if "Successful" in res["Value"]:
+                        for key, item in res["Value"]["Successful"].items():
+                            successful.setdefault(key, item)
+                            failed.pop(key, None)
+                        for key, item in res["Value"]["Failed"].items():
+                            if key not in successful:
+                                failed[key] = item
+                    else:
+                        return res
+                if lfns and lfns.issubset(successful):
+                    break
+        finally:
+            # Do not call (or wait for) the remaining catalogs
+            results.close()
         if not successful and not failed:
-            return S_ERROR(DErrno.EFCERR, "Failed to perform %s from any catalog" % self.call)
+            return S_ERROR(DErrno.EFCERR, "Failed to perform %s from any catalog" % call)
         return S_OK({"Failed": failed, "Successful": successful})
 
+    def __parallelRead(self, call, catalogs, parms, kws):
+        """Call all the catalogs concurrently and yield their results in the catalogs order
+
+        A catalog not answering within its timeout is considered as failed.
+        When the caller stops iterating (early stop), the calls not started yet are cancelled.
+
+        :param str call: name of the method
+        :param list catalogs: list of tuples (catalogName, method)
+        """
+        executor = _getReadExecutor()
+        threadConfig = ThreadConfig().dump()
+        start = time.time()
+        futures = [
+            (catalogName, executor.submit(_callWithThreadConfig, threadConfig, method, parms, kws))
+            for catalogName, method in catalogs
+        ]
+        try:
+            for catalogName, future in futures:
+                timeout = self.opHelper.getValue("/Services/Catalogs/%s/ReadTimeout" % catalogName, self.readTimeout)
+                try:
+                    res = future.result(timeout=max(0, start + timeout - time.time()))
+                except TimeoutError:
+                    self.log.warn("Timeout calling catalog", "%s.%s after %s seconds" % (catalogName, call, timeout))
+                    res = S_ERROR(errno.ETIMEDOUT, "Timeout calling %s.%s" % (catalogName, call))
+                yield catalogName, res
+        finally:
+            for _catalogName, future in futures:
+                future.cancel()
+
     ###########################################################################################
     #
     # Below is the method for obtaining the objects instantiated for a provided catalogue configuration
@@ -121,6 +121,7 @@ class FileCatalogClient(FileCatalogClientBase):
         "getUsers",
         "getGroups",
         "getCatalogCounters",
+        "getDirectoryCacheStats",
         "repairCatalog",
         "rebuildDirectoryUsage",
     ]
@@ -525,6 +526,10 @@ class FileCatalogClient(FileCatalogClientBase):
         """Get the number of registered directories, files and replicas in various tables"""
         return self._getRPC(timeout=timeout).getCatalogCounters()
 
+    def getDirectoryCacheStats(self, timeout=120):
+        """Get the hits, misses and hit ratio of the directory path cache of the service"""
+        return self._getRPC(timeout=timeout).getDirectoryCacheStats()
+
     def rebuildDirectoryUsage(self, timeout=120):
         """Rebuild DirectoryUsage table from scratch"""
         return self._getRPC(timeout=timeout).rebuildDirectoryUsage()
@@ -657,7 +662,7 @@ class FileCatalogClient(FileCatalogClientBase):
 
     #############################################################################
 
-    def getSEDump(self, seNames, outputFilename):
+    def getSEDump(self, seNames, outputFilename, compressed=False):
         """
         Dump the content of SEs in the given file.
         The file contains a list of [SEName, lfn,checksum,size] dumped as csv,
@@ -665,13 +670,19 @@ class FileCatalogClient(FileCatalogClientBase):
 
         :param seName: list of StorageElement names
         :param outputFilename: path to the file where to dump it
+        :param bool compressed: if True, the file is gzip compressed by the server.
+                                This requires a recent enough server.
 
         :returns: result from the TransferClient
         """
         if isinstance(seNames, str):
             seNames = seNames.split(",")
 
-        seNames = json.dumps(seNames)
+        # Old servers only understand a list of SEs
+        if compressed:
+            seNames = json.dumps({"SENames": seNames, "Compressed": True})
+        else:
+            seNames = json.dumps(seNames)
 
         dfc = TransferClient(self.serverURL, timeout=3600)
         return dfc.receiveFile(outputFilename, seNames)
@@ -2,6 +2,7 @@
    Testing the FileCatalog logic
 """
 import sys
+import time
 import unittest
 import mock
 
@@ -423,6 +424,90 @@ class TestRead(unittest.TestCase):
         self.assertEqual(["c1"], sorted(res["Value"]["Successful"][lfn]))
         self.assertEqual(["c2"], sorted(res["Value"]["Failed"][lfn]))
 
+    @mock.patch.object(
+        DIRAC.Resources.Catalog.FileCatalog.FileCatalog,
+        "_getSelectedCatalogs",
+        side_effect=mock_fc_getSelectedCatalogs,
+        autospec=True,
+    )  # autospec is for the binding of the method...
+    @mock.patch.object(
+        DIRAC.Resources.Catalog.FileCatalog.FileCatalog,
+        "_getEligibleCatalogs",
+        side_effect=mock_fc_getEligibleCatalogs,
+        autospec=True,
+    )  # autospec is for the binding of the method...
+    def test_02_parallel(self, mk_getSelectedCatalogs, mk_getEligibleCatalogs):
+        """Test that the concurrent read gives the same results as the sequential one"""
+
+        fc = FileCatalog(catalogs=["c1_True_True_True_2_0_2_0", "c2_False_True_True_3_0_1_0"])
+
+        lfnLists = [
+            ["/lhcb/toto"],
+            ["/lhcb/c1/Failed", "/lhcb/c2/Failed", "/lhcb/toto"],
+            ["/lhcb/c1/Error", "/lhcb/c2/Failed"],
+            ["/lhcb/c1/Failed/c2/Failed"],
+            ["/lhcb/c1/Error/c2/Error"],
+        ]
+        for lfns in lfnLists:
+            fc.parallelRead = False
+            sequential = fc.read1(lfns)
+            fc.parallelRead = True
+            parallel = fc.read1(lfns)
+            # The call stack of the errors differs
+            sequential.pop("CallStack", None)
+            parallel.pop("CallStack", None)
+            self.assertEqual(sequential, parallel)
+        # Only in c2
+        self.assertEqual(fc.read3(["/lhcb/toto"])["Value"]["Successful"], {"/lhcb/toto": "yeah"})
+
+    @mock.patch.object(
+        DIRAC.Resources.Catalog.FileCatalog.FileCatalog,
+        "_getSelectedCatalogs",
+        side_effect=mock_fc_getSelectedCatalogs,
+        autospec=True,
+    )  # autospec is for the binding of the method...
+    @mock.patch.object(
+        DIRAC.Resources.Catalog.FileCatalog.FileCatalog,
+        "_getEligibleCatalogs",
+        side_effect=mock_fc_getEligibleCatalogs,
+        autospec=True,
+    )  # autospec is for the binding of the method...
+    def test_03_parallelTimeout(self, mk_getSelectedCatalogs, mk_getEligibleCatalogs):
+        """Test that a slow catalog is considered as failed, and that the early stop does not wait for it"""
+
+        fc = FileCatalog(catalogs=["c1_True_True_True_2_0_2_0", "c2_False_True_True_3_0_1_0"])
+        fc.parallelRead = True
+        fc.readTimeout = 0.2
+
+        slowCatalog = mock.MagicMock()
+        slowCatalog.hasCatalogMethod.return_value = True
+        slowCatalog.read1.side_effect = lambda lfns: time.sleep(2) or S_OK({"Successful": {}, "Failed": {}})
+        fc.readCatalogs[0] = ("slow", slowCatalog, True)
+
+        # The slow catalog is first, but times out
+        start = time.time()
+        res = fc.read1(["/lhcb/toto", "/lhcb/c2/Failed"])
+        self.assertLess(time.time() - start, 1)
+        self.assertTrue(res["OK"])
+        self.assertEqual(list(res["Value"]["Successful"]), ["/lhcb/toto"])
+        self.assertEqual(list(res["Value"]["Failed"]), ["/lhcb/c2/Failed"])
+
+        # With early stop, the slow catalog is not waited for if the first one resolved all the LFNs
+        fc.readCatalogs.reverse()
+        fc.readTimeout = 10
+        fc.readEarlyStop = True
+        start = time.time()
+        res = fc.read1(["/lhcb/toto"])
+        self.assertLess(time.time() - start, 1)
+        self.assertEqual(res["Value"]["Successful"], {"/lhcb/toto": "yeah"})
+
+        # Same for the sequential read, which does not even call the slow catalog
+        fc.parallelRead = False
+        slowCatalog.read1.reset_mock()
+        res = fc.read1(["/lhcb/toto"])
+        self.assertEqual(res["Value"]["Successful"], {"/lhcb/toto": "yeah"})
+        slowCatalog.read1.assert_not_called()
+
 
 if __name__ == "__main__":
     suite = unittest.defaultTestLoader.loadTestsFromTestCase(TestInitialization)
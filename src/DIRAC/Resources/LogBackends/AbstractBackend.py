@@ -2,6 +2,7 @@
 Backend wrapper
 """
 from DIRAC.FrameworkSystem.private.standardLogging.LogLevels import LogLevels
+from DIRAC.FrameworkSystem.private.standardLogging.Handler.AsynchronousHandler import AsynchronousHandler
 
 
 class AbstractBackend(object):
@@ -49,6 +50,10 @@ class AbstractBackend(object):
         self._setFormatterParameters(backendParams)
         self._setFormatter(formatterType)
 
+        # hand over the records to the handler in a thread if requested
+        if backendParams and str(backendParams.get("Asynchronous", "")).lower() in ("yes", "true", "y", "1"):
+            self._handler = AsynchronousHandler(self._handler, int(backendParams.get("QueueSize", 10000)))
+
         # set the level: can also be defined in the backendParams
         if backendParams:
             level = backendParams.get("LogLevel", level)
@@ -21,9 +21,11 @@ from DIRAC.Core.Utilities.List import stringListToString, intListToString, break
 from DIRAC.Core.Utilities.Shifter import setupShifterProxyInEnv
 from DIRAC.ConfigurationSystem.Client.Helpers.Operations import Operations
 from DIRAC.Core.Utilities.Subprocess import pythonCall
-from DIRAC.DataManagementSystem.Client.MetaQuery import MetaQuery
+from DIRAC.TransformationSystem.Utilities.MetaFilterIndex import MetaFilterIndex, FILTER_STATUSES
 
 MAX_ERROR_COUNT = 10
+# Lifetime in seconds of the filter index, to follow the changes done by other instances of the DB
+FILTER_INDEX_LIFETIME = 300
 
 #############################################################################
 
@@ -111,6 +113,11 @@ class TransformationDB(DB):
 
         # Intialize filter Queries with Input Meta Queries
         self.filterQueries = []
+        self.filterStatuses = {}
+        # Compiled at the first use after each change of the filter queries
+        self.__filterIndex = None
+        self.__filterIndexTime = 0
+        self.__filterIndexLock = threading.Lock()
         res = self.__updateFilterQueries()
         if not res["OK"]:
             gLogger.fatal("Failed to create filter queries")
@@ -209,6 +216,8 @@ class TransformationDB(DB):
         # If the transformation has an input data specification
         if inputMetaQuery:
             self.filterQueries.append((transID, inputMetaQuery))
+            self.filterStatuses[transID] = "New"
+            self.__filterIndex = None
 
         if inheritedFrom:
             res = self._getTransformationID(inheritedFrom, connection=connection)
@@ -441,9 +450,8 @@ class TransformationDB(DB):
     def __updateFilterQueries(self, connection=False):
         """Get filters for all defined input streams in all the transformations."""
         resultList = []
-        res = self.getTransformations(
-            condDict={"Status": ["New", "Active", "Stopped", "Flush", "Completing"]}, connection=connection
-        )
+        statuses = {}
+        res = self.getTransformations(condDict={"Status": FILTER_STATUSES}, connection=connection)
         if not res["OK"]:
             return res
 
@@ -454,10 +462,61 @@ class TransformationDB(DB):
             if not res["OK"]:
                 continue
             resultList.append((transID, res["Value"]))
+            statuses[transDict["TransformationID"]] = transDict["Status"]
 
         self.filterQueries = resultList
+        self.filterStatuses = statuses
+        self.__filterIndex = None
         return S_OK(resultList)
 
+    def __getFilterIndex(self):
+        """Get the index of the filter queries, compiling it if they changed
+
+        :return: S_OK(MetaFilterIndex)/S_ERROR()
+        """
+        with self.__filterIndexLock:
+            if self.__filterIndex is not None and time.time() - self.__filterIndexTime < FILTER_INDEX_LIFETIME:
+                return S_OK(self.__filterIndex)
+            if self.__filterIndex is not None:
+                res = self.__updateFilterQueries()
+                if not res["OK"]:
+                    return res
+            res = FileCatalog().getMetadataFields()
+            if not res["OK"]:
+                gLogger.error("Error in getMetadataFields: %s" % res["Message"])
+                return res
+            if not res["Value"]:
+                gLogger.error("Error: no metadata fields defined")
+                return S_ERROR("No metadata fields defined")
+            typeDict = res["Value"]["FileMetaFields"]
+            typeDict.update(res["Value"]["DirectoryMetaFields"])
+            self.__filterIndex = MetaFilterIndex(self.filterQueries, self.filterStatuses, typeDict)
+            self.__filterIndexTime = time.time()
+            gLogger.verbose("Compiled the filter index of %d transformations" % len(self.filterQueries))
+            return S_OK(self.__filterIndex)
+
+    def __setFilterStatus(self, transID, status):
+        """Follow the status of the transformations in the filter index"""
+        with self.__filterIndexLock:
+            if transID in self.filterStatuses:
+                self.filterStatuses[transID] = status
+                if self.__filterIndex is not None:
+                    self.__filterIndex.setStatus(transID, status)
+                return
+            if status not in FILTER_STATUSES:
+                return
+            # The transformation may have an input meta query, not followed with its previous status
+            res = self.getTransformationMetaQuery(transID, "Input")
+            if not res["OK"]:
+                if not cmpError(res, ENOENT):
+                    gLogger.error(
+                        "Failed to get the input meta query of transformation", f"{transID}: {res['Message']}"
+                    )
+                return
+            self.filterQueries.append((transID, res["Value"]))
+            self.filterStatuses[transID] = status
+            self.__filterIndex = None
+
     ###########################################################################
     #
     # These methods manipulate the AdditionalParameters tables
@@ -473,6 +532,8 @@ class TransformationDB(DB):
         if paramName in self.TRANSPARAMS:
             res = self.__updateTransformationParameter(transID, paramName, paramValue, connection=connection)
             if res["OK"]:
+                if paramName == "Status":
+                    self.__setFilterStatus(transID, paramValue)
                 pv = self._escapeString(paramValue)
                 if not pv["OK"]:
                     return S_ERROR("Failed to parse parameter value")
@@ -1584,9 +1645,9 @@ class TransformationDB(DB):
         failed = {}
         # Determine which files pass the filters and are to be added to transformations
         transFiles = {}
-        filesToAdd = []
         catalog = FileCatalog()
 
+        metadataDicts = {}
         for lfn in fileDicts:
             gLogger.info("addFile: Attempting to add file %s" % lfn)
             res = catalog.getFileUserMetadata(lfn)
@@ -1594,31 +1655,28 @@ class TransformationDB(DB):
                 gLogger.error("Failed to getFileUserMetadata for file", "%s: %s" % (lfn, res["Message"]))
                 failed[lfn] = res["Message"]
                 continue
-            else:
-                metadatadict = res["Value"]
-            gLogger.info("Filter file with metadata", metadatadict)
-            transIDs = self._filterFileByMetadata(metadatadict)
-            gLogger.info("Transformations passing the filter: %s" % transIDs)
+            metadataDicts[lfn] = res["Value"]
+
+        # The files are filtered all together, then added once to each transformation
+        res = self._filterFilesByMetadata(metadataDicts)
+        if not res["OK"]:
+            return res
+        failed.update(res["Value"]["Failed"])
+        for lfn, transIDs in res["Value"]["Successful"].items():
+            gLogger.info("Transformations passing the filter for %s: %s" % (lfn, transIDs))
             if not (transIDs or force):  # not clear how force should be used for
                 successful[lfn] = False  # True -> False bug fix: otherwise it is set to True even if transIDs is empty.
-            else:
-                filesToAdd.append(lfn)
-                for trans in transIDs:
-                    if trans not in transFiles:
-                        transFiles[trans] = []
-                    transFiles[trans].append(lfn)
-
-            # Add the files to the transformations
-            gLogger.info("Files to add to transformations:", filesToAdd)
-            if filesToAdd:
-                for transID, lfns in transFiles.items():
-                    res = self.addFilesToTransformation(transID, lfns)
-                    if not res["OK"]:
-                        gLogger.error("Failed to add files to transformation", "%s %s" % (transID, res["Message"]))
-                        return res
-                    else:
-                        for lfn in lfns:
-                            successful[lfn] = True
+            for trans in transIDs:
+                transFiles.setdefault(trans, []).append(lfn)
+
+        # Add the files to the transformations
+        for transID, lfns in transFiles.items():
+            res = self.addFilesToTransformation(transID, lfns)
+            if not res["OK"]:
+                gLogger.error("Failed to add files to transformation", "%s %s" % (transID, res["Message"]))
+                return res
+            for lfn in lfns:
+                successful[lfn] = True
 
         res = S_OK({"Successful": successful, "Failed": failed})
         return res
@@ -1751,37 +1809,22 @@ class TransformationDB(DB):
 
     def _filterFileByMetadata(self, metadatadict):
         """Pass the input metadatadict through those currently active"""
-        transIDs = []
-        queries = self.filterQueries
-
-        catalog = FileCatalog()
-        gLogger.info("Filter file by queries", queries)
-        res = catalog.getMetadataFields()
-
+        res = self.__getFilterIndex()
         if not res["OK"]:
-            gLogger.error("Error in getMetadataFields: %s" % res["Message"])
             return res
-        if not res["Value"]:
-            gLogger.error("Error: no metadata fields defined")
+        res = res["Value"].filter(metadatadict)
+        if not res["OK"]:
+            gLogger.error("Error in applying query: %s" % res["Message"])
             return res
-        typeDict = res["Value"]["FileMetaFields"]
-        typeDict.update(res["Value"]["DirectoryMetaFields"])
+        return res["Value"]
 
-        for transID, query in queries:
-            gLogger.info("Check the transformation status")
-            res = self.getTransformationParameters(transID, "Status")
-            if res["Value"] not in ["New", "Active", "Stopped", "Completing", "Flush"]:
-                continue
-            mq = MetaQuery(query, typeDict)
-            gLogger.info("Apply query %s to metadata %s" % (mq.getMetaQuery(), metadatadict))
-            res = mq.applyQuery(metadatadict)
-            if not res["OK"]:
-                gLogger.error("Error in applying query: %s" % res["Message"])
-                return res
-            elif res["Value"]:
-                gLogger.info("Apply query result is True")
-                transIDs.append(transID)
-            else:
-                gLogger.info("Apply query result is False")
+    def _filterFilesByMetadata(self, metadataDicts):
+        """Pass the metadata of several files through the queries of the transformations currently active
 
-        return transIDs
+        :param dict metadataDicts: {lfn: metadatadict}
+        :return: S_OK({"Successful": {lfn: list of transIDs}, "Failed": {lfn: error message}})
+        """
+        res = self.__getFilterIndex()
+        if not res["OK"]:
+            return res
+        return res["Value"].filterFiles(metadataDicts)
@@ -0,0 +1,191 @@
+"""
+  Compiled form of the input meta queries of the transformations, used by the TransformationDB to find
+  the transformations a file should be added to, from its metadata.
+
+  The equality conditions of the queries (a value, a list of values, or the "=" and "in" operations)
+  are indexed by metadata name and value. A file is a candidate for the transformations whose indexed
+  conditions all match one of its values, found with one dictionary lookup per indexed metadata name.
+  The other conditions (comparisons, exclusions, "Missing" and "Any") are only checked for the candidates,
+  with a MetaQuery built once per transformation.
+  The files with a metadata value which cannot be looked up, such as a list, are checked against all the
+  queries with MetaQuery, as without the index.
+"""
+from DIRAC import S_OK, S_ERROR
+from DIRAC.Core.Utilities import TimeUtilities
+from DIRAC.DataManagementSystem.Client.MetaQuery import MetaQuery
+
+# Statuses of the transformations which receive new files
+FILTER_STATUSES = ["New", "Active", "Stopped", "Flush", "Completing"]
+
+
+def _typedValue(value, mtype):
+    """Convert a value according to the type of a metadata field, as MetaQuery does"""
+    if mtype[0:3].lower() == "int":
+        return int(value)
+    if mtype[0:5].lower() == "float":
+        return float(value)
+    if mtype[0:4].lower() == "date":
+        return TimeUtilities.fromString(value)
+    return value
+
+
+def _splitCondition(value):
+    """Split the condition on a metadata field into the values it must be equal to and the other conditions
+
+    :return: (list of values or None, remaining condition or None)
+    """
+    if str(value).lower() in ("missing", "any"):
+        return None, value
+    if isinstance(value, list):
+        return value, None
+    if isinstance(value, dict):
+        for operation in ("in", "="):
+            if operation in value:
+                operand = value[operation]
+                remaining = {op: opValue for op, opValue in value.items() if op != operation}
+                return (operand if isinstance(operand, list) else [operand]), remaining or None
+        return None, value
+    return [value], None
+
+
+class MetaFilterIndex(object):
+    """Inverted index of the input meta queries of the transformations, with their statuses"""
+
+    def __init__(self, filterQueries, statuses, typeDict):
+        """c'tor
+
+        :param list filterQueries: list of (transID, meta query dictionary)
+        :param dict statuses: {int transID: status}
+        :param dict typeDict: {metadata name: type} of the catalog metadata fields
+        """
+        self.statuses = dict(statuses)
+        self.__typeDict = typeDict
+        # { metadata name: { typed value: set of transIDs } }
+        self.__index = {}
+        # { transID: number of indexed conditions }
+        self.__required = {}
+        # { transID: MetaQuery of the conditions which are not indexed }
+        self.__remaining = {}
+        # transIDs without indexed conditions
+        self.__unindexed = []
+        # { transID: position }, to return the transformations in the order of the queries
+        self.__position = {}
+        # The full queries, and their MetaQuery once built, for the files which cannot use the index
+        self.__queries = list(filterQueries)
+        self.__metaQueries = {}
+        for transID, query in filterQueries:
+            self.__position[transID] = len(self.__position)
+            self.__compile(transID, query)
+
+    def __compile(self, transID, query):
+        """Add the query of a transformation to the index"""
+        indexed = {}
+        remaining = {}
+        try:
+            for meta, value in query.items():
+                values, condition = _splitCondition(value)
+                if values is not None:
+                    indexed[meta] = {_typedValue(val, self.__typeDict[meta]) for val in values}
+                if condition is not None:
+                    remaining[meta] = condition
+        except (KeyError, ValueError, TypeError):
+            # Unknown field or illegal value: the query is applied by MetaQuery as it is, as without the index
+            indexed = {}
+            remaining = query
+        for meta, values in indexed.items():
+            metaIndex = self.__index.setdefault(meta, {})
+            for value in values:
+                metaIndex.setdefault(value, set()).add(transID)
+        if indexed:
+            self.__required[transID] = len(indexed)
+        else:
+            self.__unindexed.append(transID)
+        if remaining:
+            self.__remaining[transID] = MetaQuery(remaining, self.__typeDict)
+
+    def setStatus(self, transID, status):
+        """Update the status of a transformation
+
+        :param int transID: transformation ID
+        :param str status: new status
+        :return: True if the transformation is in the index
+        """
+        if int(transID) not in self.statuses:
+            return False
+        self.statuses[int(transID)] = status
+        return True
+
+    def filter(self, metadatadict):
+        """Find the transformations whose query matches the metadata of a file or directory
+
+        :param dict metadatadict: metadata
+        :return: S_OK(list of transIDs)/S_ERROR()
+        """
+        hits = {}
+        for meta, metaIndex in self.__index.items():
+            userValue = metadatadict.get(meta)
+            if userValue is None:
+                continue
+            try:
+                userValue = _typedValue(userValue, self.__typeDict[meta])
+            except ValueError:
+                return S_ERROR("Illegal type for metadata %s: %s in user data" % (meta, str(userValue)))
+            try:
+                transIDs = metaIndex.get(userValue, ())
+            except TypeError:
+                # Unhashable value
+                return self.__filterWithMetaQueries(metadatadict)
+            for transID in transIDs:
+                hits[transID] = hits.get(transID, 0) + 1
+        candidates = [transID for transID, count in hits.items() if count == self.__required[transID]]
+        candidates.extend(self.__unindexed)
+
+        transIDs = []
+        for transID in sorted(candidates, key=self.__position.get):
+            if self.statuses.get(int(transID)) not in FILTER_STATUSES:
+                continue
+            metaQuery = self.__remaining.get(transID)
+            if metaQuery is not None:
+                res = metaQuery.applyQuery(metadatadict)
+                if not res["OK"]:
+                    return res
+                if not res["Value"]:
+                    continue
+            transIDs.append(transID)
+        return S_OK(transIDs)
+
+    def __filterWithMetaQueries(self, metadatadict):
+        """Apply the queries of the transformations one by one, without the index
+
+        :param dict metadatadict: metadata
+        :return: S_OK(list of transIDs)/S_ERROR()
+        """
+        transIDs = []
+        for transID, query in self.__queries:
+            if self.statuses.get(int(transID)) not in FILTER_STATUSES:
+                continue
+            metaQuery = self.__metaQueries.get(transID)
+            if metaQuery is None:
+                metaQuery = self.__metaQueries[transID] = MetaQuery(query, self.__typeDict)
+            res = metaQuery.applyQuery(metadatadict)
+            if not res["OK"]:
+                return res
+            if res["Value"]:
+                transIDs.append(transID)
+        return S_OK(transIDs)
+
+    def filterFiles(self, metadataDicts):
+        """Find the transformations of several files
+
+        :param dict metadataDicts: {lfn: metadata}
+        :return: S_OK({"Successful": {lfn: list of transIDs}, "Failed": {lfn: error message}})
+        """
+        successful = {}
+        failed = {}
+        for lfn, metadatadict in metadataDicts.items():
+            res = self.filter(metadatadict)
+            if res["OK"]:
+                successful[lfn] = res["Value"]
+            else:
+                failed[lfn] = res["Message"]
+        return S_OK({"Successful": successful, "Failed": failed})
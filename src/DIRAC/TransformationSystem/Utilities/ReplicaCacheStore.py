@@ -0,0 +1,124 @@
+"""
+  Persistent cache of the replicas of the input files of the transformations, used by the TransformationAgent.
+
+  The replicas are kept in an SQLite file, one row per transformation and LFN, with the time they were obtained.
+  Only the LFNs asked for are read, and each change only writes the LFNs it concerns, so that the cost of the
+  cache follows the number of files processed rather than the number of files cached.
+  The replicas older than the validity of the cache are neither returned nor kept.
+"""
+import json
+import sqlite3
+import threading
+import time
+
+from DIRAC.Core.Utilities.List import breakListIntoChunks
+
+# Maximum number of parameters of an SQLite statement is 999 in old versions
+LFNS_PER_QUERY = 500
+
+
+class ReplicaCacheStore(object):
+    """Replicas of the LFNs of the transformations, in an SQLite file"""
+
+    def __init__(self, fileName, validity=2):
+        """c'tor
+
+        :param str fileName: path of the SQLite file, created if needed
+        :param float validity: validity of the replicas, in days
+        """
+        self.fileName = fileName
+        self.validity = validity
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(fileName, check_same_thread=False)
+        with self.__lock, self.__connection:
+            self.__connection.execute("PRAGMA journal_mode=WAL")
+            self.__connection.execute(
+                "CREATE TABLE IF NOT EXISTS Replicas "
+                "(TransformationID INTEGER, LFN TEXT, SEs TEXT, UpdateTime REAL, PRIMARY KEY (TransformationID, LFN))"
+            )
+            self.__connection.execute(
+                "CREATE INDEX IF NOT EXISTS ReplicasUpdateTime ON Replicas (TransformationID, UpdateTime)"
+            )
+
+    def __timeLimit(self):
+        """Time before which the replicas are expired"""
+        return time.time() - self.validity * 86400
+
+    def getReplicas(self, transID, lfns):
+        """Get the valid cached replicas of LFNs
+
+        :param int transID: transformation ID
+        :param list lfns: LFNs
+        :return: dictionary {lfn: list of SEs} for the LFNs in the cache
+        """
+        replicas = {}
+        timeLimit = self.__timeLimit()
+        with self.__lock:
+            for chunk in breakListIntoChunks(list(lfns), LFNS_PER_QUERY):
+                rows = self.__connection.execute(
+                    "SELECT LFN, SEs FROM Replicas WHERE TransformationID = ? AND UpdateTime >= ? AND LFN IN (%s)"
+                    % ",".join("?" * len(chunk)),
+                    [transID, timeLimit] + chunk,
+                )
+                replicas.update((lfn, json.loads(ses)) for lfn, ses in rows)
+        return replicas
+
+    def updateReplicas(self, transID, replicas, updateTime=None):
+        """Add or replace the replicas of LFNs
+
+        :param int transID: transformation ID
+        :param dict replicas: {lfn: list of SEs}
+        :param float updateTime: time the replicas were obtained, now by default
+        """
+        now = time.time() if updateTime is None else updateTime
+        with self.__lock, self.__connection:
+            self.__connection.executemany(
+                "INSERT OR REPLACE INTO Replicas (TransformationID, LFN, SEs, UpdateTime) VALUES (?, ?, ?, ?)",
+                ((transID, lfn, json.dumps(ses), now) for lfn, ses in replicas.items()),
+            )
+
+    def removeReplicas(self, transID, lfns):
+        """Remove LFNs from the cache
+
+        :param int transID: transformation ID
+        :param list lfns: LFNs
+        :return: number of LFNs removed
+        """
+        removed = 0
+        with self.__lock, self.__connection:
+            for chunk in breakListIntoChunks(list(lfns), LFNS_PER_QUERY):
+                removed += self.__connection.execute(
+                    "DELETE FROM Replicas WHERE TransformationID = ? AND LFN IN (%s)" % ",".join("?" * len(chunk)),
+                    [transID] + chunk,
+                ).rowcount
+        return removed
+
+    def clearTransformation(self, transID):
+        """Remove all the LFNs of a transformation
+
+        :param int transID: transformation ID
+        :return: number of LFNs removed
+        """
+        with self.__lock, self.__connection:
+            return self.__connection.execute("DELETE FROM Replicas WHERE TransformationID = ?", (transID,)).rowcount
+
+    def expire(self, transID=None):
+        """Remove the replicas older than the validity of the cache
+
+        :param int transID: transformation ID, or None for all of them
+        :return: number of LFNs removed
+        """
+        timeLimit = self.__timeLimit()
+        with self.__lock, self.__connection:
+            if transID is None:
+                cursor = self.__connection.execute("DELETE FROM Replicas WHERE UpdateTime < ?", (timeLimit,))
+            else:
+                cursor = self.__connection.execute(
+                    "DELETE FROM Replicas WHERE TransformationID = ? AND UpdateTime < ?", (transID, timeLimit)
+                )
+            return cursor.rowcount
+
+    def close(self):
+        """Close the SQLite file"""
+        with self.__lock:
+            self.__connection.close()
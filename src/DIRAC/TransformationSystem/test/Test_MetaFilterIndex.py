@@ -0,0 +1,106 @@
+"""Test the MetaFilterIndex used by the TransformationDB to filter the files"""
+import random
+
+import pytest
+
+from DIRAC.DataManagementSystem.Client.MetaQuery import MetaQuery
+from DIRAC.TransformationSystem.Utilities.MetaFilterIndex import MetaFilterIndex, FILTER_STATUSES
+
+typeDict = {"DataType": "VARCHAR(128)", "RunNumber": "INT", "Energy": "FLOAT", "Tag": "VARCHAR(128)"}
+
+filterQueries = [
+    ("1", {"DataType": "RAW"}),
+    ("2", {"DataType": ["RAW", "DST"], "RunNumber": {">": 100}}),
+    ("3", {"DataType": {"in": ["DST"]}, "RunNumber": {"=": 7}}),
+    ("4", {"Tag": "Missing"}),
+    ("5", {"Tag": "Any", "DataType": "RAW"}),
+    ("6", {"RunNumber": {"<=": 10}, "Energy": {"!=": 1.5}}),
+    ("7", {"DataType": "RAW"}),
+]
+statuses = {1: "Active", 2: "Active", 3: "Flush", 4: "New", 5: "Active", 6: "Completing", 7: "Archived"}
+
+
+@pytest.mark.parametrize(
+    "metadata, expected",
+    [
+        ({"DataType": "RAW"}, ["1", "4"]),
+        ({"DataType": "RAW", "RunNumber": 101}, ["1", "2", "4"]),
+        ({"DataType": "RAW", "RunNumber": "100", "Tag": "x"}, ["1", "5"]),
+        ({"DataType": "DST", "RunNumber": "7", "Tag": "x"}, ["3"]),
+        ({"DataType": "DST", "RunNumber": "7", "Tag": "x", "Energy": 3.0}, ["3", "6"]),
+        ({"RunNumber": 5, "Energy": 1.5}, ["4"]),
+        ({"RunNumber": 5, "Energy": 2}, ["4", "6"]),
+        ({"DataType": "SIM"}, ["4"]),
+    ],
+)
+def test_filter(metadata, expected):
+    index = MetaFilterIndex(filterQueries, statuses, typeDict)
+    res = index.filter(metadata)
+    assert res["OK"], res
+    assert res["Value"] == expected
+
+
+def test_status():
+    index = MetaFilterIndex(filterQueries, statuses, typeDict)
+    assert index.setStatus("7", "Active")
+    assert index.setStatus(1, "Stopped")
+    assert not index.setStatus(8, "Active")
+    assert index.filter({"DataType": "RAW"})["Value"] == ["1", "4", "7"]
+    assert index.setStatus(1, "Completed")
+    assert index.filter({"DataType": "RAW"})["Value"] == ["4", "7"]
+
+
+def test_errors():
+    index = MetaFilterIndex(filterQueries + [("8", {"RunNumber": {">": "a"}})], {**statuses, 8: "Active"}, typeDict)
+    assert not index.filter({"RunNumber": "notAnInt"})["OK"]
+    # The illegal query is only an error for the files it is applied to
+    assert index.filter({"DataType": "RAW"})["OK"]
+    assert not index.filter({"RunNumber": 1})["OK"]
+
+    res = index.filterFiles({"/a": {"DataType": "RAW"}, "/b": {"DataType": "RAW", "RunNumber": 1}})
+    assert res["OK"], res
+    assert res["Value"]["Successful"] == {"/a": ["1", "4"]}
+    assert list(res["Value"]["Failed"]) == ["/b"]
+
+
+def test_listValue():
+    """A list as metadata value is handled by MetaQuery, as without the index"""
+    queries = filterQueries + [("8", {"DataType": [["RAW", "DST"]]}), ("9", {"Tag": {"!=": "x"}})]
+    index = MetaFilterIndex(queries, {**statuses, 8: "Active", 9: "Active"}, typeDict)
+    for metadata in ({"DataType": ["RAW", "DST"]}, {"DataType": "RAW", "Tag": ["a", "b"]}):
+        res = index.filter(metadata)
+        assert res["OK"], res
+        expected = [
+            transID
+            for transID, query in queries
+            if index.statuses[int(transID)] in FILTER_STATUSES
+            and MetaQuery(query, typeDict).applyQuery(metadata)["Value"]
+        ]
+        assert res["Value"] == expected
+    assert index.filter({"DataType": ["RAW", "DST"]})["Value"] == ["4", "8"]
+
+
+def test_sameAsMetaQuery():
+    """The index selects the same transformations as applying all the queries one by one"""
+    rng = random.Random(1234)
+    dataTypes = ["RAW", "DST", "SIM", "MC"]
+    queries = []
+    for transID in range(200):
+        query = {}
+        if rng.random() < 0.8:
+            query["DataType"] = rng.choice([rng.choice(dataTypes), rng.sample(dataTypes, 2)])
+        if rng.random() < 0.5:
+            query["RunNumber"] = rng.choice(
+                [rng.randint(0, 20), {"in": [rng.randint(0, 20), rng.randint(0, 20)]}, {">": rng.randint(0, 20)}]
+            )
+        if rng.random() < 0.3:
+            query["Tag"] = rng.choice(["Missing", "Any", "v1"])
+        queries.append((transID, query))
+    index = MetaFilterIndex(queries, {transID: "Active" for transID, _ in queries}, typeDict)
+
+    for _ in range(500):
+        metadata = {"DataType": rng.choice(dataTypes), "RunNumber": rng.randint(0, 20)}
+        if rng.random() < 0.5:
+            metadata["Tag"] = rng.choice(["v1", "v2"])
+        expected = [transID for transID, query in queries if MetaQuery(query, typeDict).applyQuery(metadata)["Value"]]
+        assert index.filter(metadata)["Value"] == expected
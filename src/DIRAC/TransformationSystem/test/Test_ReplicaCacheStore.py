@@ -0,0 +1,33 @@
+"""Test the ReplicaCacheStore of the TransformationAgent"""
+import time
+
+from DIRAC.TransformationSystem.Utilities.ReplicaCacheStore import ReplicaCacheStore
+
+
+def test_replicaCacheStore(tmp_path):
+    fileName = str(tmp_path / "ReplicaCache.sqlite")
+    store = ReplicaCacheStore(fileName, validity=1)
+    replicas = {"/vo/file%d" % i: ["SE1", "SE2"] for i in range(1200)}
+    store.updateReplicas(1, replicas)
+    store.updateReplicas(2, {"/vo/file0": ["SE3"]})
+    # Obtained 2 days ago, hence expired
+    store.updateReplicas(1, {"/vo/old": ["SE1"]}, updateTime=time.time() - 2 * 86400)
+
+    lfns = list(replicas) + ["/vo/old", "/vo/unknown"]
+    assert store.getReplicas(1, lfns) == replicas
+    assert store.getReplicas(2, lfns) == {"/vo/file0": ["SE3"]}
+
+    # Only the LFNs given are removed
+    assert store.removeReplicas(1, ["/vo/file%d" % i for i in range(1000)] + ["/vo/unknown"]) == 1000
+    assert len(store.getReplicas(1, lfns)) == 200
+    assert store.expire(1) == 1
+    assert store.expire() == 0
+
+    # The cache is kept on disk
+    store.close()
+    store = ReplicaCacheStore(fileName, validity=1)
+    assert len(store.getReplicas(1, lfns)) == 200
+    assert store.clearTransformation(1) == 200
+    assert store.getReplicas(1, lfns) == {}
+    assert store.getReplicas(2, ["/vo/file0"]) == {"/vo/file0": ["SE3"]}
+    store.close()
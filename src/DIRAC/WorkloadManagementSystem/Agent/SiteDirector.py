@@ -12,8 +12,9 @@ import datetime
 import sys
 import random
 import socket
+import time
 from collections import defaultdict
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
 import DIRAC
 from DIRAC import S_OK, S_ERROR, gConfig
@@ -43,6 +44,8 @@ from DIRAC.WorkloadManagementSystem.Utilities.PilotWrapper import (
 )
 
 MAX_PILOTS_TO_SUBMIT = 100
+SUBMISSION_THREADS = 10
+SUBMISSION_TIMEOUT = 600
 
 
 class SiteDirector(AgentModule):
@@ -104,6 +107,12 @@ class SiteDirector(AgentModule):
         self.maxQueueLength = 86400 * 3
         # Maximum number of times the Site Director is going to try to get a pilot output before stopping
         self.maxRetryGetPilotOutput = 3
+        # The pilots are submitted to the queues by a pool of threads
+        self.submissionThreads = SUBMISSION_THREADS
+        self.submissionPool = None
+        # Seconds after which a submission is not waited for: it is recorded in a later cycle, once over
+        self.submissionTimeout = SUBMISSION_TIMEOUT
+        self.lateSubmissions = {}
 
         self.pilotWaitingFlag = True
         self.pilotLogLevel = "INFO"
@@ -184,6 +193,13 @@ class SiteDirector(AgentModule):
             "AvailableSlotsUpdateCycleFactor", self.availableSlotsUpdateCycleFactor
         )
         self.maxRetryGetPilotOutput = self.am_getOption("MaxRetryGetPilotOutput", self.maxRetryGetPilotOutput)
+        submissionThreads = max(1, self.am_getOption("SubmissionThreads", self.submissionThreads))
+        if self.submissionPool and submissionThreads != self.submissionThreads:
+            # The running submissions go on in the threads of the previous pool
+            self.submissionPool.shutdown(wait=False)
+            self.submissionPool = None
+        self.submissionThreads = submissionThreads
+        self.submissionTimeout = self.am_getOption("SubmissionTimeout", self.submissionTimeout)
 
         # Flags
         self.addPilotsToEmptySites = self.am_getOption("AddPilotsToEmptySites", self.addPilotsToEmptySites)
@@ -356,8 +372,8 @@ class SiteDirector(AgentModule):
         queueDictItems = list(self.queueDict.items())
         random.shuffle(queueDictItems)
 
+        queuesToSubmit = []
         for queueName, queueDictionary in queueDictItems:
-            # now submitting to the single queues
             self.log.verbose("Evaluating queue", queueName)
 
             # are we going to submit pilots to this specific queue?
@@ -373,79 +389,38 @@ class SiteDirector(AgentModule):
                 queueCPUTime = self.maxQueueLength
 
             ce, ceDict = self._getCE(queueName)
+            queuesToSubmit.append((queueName, queueCPUTime, ce, ceDict))
+
+        # The task queues matching all the queues are obtained at once
+        matchingTaskQueues = self._getMatchingTaskQueues(
+            {queueName: ceDict for queueName, _, _, ceDict in queuesToSubmit}
+        )
+
+        # Submissions which were still running at the end of the previous cycles
+        self._recordLateSubmissions()
+
+        submissions = {}
+        for queueName, queueCPUTime, ce, ceDict in queuesToSubmit:
+            if queueName in self.lateSubmissions:
+                self.log.verbose("Previous submission still running, skipping", f"queue {queueName}")
+                continue
 
             # additionalInfo is normally taskQueueDict
-            pilotsWeMayWantToSubmit, additionalInfo = self._getPilotsWeMayWantToSubmit(ceDict)
+            pilotsWeMayWantToSubmit, additionalInfo = self._getPilotsWeMayWantToSubmit(
+                ceDict, matchingTaskQueues.get(queueName) if matchingTaskQueues is not None else None
+            )
             self.log.debug(f"{pilotsWeMayWantToSubmit} pilotsWeMayWantToSubmit are eligible for {queueName} queue")
             if not pilotsWeMayWantToSubmit:
                 self.log.debug(f"...so skipping {queueName}")
                 continue
 
-            # Get the number of already waiting pilots for the queue
-            totalWaitingPilots = 0
-            manyWaitingPilotsFlag = False
-            if self.pilotWaitingFlag:
-                tqIDList = list(additionalInfo)
-                result = pilotAgentsDB.countPilots(
-                    {"TaskQueueID": tqIDList, "Status": PilotStatus.PILOT_WAITING_STATES}, None
-                )
-                if not result["OK"]:
-                    self.log.error("Failed to get Number of Waiting pilots", result["Message"])
-                    totalWaitingPilots = 0
-                else:
-                    totalWaitingPilots = result["Value"]
-                    self.log.debug(f"Waiting Pilots: {totalWaitingPilots}")
-            if totalWaitingPilots >= pilotsWeMayWantToSubmit:
-                self.log.verbose("Possibly enough pilots already waiting", f"({totalWaitingPilots})")
-                manyWaitingPilotsFlag = True
-                if not self.addPilotsToEmptySites:
-                    continue
-
-            self.log.debug(
-                f"{totalWaitingPilots} waiting pilots for the total of {pilotsWeMayWantToSubmit} eligible pilots for {queueName}"
+            # The CEs are contacted concurrently, the results are recorded once all the submissions are over
+            submissions[queueName] = self._startSubmission(
+                queueName, queueCPUTime, ce, pilotsWeMayWantToSubmit, additionalInfo
             )
 
-            # Get the number of available slots on the target site/queue
-            totalSlots = self.getQueueSlots(queueName, manyWaitingPilotsFlag)
-            if totalSlots <= 0:
-                self.log.debug(f"{queueName}: No slots available")
-                continue
-
-            if manyWaitingPilotsFlag:
-                # Throttle submission of extra pilots to empty sites
-                pilotsToSubmit = int(self.maxPilotsToSubmit / 10) + 1
-            else:
-                pilotsToSubmit = max(0, min(totalSlots, pilotsWeMayWantToSubmit - totalWaitingPilots))
-                self.log.info(
-                    f"{queueName}: Slots={totalSlots}, TQ jobs(pilotsWeMayWantToSubmit)={pilotsWeMayWantToSubmit}, Pilots: waiting {totalWaitingPilots}, to submit={pilotsToSubmit}"
-                )
-
-            # Limit the number of pilots to submit to MAX_PILOTS_TO_SUBMIT
-            pilotsToSubmit = min(self.maxPilotsToSubmit, pilotsToSubmit)
-
-            # Get the working proxy
-            cpuTime = queueCPUTime + 86400
-            self.log.verbose("Getting pilot proxy", f"for {self.pilotDN}/{self.pilotGroup} {cpuTime} long")
-            result = gProxyManager.getPilotProxyFromDIRACGroup(self.pilotDN, self.pilotGroup, cpuTime)
-            if not result["OK"]:
-                return result
-            proxy = result["Value"]
-            # Check returned proxy lifetime
-            result = proxy.getRemainingSecs()  # pylint: disable=no-member
-            if not result["OK"]:
-                return result
-            lifetime_secs = result["Value"]
-            ce.setProxy(proxy, lifetime_secs)
-
-            # now really submitting
-            res = self._submitPilotsToQueue(pilotsToSubmit, ce, queueName)
-            if not res["OK"]:
-                self.log.info("Failed pilot submission", f"Queue: {queueName}")
-            else:
-                pilotList, stampDict = res["Value"]
-
-                # updating the pilotAgentsDB... done by default but maybe not strictly necessary
-                self._addPilotTQReference(queueName, additionalInfo, pilotList, stampDict)
+        for queueName in self._waitForSubmissions(submissions):
+            self._recordSubmission(queueName, submissions[queueName])
 
         # Summary after the cycle over queues
         self.log.info("Total number of pilots submitted in this cycle", f"{self.totalSubmittedPilots}")
@@ -642,7 +617,26 @@ class SiteDirector(AgentModule):
 
         return ce, ceDict
 
-    def _getPilotsWeMayWantToSubmit(self, ceDict):
+    def _getMatchingTaskQueues(self, ceDicts):
+        """Get the task queues matching several CEs with one call to the Matcher
+
+        :param dict ceDicts: { queue name : dictionary describing the CE of the queue }
+
+        :return: { queue name : taskQueueDict }, or None if the Matcher could not be asked for all the queues
+        """
+        if not ceDicts:
+            return {}
+        result = self.matcherClient.getMatchingTaskQueuesBulk(ceDicts)
+        if not result["OK"]:
+            self.log.warn("Could not retrieve TaskQueues for all the queues at once", result["Message"])
+            return None
+        matchingTaskQueues = result["Value"]["Successful"]
+        for queueName, message in result["Value"]["Failed"].items():
+            self.log.error("Could not retrieve TaskQueues from TaskQueueDB", f"{queueName}: {message}")
+            matchingTaskQueues[queueName] = {}
+        return matchingTaskQueues
+
+    def _getPilotsWeMayWantToSubmit(self, ceDict, taskQueueDict=None):
         """Returns the number of pilots that we may want to submit to the ce described in ceDict
 
         This implementation is based on the number of eligible WMS taskQueues for the target site/queue.
@@ -650,6 +644,7 @@ class SiteDirector(AgentModule):
 
         :param ceDict: dictionary describing CE
         :type ceDict: dict
+        :param dict taskQueueDict: task queues matching the CE, if already known (see _getMatchingTaskQueues)
 
         :return: pilotsWeMayWantToSubmit (int), taskQueueDict (dict)
         :rType: tuple
@@ -657,11 +652,12 @@ class SiteDirector(AgentModule):
 
         pilotsWeMayWantToSubmit = 0
 
-        result = self.matcherClient.getMatchingTaskQueues(ceDict)
-        if not result["OK"]:
-            self.log.error("Could not retrieve TaskQueues from TaskQueueDB", result["Message"])
-            return 0, {}
-        taskQueueDict = result["Value"]
+        if taskQueueDict is None:
+            result = self.matcherClient.getMatchingTaskQueues(ceDict)
+            if not result["OK"]:
+                self.log.error("Could not retrieve TaskQueues from TaskQueueDB", result["Message"])
+                return 0, {}
+            taskQueueDict = result["Value"]
         if not taskQueueDict:
             self.log.verbose("No matching TQs found", f"for {ceDict}")
 
@@ -670,6 +666,163 @@ class SiteDirector(AgentModule):
 
         return pilotsWeMayWantToSubmit, taskQueueDict
 
+    def _startSubmission(self, queueName, queueCPUTime, ce, pilotsWeMayWantToSubmit, taskQueueDict):
+        """Start the submission of pilots to a queue in the pool of submission threads
+
+        :param str queueName: queue name
+        :param int queueCPUTime: CPU time limit of the queue
+        :param ce: computing element of the queue
+        :param int pilotsWeMayWantToSubmit: number of pilots eligible for the queue
+        :param dict taskQueueDict: task queues matching the queue
+
+        :return: dict describing the submission, to give to _waitForSubmissions and _recordSubmission
+        """
+        submission = {"TaskQueues": taskQueueDict, "SubmitTime": time.time(), "StartTime": None}
+
+        def submit():
+            submission["StartTime"] = time.time()
+            return self._submitPilotsIfSlotsAvailable(
+                queueName, queueCPUTime, ce, pilotsWeMayWantToSubmit, taskQueueDict
+            )
+
+        if self.submissionPool is None:
+            self.submissionPool = ThreadPoolExecutor(max_workers=self.submissionThreads)
+        submission["Future"] = self.submissionPool.submit(submit)
+        return submission
+
+    def _waitForSubmissions(self, submissions):
+        """Wait for the submissions to the queues.
+        A submission is not waited for once it has been running for SubmissionTimeout seconds: the queue is left
+        aside until it is over. A submission which could not start within SubmissionTimeout seconds,
+        all the threads being busy, is cancelled.
+
+        :param dict submissions: { queue name : submission }
+
+        :return: list of the queues whose submission is over, in the order of the submissions
+        """
+        running = dict(submissions)
+        while running:
+            wait([submission["Future"] for submission in running.values()], timeout=1, return_when=FIRST_COMPLETED)
+            now = time.time()
+            for queueName, submission in list(running.items()):
+                if submission["Future"].done():
+                    del running[queueName]
+                elif submission["StartTime"] is None:
+                    if now - submission["SubmitTime"] > self.submissionTimeout and submission["Future"].cancel():
+                        self.log.warn("Submission could not start in time, postponed", f"queue {queueName}")
+                        del running[queueName]
+                elif now - submission["StartTime"] > self.submissionTimeout:
+                    self.log.warn("Submission takes too long, not waiting for it", f"queue {queueName}")
+                    self.failedQueues[queueName] += 1
+                    self.lateSubmissions[queueName] = submission
+                    del running[queueName]
+        return [
+            queueName
+            for queueName, submission in submissions.items()
+            if queueName not in self.lateSubmissions and not submission["Future"].cancelled()
+        ]
+
+    def _recordLateSubmissions(self):
+        """Record the submissions which were not over at the end of a previous cycle, if they are now"""
+        for queueName, submission in list(self.lateSubmissions.items()):
+            if submission["Future"].done():
+                self.log.info("Late submission is over", f"queue {queueName}")
+                del self.lateSubmissions[queueName]
+                self._recordSubmission(queueName, submission)
+
+    def _recordSubmission(self, queueName, submission):
+        """Record the result of a submission which is over: accounting, monitoring and PilotAgentsDB
+
+        :param str queueName: queue name
+        :param dict submission: submission, as returned by _startSubmission
+        """
+        try:
+            result = submission["Future"].result()
+        except Exception as e:  # pylint: disable=broad-except
+            self.log.exception("Exception while submitting pilots", f"queue {queueName}", lException=e)
+            self.failedQueues[queueName] += 1
+            return
+        if not result["OK"]:
+            self.log.error("Failed pilot submission", f"Queue {queueName}: {result['Message']}")
+            return
+        if not result["Value"]:
+            # Nothing to submit
+            return
+        pilotsToSubmit, submitResult = result["Value"]
+        res = self._recordPilotSubmission(pilotsToSubmit, queueName, submitResult)
+        if not res["OK"]:
+            self.log.info("Failed pilot submission", f"Queue: {queueName}")
+            return
+        pilotList, stampDict = res["Value"]
+
+        # updating the pilotAgentsDB... done by default but maybe not strictly necessary
+        self._addPilotTQReference(queueName, submission["TaskQueues"], pilotList, stampDict)
+
+    def _submitPilotsIfSlotsAvailable(self, queueName, queueCPUTime, ce, pilotsWeMayWantToSubmit, taskQueueDict):
+        """Submit pilots to a queue, if there are not enough waiting pilots and there are free slots.
+        Run in the submission threads: the result is recorded by _recordSubmission.
+
+        :return: S_OK((pilotsToSubmit, submitResult)), S_OK() if no pilot is to be submitted, or S_ERROR
+        """
+        # Get the number of already waiting pilots for the queue
+        totalWaitingPilots = 0
+        manyWaitingPilotsFlag = False
+        if self.pilotWaitingFlag:
+            tqIDList = list(taskQueueDict)
+            result = pilotAgentsDB.countPilots(
+                {"TaskQueueID": tqIDList, "Status": PilotStatus.PILOT_WAITING_STATES}, None
+            )
+            if not result["OK"]:
+                self.log.error("Failed to get Number of Waiting pilots", result["Message"])
+                totalWaitingPilots = 0
+            else:
+                totalWaitingPilots = result["Value"]
+                self.log.debug(f"Waiting Pilots: {totalWaitingPilots}")
+        if totalWaitingPilots >= pilotsWeMayWantToSubmit:
+            self.log.verbose("Possibly enough pilots already waiting", f"({totalWaitingPilots})")
+            manyWaitingPilotsFlag = True
+            if not self.addPilotsToEmptySites:
+                return S_OK()
+
+        self.log.debug(
+            f"{totalWaitingPilots} waiting pilots for the total of {pilotsWeMayWantToSubmit} eligible pilots for {queueName}"
+        )
+
+        # Get the number of available slots on the target site/queue
+        totalSlots = self.getQueueSlots(queueName, manyWaitingPilotsFlag)
+        if totalSlots <= 0:
+            self.log.debug(f"{queueName}: No slots available")
+            return S_OK()
+
+        if manyWaitingPilotsFlag:
+            # Throttle submission of extra pilots to empty sites
+            pilotsToSubmit = int(self.maxPilotsToSubmit / 10) + 1
+        else:
+            pilotsToSubmit = max(0, min(totalSlots, pilotsWeMayWantToSubmit - totalWaitingPilots))
+            self.log.info(
+                f"{queueName}: Slots={totalSlots}, TQ jobs(pilotsWeMayWantToSubmit)={pilotsWeMayWantToSubmit}, Pilots: waiting {totalWaitingPilots}, to submit={pilotsToSubmit}"
+            )
+
+        # Limit the number of pilots to submit to MAX_PILOTS_TO_SUBMIT
+        pilotsToSubmit = min(self.maxPilotsToSubmit, pilotsToSubmit)
+
+        # Get the working proxy
+        cpuTime = queueCPUTime + 86400
+        self.log.verbose("Getting pilot proxy", f"for {self.pilotDN}/{self.pilotGroup} {cpuTime} long")
+        result = gProxyManager.getPilotProxyFromDIRACGroup(self.pilotDN, self.pilotGroup, cpuTime)
+        if not result["OK"]:
+            return result
+        proxy = result["Value"]
+        # Check returned proxy lifetime
+        result = proxy.getRemainingSecs()  # pylint: disable=no-member
+        if not result["OK"]:
+            return result
+        lifetime_secs = result["Value"]
+        ce.setProxy(proxy, lifetime_secs)
+
+        # now really submitting
+        return S_OK((pilotsToSubmit, self._submitPilotsToCE(pilotsToSubmit, ce, queueName)))
+
     def _submitPilotsToQueue(self, pilotsToSubmit, ce, queue):
         """Method that really submits the pilots to the ComputingElements' queue
 
@@ -687,6 +840,18 @@ class SiteDirector(AgentModule):
                    stampDict is a dict of timestamps of pilots submission
         :rtype: dict
         """
+        submitResult = self._submitPilotsToCE(pilotsToSubmit, ce, queue)
+        return self._recordPilotSubmission(pilotsToSubmit, queue, submitResult)
+
+    def _submitPilotsToCE(self, pilotsToSubmit, ce, queue):
+        """Submit the pilots to the ComputingElement of the queue
+
+        :param int pilotsToSubmit: number of pilots to submit
+        :param ce: computing element object to where we submit
+        :param str queue: queue where to submit
+
+        :return: result of the submission by the CE
+        """
         self.log.info("Going to submit pilots", f"(a maximum of {pilotsToSubmit} pilots to {queue} queue)")
 
         bundleProxy = self.queueDict[queue].get("BundleProxy", False)
@@ -705,6 +870,17 @@ class SiteDirector(AgentModule):
         if submitResult.get("ExecutableToKeep") != executable:
             os.unlink(executable)
 
+        return submitResult
+
+    def _recordPilotSubmission(self, pilotsToSubmit, queue, submitResult):
+        """Account for the submission of pilots to a queue
+
+        :param int pilotsToSubmit: number of pilots submitted
+        :param str queue: queue where they were submitted
+        :param dict submitResult: result of the submission by the CE
+
+        :return: S_OK((pilotList, stampDict))/S_ERROR
+        """
         if not submitResult["OK"]:
             self.log.error("Failed submission to queue", f"Queue {queue}:\n{submitResult['Message']}")
 
@@ -1065,15 +1241,23 @@ class SiteDirector(AgentModule):
             return result
         proxy = result["Value"]
 
+        # The CE of a queue is not used while a submission to it is still running, CEs not being thread safe
+        self._recordLateSubmissions()
+        queues = [queue for queue in self.queueDict if queue not in self.lateSubmissions]
+        for queue in self.lateSubmissions:
+            self.log.verbose("Submission still running, not updating the pilots", f"queue {queue}")
+        if not queues:
+            return S_OK()
+
         # Getting the status of pilots in a queue implies the use of remote CEs and may lead to network latency
         # Threads aim at overcoming such issues and thus 1 thread per queue is created to
         # update the status of pilots in transient states
-        with ThreadPoolExecutor(max_workers=len(self.queueDict)) as executor:
-            for queue in self.queueDict:
+        with ThreadPoolExecutor(max_workers=len(queues)) as executor:
+            for queue in queues:
                 executor.submit(self._updatePilotStatusPerQueue, queue, proxy)
 
         # The pilot can be in Done state set by the job agent check if the output is retrieved
-        for queue in self.queueDict:
+        for queue in queues:
             ce = self.queueDict[queue]["CE"]
 
             if not ce.isProxyValid(120)["OK"]:
@@ -4,10 +4,13 @@
 
 # imports
 import datetime
+import threading
+from collections import defaultdict
+
 import pytest
 from mock import MagicMock
 
-from DIRAC import gLogger
+from DIRAC import S_OK, gLogger
 
 # sut
 from DIRAC.WorkloadManagementSystem.Agent.SiteDirector import SiteDirector
@@ -153,6 +156,90 @@ def test__ifAndWhereToSubmit(sd, mockMatcherReturnValue, expected, anyExpected,
         assert res == (expected, anyExpected, sitesExpected, set())
 
 
+def test__getMatchingTaskQueues(sd):
+    """Testing SiteDirector()._getMatchingTaskQueues() and its use by _getPilotsWeMayWantToSubmit()"""
+    sd.matcherClient = MagicMock()
+    sd.matcherClient.getMatchingTaskQueuesBulk.return_value = {
+        "OK": True,
+        "Value": {"Successful": {"aQueue": {1: {"Jobs": 3}, 2: {"Jobs": 4}}}, "Failed": {"bQueue": "Wrong conditions"}},
+    }
+    res = sd._getMatchingTaskQueues({"aQueue": {"Site": "LCG.CERN.cern"}, "bQueue": {"Site": "LCG.CERN.cern"}})
+    assert res == {"aQueue": {1: {"Jobs": 3}, 2: {"Jobs": 4}}, "bQueue": {}}
+    assert sd._getPilotsWeMayWantToSubmit({}, res["aQueue"]) == (7, res["aQueue"])
+    assert sd._getPilotsWeMayWantToSubmit({}, res["bQueue"]) == (0, {})
+    sd.matcherClient.getMatchingTaskQueues.assert_not_called()
+
+    # Without the bulk result, the Matcher is asked for the queue
+    sd.matcherClient.getMatchingTaskQueuesBulk.return_value = {"OK": False, "Message": "Unknown method"}
+    assert sd._getMatchingTaskQueues({"aQueue": {"Site": "LCG.CERN.cern"}}) is None
+    sd.matcherClient.getMatchingTaskQueues.return_value = {"OK": True, "Value": {1: {"Jobs": 3}}}
+    assert sd._getPilotsWeMayWantToSubmit({"Site": "LCG.CERN.cern"}) == (3, {1: {"Jobs": 3}})
+
+
+def test__waitForSubmissions(sd):
+    """Testing SiteDirector()._waitForSubmissions() with a queue taking too long"""
+    sd.failedQueues = defaultdict(int)
+    sd.submissionTimeout = 0.5
+    slowCE = threading.Event()
+
+    def submit(queueName, *_args):
+        if queueName == "slowQueue":
+            slowCE.wait(10)
+        return S_OK()
+
+    sd._submitPilotsIfSlotsAvailable = submit
+    submissions = {queue: sd._startSubmission(queue, 100, None, 1, {}) for queue in ("aQueue", "slowQueue", "bQueue")}
+    assert sd._waitForSubmissions(submissions) == ["aQueue", "bQueue"]
+    assert list(sd.lateSubmissions) == ["slowQueue"]
+    assert sd.failedQueues == {"slowQueue": 1}
+
+    # Recorded at a later cycle, once over
+    sd._recordLateSubmissions()
+    assert list(sd.lateSubmissions) == ["slowQueue"]
+    slowCE.set()
+    submissions["slowQueue"]["Future"].result()
+    sd._recordLateSubmissions()
+    assert not sd.lateSubmissions
+
+
+def test_updatePilotStatus_lateSubmission(sd, mocker):
+    """The CE of a queue is left alone while a submission to it is still running"""
+    mocker.patch(
+        "DIRAC.WorkloadManagementSystem.Agent.SiteDirector.gProxyManager.getPilotProxyFromDIRACGroup",
+        return_value=S_OK("proxy"),
+    )
+    mocker.patch("DIRAC.WorkloadManagementSystem.Agent.SiteDirector.pilotAgentsDB.selectPilots", return_value=S_OK([]))
+    sd.failedQueues = defaultdict(int)
+    sd.sendAccounting = False
+    sd.queueDict["bQueue"] = dict(sd.queueDict["aQueue"], QueueName="bQueue")
+    for queue in sd.queueDict:
+        sd.queueDict[queue]["CE"] = MagicMock()
+    sd._updatePilotStatusPerQueue = MagicMock()
+    slowCE = threading.Event()
+
+    def submit(*_args):
+        slowCE.wait(10)
+        return S_OK()
+
+    sd._submitPilotsIfSlotsAvailable = submit
+    submission = sd._startSubmission("aQueue", 100, sd.queueDict["aQueue"]["CE"], 1, {})
+    sd.lateSubmissions["aQueue"] = submission
+
+    assert sd.updatePilotStatus()["OK"]
+    sd._updatePilotStatusPerQueue.assert_called_once_with("bQueue", "proxy")
+    assert not sd.queueDict["aQueue"]["CE"].method_calls
+    assert sd.queueDict["bQueue"]["CE"].cleanupPilots.called
+
+    # Once the submission is over, it is recorded and the queue is updated again
+    slowCE.set()
+    submission["Future"].result()
+    sd._updatePilotStatusPerQueue.reset_mock()
+    assert sd.updatePilotStatus()["OK"]
+    assert not sd.lateSubmissions
+    assert sd._updatePilotStatusPerQueue.call_count == 2
+    assert sd.queueDict["aQueue"]["CE"].cleanupPilots.called
+
+
 def test__allowedToSubmit(sd):
     """Testing SiteDirector()._allowedToSubmit()"""
     submit = sd._allowedToSubmit("aQueue", True, set(["LCG.CERN.cern"]), set())
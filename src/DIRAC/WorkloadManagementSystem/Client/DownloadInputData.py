@@ -6,12 +6,21 @@
 """ The Download Input Data module wraps around the Replica Management
     components to provide access to datasets by available site protocols as
     defined in the CS for the VO.
+
+    The files are downloaded concurrently, by DownloadThreads threads (Operations InputDataPolicy section).
+    A file which could not be downloaded from any of its replicas is tried again DownloadRetries times,
+    after DownloadRetryDelay seconds times the number of the attempt.
+    The files already downloaded with the right size are not downloaded again.
 """
 import os
+import shutil
 import tempfile
 import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from DIRAC import S_OK, S_ERROR, gLogger
+from DIRAC.ConfigurationSystem.Client.Helpers.Operations import Operations
 from DIRAC.WorkloadManagementSystem.Client.JobStateUpdateClient import JobStateUpdateClient
 from DIRAC.Resources.Storage.StorageElement import StorageElement
 from DIRAC.Core.Utilities.Os import getDiskSpace
@@ -29,6 +38,31 @@ def _isCached(lfn, seName):
     return metadata.get("Cached", metadata["Accessible"])
 
 
+def _isCachedMetadata(seMetadata, lfn, seName):
+    """Same as _isCached, from the metadata obtained in bulk"""
+    metadata = seMetadata.get((seName, lfn))
+    if not isinstance(metadata, dict):
+        return False
+    return metadata.get("Cached", metadata["Accessible"])
+
+
+def _replicaError(seMetadata, lfn, seName):
+    """Check that a replica can be downloaded, from the metadata obtained in bulk
+
+    :return: the reason why it can not, or an empty string
+    """
+    metadata = seMetadata.get((seName, lfn), "No metadata for the file")
+    if not isinstance(metadata, dict):
+        return metadata
+    if metadata.get("Lost", False):
+        return "PFN has been Lost by the StorageElement"
+    if metadata.get("Unavailable", False):
+        return "PFN is declared Unavailable by the StorageElement"
+    if not metadata.get("Cached", metadata["Accessible"]):
+        return "PFN is no longer in StorageElement Cache"
+    return ""
+
+
 class DownloadInputData(object):
     """
     retrieve InputData LFN from localSEs (if available) or from elsewhere.
@@ -48,6 +82,16 @@ class DownloadInputData(object):
         self.jobID = None
         self.counter = 1
         self.availableSEs = DMSHelpers().getStorageElements()
+        op = Operations()
+        self.downloadThreads = max(
+            1, int(self.configuration.get("DownloadThreads", op.getValue("InputDataPolicy/DownloadThreads", 4)))
+        )
+        self.downloadRetries = int(
+            self.configuration.get("DownloadRetries", op.getValue("InputDataPolicy/DownloadRetries", 1))
+        )
+        self.retryDelay = float(
+            self.configuration.get("DownloadRetryDelay", op.getValue("InputDataPolicy/DownloadRetryDelay", 10))
+        )
 
     #############################################################################
     def execute(self, dataToResolve=None):
@@ -75,6 +119,9 @@ class DownloadInputData(object):
         # For the case that a file is found on two SEs at the same site
         # disk-based replicas are favoured.
         downloadReplicas = {}
+        # Local replicas on tape, which can only be used if they are cached
+        tapeReplicas = {}
+        seStatuses = {}
 
         for lfn, reps in replicas.items():
             if lfn not in self.inputData:
@@ -98,16 +145,26 @@ class DownloadInputData(object):
             # First get Disk replicas
             localReps = set(reps) & localSESet
             for seName in localReps:
-                seStatus = StorageElement(seName).status()
+                if seName not in seStatuses:
+                    seStatuses[seName] = StorageElement(seName).status()
+                seStatus = seStatuses[seName]
                 if seStatus["DiskSE"] and seStatus["Read"]:
                     downloadReplicas[lfn]["SE"].append(seName)
             # If no disk replicas, take tape replicas
             if not downloadReplicas[lfn]["SE"]:
-                for seName in localReps:
-                    seStatus = StorageElement(seName).status()
-                    if seStatus["TapeSE"] and seStatus["Read"] and _isCached(lfn, seName):
-                        # Only consider replicas that are cached
-                        downloadReplicas[lfn]["SE"].append(seName)
+                tapeReplicas[lfn] = [
+                    seName for seName in localReps if seStatuses[seName]["TapeSE"] and seStatuses[seName]["Read"]
+                ]
+
+        # The metadata of the local replicas are obtained with one call per SE
+        lfnsPerSE = {}
+        for lfn, info in downloadReplicas.items():
+            for seName in info["SE"] + tapeReplicas.get(lfn, []):
+                lfnsPerSE.setdefault(seName, []).append(lfn)
+        seMetadata = self.__getReplicasMetadata(lfnsPerSE)
+        for lfn, seNames in tapeReplicas.items():
+            # Only consider replicas that are cached
+            downloadReplicas[lfn]["SE"] = [seName for seName in seNames if _isCachedMetadata(seMetadata, lfn, seName)]
 
         totalSize = 0
         verbose = self.log.verbose("Replicas to download are:")
@@ -152,54 +209,26 @@ class DownloadInputData(object):
 
         resolvedData = {}
         localSECount = 0
-        for lfn, info in downloadReplicas.items():
-            seName = info["SE"]
-            guid = info["GUID"]
-            reps = replicas.get(lfn, {})
-            if seName:
-                result = returnSingleResult(StorageElement(seName).getFileMetadata(lfn))
+        downloadedSize = 0
+        startTime = time.time()
+        self.log.info("Downloading %d files with %d threads" % (len(downloadReplicas), self.downloadThreads))
+        with ThreadPoolExecutor(max_workers=self.downloadThreads) as executor:
+            futures = {
+                executor.submit(self._downloadFile, lfn, info, replicas.get(lfn, {}), seMetadata): lfn
+                for lfn, info in downloadReplicas.items()
+            }
+            for future in as_completed(futures):
+                lfn = futures[future]
+                try:
+                    result, fromLocalSE = future.result()
+                except Exception as e:  # pylint: disable=broad-except
+                    self.log.exception("Exception while downloading", lfn, lException=e)
+                    result, fromLocalSE = S_ERROR(repr(e)), False
                 if not result["OK"]:
-                    self.log.error("Error getting metadata", result["Message"])
-                    error = result["Message"]
-                else:
-                    metadata = result["Value"]
-                    if metadata.get("Lost", False):
-                        error = "PFN has been Lost by the StorageElement"
-                    elif metadata.get("Unavailable", False):
-                        error = "PFN is declared Unavailable by the StorageElement"
-                    elif not metadata.get("Cached", metadata["Accessible"]):
-                        error = "PFN is no longer in StorageElement Cache"
-                    else:
-                        error = ""
-                if error:
-                    self.log.error(error, lfn)
-                    result = {"OK": False}
-                else:
-                    self.log.info("Preliminary checks OK", "download %s from %s:" % (lfn, seName))
-                    result = self._downloadFromSE(lfn, seName, reps, guid)
-                    if not result["OK"]:
-                        self.log.error(
-                            "Download failed", "Tried downloading from SE %s: %s" % (seName, result["Message"])
-                        )
-            else:
-                result = {"OK": False}
-
-            if not result["OK"]:
-                reps.pop(seName, None)
-                # Check the other SEs
-                if reps:
-                    self.log.info("Trying to download from any SE")
-                    result = self._downloadFromBestSE(lfn, reps, guid)
-                    if not result["OK"]:
-                        self.log.error(
-                            "Download from best SE failed", "Tried downloading %s: %s" % (lfn, result["Message"])
-                        )
-                        failedReplicas.add(lfn)
-                else:
                     failedReplicas.add(lfn)
-            else:
-                localSECount += 1
-            if result["OK"]:
+                    continue
+                if fromLocalSE:
+                    localSECount += 1
                 # Rename file if downloaded FileName does not match the LFN... How can this happen?
                 lfnName = os.path.basename(lfn)
                 oldPath = result["Value"]["path"]
@@ -209,6 +238,14 @@ class DownloadInputData(object):
                     os.rename(oldPath, newPath)
                     result["Value"]["path"] = newPath
                 resolvedData[lfn] = result["Value"]
+                downloadedSize += int(downloadReplicas[lfn].get("Size", 0))
+                self.log.info(
+                    "Download progress",
+                    "%d/%d files, %d/%d bytes" % (len(resolvedData), len(downloadReplicas), downloadedSize, totalSize),
+                )
+        # In the order of the LFNs
+        resolvedData = {lfn: resolvedData[lfn] for lfn in downloadReplicas if lfn in resolvedData}
+        downloadTime = time.time() - startTime
 
         # Report datasets that could not be downloaded
         report = ""
@@ -219,6 +256,12 @@ class DownloadInputData(object):
             else:
                 report += " from local SEs:\n"
             report += "\n".join(sorted(resolvedData))
+            report += "\n%d bytes in %.1f s (%.2f MB/s) with %d threads" % (
+                downloadedSize,
+                downloadTime,
+                downloadedSize / max(downloadTime, 1e-3) / (1024 * 1024),
+                self.downloadThreads,
+            )
         failedReplicas = sorted(failedReplicas.difference(resolvedData))
         if failedReplicas:
             self.log.warn("The following LFN(s) could not be downloaded to the WN:\n%s" % "n".join(failedReplicas))
@@ -230,6 +273,73 @@ class DownloadInputData(object):
 
         return S_OK({"Successful": resolvedData, "Failed": failedReplicas})
 
+    #############################################################################
+    def __getReplicasMetadata(self, lfnsPerSE):
+        """Get the metadata of replicas, with one bulk call per SE
+
+        :param dict lfnsPerSE: { seName : list of LFNs }
+        :return: { (seName, lfn) : metadata dictionary, or error message }
+        """
+        seMetadata = {}
+        for seName, lfns in lfnsPerSE.items():
+            result = StorageElement(seName).getFileMetadata(lfns)
+            if not result["OK"]:
+                self.log.error("Error getting metadata", "from %s: %s" % (seName, result["Message"]))
+                seMetadata.update(((seName, lfn), result["Message"]) for lfn in lfns)
+                continue
+            for lfn in lfns:
+                if lfn in result["Value"]["Successful"]:
+                    seMetadata[(seName, lfn)] = result["Value"]["Successful"][lfn]
+                else:
+                    seMetadata[(seName, lfn)] = result["Value"]["Failed"].get(lfn, "No metadata for the file")
+        return seMetadata
+
+    def _downloadFile(self, lfn, info, reps, seMetadata):
+        """Download a file from its selected local SE, or else from any of its replicas.
+        If it fails, it is tried again up to downloadRetries times.
+
+        :param str lfn: LFN
+        :param dict info: selected local SE, size and GUID of the file
+        :param dict reps: { seName : pfn } of all the replicas of the file
+        :param dict seMetadata: metadata of the local replicas, as returned by __getReplicasMetadata
+
+        :return: (S_OK(fileDict)/S_ERROR, True if downloaded from the selected local SE)
+        """
+        seName = info["SE"]
+        guid = info["GUID"]
+        size = info.get("Size")
+        otherReps = {otherSE: pfn for otherSE, pfn in reps.items() if otherSE != seName}
+        result = S_ERROR("No replica to download from")
+        if seName:
+            # The metadata do not change between the attempts: a replica which fails the checks is not tried again
+            error = _replicaError(seMetadata, lfn, seName)
+            if error:
+                self.log.error(error, lfn)
+                result = S_ERROR(error)
+                seName = ""
+        if not seName and not otherReps:
+            return result, False
+
+        for attempt in range(self.downloadRetries + 1):
+            if attempt:
+                time.sleep(self.retryDelay * attempt)
+                self.log.info("Retrying the download", "of %s (attempt %d)" % (lfn, attempt + 1))
+            if seName:
+                self.log.info("Preliminary checks OK", "download %s from %s:" % (lfn, seName))
+                result = self._downloadFromSE(lfn, seName, reps, guid, size=size)
+                if result["OK"]:
+                    return result, True
+                self.log.error("Download failed", "Tried downloading from SE %s: %s" % (seName, result["Message"]))
+
+            # Check the other SEs
+            if otherReps:
+                self.log.info("Trying to download from any SE")
+                result = self._downloadFromBestSE(lfn, otherReps, guid, size=size)
+                if result["OK"]:
+                    return result, False
+                self.log.error("Download from best SE failed", "Tried downloading %s: %s" % (lfn, result["Message"]))
+        return result, False
+
     #############################################################################
     def __checkDiskSpace(self, totalSize):
         """Compare available disk space to the file size reported from the catalog
@@ -265,7 +375,7 @@ class DownloadInputData(object):
             return self.inputDataDirectory
 
     #############################################################################
-    def _downloadFromBestSE(self, lfn, reps, guid):
+    def _downloadFromBestSE(self, lfn, reps, guid, size=None):
         """Download a local copy of a single LFN from a list of Storage Elements.
         This is used as a last resort to attempt to retrieve the file.
         """
@@ -284,7 +394,7 @@ class DownloadInputData(object):
         for seName in list(diskSEs) + list(tapeSEs):
             if seName in diskSEs or _isCached(lfn, seName):
                 # On disk or cached from tape
-                result = self._downloadFromSE(lfn, seName, reps, guid)
+                result = self._downloadFromSE(lfn, seName, reps, guid, size=size)
                 if result["OK"]:
                     return result
                 else:
@@ -295,8 +405,11 @@ class DownloadInputData(object):
         return S_ERROR("Unable to download the file from any SE")
 
     #############################################################################
-    def _downloadFromSE(self, lfn, seName, reps, guid):
-        """Download a local copy from the specified Storage Element."""
+    def _downloadFromSE(self, lfn, seName, reps, guid, size=None):
+        """Download a local copy from the specified Storage Element.
+        If the size is given, a local copy of another size is not used. If it is in the download directory,
+        where it was left by an interrupted download, it is downloaded again.
+        """
         if not lfn:
             return S_ERROR("LFN not specified: assume file is not at this site")
 
@@ -304,8 +417,20 @@ class DownloadInputData(object):
 
         downloadDir = self.__getDownloadDir()
         fileName = os.path.basename(lfn)
-        for localFile in (os.path.join(os.getcwd(), fileName), os.path.join(downloadDir, fileName)):
+        cwdFile = os.path.join(os.getcwd(), fileName)
+        keptFiles = set()
+        for localFile in (cwdFile, os.path.join(downloadDir, fileName)):
             if os.path.exists(localFile):
+                if size is not None and os.path.getsize(localFile) != int(size):
+                    # The working directory may hold a file of the same name, e.g. from the input sandbox,
+                    # and a per file download directory is new
+                    if localFile == cwdFile or self.inputDataDirectory == "PerFile":
+                        self.log.warn("Local file does not have the size of the LFN, not using it", localFile)
+                        keptFiles.add(localFile)
+                    else:
+                        self.log.info("Incomplete local copy, downloading it again", localFile)
+                        os.remove(localFile)
+                    continue
                 self.log.info("File already exists locally", "%s as %s" % (fileName, localFile))
                 fileDict = {
                     "turl": "LocalData",
@@ -318,13 +443,26 @@ class DownloadInputData(object):
                 return S_OK(fileDict)
 
         localFile = os.path.join(downloadDir, fileName)
-        result = returnSingleResult(StorageElement(seName).getFile(lfn, localPath=downloadDir))
+        getDir = downloadDir
+        if localFile in keptFiles:
+            # Download next to the file of the working directory, which is only replaced on success
+            getDir = tempfile.mkdtemp(prefix="InputData_", dir=downloadDir)
+        result = returnSingleResult(StorageElement(seName).getFile(lfn, localPath=getDir))
         if not result["OK"]:
             self.log.warn("Problem getting lfn", "%s from %s:\n%s" % (lfn, seName, result["Message"]))
-            self.__cleanFailedFile(lfn, downloadDir)
+            self.__cleanFailedFile(lfn, getDir)
+            if getDir != downloadDir:
+                shutil.rmtree(getDir, ignore_errors=True)
             return result
 
-        if os.path.exists(localFile):
+        downloadedFile = os.path.join(getDir, fileName)
+        fileDownloaded = os.path.exists(downloadedFile)
+        if getDir != downloadDir:
+            if fileDownloaded:
+                os.replace(downloadedFile, localFile)
+            shutil.rmtree(getDir, ignore_errors=True)
+
+        if fileDownloaded:
             self.log.verbose("File successfully downloaded locally", "(%s to %s)" % (lfn, localFile))
             fileDict = {
                 "turl": "Downloaded",
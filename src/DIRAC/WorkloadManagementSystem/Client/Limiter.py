@@ -2,6 +2,8 @@
 
     Utilities and classes here are used by the Matcher
 """
+import threading
+
 from DIRAC import S_OK, S_ERROR
 from DIRAC import gLogger
 
@@ -10,6 +12,7 @@ from DIRAC.Core.Utilities.DErrno import cmpError, ESECTION
 from DIRAC.ConfigurationSystem.Client.Helpers.Operations import Operations
 from DIRAC.WorkloadManagementSystem.DB.JobDB import JobDB
 from DIRAC.WorkloadManagementSystem.Client import JobStatus
+from DIRAC.WorkloadManagementSystem.Utilities.RunningJobsSnapshot import RunningJobsSnapshot
 
 
 class Limiter:
@@ -18,6 +21,9 @@ class Limiter:
     csDictCache = DictCache()
     condCache = DictCache()
     delayMem = {}
+    # Running jobs refreshed in the background, if JobScheduling/RunningLimitRefreshInterval is set
+    runningSnapshot = None
+    __snapshotLock = threading.Lock()
 
     def __init__(self, jobDB=None, opsHelper=None, pilotRef=None):
         """Constructor"""
@@ -178,19 +184,10 @@ class Limiter:
             if attName not in self.jobDB.jobAttributeNames:
                 self.log.error("Attribute does not exist", "(%s). Check the job limits" % attName)
                 continue
-            cK = "Running:%s:%s" % (siteName, attName)
-            data = self.condCache.get(cK)
-            if not data:
-                result = self.jobDB.getCounters(
-                    "Jobs",
-                    [attName],
-                    {"Site": siteName, "Status": [JobStatus.RUNNING, JobStatus.MATCHED, JobStatus.STALLED]},
-                )
-                if not result["OK"]:
-                    return result
-                data = result["Value"]
-                data = dict([(k[0][attName], k[1]) for k in data])
-                self.condCache.add(cK, 10, data)
+            result = self.__getRunningJobs(siteName, attName)
+            if not result["OK"]:
+                return result
+            data = result["Value"]
             for attValue in limitsDict[attName]:
                 limit = limitsDict[attName][attValue]
                 running = data.get(attValue, 0)
@@ -205,6 +202,45 @@ class Limiter:
         # negCond is something like : {'JobType': ['Merge']}
         return S_OK(negCond)
 
+    def __getRunningJobs(self, siteName, attName):
+        """Get the number of running jobs at a site per value of a job attribute,
+        from the background snapshot if enabled, or from a short lived cache
+        """
+        refreshInterval = self.__opsHelper.getValue("JobScheduling/RunningLimitRefreshInterval", 0)
+        if refreshInterval > 0:
+            maxAge = self.__opsHelper.getValue("JobScheduling/RunningLimitMaxAge", 300)
+            snapshot = self.getRunningSnapshot(create=True)
+            snapshot.setParameters(refreshInterval, maxAge)
+            return snapshot.get(siteName, attName)
+
+        cK = "Running:%s:%s" % (siteName, attName)
+        data = self.condCache.get(cK)
+        if not data:
+            result = self.jobDB.getCounters(
+                "Jobs",
+                [attName],
+                {"Site": siteName, "Status": [JobStatus.RUNNING, JobStatus.MATCHED, JobStatus.STALLED]},
+            )
+            if not result["OK"]:
+                return result
+            data = result["Value"]
+            data = dict([(k[0][attName], k[1]) for k in data])
+            self.condCache.add(cK, 10, data)
+        return S_OK(data)
+
+    def getRunningSnapshot(self, create=False):
+        """Get the snapshot of the running jobs shared by all the instances
+
+        :param bool create: create the snapshot if it does not exist yet
+
+        :return: RunningJobsSnapshot object or None
+        """
+        if Limiter.runningSnapshot is None and create:
+            with Limiter.__snapshotLock:
+                if Limiter.runningSnapshot is None:
+                    Limiter.runningSnapshot = RunningJobsSnapshot(self.jobDB)
+        return Limiter.runningSnapshot
+
     def updateDelayCounters(self, siteName, jid):
         # Get the info from the CS
         siteSection = "%s/%s" % (self.__matchingDelaySection, siteName)
@@ -147,6 +147,81 @@ class Matcher:
 
         return resultDict
 
+    def selectJobs(self, resourceDescription, credDict, numJobs):
+        """Bulk version of selectJob: find up to numJobs jobs matching the resource capacity.
+        The negative conditions and the task queues are evaluated once for all the jobs,
+        and the status and pilot updates are done in bulk.
+
+        :return: list of dictionaries, one per matched job, as returned by selectJob
+        """
+
+        startTime = time.time()
+
+        resourceDict = self._getResourceDict(resourceDescription, credDict)
+        self.log.info("Resource description for matching %d jobs" % numJobs, printDict(resourceDict))
+
+        negativeCond = self.limiter.getNegativeCondForSite(resourceDict["Site"], resourceDict.get("GridCE"))
+        result = self.tqDB.matchAndGetJobs(resourceDict, numJobs, negativeCond=negativeCond)
+        if not result["OK"]:
+            raise RuntimeError(result["Message"])
+        result = result["Value"]
+        if not result["matchFound"]:
+            self.log.info("No match found")
+            return []
+
+        jobIDs = [jobID for jobID, _tqID in result["jobs"]]
+        resAtt = self.jobDB.getJobsAttributes(jobIDs, ["OwnerDN", "OwnerGroup", "Status"])
+        if not resAtt["OK"]:
+            raise RuntimeError("Could not retrieve job attributes")
+        jobsAttributes = resAtt["Value"]
+        waitingJobIDs = []
+        for jobID in jobIDs:
+            if jobID not in jobsAttributes:
+                self.log.error("No attributes returned for job", str(jobID))
+            elif jobsAttributes[jobID]["Status"] != JobStatus.WAITING:
+                self.log.error("Job matched by the TQ is not in Waiting state", str(jobID))
+            else:
+                waitingJobIDs.append(jobID)
+                continue
+            result = self.tqDB.deleteJob(jobID)
+            if not result["OK"]:
+                self.log.error("Could not delete job from the TQ", "%s: %s" % (jobID, result["Message"]))
+        if not waitingJobIDs:
+            raise RuntimeError("Jobs %s are not in Waiting state" % ",".join(str(jobID) for jobID in jobIDs))
+
+        self._reportStatus(resourceDict, waitingJobIDs)
+
+        checkMatchingDelay = self.opsHelper.getValue("JobScheduling/CheckMatchingDelay", True)
+        resultList = []
+        for jobID in waitingJobIDs:
+            result = self.jobDB.getJobJDL(jobID)
+            if not result["OK"]:
+                self.log.error("Failed to get the job JDL", "%s: %s" % (jobID, result["Message"]))
+                continue
+            resultDict = {"JDL": result["Value"], "JobID": jobID}
+            # Get some extra stuff into the response returned
+            resOpt = self.jobDB.getJobOptParameters(jobID)
+            if resOpt["OK"]:
+                for key, value in resOpt["Value"].items():
+                    resultDict[key] = value
+            resultDict["DN"] = jobsAttributes[jobID]["OwnerDN"]
+            resultDict["Group"] = jobsAttributes[jobID]["OwnerGroup"]
+            resultDict["PilotInfoReportedFlag"] = True
+            resultList.append(resultDict)
+
+            if checkMatchingDelay:
+                self.limiter.updateDelayCounters(resourceDict["Site"], jobID)
+
+        pilotInfoReportedFlag = resourceDict.get("PilotInfoReportedFlag", False)
+        if not pilotInfoReportedFlag:
+            self._updatePilotInfo(resourceDict)
+        self._updatePilotJobMapping(resourceDict, waitingJobIDs)
+
+        matchTime = time.time() - startTime
+        self.log.verbose("Match time for %d jobs" % len(resultList), "[%s]" % str(matchTime))
+
+        return resultList
+
     def _getResourceDict(self, resourceDescription, credDict):
         """from resourceDescription to resourceDict (just various mods)"""
         resourceDict = self._processResourceDescription(resourceDescription)
@@ -243,7 +318,7 @@ class Matcher:
         return resourceDict
 
     def _reportStatus(self, resourceDict, jobID):
-        """Reports the status of the matched job in jobDB and jobLoggingDB
+        """Reports the status of the matched job(s) in jobDB and jobLoggingDB
 
         Do not fail if errors happen here
         """
@@ -307,20 +382,21 @@ class Matcher:
                 )
 
     def _updatePilotJobMapping(self, resourceDict, jobID):
-        """Update pilot to job mapping information"""
+        """Update pilot to job mapping information, for one job or a list of jobs"""
         pilotReference = resourceDict.get("PilotReference", "")
         if pilotReference and pilotReference != "Unknown":
-            result = self.pilotAgentsDB.setCurrentJobID(pilotReference, jobID)
+            jobIDs = jobID if isinstance(jobID, list) else [jobID]
+            result = self.pilotAgentsDB.setCurrentJobID(pilotReference, jobIDs[-1])
             if not result["OK"]:
                 self.log.error(
                     "Problem updating pilot information",
                     ";setCurrentJobID. pilotReference: %s; %s" % (pilotReference, result["Message"]),
                 )
-            result = self.pilotAgentsDB.setJobForPilot(jobID, pilotReference, updateStatus=False)
+            result = self.pilotAgentsDB.setJobsForPilot(jobIDs, pilotReference, updateStatus=False)
             if not result["OK"]:
                 self.log.error(
                     "Problem updating pilot information",
-                    "; setJobForPilot. pilotReference: %s; %s" % (pilotReference, result["Message"]),
+                    "; setJobsForPilot. pilotReference: %s; %s" % (pilotReference, result["Message"]),
                 )
 
     def _checkCredentials(self, resourceDict, credDict):
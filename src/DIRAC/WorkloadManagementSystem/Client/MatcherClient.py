@@ -32,6 +32,18 @@ class MatcherClient(Client):
             res["Value"] = strToIntDict(res["Value"])
         return res
 
+    @ignoreEncodeWarning
+    def getMatchingTaskQueuesBulk(self, resourceDicts):
+        """Return the task queues that match each of the resourceDicts, given as { name : resourceDict }"""
+        res = self._getRPC().getMatchingTaskQueuesBulk(resourceDicts)
+
+        if res["OK"]:
+            # Cast the string back to int
+            res["Value"]["Successful"] = {
+                name: strToIntDict(taskQueues) for name, taskQueues in res["Value"]["Successful"].items()
+            }
+        return res
+
     @ignoreEncodeWarning
     def getActiveTaskQueues(self):
         """Return all active task queues"""
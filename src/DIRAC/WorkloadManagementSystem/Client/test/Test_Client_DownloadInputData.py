@@ -1,6 +1,8 @@
 """Test for WMS clients."""
 # pylint: disable=protected-access, missing-docstring, invalid-name
 
+import os
+
 import pytest
 
 from mock import MagicMock
@@ -41,7 +43,7 @@ def dli():
     theDLI = DownloadInputData(
         {
             "InputData": [],
-            "Configuration": {"LocalSEList": ["SE_Local"]},
+            "Configuration": {"LocalSEList": ["SE_Local"], "DownloadRetryDelay": 0},
             "InputDataDirectory": "CWD",
             "FileCatalog": S_OK(
                 {
@@ -244,7 +246,7 @@ def test_DLI_execute_NoLocal(dli, mockSE):
     dli = DownloadInputData(
         {
             "InputData": [],
-            "Configuration": {"LocalSEList": ["SE_Local", "SE_Tape"]},
+            "Configuration": {"LocalSEList": ["SE_Local", "SE_Tape"], "DownloadRetryDelay": 0},
             "InputDataDirectory": "CWD",
             "FileCatalog": S_OK(
                 {
@@ -272,3 +274,147 @@ def test_DLI_execute_NoLocal(dli, mockSE):
     assert res["Value"]["Failed"]
     assert "/a/lfn/1.txt" in res["Value"]["Failed"], res
     assert res["Value"]["Failed"][0] == "/a/lfn/1.txt", res
+
+
+def test_DLIDownloadFromSE_incomplete(dli, mockSE, mocker, tmp_path):
+    """A copy of the wrong size in the download directory is downloaded again"""
+    mocker.patch("%s.os.getcwd" % MODULE_NAME, return_value=str(tmp_path))
+    downloadDir = tmp_path / "download"
+    downloadDir.mkdir()
+    (downloadDir / "1.txt").write_text("partial")
+    dli.inputDataDirectory = str(downloadDir)
+
+    def getFile(lfn, localPath):
+        # The incomplete copy was removed before the download
+        assert not (downloadDir / "1.txt").exists()
+        (downloadDir / "1.txt").write_text("0123456789")
+        return S_OK({"Successful": {lfn: 10}, "Failed": {}})
+
+    mockSE.return_value.getFile.side_effect = getFile
+    res = dli._downloadFromSE("/a/lfn/1.txt", "mySE", {"mySE": []}, "aGuid", size=10)
+    assert res["OK"], res
+    assert res["Value"]["protocol"] == "Downloaded"
+    assert res["Value"]["path"] == str(downloadDir / "1.txt")
+
+    # Complete now, so it is not downloaded again
+    res = dli._downloadFromSE("/a/lfn/1.txt", "mySE", {"mySE": []}, "aGuid", size=10)
+    assert res["OK"], res
+    assert res["Value"]["protocol"] == "LocalData"
+    assert mockSE.return_value.getFile.call_count == 1
+
+
+def test_DLIDownloadFromSE_perFileSandboxFile(dli, mockSE, mocker, tmp_path):
+    """A file of the same name in the working directory is neither used nor removed"""
+    mocker.patch("%s.os.getcwd" % MODULE_NAME, return_value=str(tmp_path))
+    (tmp_path / "1.txt").write_text("from the sandbox")
+    dli.inputDataDirectory = "PerFile"
+
+    def getFile(lfn, localPath):
+        with open(os.path.join(localPath, "1.txt"), "w") as localFile:
+            localFile.write("0123456789")
+        return S_OK({"Successful": {lfn: 10}, "Failed": {}})
+
+    mockSE.return_value.getFile.side_effect = getFile
+    res = dli._downloadFromSE("/a/lfn/1.txt", "mySE", {"mySE": []}, "aGuid", size=10)
+    assert res["OK"], res
+    assert res["Value"]["protocol"] == "Downloaded"
+    assert os.path.dirname(res["Value"]["path"]) != str(tmp_path)
+    assert (tmp_path / "1.txt").read_text() == "from the sandbox"
+
+
+def test_DLIDownloadFromSE_cwdSandboxFile(dli, mockSE, mocker, tmp_path):
+    """In the working directory, a file of the same name is only replaced by a successful download"""
+    mocker.patch("%s.os.getcwd" % MODULE_NAME, return_value=str(tmp_path))
+    (tmp_path / "1.txt").write_text("from the sandbox")
+    assert dli.inputDataDirectory == "CWD"
+
+    def getFile(lfn, localPath):
+        assert localPath != str(tmp_path)
+        with open(os.path.join(localPath, "1.txt"), "w") as localFile:
+            localFile.write("01234")
+        return S_ERROR("Interrupted download")
+
+    mockSE.return_value.getFile.side_effect = getFile
+    res = dli._downloadFromSE("/a/lfn/1.txt", "mySE", {"mySE": []}, "aGuid", size=10)
+    assert not res["OK"], res
+    assert (tmp_path / "1.txt").read_text() == "from the sandbox"
+    assert os.listdir(tmp_path) == ["1.txt"]
+
+    # Nothing downloaded, but successful
+    mockSE.return_value.getFile.side_effect = None
+    res = dli._downloadFromSE("/a/lfn/1.txt", "mySE", {"mySE": []}, "aGuid", size=10)
+    assert not res["OK"], res
+    assert (tmp_path / "1.txt").read_text() == "from the sandbox"
+    assert os.listdir(tmp_path) == ["1.txt"]
+
+    def getFile(lfn, localPath):
+        assert localPath != str(tmp_path)
+        with open(os.path.join(localPath, "1.txt"), "w") as localFile:
+            localFile.write("0123456789")
+        return S_OK({"Successful": {lfn: 10}, "Failed": {}})
+
+    mockSE.return_value.getFile.side_effect = getFile
+    res = dli._downloadFromSE("/a/lfn/1.txt", "mySE", {"mySE": []}, "aGuid", size=10)
+    assert res["OK"], res
+    assert res["Value"]["protocol"] == "Downloaded"
+    assert res["Value"]["path"] == str(tmp_path / "1.txt")
+    assert (tmp_path / "1.txt").read_text() == "0123456789"
+    assert os.listdir(tmp_path) == ["1.txt"]
+
+
+def test_DLI_execute_concurrent(dli, mockSE):
+    """Several files downloaded in parallel, with a failover to another SE and a retry"""
+    lfns = ["/a/lfn/%d.txt" % index for index in range(20)]
+    dli.fileCatalogResult = S_OK(
+        {"Successful": {lfn: {"Size": 10, "GUID": "aGUID", "SE_Local": "", "SE_Remote": ""} for lfn in lfns}}
+    )
+    mockObjectSE = mockSE.return_value
+    mockObjectSE.getFileMetadata.return_value = S_OK(
+        {"Successful": {lfn: {"Cached": 1, "Accessible": 1} for lfn in lfns}, "Failed": {}}
+    )
+    dli.downloadThreads = 4
+    dli.downloadRetries = 1
+    attempts = {}
+
+    def downloadFromSE(lfn, seName, reps, guid, size=None):
+        attempts[lfn] = attempts.get(lfn, 0) + 1
+        # 1.txt is only found at the remote SE, 2.txt only at the second attempt
+        if (lfn == "/a/lfn/1.txt" and seName == "SE_Local") or (lfn == "/a/lfn/2.txt" and attempts[lfn] < 3):
+            return S_ERROR("Failed to down")
+        return S_OK({"path": "/local/path/%s" % lfn.split("/")[-1]})
+
+    dli._downloadFromSE = MagicMock(side_effect=downloadFromSE)
+    res = dli.execute(dataToResolve=lfns)
+    assert res["OK"], res
+    assert not res["Value"]["Failed"]
+    assert list(res["Value"]["Successful"]) == lfns
+    assert attempts["/a/lfn/1.txt"] == 2
+    assert attempts["/a/lfn/2.txt"] == 3
+    # Only one bulk metadata call per SE
+    assert mockObjectSE.getFileMetadata.call_count == 1
+    # The status of the local SE is obtained once for all the files, then once per failover to the remote SE
+    assert mockObjectSE.status.call_count == 1 + 2
+
+
+def test_DLI_downloadFile_noRetryOfLostReplica(dli, mockSE):
+    """A replica failing the metadata checks is neither downloaded nor retried"""
+    dli.downloadRetries = 2
+    dli.retryDelay = 60
+    dli._downloadFromSE = MagicMock(return_value=S_OK({"path": "/local/path/1.txt"}))
+    dli._downloadFromBestSE = MagicMock(return_value=S_ERROR("Failed to down"))
+    info = {"SE": "SE_Local", "GUID": "aGUID", "Size": 10}
+    seMetadata = {("SE_Local", "/a/lfn/1.txt"): {"Lost": 1, "Cached": 1, "Accessible": 1}}
+
+    result, fromLocalSE = dli._downloadFile("/a/lfn/1.txt", info, {"SE_Local": ""}, seMetadata)
+    assert not result["OK"]
+    assert "Lost" in result["Message"]
+    assert not fromLocalSE
+    dli._downloadFromSE.assert_not_called()
+
+    # Only the other replicas are retried
+    dli.retryDelay = 0
+    result, fromLocalSE = dli._downloadFile("/a/lfn/1.txt", info, {"SE_Local": "", "SE_Remote": ""}, seMetadata)
+    assert not result["OK"]
+    dli._downloadFromSE.assert_not_called()
+    assert dli._downloadFromBestSE.call_count == 3
+    assert dli._downloadFromBestSE.call_args[0][1] == {"SE_Remote": ""}
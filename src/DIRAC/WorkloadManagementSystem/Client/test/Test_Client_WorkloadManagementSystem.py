@@ -8,7 +8,7 @@ from io import BytesIO
 import pytest
 from mock import MagicMock
 
-from DIRAC import gLogger
+from DIRAC import gLogger, S_OK
 
 gLogger.setLevel("DEBUG")
 
@@ -83,6 +83,40 @@ def test__processResourceDescription(setUp):
     assert res == resExpected
 
 
+def test_selectJobs(mocker):
+
+    resourceDict = {"Site": "DIRAC.Jenkins.ch", "PilotReference": "somePilotReference", "PilotInfoReportedFlag": True}
+    mocker.patch.object(matcher, "_getResourceDict", return_value=resourceDict)
+    mocker.patch.object(matcher.limiter, "getNegativeCondForSite", return_value={})
+    opsHelperMock.getValue.return_value = False
+    tqDBMock.matchAndGetJobs.return_value = S_OK(
+        {"matchFound": True, "jobs": [(1, 10), (2, 10), (3, 11)], "tqMatch": resourceDict}
+    )
+    jobDBMock.getJobsAttributes.return_value = S_OK(
+        {
+            1: {"OwnerDN": "/my/DN", "OwnerGroup": "myGroup", "Status": "Waiting"},
+            2: {"OwnerDN": "/my/DN", "OwnerGroup": "myGroup", "Status": "Running"},
+            3: {"OwnerDN": "/other/DN", "OwnerGroup": "otherGroup", "Status": "Waiting"},
+        }
+    )
+    jobDBMock.getJobJDL.return_value = S_OK("[Executable = 'a.sh';]")
+    jobDBMock.getJobOptParameters.return_value = S_OK({})
+
+    res = matcher.selectJobs({}, {}, 3)
+
+    assert [resDict["JobID"] for resDict in res] == [1, 3]
+    assert [resDict["DN"] for resDict in res] == ["/my/DN", "/other/DN"]
+    tqDBMock.matchAndGetJobs.assert_called_once_with(resourceDict, 3, negativeCond={})
+    tqDBMock.deleteJob.assert_called_once_with(2)
+    jobDBMock.setJobAttributes.assert_called_once_with(
+        [1, 3],
+        ["Status", "MinorStatus", "ApplicationStatus", "Site"],
+        ["Matched", "Assigned", "Unknown", "DIRAC.Jenkins.ch"],
+    )
+    pilotAgentsDBMock.setCurrentJobID.assert_called_once_with("somePilotReference", 3)
+    pilotAgentsDBMock.setJobsForPilot.assert_called_once_with([1, 3], "somePilotReference", updateStatus=False)
+
+
 def test_uploadFilesAsSandbox(mocker, setUp):
 
     mocker.patch("DIRAC.WorkloadManagementSystem.Client.SandboxStoreClient.TransferClient", return_value=MagicMock())
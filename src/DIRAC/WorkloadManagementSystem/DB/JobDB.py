@@ -25,6 +25,7 @@ from DIRAC.Core.Utilities import DErrno
 from DIRAC.Core.Utilities.ClassAd.ClassAdLight import ClassAd
 from DIRAC.Core.Utilities.ReturnValues import S_OK, S_ERROR
 from DIRAC.Core.Utilities.DErrno import EWMSSUBM, EWMSJMAN
+from DIRAC.Core.Utilities.List import breakListIntoChunks, intListToString
 from DIRAC.Core.Utilities.ObjectLoader import ObjectLoader
 from DIRAC.ResourceStatusSystem.Client.SiteStatus import SiteStatus
 from DIRAC.WorkloadManagementSystem.Client.JobState.JobManifest import JobManifest
@@ -1918,6 +1919,75 @@ class JobDB(DB):
 
         return S_OK() if ok else S_ERROR("Failed to store some or all the parameters")
 
+    #####################################################################################
+    def setHeartBeatDataBulk(self, heartBeats, chunkSize=1000):
+        """Add the heart beat data of several jobs to the database, with one UPDATE of the Jobs table
+        and one INSERT into the HeartBeatLoggingInfo table per chunk of jobs.
+        It does the same as setHeartBeatData, but the times are given instead of using UTC_TIMESTAMP().
+
+        :param dict heartBeats: { jobID: (heartBeatTime, receptionTime, setRunning, dynamicDataDict) }
+                                heartBeatTime is the value of HeartBeatTime, receptionTime is the time of the
+                                heart beat data, and setRunning tells whether the Status is set to Running
+        :param int chunkSize: maximum number of jobs per query
+
+        :return: S_OK/S_ERROR
+        """
+        ok = True
+        for jobIDs in breakListIntoChunks(sorted(heartBeats), chunkSize):
+            # Escape all the values at once: heart beat time, reception time, then the names and values
+            rawValues = []
+            for jobID in jobIDs:
+                heartBeatTime, receptionTime, _setRunning, dynamicDataDict = heartBeats[jobID]
+                rawValues += [str(heartBeatTime), str(receptionTime)]
+                for key, value in dynamicDataDict.items():
+                    rawValues += [str(key), str(value)]
+            result = self._escapeValues(rawValues)
+            if not result["OK"]:
+                return result
+            escapedValues = iter(result["Value"])
+
+            timeCases = []
+            runningJobIDs = []
+            valueList = []
+            for jobID in jobIDs:
+                _heartBeatTime, _receptionTime, setRunning, dynamicDataDict = heartBeats[jobID]
+                e_heartBeatTime = next(escapedValues)
+                e_receptionTime = next(escapedValues)
+                timeCases.append(f"WHEN {int(jobID)} THEN {e_heartBeatTime}")
+                if setRunning:
+                    runningJobIDs.append(int(jobID))
+                for _ in range(len(dynamicDataDict)):
+                    e_key = next(escapedValues)
+                    e_value = next(escapedValues)
+                    valueList.append(f"( {int(jobID)}, {e_key}, {e_value}, {e_receptionTime})")
+
+            req = f"UPDATE Jobs SET HeartBeatTime = CASE JobID {' '.join(timeCases)} END"
+            if runningJobIDs:
+                # The heart beats may be written some time after they were received: a job which has reached
+                # a final status in the meantime must not be set back to Running
+                req += ", Status = CASE WHEN JobID IN (%s) AND Status IN ('%s','%s','%s') THEN '%s' ELSE Status END" % (
+                    intListToString(runningJobIDs),
+                    JobStatus.MATCHED,
+                    JobStatus.STALLED,
+                    JobStatus.RUNNING,
+                    JobStatus.RUNNING,
+                )
+            req += f" WHERE JobID IN ({intListToString(jobIDs)})"
+            result = self._update(req)
+            if not result["OK"]:
+                return S_ERROR(f"Failed to set the heart beat time: {result['Message']}")
+
+            if valueList:
+                # A job may have been removed since its heart beat was received: ignore it rather than failing all
+                req = "INSERT IGNORE INTO HeartBeatLoggingInfo (JobID,Name,Value,HeartBeatTime) VALUES "
+                req += ",".join(valueList)
+                result = self._update(req)
+                if not result["OK"]:
+                    ok = False
+                    self.log.warn("Error storing heart beat data", result["Message"])
+
+        return S_OK() if ok else S_ERROR("Failed to store some or all the parameters")
+
     #####################################################################################
     def getHeartBeatData(self, jobID):
         """Retrieve the job's heart beat data"""
@@ -42,7 +42,8 @@ class JobLoggingDB(DB):
         Optionally the time stamp of the status can
         be provided in a form of a string in a format '%Y-%m-%d %H:%M:%S' or
         as datetime.datetime object. If the time stamp is not provided the current
-        UTC time is used.
+        UTC time is used. If a list of jobIDs is given, the same record is added
+        for all of them with a single statement.
         """
 
         # Backward compatibility
@@ -72,10 +73,15 @@ class JobLoggingDB(DB):
             _date = datetime.datetime.utcnow()
         epoc = time.mktime(_date.timetuple()) + _date.microsecond / 1000000.0 - MAGIC_EPOC_NUMBER
 
+        jobIDList = jobID if isinstance(jobID, (list, tuple)) else [jobID]
         cmd = (
             "INSERT INTO LoggingInfo (JobId, Status, MinorStatus, ApplicationStatus, "
-            + "StatusTime, StatusTimeOrder, StatusSource) VALUES (%d,'%s','%s','%s','%s',%f,'%s')"
-            % (int(jobID), status, minorStatus, applicationStatus[:255], str(_date), epoc, source[:32])
+            + "StatusTime, StatusTimeOrder, StatusSource) VALUES "
+            + ", ".join(
+                "(%d,'%s','%s','%s','%s',%f,'%s')"
+                % (int(jID), status, minorStatus, applicationStatus[:255], str(_date), epoc, source[:32])
+                for jID in jobIDList
+            )
         )
 
         return self._update(cmd)
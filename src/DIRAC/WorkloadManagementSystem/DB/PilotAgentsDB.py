@@ -13,6 +13,7 @@
     storePilotOutput()
     getPilotOutput()
     setJobForPilot()
+    setJobsForPilot()
     getPilotsSummary()
     getGroupedPilotSummary()
 
@@ -468,6 +469,25 @@ AND SubmissionTime < DATE_SUB(UTC_TIMESTAMP(),INTERVAL %d DAY)"
         else:
             return S_ERROR("PilotJobReference " + pilotRef + " not found")
 
+    ##########################################################################################
+    def setJobsForPilot(self, jobIDs, pilotRef, site=None, updateStatus=True):
+        """Store the jobIDs of the jobs executed by the pilot with reference pilotRef, in bulk"""
+
+        if not jobIDs:
+            return S_OK()
+        pilotID = self.__getPilotID(pilotRef)
+        if not pilotID:
+            return S_ERROR("PilotJobReference " + pilotRef + " not found")
+        if updateStatus:
+            reason = "Report from jobs %s" % ",".join(str(int(jobID)) for jobID in jobIDs)
+            result = self.setPilotStatus(pilotRef, status=PilotStatus.RUNNING, statusReason=reason, gridSite=site)
+            if not result["OK"]:
+                return result
+        req = "INSERT INTO JobToPilotMapping (PilotID,JobID,StartTime) VALUES %s" % ", ".join(
+            "(%d,%d,UTC_TIMESTAMP())" % (pilotID, jobID) for jobID in jobIDs
+        )
+        return self._update(req)
+
     ##########################################################################################
     def setCurrentJobID(self, pilotRef, jobID):
         """Set the pilot agent current DIRAC job ID"""
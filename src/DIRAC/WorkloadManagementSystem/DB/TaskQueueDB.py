@@ -12,6 +12,7 @@ from DIRAC.Core.Security import Properties
 from DIRAC.ConfigurationSystem.Client.Helpers.Operations import Operations
 from DIRAC.ConfigurationSystem.Client.Helpers import Registry
 from DIRAC.WorkloadManagementSystem.private.SharesCorrector import SharesCorrector
+from DIRAC.WorkloadManagementSystem.private.TaskQueueIndex import TaskQueueIndex
 
 DEFAULT_GROUP_SHARE = 1000
 TQ_MIN_SHARE = 0.001
@@ -60,9 +61,12 @@ class TaskQueueDB(DB):
         self.__opsHelper = Operations()
         self.__ensureInsertionIsSingle = False
         self.__sharesCorrector = SharesCorrector(self.__opsHelper)
+        self.__matchingIndex = None
         result = self.__initializeDB()
         if not result["OK"]:
             raise Exception("Can't create tables: %s" % result["Message"])
+        if self.__getCSOption("EnableTQMatchingIndex", False):
+            self.enableMatchingIndex(refreshInterval=self.__getCSOption("TQMatchingIndexRefreshInterval", 30))
 
     def enableAllTaskQueues(self):
         """Enable all Task queues"""
@@ -84,6 +88,73 @@ class TaskQueueDB(DB):
     def getValidPilotTypes(self):
         return self.__getCSOption("AllPilotTypes", ["private"])
 
+    def enableMatchingIndex(self, enabled=True, refreshInterval=30):
+        """Enable (or disable) the in-memory index of task queues used for matching.
+        When enabled, the task queues matching a resource are selected in memory and only
+        the jobs are extracted from the DB. The index is synchronized with the DB at most
+        every refreshInterval seconds, and immediately for changes done by this process.
+
+        :param bool enabled: enable or disable the index
+        :param int refreshInterval: seconds between synchronizations with the DB
+        """
+        if not enabled:
+            self.__matchingIndex = None
+        elif self.__matchingIndex is None:
+            self.__matchingIndex = TaskQueueIndex(refreshInterval=refreshInterval)
+        else:
+            self.__matchingIndex.refreshInterval = refreshInterval
+
+    def getMatchingIndexStats(self):
+        """Get the counters of the in-memory matching index
+
+        :return: S_OK(dict) / S_ERROR
+        """
+        if self.__matchingIndex is None:
+            return S_ERROR("Task queue matching index is not enabled")
+        return S_OK(self.__matchingIndex.getStats())
+
+    def __syncMatchingIndex(self, connObj=False):
+        """Synchronize the in-memory matching index with the DB, if needed.
+        Only the definitions of the task queues unknown to the index are loaded.
+        """
+        if not self.__matchingIndex.isStale() or not self.__matchingIndex.startRefresh():
+            return S_OK()
+        try:
+            return self.__loadMatchingIndex(connObj=connObj)
+        finally:
+            self.__matchingIndex.endRefresh()
+
+    def __loadMatchingIndex(self, connObj=False):
+        cmd = "SELECT TQId, OwnerDN, OwnerGroup, Setup, CPUTime, Priority, Enabled FROM `tq_TaskQueues`"
+        result = self._query(cmd, conn=connObj)
+        if not result["OK"]:
+            return result
+        priorities = {}
+        newTQDefinitions = {}
+        for tqId, ownerDN, ownerGroup, setup, cpuTime, priority, enabled in result["Value"]:
+            # A TQ is enabled once all its definition has been inserted
+            if tqId not in self.__matchingIndex and enabled < 1:
+                continue
+            priorities[tqId] = priority
+            if tqId not in self.__matchingIndex:
+                newTQDefinitions[tqId] = {
+                    "OwnerDN": ownerDN,
+                    "OwnerGroup": ownerGroup,
+                    "Setup": setup,
+                    "CPUTime": cpuTime,
+                }
+        if newTQDefinitions:
+            tqIdList = ", ".join(str(tqId) for tqId in newTQDefinitions)
+            for field in multiValueDefFields:
+                cmd = "SELECT TQId, Value FROM `tq_TQTo%s` WHERE TQId IN ( %s )" % (field, tqIdList)
+                result = self._query(cmd, conn=connObj)
+                if not result["OK"]:
+                    return result
+                for tqId, value in result["Value"]:
+                    newTQDefinitions[tqId].setdefault(field, []).append(value)
+        self.__matchingIndex.sync(priorities, newTQDefinitions)
+        return S_OK()
+
     def __initializeDB(self):
         """
         Create the tables
@@ -290,6 +361,8 @@ class TaskQueueDB(DB):
                 self.cleanOrphanedTaskQueues(connObj=connObj)
                 return S_ERROR("Can't insert values %s for field %s: %s" % (str(values), field, result["Message"]))
         self.log.info("Created TQ", tqId)
+        if self.__matchingIndex is not None:
+            self.__matchingIndex.invalidate()
         return S_OK(tqId)
 
     def cleanOrphanedTaskQueues(self, connObj=False):
@@ -316,6 +389,8 @@ class TaskQueueDB(DB):
         result = self._update("DELETE FROM `tq_TaskQueues` WHERE TQId in ( %s )" % ",".join(orphanedTQs), conn=connObj)
         if not result["OK"]:
             return result
+        if self.__matchingIndex is not None:
+            self.__matchingIndex.removeTaskQueues([int(tqId) for tqId in orphanedTQs])
         return S_OK()
 
     def __setTaskQueueEnabled(self, tqId, enabled=True, connObj=False):
@@ -525,6 +600,7 @@ ORDER BY COUNT( `tq_Jobs`.JobID ) ASC"
             negativeCond = {}
         # Make a copy to avoid modification of original if escaping needs to be done
         tqMatchDict = dict(tqMatchDict)
+        rawMatchDict = dict(tqMatchDict)
         retVal = self._checkMatchDefinition(tqMatchDict)
         if not retVal["OK"]:
             self.log.error("TQ match request check failed", retVal["Message"])
@@ -542,15 +618,13 @@ WHERE `tq_Jobs`.TQId = %s ORDER BY RAND() / `tq_Jobs`.RealPriority ASC LIMIT 1"
             noJobsFound = False
             if "JobID" in tqMatchDict:
                 # A certain JobID is required by the resource, so all TQ are to be considered
-                retVal = self.matchAndGetTaskQueue(
-                    tqMatchDict, numQueuesToGet=0, skipMatchDictDef=True, connObj=connObj
-                )
+                retVal = self.__matchTaskQueues(tqMatchDict, rawMatchDict, numQueuesToGet=0, connObj=connObj)
                 preJobSQL = "%s AND `tq_Jobs`.JobId = %s " % (preJobSQL, tqMatchDict["JobID"])
             else:
-                retVal = self.matchAndGetTaskQueue(
+                retVal = self.__matchTaskQueues(
                     tqMatchDict,
+                    rawMatchDict,
                     numQueuesToGet=numQueuesPerTry,
-                    skipMatchDictDef=True,
                     negativeCond=negativeCond,
                     connObj=connObj,
                 )
@@ -595,6 +669,110 @@ WHERE `tq_Jobs`.TQId = %s ORDER BY RAND() / `tq_Jobs`.RealPriority ASC LIMIT 1"
         self.log.info("Could not find a match after %s match retries" % self.__maxMatchRetry)
         return S_ERROR("Could not find a match after %s match retries" % self.__maxMatchRetry)
 
+    def matchAndGetJobs(self, tqMatchDict, numJobs, numQueuesPerTry=10, negativeCond=None):
+        """Match up to numJobs jobs based on requirements.
+        The matching task queues are selected once, and the jobs are taken out of them
+        (following their priorities) in one transaction per task queue.
+
+        :param dict tqMatchDict: dict for TQ match
+        :param int numJobs: maximum number of jobs to match
+        :param int numQueuesPerTry: number of task queues to select per try
+        :param negativeCond: negative conditions (see matchAndGetJob)
+
+        :returns: S_OK( { 'matchFound': bool, 'jobs': [ ( jobId, tqId ) ], 'tqMatch': dict } ) / S_ERROR
+        """
+        if negativeCond is None:
+            negativeCond = {}
+        # Make a copy to avoid modification of original if escaping needs to be done
+        tqMatchDict = dict(tqMatchDict)
+        rawMatchDict = dict(tqMatchDict)
+        retVal = self._checkMatchDefinition(tqMatchDict)
+        if not retVal["OK"]:
+            self.log.error("TQ match request check failed", retVal["Message"])
+            return retVal
+        retVal = self._getConnection()
+        if not retVal["OK"]:
+            return S_ERROR("Can't connect to DB: %s" % retVal["Message"])
+        connObj = retVal["Value"]
+        try:
+            retVal = self.__matchAndExtractJobs(
+                tqMatchDict, rawMatchDict, numJobs, numQueuesPerTry, negativeCond, connObj
+            )
+        finally:
+            # Give the connection back to the pool
+            self._releaseConnection()
+        if not retVal["OK"]:
+            return retVal
+        matchedJobs = retVal["Value"]
+        return S_OK({"matchFound": bool(matchedJobs), "jobs": matchedJobs, "tqMatch": tqMatchDict})
+
+    def __matchAndExtractJobs(self, tqMatchDict, rawMatchDict, numJobs, numQueuesPerTry, negativeCond, connObj):
+        """Take up to numJobs jobs out of the task queues matching the requirements (see matchAndGetJobs)
+
+        :returns: S_OK( [ ( jobId, tqId ) ] ) / S_ERROR
+        """
+        jobSQL = "SELECT `tq_Jobs`.JobId FROM `tq_Jobs` WHERE `tq_Jobs`.TQId = %s"
+        if "JobID" in tqMatchDict:
+            jobSQL += " AND `tq_Jobs`.JobId = %s" % tqMatchDict["JobID"]
+        jobSQL += " ORDER BY RAND() / `tq_Jobs`.RealPriority ASC LIMIT %s FOR UPDATE"
+
+        matchedJobs = []
+        for _ in range(self.__maxMatchRetry):
+            retVal = self.__matchTaskQueues(
+                tqMatchDict,
+                rawMatchDict,
+                numQueuesToGet=0 if "JobID" in tqMatchDict else max(numQueuesPerTry, numJobs),
+                negativeCond=negativeCond,
+                connObj=connObj,
+            )
+            if not retVal["OK"]:
+                return retVal
+            tqList = retVal["Value"]
+            if not tqList:
+                self.log.info("No TQ matches requirements")
+                break
+            for tqId, tqOwnerDN, tqOwnerGroup in tqList:
+                retVal = self.__extractJobsFromTaskQueue(tqId, jobSQL % (tqId, numJobs - len(matchedJobs)), connObj)
+                if not retVal["OK"]:
+                    return retVal
+                if not retVal["Value"]:
+                    self.log.info("Task queue seems to be empty, triggering a cleaning of", tqId)
+                    self.__deleteTQWithDelay.add(tqId, 300, (tqId, tqOwnerDN, tqOwnerGroup))
+                    continue
+                self.log.info("Extracted jobs from TQ", "(%s : %s)" % (tqId, retVal["Value"]))
+                matchedJobs.extend((jobId, tqId) for jobId in retVal["Value"])
+                if len(matchedJobs) >= numJobs:
+                    break
+            if matchedJobs:
+                break
+
+        return S_OK(matchedJobs)
+
+    def __extractJobsFromTaskQueue(self, tqId, jobSQL, connObj=False):
+        """Take out of a task queue the jobs selected by jobSQL, in one transaction
+
+        :returns: S_OK( [ jobId ] ) / S_ERROR
+        """
+        retVal = self.transactionStart()
+        if not retVal["OK"]:
+            return S_ERROR("Can't begin transaction for matching jobs: %s" % retVal["Message"])
+        retVal = self._query(jobSQL, conn=connObj)
+        if not retVal["OK"]:
+            self.transactionRollback()
+            return S_ERROR("Can't retrieve jobs from TQ %s: %s" % (tqId, retVal["Message"]))
+        jobIDs = [row[0] for row in retVal["Value"]]
+        if jobIDs:
+            retVal = self._update(
+                "DELETE FROM `tq_Jobs` WHERE JobId IN ( %s )" % ", ".join(str(jobId) for jobId in jobIDs), conn=connObj
+            )
+            if not retVal["OK"]:
+                self.transactionRollback()
+                return S_ERROR("Could not take jobs out from the TQ %s: %s" % (tqId, retVal["Message"]))
+        retVal = self.transactionCommit()
+        if not retVal["OK"]:
+            return S_ERROR("Could not take jobs out from the TQ %s: %s" % (tqId, retVal["Message"]))
+        return S_OK(jobIDs)
+
     def matchAndGetTaskQueue(
         self, tqMatchDict, numQueuesToGet=1, skipMatchDictDef=False, negativeCond=None, connObj=False
     ):
@@ -604,9 +782,37 @@ WHERE `tq_Jobs`.TQId = %s ORDER BY RAND() / `tq_Jobs`.RealPriority ASC LIMIT 1"
         # Make a copy to avoid modification of original if escaping needs to be done
         tqMatchDict = dict(tqMatchDict)
         if not skipMatchDictDef:
+            rawMatchDict = dict(tqMatchDict)
             retVal = self._checkMatchDefinition(tqMatchDict)
             if not retVal["OK"]:
                 return retVal
+            return self.__matchTaskQueues(
+                tqMatchDict, rawMatchDict, numQueuesToGet=numQueuesToGet, negativeCond=negativeCond, connObj=connObj
+            )
+        # The values are already escaped: only the SQL match can be used
+        return self.__matchTaskQueuesSQL(
+            tqMatchDict, numQueuesToGet=numQueuesToGet, negativeCond=negativeCond, connObj=connObj
+        )
+
+    def __matchTaskQueues(self, tqMatchDict, rawMatchDict, numQueuesToGet=1, negativeCond=None, connObj=False):
+        """Get the queues matching the requirements, using the in-memory index if enabled
+
+        :param dict tqMatchDict: checked and escaped match dict
+        :param dict rawMatchDict: same match dict, with non escaped values
+        """
+        if self.__matchingIndex is not None:
+            retVal = self.__syncMatchingIndex(connObj=connObj)
+            if retVal["OK"]:
+                return self.__matchingIndex.match(
+                    rawMatchDict, numQueuesToGet=numQueuesToGet, negativeCond=negativeCond
+                )
+            self.log.warn("Could not synchronize the TQ matching index, using SQL", retVal["Message"])
+        return self.__matchTaskQueuesSQL(
+            tqMatchDict, numQueuesToGet=numQueuesToGet, negativeCond=negativeCond, connObj=connObj
+        )
+
+    def __matchTaskQueuesSQL(self, tqMatchDict, numQueuesToGet=1, negativeCond=None, connObj=False):
+        """Get the queues matching the (checked and escaped) requirements with a SQL query"""
         retVal = self.__generateTQMatchSQL(tqMatchDict, numQueuesToGet=numQueuesToGet, negativeCond=negativeCond)
         if not retVal["OK"]:
             return retVal
@@ -1032,6 +1238,8 @@ WHERE j.JobId = %s AND t.TQId = j.TQId"
             retVal = self._update("DELETE FROM `tq_TaskQueues` WHERE TQId = %s" % tqId, conn=connObj)
             if not retVal["OK"]:
                 return retVal
+            if self.__matchingIndex is not None:
+                self.__matchingIndex.removeTaskQueues([tqId])
             self.recalculateTQSharesForEntity(tqOwnerDN, tqOwnerGroup, connObj=connObj)
             self.log.info("Deleted empty and enabled TQ", tqId)
             return S_OK()
@@ -1060,6 +1268,8 @@ WHERE j.JobId = %s AND t.TQId = j.TQId"
         if not retVal["OK"]:
             return S_ERROR("Could not delete task queue %s: %s" % (tqId, retVal["Message"]))
         delTQ = retVal["Value"]
+        if self.__matchingIndex is not None:
+            self.__matchingIndex.removeTaskQueues([tqId])
         sqlCmd = "DELETE FROM `tq_Jobs` WHERE `tq_Jobs`.TQId = %s" % tqId
         retVal = self._update(sqlCmd, conn=connObj)
         if not retVal["OK"]:
@@ -1080,6 +1290,38 @@ WHERE j.JobId = %s AND t.TQId = j.TQId"
             return result
         return self.retrieveTaskQueues([tqTuple[0] for tqTuple in result["Value"]])
 
+    def getMatchingTaskQueuesBulk(self, tqMatchDicts, negativeConds=None):
+        """Get the info of the task queues that match each of several resources.
+        The task queues are read once, and matched in memory against all the resources.
+
+        :param dict tqMatchDicts: { name : resource description }
+        :param dict negativeConds: { name : negative condition } for the resources having one
+
+        :return: S_OK( { "Successful" : { name : { tqId : tqInfo } }, "Failed" : { name : error } } ) / S_ERROR
+        """
+        if negativeConds is None:
+            negativeConds = {}
+        result = self.retrieveTaskQueues()
+        if not result["OK"]:
+            return result
+        tqData = result["Value"]
+        tqIndex = TaskQueueIndex()
+        for tqId, tqInfo in tqData.items():
+            tqIndex.addTaskQueue(tqId, tqInfo, priority=tqInfo["Priority"])
+
+        successful = {}
+        failed = {}
+        for name, tqMatchDict in tqMatchDicts.items():
+            # Same checks as for a single match, but the index uses the non escaped values
+            result = self._checkMatchDefinition(dict(tqMatchDict))
+            if result["OK"]:
+                result = tqIndex.match(tqMatchDict, numQueuesToGet=0, negativeCond=negativeConds.get(name))
+            if not result["OK"]:
+                failed[name] = result["Message"]
+                continue
+            successful[name] = {tqTuple[0]: tqData[tqTuple[0]] for tqTuple in result["Value"]}
+        return S_OK({"Successful": successful, "Failed": failed})
+
     def getNumTaskQueues(self):
         """
         Get the number of task queues in the system
@@ -1318,7 +1560,9 @@ FROM `tq_TaskQueues` t, `tq_Jobs` j WHERE "
         for prio in prioDict:
             tqList = ", ".join([str(tqId) for tqId in prioDict[prio]])
             updateSQL = "UPDATE `tq_TaskQueues` SET Priority=%.4f WHERE TQId in ( %s )" % (prio, tqList)
-            self._update(updateSQL, conn=connObj)
+            result = self._update(updateSQL, conn=connObj)
+            if result["OK"] and self.__matchingIndex is not None:
+                self.__matchingIndex.setPriority(prioDict[prio], float("%.4f" % prio))
         return S_OK()
 
     @staticmethod
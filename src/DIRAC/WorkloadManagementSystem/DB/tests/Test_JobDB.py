@@ -34,3 +34,33 @@ class JobDBTest(unittest.TestCase):
         print(result)
         self.assertTrue(result["OK"])
         self.assertEqual(result["Value"], ["/vo/user/lfn1", "/vo/user/lfn2"])
+
+    def test_setHeartBeatDataBulk(self):
+        self.jobDB._escapeValues = MagicMock(side_effect=lambda values: S_OK(["'%s'" % value for value in values]))
+        self.jobDB._update = MagicMock(return_value=S_OK())
+        heartBeats = {
+            2: ("2022-01-01 10:00:00", "2022-01-01 10:00:05", False, {}),
+            1: ("2022-01-01 11:00:00", "2022-01-01 11:00:00", True, {"CPU": 12.5, "Memory": 100}),
+        }
+        result = self.jobDB.setHeartBeatDataBulk(heartBeats)
+        self.assertTrue(result["OK"])
+        self.assertEqual(self.jobDB._escapeValues.call_count, 1)
+        self.assertEqual(self.jobDB._update.call_count, 2)
+        self.assertEqual(
+            self.jobDB._update.call_args_list[0][0][0],
+            "UPDATE Jobs SET HeartBeatTime = CASE JobID WHEN 1 THEN '2022-01-01 11:00:00' "
+            "WHEN 2 THEN '2022-01-01 10:00:00' END, "
+            "Status = CASE WHEN JobID IN (1) AND Status IN ('Matched','Stalled','Running') THEN 'Running' "
+            "ELSE Status END WHERE JobID IN (1,2)",
+        )
+        self.assertEqual(
+            self.jobDB._update.call_args_list[1][0][0],
+            "INSERT IGNORE INTO HeartBeatLoggingInfo (JobID,Name,Value,HeartBeatTime) VALUES "
+            "( 1, 'CPU', '12.5', '2022-01-01 11:00:00'),( 1, 'Memory', '100', '2022-01-01 11:00:00')",
+        )
+
+        # One update per chunk of jobs
+        self.jobDB._update.reset_mock()
+        result = self.jobDB.setHeartBeatDataBulk(heartBeats, chunkSize=1)
+        self.assertTrue(result["OK"])
+        self.assertEqual(self.jobDB._update.call_count, 3)
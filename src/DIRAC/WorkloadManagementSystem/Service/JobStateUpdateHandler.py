@@ -10,12 +10,14 @@ import time
 import datetime as dateTime
 
 from DIRAC import S_OK, S_ERROR
-from DIRAC.Core.DISET.RequestHandler import RequestHandler
+from DIRAC.Core.DISET.RequestHandler import RequestHandler, getServiceOption
 from DIRAC.Core.Utilities import TimeUtilities
 from DIRAC.Core.Utilities.DEncode import ignoreEncodeWarning
 from DIRAC.Core.Utilities.ObjectLoader import ObjectLoader
+from DIRAC.Core.Utilities.ThreadScheduler import gThreadScheduler
 from DIRAC.ConfigurationSystem.Client.Helpers.Operations import Operations
 from DIRAC.WorkloadManagementSystem.Client import JobStatus
+from DIRAC.WorkloadManagementSystem.Utilities.HeartBeatBuffer import HeartBeatBuffer
 
 
 class JobStateUpdateHandlerMixin:
@@ -50,6 +52,15 @@ class JobStateUpdateHandlerMixin:
                 cls.elasticJobParametersDB = result["Value"]()
             except RuntimeError as excp:
                 return S_ERROR("Can't connect to DB: %s" % excp)
+
+        # Heart beats are written in bulk every HeartBeatFlushInterval seconds, if set
+        cls.heartBeatBuffer = None
+        flushInterval = getServiceOption(svcInfoDict, "HeartBeatFlushInterval", 0)
+        if flushInterval > 0:
+            cls.heartBeatBuffer = HeartBeatBuffer(
+                cls.jobDB, maxSize=getServiceOption(svcInfoDict, "HeartBeatBufferSize", 1000), parentLogger=cls.log
+            )
+            gThreadScheduler.addPeriodicTask(flushInterval, cls.heartBeatBuffer.flush)
         return S_OK()
 
     ###########################################################################
@@ -408,9 +419,12 @@ class JobStateUpdateHandlerMixin:
     def export_sendHeartBeat(cls, jobID, dynamicData, staticData):
         """Send a heart beat sign of life for a job jobID"""
 
-        result = cls.jobDB.setHeartBeatData(int(jobID), dynamicData)
-        if not result["OK"]:
-            cls.log.warn("Failed to set the heart beat data", f"for job {jobID} ")
+        if cls.heartBeatBuffer:
+            cls.heartBeatBuffer.add(int(jobID), dynamicData)
+        else:
+            result = cls.jobDB.setHeartBeatData(int(jobID), dynamicData)
+            if not result["OK"]:
+                cls.log.warn("Failed to set the heart beat data", f"for job {jobID} ")
 
         if cls.elasticJobParametersDB:
             for key, value in staticData.items():
@@ -447,6 +461,16 @@ class JobStateUpdateHandlerMixin:
 
         return S_OK(jobMessageDict)
 
+    ###########################################################################
+    types_getHeartBeatBufferStats = []
+
+    @classmethod
+    def export_getHeartBeatBufferStats(cls):
+        """Get the number of jobs whose heart beat is waiting to be written, and the statistics of the writes"""
+        if not cls.heartBeatBuffer:
+            return S_ERROR("The heart beats are not buffered")
+        return S_OK(cls.heartBeatBuffer.getStats())
+
 
 class JobStateUpdateHandler(JobStateUpdateHandlerMixin, RequestHandler):
     pass
@@ -81,6 +81,43 @@ class MatcherHandlerMixin:
             return S_OK(result)
         return S_ERROR(DErrno.EWMSNOMATCH, callStack=[])
 
+    ##############################################################################
+    types_requestJobs = [dict, int]
+
+    def export_requestJobs(self, resourceDescription, numJobs):
+        """Serve up to numJobs jobs to the request of an agent, in one go.
+        Each job is returned in the same form as by requestJob.
+        """
+        if numJobs < 1:
+            return S_ERROR("Invalid number of jobs requested: %s" % numJobs)
+
+        resourceDescription["Setup"] = self.serviceInfoDict["clientSetup"]
+        credDict = self.getRemoteCredentials()
+        pilotRef = resourceDescription.get("PilotReference", "Unknown")
+
+        try:
+            opsHelper = Operations(group=credDict["group"])
+            matcher = Matcher(
+                pilotAgentsDB=self.pilotAgentsDB,
+                jobDB=self.jobDB,
+                tqDB=self.taskQueueDB,
+                jlDB=self.jobLoggingDB,
+                opsHelper=opsHelper,
+                pilotRef=pilotRef,
+            )
+            result = matcher.selectJobs(resourceDescription, credDict, numJobs)
+        except RuntimeError as rte:
+            self.log.error("Error requesting jobs for pilot", "[%s] %s" % (pilotRef, rte))
+            return S_ERROR("Error requesting jobs")
+        except PilotVersionError as pve:
+            self.log.warn("Pilot version error for pilot", "[%s] %s" % (pilotRef, pve))
+            return S_ERROR(DErrno.EWMSPLTVER, callStack=[])
+
+        # result can be empty, meaning that no job matched
+        if result:
+            return S_OK(result)
+        return S_ERROR(DErrno.EWMSNOMATCH, callStack=[])
+
     ##############################################################################
     types_getActiveTaskQueues = []
 
@@ -106,6 +143,38 @@ class MatcherHandlerMixin:
         resourceDescriptionDict = matcher._processResourceDescription(resourceDict)
         return cls.taskQueueDB.getMatchingTaskQueues(resourceDescriptionDict, negativeCond=negativeCond)
 
+    ##############################################################################
+    types_getMatchingTaskQueuesBulk = [dict]
+
+    @classmethod
+    @ignoreEncodeWarning
+    def export_getMatchingTaskQueuesBulk(cls, resourceDicts):
+        """Return the task queues that match each of the resourceDicts, given as { name : resourceDict }.
+        The task queues are read once for all of them.
+        """
+        matcher = Matcher(pilotAgentsDB=cls.pilotAgentsDB, jobDB=cls.jobDB, tqDB=cls.taskQueueDB, jlDB=cls.jobLoggingDB)
+        resourceDescriptionDicts = {}
+        negativeConds = {}
+        for name, resourceDict in resourceDicts.items():
+            if "Site" in resourceDict and isinstance(resourceDict["Site"], str):
+                gridCE = resourceDict.get("GridCE")
+                negativeConds[name] = cls.limiter.getNegativeCondForSite(resourceDict["Site"], gridCE)
+            else:
+                negativeConds[name] = cls.limiter.getNegativeCond()
+            resourceDescriptionDicts[name] = matcher._processResourceDescription(resourceDict)
+        return cls.taskQueueDB.getMatchingTaskQueuesBulk(resourceDescriptionDicts, negativeConds=negativeConds)
+
+    ##############################################################################
+    types_getRunningJobsSnapshotStats = []
+
+    @classmethod
+    def export_getRunningJobsSnapshotStats(cls):
+        """Return the statistics of the snapshot of the running jobs used for the job limits"""
+        snapshot = cls.limiter.getRunningSnapshot()
+        if not snapshot:
+            return S_ERROR("The running jobs are not refreshed in the background")
+        return S_OK(snapshot.getStats())
+
 
 class MatcherHandler(MatcherHandlerMixin, RequestHandler):
     pass
@@ -0,0 +1,108 @@
+""" Buffer of the heart beats received by the JobStateUpdate service
+
+    Instead of one UPDATE and one INSERT per heart beat, the heart beats are kept in memory
+    and written periodically with JobDB.setHeartBeatDataBulk. Several heart beats of the same job
+    received before a flush are merged, the last one winning.
+
+    The heart beats still in the buffer when the service stops are lost, so the flush interval
+    should stay small compared to the heart beat period of the jobs.
+"""
+import datetime
+import threading
+import time
+
+from DIRAC import gLogger, S_OK
+
+
+class HeartBeatBuffer:
+    """Coalesce the heart beats of the jobs, and write them in bulk"""
+
+    def __init__(self, jobDB, maxSize=1000, parentLogger=None):
+        """c'tor
+
+        :param jobDB: JobDB object
+        :param int maxSize: number of jobs in the buffer triggering a flush
+        :param parentLogger: logger to use
+        """
+        self.jobDB = jobDB
+        self.maxSize = maxSize
+        if not parentLogger:
+            parentLogger = gLogger
+        self.log = parentLogger.getSubLogger("HeartBeatBuffer")
+        self.__lock = threading.Lock()
+        # Only one flush at a time
+        self.__flushLock = threading.Lock()
+        # { jobID: (heartBeatTime, receptionTime, setRunning, dynamicDataDict) }
+        self.__heartBeats = {}
+        self.__stats = dict.fromkeys(
+            ("Received", "Flushes", "FailedFlushes", "FlushedJobs", "TotalFlushTime", "LastFlushTime", "MaxFlushTime"),
+            0,
+        )
+        self.__stats["LastFlush"] = None
+
+    def add(self, jobID, dynamicDataDict):
+        """Add a heart beat to the buffer, flushing it if it is full
+
+        :param int jobID: job ID
+        :param dict dynamicDataDict: dynamic data of the heart beat, as given to JobDB.setHeartBeatData
+        """
+        dynamicDataDict = dict(dynamicDataDict)
+        receptionTime = datetime.datetime.utcnow().replace(microsecond=0)
+        # Same as JobDB.setHeartBeatData: the status is set to Running unless the time is given
+        heartBeatTime = dynamicDataDict.pop("HeartBeatTime", None)
+        setRunning = not heartBeatTime
+        if not heartBeatTime:
+            heartBeatTime = receptionTime
+        with self.__lock:
+            previous = self.__heartBeats.get(jobID)
+            if previous:
+                setRunning = setRunning or previous[2]
+                dynamicDataDict = dict(previous[3], **dynamicDataDict)
+            self.__heartBeats[jobID] = (heartBeatTime, receptionTime, setRunning, dynamicDataDict)
+            self.__stats["Received"] += 1
+            full = len(self.__heartBeats) >= self.maxSize
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Write the heart beats of the buffer in the DB. They are dropped if it fails.
+
+        :return: S_OK(number of jobs written)/S_ERROR
+        """
+        with self.__flushLock:
+            with self.__lock:
+                heartBeats = self.__heartBeats
+                self.__heartBeats = {}
+            if not heartBeats:
+                return S_OK(0)
+
+            start = time.time()
+            result = self.jobDB.setHeartBeatDataBulk(heartBeats)
+            flushTime = time.time() - start
+
+            with self.__lock:
+                self.__stats["Flushes"] += 1
+                self.__stats["TotalFlushTime"] += flushTime
+                self.__stats["LastFlushTime"] = flushTime
+                self.__stats["MaxFlushTime"] = max(self.__stats["MaxFlushTime"], flushTime)
+                self.__stats["LastFlush"] = datetime.datetime.utcnow()
+                if result["OK"]:
+                    self.__stats["FlushedJobs"] += len(heartBeats)
+                else:
+                    self.__stats["FailedFlushes"] += 1
+        if not result["OK"]:
+            self.log.error("Failed to store the heart beats", f"of {len(heartBeats)} jobs: {result['Message']}")
+            return result
+        self.log.verbose("Stored the heart beats", f"of {len(heartBeats)} jobs in {flushTime:.3f} seconds")
+        return S_OK(len(heartBeats))
+
+    def getStats(self):
+        """Get the number of jobs waiting in the buffer and the statistics of the flushes
+
+        :return: dict
+        """
+        with self.__lock:
+            stats = dict(self.__stats)
+            stats["QueuedJobs"] = len(self.__heartBeats)
+        stats["MeanFlushTime"] = stats["TotalFlushTime"] / stats["Flushes"] if stats["Flushes"] else 0.0
+        return stats
@@ -0,0 +1,170 @@
+""" Snapshot of the number of running jobs per site, used by the Limiter
+
+    Instead of querying the JobDB each time the cached counters expire, which makes all the
+    matching requests arriving at that moment run the same queries, the counters are kept in
+    memory and refreshed by a single background thread, with one query per job attribute for all
+    the sites. The matching requests only read the snapshot.
+
+    The counters of a (site, attribute) pair are only fetched synchronously the first time they
+    are needed, or when the snapshot is older than its maximum age, which happens only if the
+    refresh keeps failing. In both cases, a single thread runs the query.
+"""
+import datetime
+import threading
+import time
+
+from DIRAC import gLogger, S_OK
+from DIRAC.WorkloadManagementSystem.Client import JobStatus
+
+
+class RunningJobsSnapshot:
+    """Number of Running, Matched and Stalled jobs per site and job attribute value"""
+
+    def __init__(self, jobDB, refreshInterval=10, maxAge=300, parentLogger=None):
+        """c'tor
+
+        :param jobDB: JobDB object
+        :param int refreshInterval: seconds between two refreshes of the snapshot
+        :param int maxAge: age in seconds after which the counters are fetched synchronously
+        :param parentLogger: logger to use
+        """
+        self.jobDB = jobDB
+        self.refreshInterval = refreshInterval
+        self.maxAge = maxAge
+        if not parentLogger:
+            parentLogger = gLogger
+        self.log = parentLogger.getSubLogger("RunningJobsSnapshot")
+        self.__lock = threading.Lock()
+        # Only one query at a time, from the refresher or from a reader
+        self.__queryLock = threading.Lock()
+        # { (siteName, attName): ({attValue: numberOfJobs}, updateTime) }
+        self.__counters = {}
+        self.__refresher = None
+        self.__stats = dict.fromkeys(
+            ("Refreshes", "FailedRefreshes", "SynchronousQueries", "LastRefreshTime", "MaxRefreshTime"), 0
+        )
+        self.__stats["LastRefresh"] = None
+
+    def setParameters(self, refreshInterval, maxAge):
+        """Change the refresh interval and the maximum age of the snapshot"""
+        self.refreshInterval = refreshInterval
+        self.maxAge = maxAge
+
+    def __query(self, attName, sites):
+        """Get the counters of an attribute for a list of sites
+
+        :return: S_OK({(siteName, attName): {attValue: numberOfJobs}})/S_ERROR
+        """
+        result = self.jobDB.getCounters(
+            "Jobs",
+            ["Site", attName],
+            {"Site": sites, "Status": [JobStatus.RUNNING, JobStatus.MATCHED, JobStatus.STALLED]},
+        )
+        if not result["OK"]:
+            return result
+        counters = {(siteName, attName): {} for siteName in sites}
+        for attDict, count in result["Value"]:
+            siteData = counters.setdefault((attDict["Site"], attName), {})
+            siteData[attDict[attName]] = siteData.get(attDict[attName], 0) + count
+        return S_OK(counters)
+
+    def __store(self, counters, updateTime):
+        with self.__lock:
+            for key, data in counters.items():
+                self.__counters[key] = (data, updateTime)
+
+    def get(self, siteName, attName):
+        """Get the number of jobs per value of an attribute at a site
+
+        :param str siteName: site name
+        :param str attName: job attribute name
+
+        :return: S_OK({attValue: numberOfJobs})/S_ERROR
+        """
+        key = (siteName, attName)
+        entry = self.__counters.get(key)
+        if not entry or entry[1] < time.time() - self.maxAge:
+            with self.__queryLock:
+                # Another thread may have fetched it meanwhile
+                entry = self.__counters.get(key)
+                if not entry or entry[1] < time.time() - self.maxAge:
+                    updateTime = time.time()
+                    result = self.__query(attName, [siteName])
+                    with self.__lock:
+                        self.__stats["SynchronousQueries"] += 1
+                    if not result["OK"]:
+                        return result
+                    self.__store(result["Value"], updateTime)
+                    entry = self.__counters[key]
+            self.__startRefresher()
+        return S_OK(entry[0])
+
+    def __startRefresher(self):
+        with self.__lock:
+            if self.__refresher and self.__refresher.is_alive():
+                return
+            self.__refresher = threading.Thread(target=self.__refreshLoop, name="RunningJobsSnapshot", daemon=True)
+            self.__refresher.start()
+
+    def __refreshLoop(self):
+        while True:
+            time.sleep(self.refreshInterval)
+            try:
+                self.refresh()
+            except Exception:  # pylint: disable=broad-except
+                self.log.exception("Failed to refresh the running jobs snapshot")
+
+    def refresh(self):
+        """Refresh the counters of all the (site, attribute) pairs asked so far, with one query per attribute
+
+        :return: S_OK()/S_ERROR
+        """
+        with self.__lock:
+            sitesPerAttribute = {}
+            for siteName, attName in self.__counters:
+                sitesPerAttribute.setdefault(attName, []).append(siteName)
+        if not sitesPerAttribute:
+            return S_OK()
+
+        start = time.time()
+        failed = None
+        with self.__queryLock:
+            for attName, sites in sitesPerAttribute.items():
+                updateTime = time.time()
+                result = self.__query(attName, sites)
+                if not result["OK"]:
+                    failed = result
+                    self.log.error("Failed to get the running jobs", f"per {attName}: {result['Message']}")
+                    continue
+                self.__store(result["Value"], updateTime)
+        refreshTime = time.time() - start
+
+        with self.__lock:
+            self.__stats["Refreshes"] += 1
+            self.__stats["LastRefreshTime"] = refreshTime
+            self.__stats["MaxRefreshTime"] = max(self.__stats["MaxRefreshTime"], refreshTime)
+            if failed:
+                self.__stats["FailedRefreshes"] += 1
+            else:
+                self.__stats["LastRefresh"] = datetime.datetime.utcnow()
+        if failed:
+            return failed
+        self.log.verbose(
+            "Refreshed the running jobs", f"of {len(self.__counters)} site/attribute in {refreshTime:.3f} s"
+        )
+        return S_OK()
+
+    def getStats(self):
+        """Get the statistics of the refreshes, and the age of the oldest counters
+
+        :return: dict
+        """
+        now = time.time()
+        with self.__lock:
+            stats = dict(self.__stats)
+            updateTimes = [updateTime for _data, updateTime in self.__counters.values()]
+        stats["Entries"] = len(updateTimes)
+        stats["MaxAge"] = now - min(updateTimes) if updateTimes else 0.0
+        stats["RefreshInterval"] = self.refreshInterval
+        stats["MaxAllowedAge"] = self.maxAge
+        return stats
@@ -0,0 +1,65 @@
+""" Test of the buffer of the heart beats of the jobs
+"""
+import datetime
+
+from DIRAC import S_OK, S_ERROR
+from DIRAC.WorkloadManagementSystem.Utilities.HeartBeatBuffer import HeartBeatBuffer
+
+
+def test_add(mocker):
+    jobDB = mocker.MagicMock()
+    jobDB.setHeartBeatDataBulk.return_value = S_OK()
+    heartBeatBuffer = HeartBeatBuffer(jobDB)
+
+    heartBeatBuffer.add(1, {"CPU": 1.0, "Memory": 10})
+    heartBeatBuffer.add(1, {"CPU": 2.0})
+    heartBeatBuffer.add(2, {"HeartBeatTime": "2022-01-01 10:00:00"})
+    jobDB.setHeartBeatDataBulk.assert_not_called()
+    assert heartBeatBuffer.getStats()["QueuedJobs"] == 2
+
+    result = heartBeatBuffer.flush()
+    assert result["OK"], result
+    assert result["Value"] == 2
+    heartBeats = jobDB.setHeartBeatDataBulk.call_args[0][0]
+    heartBeatTime, receptionTime, setRunning, dynamicData = heartBeats[1]
+    assert isinstance(heartBeatTime, datetime.datetime)
+    assert heartBeatTime == receptionTime
+    assert setRunning
+    # The heart beats of the same job are merged
+    assert dynamicData == {"CPU": 2.0, "Memory": 10}
+    heartBeatTime, receptionTime, setRunning, dynamicData = heartBeats[2]
+    assert heartBeatTime == "2022-01-01 10:00:00"
+    assert not setRunning
+    assert dynamicData == {}
+
+    # Nothing left to flush
+    assert heartBeatBuffer.flush()["Value"] == 0
+    stats = heartBeatBuffer.getStats()
+    assert stats["Received"] == 3
+    assert stats["Flushes"] == 1
+    assert stats["FlushedJobs"] == 2
+    assert stats["QueuedJobs"] == 0
+
+
+def test_full(mocker):
+    """The buffer is flushed when it is full"""
+    jobDB = mocker.MagicMock()
+    jobDB.setHeartBeatDataBulk.return_value = S_OK()
+    heartBeatBuffer = HeartBeatBuffer(jobDB, maxSize=2)
+    heartBeatBuffer.add(1, {})
+    heartBeatBuffer.add(1, {})
+    jobDB.setHeartBeatDataBulk.assert_not_called()
+    heartBeatBuffer.add(2, {})
+    assert sorted(jobDB.setHeartBeatDataBulk.call_args[0][0]) == [1, 2]
+
+
+def test_failedFlush(mocker):
+    jobDB = mocker.MagicMock()
+    jobDB.setHeartBeatDataBulk.return_value = S_ERROR("DB error")
+    heartBeatBuffer = HeartBeatBuffer(jobDB)
+    heartBeatBuffer.add(1, {})
+    assert not heartBeatBuffer.flush()["OK"]
+    stats = heartBeatBuffer.getStats()
+    assert stats["FailedFlushes"] == 1
+    assert stats["FlushedJobs"] == 0
+    assert stats["QueuedJobs"] == 0
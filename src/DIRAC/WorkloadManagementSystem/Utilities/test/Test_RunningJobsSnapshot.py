@@ -0,0 +1,70 @@
+""" Test of the snapshot of the running jobs used by the Limiter
+"""
+from unittest.mock import MagicMock
+
+from DIRAC import S_OK, S_ERROR
+from DIRAC.WorkloadManagementSystem.Utilities import RunningJobsSnapshot as moduleTested
+from DIRAC.WorkloadManagementSystem.Utilities.RunningJobsSnapshot import RunningJobsSnapshot
+
+
+def getCounters(table, attrList, condDict):
+    running = {("Site1", "Merge"): 3, ("Site1", "MCGen"): 10, ("Site2", "Merge"): 1}
+    return S_OK(
+        [
+            ({"Site": site, "JobType": jobType}, count)
+            for (site, jobType), count in running.items()
+            if site in condDict["Site"]
+        ]
+    )
+
+
+def test_get(mocker):
+    mocker.patch.object(RunningJobsSnapshot, "_RunningJobsSnapshot__startRefresher")
+    jobDB = MagicMock()
+    jobDB.getCounters.side_effect = getCounters
+    snapshot = RunningJobsSnapshot(jobDB)
+
+    assert snapshot.get("Site1", "JobType")["Value"] == {"Merge": 3, "MCGen": 10}
+    assert snapshot.get("Site1", "JobType")["Value"] == {"Merge": 3, "MCGen": 10}
+    assert snapshot.get("Site3", "JobType")["Value"] == {}
+    # Only the first request of each site runs a query
+    assert jobDB.getCounters.call_count == 2
+    assert snapshot.getStats()["SynchronousQueries"] == 2
+
+    jobDB.getCounters.side_effect = None
+    jobDB.getCounters.return_value = S_ERROR("DB down")
+    assert not snapshot.get("Site2", "JobType")["OK"]
+
+
+def test_refresh(mocker):
+    mocker.patch.object(RunningJobsSnapshot, "_RunningJobsSnapshot__startRefresher")
+    now = [1000]
+    mocker.patch.object(moduleTested, "time").time.side_effect = lambda: now[0]
+    jobDB = MagicMock()
+    jobDB.getCounters.side_effect = getCounters
+    snapshot = RunningJobsSnapshot(jobDB, refreshInterval=10, maxAge=60)
+    snapshot.get("Site1", "JobType")
+    snapshot.get("Site2", "JobType")
+
+    # One query for both sites
+    jobDB.getCounters.reset_mock()
+    now[0] += 30
+    assert snapshot.refresh()["OK"]
+    jobDB.getCounters.assert_called_once()
+    assert sorted(jobDB.getCounters.call_args[0][2]["Site"]) == ["Site1", "Site2"]
+    assert snapshot.get("Site2", "JobType")["Value"] == {"Merge": 1}
+    stats = snapshot.getStats()
+    assert stats["Refreshes"] == 1
+    assert stats["Entries"] == 2
+    assert stats["MaxAge"] == 0
+
+    # The refresh fails: the old counters are used until they are too old
+    jobDB.getCounters.side_effect = None
+    jobDB.getCounters.return_value = S_ERROR("DB down")
+    now[0] += 30
+    assert not snapshot.refresh()["OK"]
+    assert snapshot.get("Site2", "JobType")["Value"] == {"Merge": 1}
+    assert snapshot.getStats()["FailedRefreshes"] == 1
+    assert snapshot.getStats()["MaxAge"] == 30
+    now[0] += 31
+    assert not snapshot.get("Site2", "JobType")["OK"]
@@ -0,0 +1,378 @@
+""" In-memory index of the task queue definitions, used by the TaskQueueDB to select
+    the task queues matching a resource without running the (expensive) match SQL query.
+
+    The index mirrors the semantics of the SQL generated by TaskQueueDB.__generateTQMatchSQL,
+    including the case insensitive comparison of the default MySQL collation.
+    Only the task queue definitions are kept in memory: the jobs are still extracted from the DB.
+"""
+import random
+import string
+import threading
+import time
+
+from DIRAC import gLogger, S_OK, S_ERROR
+from DIRAC.Core.Security import Properties
+from DIRAC.ConfigurationSystem.Client.Helpers import Registry
+
+# Same as in TaskQueueDB
+multiValueDefFields = ("Sites", "GridCEs", "BannedSites", "Platforms", "JobTypes", "Tags")
+multiValueMatchFields = ("GridCE", "Site", "Platform", "JobType", "Tag")
+bannedJobMatchFields = ("Site",)
+
+
+def _lowerAndRemovePunctuation(s):
+    table = str.maketrans("", "", string.punctuation)
+    return s.lower().translate(table)
+
+
+def _isAny(value):
+    """Check whether a match value is the special "any" value (or a list containing it)"""
+    if isinstance(value, str):
+        return _lowerAndRemovePunctuation(value) == "any"
+    if isinstance(value, (list, tuple)):
+        return any(_lowerAndRemovePunctuation(str(v)) == "any" for v in value)
+    return False
+
+
+def _norm(value):
+    """Normalize a value the way the MySQL default collation compares it"""
+    return str(value).strip().lower()
+
+
+def _normList(value):
+    """Normalize a single value or a list of values to a list of normalized values"""
+    if isinstance(value, (list, tuple)):
+        return [_norm(v) for v in value]
+    return [_norm(value)]
+
+
+class TaskQueueIndex:
+    """Index of the task queue definitions by setup, owner and multi value fields"""
+
+    def __init__(self, refreshInterval=30):
+        """C'tor
+
+        :param int refreshInterval: seconds after which the index has to be synchronized with the DB
+        """
+        self.log = gLogger.getSubLogger(self.__class__.__name__)
+        self.refreshInterval = refreshInterval
+        self.__lock = threading.RLock()
+        self.__refreshLock = threading.Lock()
+        self.__loaded = False
+        self.__lastRefresh = 0
+        # tqId -> definition
+        self.__tqs = {}
+        # Setup -> set( tqId )
+        self.__bySetup = {}
+        # field -> value -> set( tqId )
+        self.__byValue = {field: {} for field in multiValueDefFields}
+        # field -> set( tqId ) of TQs that do not define the field
+        self.__without = {field: set() for field in multiValueDefFields}
+        self.__stats = {"Matches": 0, "Candidates": 0, "Refreshes": 0}
+
+    def __len__(self):
+        return len(self.__tqs)
+
+    def __contains__(self, tqId):
+        return tqId in self.__tqs
+
+    def isStale(self):
+        """Check whether the index has to be synchronized with the DB"""
+        return time.time() - self.__lastRefresh > self.refreshInterval
+
+    def startRefresh(self):
+        """Take the right to synchronize the index. Only one thread refreshes at a time:
+        the others keep using the current content, unless the index was never loaded.
+
+        :return: True if the caller has to synchronize the index and call endRefresh
+        """
+        if not self.__refreshLock.acquire(blocking=not self.__loaded):
+            return False
+        if not self.isStale():
+            # Refreshed by another thread in the meantime
+            self.__refreshLock.release()
+            return False
+        return True
+
+    def endRefresh(self):
+        """Release the right to synchronize the index"""
+        self.__refreshLock.release()
+
+    def invalidate(self):
+        """Force a synchronization with the DB before the next match"""
+        self.__lastRefresh = 0
+
+    def getStats(self):
+        """Get the counters of the index
+
+        :return: dict
+        """
+        with self.__lock:
+            stats = dict(self.__stats)
+            stats["TaskQueues"] = len(self.__tqs)
+            stats["LastRefresh"] = self.__lastRefresh
+        return stats
+
+    def addTaskQueue(self, tqId, tqDefDict, priority=1):
+        """Add (or replace) a task queue in the index
+
+        :param int tqId: task queue ID
+        :param dict tqDefDict: task queue definition, with non escaped values
+        :param float priority: task queue priority
+        """
+        tqData = {
+            "OwnerDN": tqDefDict["OwnerDN"],
+            "OwnerGroup": tqDefDict["OwnerGroup"],
+            "Setup": _norm(tqDefDict["Setup"]),
+            "CPUTime": int(tqDefDict["CPUTime"]),
+            "Priority": float(priority),
+            "NormOwnerDN": _norm(tqDefDict["OwnerDN"]),
+            "NormOwnerGroup": _norm(tqDefDict["OwnerGroup"]),
+        }
+        for field in multiValueDefFields:
+            tqData[field] = {_norm(v) for v in tqDefDict.get(field, []) if str(v).strip()}
+        with self.__lock:
+            if tqId in self.__tqs:
+                self.__removeTaskQueue(tqId)
+            self.__tqs[tqId] = tqData
+            self.__bySetup.setdefault(tqData["Setup"], set()).add(tqId)
+            for field in multiValueDefFields:
+                if not tqData[field]:
+                    self.__without[field].add(tqId)
+                for value in tqData[field]:
+                    self.__byValue[field].setdefault(value, set()).add(tqId)
+
+    def removeTaskQueues(self, tqIdList):
+        """Remove task queues from the index
+
+        :param list tqIdList: list of task queue IDs
+        """
+        with self.__lock:
+            for tqId in tqIdList:
+                if tqId in self.__tqs:
+                    self.__removeTaskQueue(tqId)
+
+    def __removeTaskQueue(self, tqId):
+        tqData = self.__tqs.pop(tqId)
+        setupTQs = self.__bySetup.get(tqData["Setup"], set())
+        setupTQs.discard(tqId)
+        if not setupTQs:
+            self.__bySetup.pop(tqData["Setup"], None)
+        for field in multiValueDefFields:
+            self.__without[field].discard(tqId)
+            for value in tqData[field]:
+                valueTQs = self.__byValue[field][value]
+                valueTQs.discard(tqId)
+                if not valueTQs:
+                    del self.__byValue[field][value]
+
+    def setPriority(self, tqIdList, priority):
+        """Update the priority of task queues
+
+        :param list tqIdList: list of task queue IDs
+        :param float priority: new priority
+        """
+        with self.__lock:
+            for tqId in tqIdList:
+                if tqId in self.__tqs:
+                    self.__tqs[tqId]["Priority"] = float(priority)
+
+    def sync(self, priorities, newTQDefinitions):
+        """Synchronize the index with the content of the DB
+
+        :param dict priorities: { tqId : priority } for all the task queues in the DB
+        :param dict newTQDefinitions: { tqId : tqDefDict } for the task queues not yet in the index
+        """
+        with self.__lock:
+            toRemove = [tqId for tqId in self.__tqs if tqId not in priorities]
+            self.removeTaskQueues(toRemove)
+            for tqId, tqDefDict in newTQDefinitions.items():
+                self.addTaskQueue(tqId, tqDefDict, priorities[tqId])
+            for tqId, priority in priorities.items():
+                if tqId in self.__tqs:
+                    self.__tqs[tqId]["Priority"] = float(priority)
+            self.__lastRefresh = time.time()
+            self.__loaded = True
+            self.__stats["Refreshes"] += 1
+        self.log.verbose(
+            "Task queue index synchronized",
+            "(%d TQs, %d added, %d removed)" % (len(self.__tqs), len(newTQDefinitions), len(toRemove)),
+        )
+
+    def __candidatesForField(self, field, values):
+        """TQs not defining the field or having any of the values for it"""
+        candidates = set(self.__without[field])
+        for value in values:
+            candidates |= self.__byValue[field].get(value, set())
+        return candidates
+
+    def match(self, tqMatchDict, numQueuesToGet=1, negativeCond=None):
+        """Get the task queues matching the requirements, ordered like the SQL match does
+
+        :param dict tqMatchDict: resource description, with non escaped values
+        :param int numQueuesToGet: maximum number of task queues to return (0 for all)
+        :param negativeCond: dict or list of dicts of conditions the task queues must not fulfill
+
+        :return: S_OK( [ ( tqId, OwnerDN, OwnerGroup ) ] ) / S_ERROR
+        """
+        tqMatchDict = dict(tqMatchDict)
+        if "Tag" not in tqMatchDict and "RequiredTag" not in tqMatchDict:
+            tqMatchDict["Tag"] = []
+
+        tagValues = tqMatchDict.get("Tag", [])
+        if isinstance(tagValues, str):
+            tagValues = [tagValues]
+        requiredTags = tqMatchDict.get("RequiredTag", [])
+        if isinstance(requiredTags, str):
+            requiredTags = [requiredTags]
+        if requiredTags and not _isAny(requiredTags):
+            if not set(requiredTags).issubset(set(tagValues)):
+                return S_ERROR("Wrong conditions")
+            requiredTags = [_norm(tag) for tag in requiredTags]
+        else:
+            requiredTags = []
+
+        with self.__lock:
+            # Pre-select candidates using the inverted indexes
+            if "Setup" in tqMatchDict:
+                candidates = set()
+                for setup in _normList(tqMatchDict["Setup"]):
+                    candidates |= self.__bySetup.get(setup, set())
+            else:
+                candidates = set(self.__tqs)
+
+            for field in multiValueMatchFields:
+                if field == "Tag" or field not in tqMatchDict:
+                    continue
+                fieldValue = tqMatchDict[field]
+                if not fieldValue or _isAny(fieldValue):
+                    continue
+                candidates &= self.__candidatesForField("%ss" % field, _normList(fieldValue))
+
+            ownerCond = self.__getOwnerCondition(tqMatchDict)
+            checks = self.__getChecks(tqMatchDict, tagValues, requiredTags)
+            negCond = self.__getNegativeCondition(negativeCond) if negativeCond else None
+
+            matching = []
+            for tqId in candidates:
+                tqData = self.__tqs[tqId]
+                if ownerCond and not ownerCond(tqData):
+                    continue
+                if not all(check(tqData) for check in checks):
+                    continue
+                if negCond and not negCond(tqData):
+                    continue
+                matching.append((tqId, tqData["OwnerDN"], tqData["OwnerGroup"], tqData["Priority"]))
+            self.__stats["Matches"] += 1
+            self.__stats["Candidates"] += len(candidates)
+
+        # Apply priorities: ORDER BY RAND() / Priority ASC (NULL, i.e. priority 0, first)
+        matching.sort(key=lambda tq: random.random() / tq[3] if tq[3] else float("-inf"))
+        if numQueuesToGet:
+            matching = matching[:numQueuesToGet]
+        return S_OK([tq[:3] for tq in matching])
+
+    @staticmethod
+    def __getOwnerCondition(tqMatchDict):
+        """Build the owner condition, or None if there is none"""
+        if "OwnerDN" in tqMatchDict and "OwnerGroup" in tqMatchDict:
+            groups = tqMatchDict["OwnerGroup"]
+            if not isinstance(groups, (list, tuple)):
+                groups = [groups]
+            dns = _normList(tqMatchDict["OwnerDN"])
+            sharingGroups = set()
+            ownerPairs = set()
+            for group in groups:
+                if Properties.JOB_SHARING in Registry.getPropertiesForGroup(group):
+                    sharingGroups.add(_norm(group))
+                else:
+                    ownerPairs.update((dn, _norm(group)) for dn in dns)
+            return lambda tqData: (
+                tqData["NormOwnerGroup"] in sharingGroups
+                or (tqData["NormOwnerDN"], tqData["NormOwnerGroup"]) in ownerPairs
+            )
+
+        conds = []
+        for field in ("OwnerGroup", "OwnerDN"):
+            if field in tqMatchDict:
+                values = set(_normList(tqMatchDict[field]))
+                conds.append(lambda tqData, field=field, values=values: tqData["Norm%s" % field] in values)
+        if not conds:
+            return None
+        return lambda tqData: all(cond(tqData) for cond in conds)
+
+    @staticmethod
+    def __getChecks(tqMatchDict, tagValues, requiredTags):
+        """Build the list of conditions not covered by the inverted indexes"""
+        checks = []
+        if "CPUTime" in tqMatchDict:
+            cpuTimes = tqMatchDict["CPUTime"]
+            if not isinstance(cpuTimes, (list, tuple)):
+                cpuTimes = [cpuTimes]
+            maxCPUTime = max(int(cpuTime) for cpuTime in cpuTimes)
+            checks.append(lambda tqData: tqData["CPUTime"] <= maxCPUTime)
+
+        # Tags: all the TQ tags have to be provided by the resource
+        if "Tag" in tqMatchDict and not _isAny(tagValues):
+            tags = {_norm(tag) for tag in tagValues}
+            checks.append(lambda tqData: tqData["Tags"].issubset(tags))
+
+        # Jobs banning the site
+        for field in bannedJobMatchFields:
+            fieldValue = tqMatchDict.get(field)
+            if not fieldValue or _isAny(fieldValue):
+                continue
+            values = _normList(fieldValue)
+            checks.append(
+                lambda tqData, field=field, values=values: any(
+                    value not in tqData["Banned%ss" % field] for value in values
+                )
+            )
+
+        # Required tags: the TQ has to ask for all of them
+        if requiredTags:
+            checks.append(lambda tqData: sum(1 for tag in requiredTags if tag in tqData["Tags"]) == len(requiredTags))
+
+        # Resources banned by the resource description
+        for field in multiValueMatchFields:
+            bannedValue = tqMatchDict.get("Banned%s" % field)
+            if not bannedValue or _isAny(bannedValue):
+                continue
+            values = _normList(bannedValue)
+            checks.append(
+                lambda tqData, field=field, values=values: any(value not in tqData["%ss" % field] for value in values)
+            )
+        return checks
+
+    @classmethod
+    def __getNegativeCondition(cls, negativeCond):
+        """Negative conditions can be a dict or a list of dicts (OR of dicts)"""
+        if isinstance(negativeCond, (list, tuple)):
+            conds = [cls.__getNegativeDictCondition(condDict) for condDict in negativeCond]
+            return lambda tqData: any(cond(tqData) for cond in conds)
+        if isinstance(negativeCond, dict):
+            return cls.__getNegativeDictCondition(negativeCond)
+        raise RuntimeError(
+            "negativeCond has to be either a list or a dict or a tuple, and it's %s" % type(negativeCond)
+        )
+
+    @staticmethod
+    def __getNegativeDictCondition(negativeCond):
+        """not ( cond1 and cond2 ) = ( not cond1 or not cond2 )"""
+        condList = []
+        for field, values in negativeCond.items():
+            if field in multiValueMatchFields:
+                values = _normList(values)
+                condList.append(
+                    lambda tqData, field=field, values=values: all(
+                        value not in tqData["%ss" % field] for value in values
+                    )
+                )
+            elif field in ("OwnerDN", "OwnerGroup", "Setup"):
+                normField = "Norm%s" % field if field != "Setup" else field
+                for value in values:
+                    condList.append(lambda tqData, normField=normField, value=_norm(value): tqData[normField] != value)
+            elif field == "CPUTime":
+                for value in values:
+                    condList.append(lambda tqData, value=int(value): tqData["CPUTime"] != value)
+        return lambda tqData: any(cond(tqData) for cond in condList)
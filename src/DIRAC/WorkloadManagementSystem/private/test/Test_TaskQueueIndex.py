@@ -0,0 +1,126 @@
+""" Test class for the in-memory TaskQueueIndex
+
+    The expected results are the same as for the SQL match in
+    tests/Integration/WorkloadManagementSystem/Test_TaskQueueDB.py
+"""
+import pytest
+
+from DIRAC.WorkloadManagementSystem.private import TaskQueueIndex as moduleTested
+from DIRAC.WorkloadManagementSystem.private.TaskQueueIndex import TaskQueueIndex
+
+baseTQ = {"OwnerDN": "/my/DN", "OwnerGroup": "myGroup", "Setup": "aSetup", "CPUTime": 86400}
+
+tqDefinitions = {
+    1: {},
+    2: {"Sites": ["LCG.CERN.ch"]},
+    3: {"Sites": ["CLOUD.IN2P3.fr"]},
+    4: {"Sites": ["LCG.CERN.ch", "CLOUD.IN2P3.fr"], "BannedSites": ["LCG.CERN.ch"]},
+    5: {"BannedSites": ["CLOUD.IN2P3.fr"]},
+    6: {"Platforms": ["centos7"], "Tags": ["MultiProcessor"]},
+    7: {"Tags": ["MultiProcessor", "GPU"], "JobTypes": ["User"]},
+    8: {"CPUTime": 360, "OwnerDN": "/other/DN", "OwnerGroup": "otherGroup"},
+    9: {"Setup": "anotherSetup"},
+}
+
+
+@pytest.fixture
+def tqIndex(mocker):
+    mocker.patch.object(moduleTested.Registry, "getPropertiesForGroup", return_value=[])
+    index = TaskQueueIndex()
+    for tqId, tqDef in tqDefinitions.items():
+        tqDefDict = dict(baseTQ)
+        tqDefDict.update(tqDef)
+        index.addTaskQueue(tqId, tqDefDict, priority=1)
+    return index
+
+
+def _match(index, matchDict, negativeCond=None):
+    result = index.match(matchDict, numQueuesToGet=0, negativeCond=negativeCond)
+    assert result["OK"], result
+    return {tq[0] for tq in result["Value"]}
+
+
+@pytest.mark.parametrize(
+    "matchDict, expected",
+    [
+        ({"Setup": "aSetup", "CPUTime": 86400}, {1, 2, 3, 4, 5, 8}),
+        ({"Setup": "aSetup", "CPUTime": 3600}, {8}),
+        ({"Setup": "ASETUP ", "CPUTime": 86400}, {1, 2, 3, 4, 5, 8}),
+        ({"Setup": "aSetup", "CPUTime": 86400, "Site": "LCG.CERN.ch"}, {1, 2, 5, 8}),
+        ({"Setup": "aSetup", "CPUTime": 86400, "Site": "CLOUD.IN2P3.fr"}, {1, 3, 4, 8}),
+        ({"Setup": "aSetup", "CPUTime": 86400, "Site": ["LCG.CERN.ch", "CLOUD.IN2P3.fr"]}, {1, 2, 3, 4, 5, 8}),
+        ({"Setup": "aSetup", "CPUTime": 86400, "Site": "Any"}, {1, 2, 3, 4, 5, 8}),
+        ({"Setup": "aSetup", "CPUTime": 86400, "BannedSite": ["LCG.CERN.ch"]}, {1, 3, 5, 8}),
+        ({"Setup": "aSetup", "CPUTime": 86400, "Tag": "MultiProcessor"}, {1, 2, 3, 4, 5, 6, 8}),
+        ({"Setup": "aSetup", "CPUTime": 86400, "Tag": ["MultiProcessor", "GPU"]}, {1, 2, 3, 4, 5, 6, 7, 8}),
+        ({"Setup": "aSetup", "CPUTime": 86400, "Tag": "any"}, {1, 2, 3, 4, 5, 6, 7, 8}),
+        ({"Setup": "aSetup", "CPUTime": 86400, "Tag": ["MultiProcessor"], "RequiredTag": ["MultiProcessor"]}, {6}),
+        ({"Setup": "aSetup", "CPUTime": 86400, "Tag": "MultiProcessor", "Platform": "slc6"}, {1, 2, 3, 4, 5, 8}),
+        ({"Setup": "aSetup", "CPUTime": 86400, "Tag": "MultiProcessor", "Platform": "centos7"}, {1, 2, 3, 4, 5, 6, 8}),
+        (
+            {"Setup": "aSetup", "CPUTime": 86400, "Tag": ["MultiProcessor", "GPU"], "JobType": "MC"},
+            {1, 2, 3, 4, 5, 6, 8},
+        ),
+        ({"Setup": "aSetup", "CPUTime": 86400, "OwnerGroup": "otherGroup"}, {8}),
+        ({"Setup": "aSetup", "CPUTime": 86400, "OwnerDN": "/my/DN", "OwnerGroup": "myGroup"}, {1, 2, 3, 4, 5}),
+        ({"Setup": "anotherSetup", "CPUTime": 86400}, {9}),
+    ],
+)
+def test_match(tqIndex, matchDict, expected):
+    assert _match(tqIndex, matchDict) == expected
+
+
+def test_wrongRequiredTags(tqIndex):
+    result = tqIndex.match({"Setup": "aSetup", "CPUTime": 86400, "Tag": ["GPU"], "RequiredTag": ["MultiProcessor"]})
+    assert not result["OK"]
+
+
+def test_jobSharing(tqIndex, mocker):
+    mocker.patch.object(moduleTested.Registry, "getPropertiesForGroup", return_value=["JobSharing"])
+    assert _match(tqIndex, {"Setup": "aSetup", "CPUTime": 86400, "OwnerDN": "/any/DN", "OwnerGroup": "myGroup"}) == {
+        1,
+        2,
+        3,
+        4,
+        5,
+    }
+
+
+@pytest.mark.parametrize(
+    "negativeCond, expected",
+    [
+        ({"Site": "LCG.CERN.ch"}, {1, 3, 5, 8}),
+        ({"Site": ["LCG.CERN.ch", "CLOUD.IN2P3.fr"]}, {1, 5, 8}),
+        ({"Site": "LCG.CERN.ch", "OwnerGroup": ["otherGroup"]}, {1, 2, 3, 4, 5, 8}),
+        ({"Site": "LCG.CERN.ch", "OwnerGroup": ["myGroup"]}, {1, 3, 5, 8}),
+        ([{"Site": "LCG.CERN.ch"}, {"Site": "CLOUD.IN2P3.fr"}], {1, 2, 3, 5, 8}),
+    ],
+)
+def test_negativeCond(tqIndex, negativeCond, expected):
+    assert _match(tqIndex, {"Setup": "aSetup", "CPUTime": 86400}, negativeCond=negativeCond) == expected
+
+
+def test_priorities(tqIndex):
+    tqIndex.setPriority([1, 2, 3, 4, 5], 0.001)
+    tqIndex.setPriority([8], 1000)
+    result = tqIndex.match({"Setup": "aSetup", "CPUTime": 86400}, numQueuesToGet=1)
+    assert result["OK"]
+    assert result["Value"] == [(8, "/other/DN", "otherGroup")]
+
+
+def test_sync(tqIndex):
+    assert tqIndex.isStale()
+    priorities = {tqId: 1 for tqId in tqDefinitions if tqId != 2}
+    priorities[10] = 1
+    newTQ = dict(baseTQ)
+    newTQ["Sites"] = ["LCG.CERN.ch"]
+    tqIndex.sync(priorities, {10: newTQ})
+    assert not tqIndex.isStale()
+    assert 2 not in tqIndex
+    assert _match(tqIndex, {"Setup": "aSetup", "CPUTime": 86400, "Site": "LCG.CERN.ch"}) == {1, 5, 8, 10}
+
+    tqIndex.removeTaskQueues([10, 5])
+    assert _match(tqIndex, {"Setup": "aSetup", "CPUTime": 86400, "Site": "LCG.CERN.ch"}) == {1, 8}
+    assert len(tqIndex) == len(tqDefinitions) - 2
+    tqIndex.invalidate()
+    assert tqIndex.isStale()
@@ -6,6 +6,7 @@
 # pylint: disable=invalid-name,wrong-import-position
 import csv
 import filecmp
+import gzip
 
 import os
 import unittest
@@ -345,6 +346,12 @@ class FileCase(DFCTestCase):
         result = self.dfc.getSEDump("testSE", actualDumpFn)
         self.assertTrue(result["OK"], "Error when getting SE dump %s" % result)
         self.assertTrue(filecmp.cmp(expectedDumpFn, actualDumpFn), "Did not get the expected SE Dump")
+        os.remove(actualDumpFn)
+
+        result = self.dfc.getSEDump("testSE", actualDumpFn, compressed=True)
+        self.assertTrue(result["OK"], "Error when getting compressed SE dump %s" % result)
+        with open(expectedDumpFn, "rb") as expectedDumpFd, gzip.open(actualDumpFn, "rb") as actualDumpFd:
+            self.assertEqual(expectedDumpFd.read(), actualDumpFd.read(), "Did not get the expected compressed SE Dump")
         os.remove(expectedDumpFn)
         os.remove(actualDumpFn)
 
@@ -441,6 +441,14 @@ class FileCase(FileCatalogDBTestCase):
             result["Value"], (("testSE", testFile, "0", 123),), "Did not get the expected SE Dump %s" % result["Value"]
         )
 
+        result = self.db.getSEDumpPage("testSE", pageSize=1)
+        self.assertTrue(result["OK"], "Error when getting SE dump page %s" % result)
+        files, lastRepID = result["Value"]
+        self.assertEqual(files, [("testSE", testFile, "0", 123)], "Did not get the expected SE Dump page %s" % files)
+        result = self.db.getSEDumpPage("testSE", lastRepID=lastRepID, pageSize=1)
+        self.assertTrue(result["OK"], "Error when getting SE dump page %s" % result)
+        self.assertEqual(result["Value"], ([], lastRepID), "The last SE Dump page should be empty %s" % result)
+
         result = self.db.removeFile([testFile, nonExistingFile], credDict)
         self.assertTrue(result["OK"], "removeFile failed: %s" % result)
         self.assertTrue(
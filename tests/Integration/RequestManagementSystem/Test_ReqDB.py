@@ -11,6 +11,7 @@ from pytest import fixture
 
 from DIRAC.RequestManagementSystem.DB.RequestDB import RequestDB
 from DIRAC.RequestManagementSystem.DB.test.RMSTestScenari import (
+    test_claim,
     test_dirty,
     test_scheduled,
     test_stress,
@@ -484,3 +484,68 @@ def test_matcher(wmsClient: WMSClient):
     print(res)
     assert res["OK"], res["Message"]
     wmsClient.deleteJob(jobID)
+
+
+def test_matcherBulk(wmsClient: WMSClient):
+    # insert a proper DN to run the test
+    resourceDescription = {
+        "OwnerGroup": "prod",
+        "OwnerDN": "/C=ch/O=DIRAC/OU=DIRAC CI/CN=ciuser",
+        "DIRACVersion": "pippo",
+        "GridCE": "some.grid.ce.org",
+        "ReleaseVersion": "blabla",
+        "VirtualOrganization": "LHCb",
+        "PilotInfoReportedFlag": "True",
+        "PilotBenchmark": "anotherPilot",
+        "Site": "DIRAC.Jenkins.ch",
+        "CPUTime": 86400,
+    }
+    tqDefDict = {
+        "OwnerDN": "/C=ch/O=DIRAC/OU=DIRAC CI/CN=ciuser",
+        "OwnerGroup": "prod",
+        "Setup": "dirac-JenkinsSetup",
+        "CPUTime": 86400,
+    }
+    tqDB = TaskQueueDB()
+
+    jobIDs = []
+    for _ in range(3):
+        job = helloWorldJob()
+        job.setDestination("DIRAC.Jenkins.ch")
+        job.setInputData("/a/bbb")
+        job.setType("User")
+        jobDescription = createFile(job)
+        res = wmsClient.submitJob(job._toJDL(xmlFile=jobDescription))
+        assert res["OK"], res["Message"]
+        jobID = res["Value"]
+        jobIDs.append(jobID)
+
+        # forcing the update
+        res = JobStateUpdateClient().setJobStatus(jobID, JobStatus.WAITING, "matching", "source", None, True)
+        assert res["OK"], res["Message"]
+        res = tqDB.insertJob(jobID, tqDefDict, 10)
+        assert res["OK"], res["Message"]
+
+    res = MatcherClient().requestJobs(resourceDescription, 2)
+    assert res["OK"], res["Message"]
+    assert len(res["Value"]) == 2
+    matchedJobIDs = [jobDict["JobID"] for jobDict in res["Value"]]
+    assert set(matchedJobIDs) < set(jobIDs)
+    for jobDict in res["Value"]:
+        assert jobDict["JDL"]
+        assert jobDict["Group"] == "prod"
+
+    res = JobMonitoringClient().getJobsStatus(matchedJobIDs)
+    assert res["OK"], res["Message"]
+    for jobID in matchedJobIDs:
+        assert res["Value"][jobID]["Status"] == JobStatus.MATCHED
+
+    # Only one job is left
+    res = MatcherClient().requestJobs(resourceDescription, 2)
+    assert res["OK"], res["Message"]
+    assert [jobDict["JobID"] for jobDict in res["Value"]] == list(set(jobIDs) - set(matchedJobIDs))
+
+    res = MatcherClient().requestJobs(resourceDescription, 0)
+    assert not res["OK"]
+
+    wmsClient.deleteJob(jobIDs)
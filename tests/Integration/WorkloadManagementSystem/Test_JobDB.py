@@ -266,6 +266,38 @@ def test_heartBeatLogging(jobDB):
     assert not res["Value"], str(res)
 
 
+def test_heartBeatLoggingBulk(jobDB):
+
+    jobIDs = []
+    for _ in range(2):
+        res = jobDB.insertNewJobIntoDB(jdl, "owner", "/DN/OF/owner", "ownerGroup", "someSetup")
+        assert res["OK"] is True, res["Message"]
+        jobIDs.append(res["JobID"])
+
+    now = datetime.utcnow().replace(microsecond=0)
+    res = jobDB.setHeartBeatDataBulk(
+        {
+            jobIDs[0]: (now, now, True, {"CPU": 2345, "Memory": 5555}),
+            jobIDs[1]: ("2022-01-01 00:00:00", now, False, {}),
+        }
+    )
+    assert res["OK"] is True, res["Message"]
+
+    res = jobDB.getJobsAttributes(jobIDs, ["Status", "HeartBeatTime"])
+    assert res["OK"] is True, res["Message"]
+    assert res["Value"][jobIDs[0]]["Status"] == JobStatus.RUNNING
+    assert res["Value"][jobIDs[0]]["HeartBeatTime"] == str(now)
+    assert res["Value"][jobIDs[1]]["Status"] != JobStatus.RUNNING
+    assert res["Value"][jobIDs[1]]["HeartBeatTime"] == "2022-01-01 00:00:00"
+
+    res = jobDB.getHeartBeatData(jobIDs[0])
+    assert res["OK"] is True, res["Message"]
+    assert sorted((name, value) for name, value, _hbt in res["Value"]) == [("CPU", "2345.0"), ("Memory", "5555.0")]
+    res = jobDB.getHeartBeatData(jobIDs[1])
+    assert res["OK"] is True, res["Message"]
+    assert not res["Value"], str(res)
+
+
 def test_jobParameters(jobDB):
     res = jobDB.insertNewJobIntoDB(jdl, "owner", "/DN/OF/owner", "ownerGroup", "someSetup")
     assert res["OK"] is True, res["Message"]
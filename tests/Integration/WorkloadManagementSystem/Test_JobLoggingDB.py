@@ -48,3 +48,22 @@ def test_JobStatus(jobLoggingDB: JobLoggingDB):
     assert result["OK"] is True, result["Message"]
 
     jobLoggingDB.deleteJob(1)
+
+
+def test_JobStatusBulk(jobLoggingDB: JobLoggingDB):
+
+    jobIDs = [2, 3, 4]
+    result = jobLoggingDB.addLoggingRecord(
+        jobIDs, status="testing", minorStatus="bulk", applicationStatus="app", source="Unittest"
+    )
+    assert result["OK"] is True, result["Message"]
+
+    for jobID in jobIDs:
+        result = jobLoggingDB.getJobLoggingInfo(jobID)
+        assert result["OK"] is True, result["Message"]
+        assert len(result["Value"]) == 1
+        assert result["Value"][0][:3] == ("testing", "bulk", "app")
+        assert result["Value"][0][4] == "Unittest"
+
+    for jobID in jobIDs:
+        jobLoggingDB.deleteJob(jobID)
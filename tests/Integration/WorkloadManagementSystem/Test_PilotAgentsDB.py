@@ -94,6 +94,37 @@ def test_basic():
     # FIXME: to expand...
 
 
+def test_setJobsForPilot():
+    """several jobs are given to a pilot at once"""
+    res = paDB.addPilotTQReference(
+        ["pilotRef"],
+        123,
+        "ownerDN",
+        "ownerGroup",
+    )
+    assert res["OK"] is True, res["Message"]
+
+    res = paDB.setJobsForPilot([], "pilotRef")
+    assert res["OK"] is True, res["Message"]
+    res = paDB.setJobsForPilot([1001, 1002], "pilotRef", site="testSite")
+    assert res["OK"] is True, res["Message"]
+    res = paDB.setJobsForPilot([1003], "pilotRef", updateStatus=False)
+    assert res["OK"] is True, res["Message"]
+
+    res = paDB.getPilotInfo("pilotRef")
+    assert res["OK"] is True, res["Message"]
+    pilotInfo = res["Value"]["pilotRef"]
+    assert sorted(pilotInfo["Jobs"]) == [1001, 1002, 1003]
+    assert pilotInfo["Status"] == "Running"
+    assert pilotInfo["GridSite"] == "testSite"
+
+    res = paDB.setJobsForPilot([1004], "unknownPilotRef")
+    assert res["OK"] is False
+
+    res = paDB.deletePilot("pilotRef")
+    assert res["OK"] is True, res["Message"]
+
+
 @patch("DIRAC.WorkloadManagementSystem.DB.PilotAgentsDB.getVOForGroup")
 def test_getGroupedPilotSummary(mocked_fcn):
     """
@@ -171,6 +171,111 @@ def test_chainWithSites():
         assert result["OK"] is True
 
 
+def test_getMatchingTaskQueuesBulk():
+    """the bulk matching gives the same task queues as matching the resources one by one"""
+    tqDefDicts = [
+        {"OwnerDN": "/my/DN", "OwnerGroup": "myGroup", "Setup": "aSetup", "CPUTime": 5000},
+        {"OwnerDN": "/my/DN", "OwnerGroup": "myGroup", "Setup": "aSetup", "CPUTime": 5000, "Sites": ["LCG.CERN.ch"]},
+        {"OwnerDN": "/my/DN", "OwnerGroup": "myGroup", "Setup": "aSetup", "CPUTime": 50000, "Tags": ["MultiProcessor"]},
+        {
+            "OwnerDN": "/my/DN",
+            "OwnerGroup": "myGroup",
+            "Setup": "aSetup",
+            "CPUTime": 5000,
+            "BannedSites": ["LCG.CERN.ch"],
+        },
+    ]
+    jobIDs = list(range(251, 251 + len(tqDefDicts)))
+    for jobID, tqDefDict in zip(jobIDs, tqDefDicts):
+        result = tqDB.insertJob(jobID, tqDefDict, 10)
+        assert result["OK"] is True
+
+    resources = {
+        "any": {"Setup": "aSetup", "CPUTime": 500000},
+        "cern": {"Setup": "aSetup", "CPUTime": 50000, "Site": "LCG.CERN.ch"},
+        "in2p3": {"Setup": "aSetup", "CPUTime": 50000, "Site": "CLOUD.IN2P3.fr", "Tag": ["MultiProcessor"]},
+        "short": {"Setup": "aSetup", "CPUTime": 5000, "Site": "CLOUD.IN2P3.fr"},
+        "notCern": {"Setup": "aSetup", "CPUTime": 50000},
+        "wrong": {"Setup": "aSetup", "CPUTime": 50000, "Tag": [], "RequiredTag": ["GPU"]},
+    }
+    negativeConds = {"notCern": {"Site": ["LCG.CERN.ch"]}}
+    result = tqDB.getMatchingTaskQueuesBulk(resources, negativeConds=negativeConds)
+    assert result["OK"] is True
+    assert set(result["Value"]["Failed"]) == {"wrong"}
+    for name, resourceDict in resources.items():
+        if name == "wrong":
+            continue
+        expected = tqDB.getMatchingTaskQueues(resourceDict, negativeCond=negativeConds.get(name, {}))
+        assert expected["OK"] is True
+        assert result["Value"]["Successful"][name] == expected["Value"]
+    assert len(result["Value"]["Successful"]["cern"]) == 2
+
+    for jobID in jobIDs:
+        result = tqDB.deleteJob(jobID)
+        assert result["OK"] is True
+    result = tqDB.cleanOrphanedTaskQueues()
+    assert result["OK"] is True
+
+
+def test_matchAndGetJobs():
+    """several jobs are taken out of the matching task queues in one call"""
+    tqDefDicts = [
+        {"OwnerDN": "/my/DN", "OwnerGroup": "myGroup", "Setup": "aSetup", "CPUTime": 5000},
+        {"OwnerDN": "/my/DN", "OwnerGroup": "myGroup", "Setup": "aSetup", "CPUTime": 5000, "Sites": ["LCG.CERN.ch"]},
+    ]
+    for jobID in range(261, 267):
+        result = tqDB.insertJob(jobID, tqDefDicts[jobID % 2], 10)
+        assert result["OK"] is True
+    result = tqDB.getTaskQueueForJobs(list(range(261, 267)))
+    assert result["OK"] is True
+    jobIDs = result["Value"]
+
+    # Only the jobs that can run anywhere match
+    result = tqDB.matchAndGetJobs({"Setup": "aSetup", "CPUTime": 50000, "Site": "CLOUD.IN2P3.fr"}, 2)
+    assert result["OK"] is True
+    assert result["Value"]["matchFound"] is True
+    matched = result["Value"]["jobs"]
+    assert len(matched) == 2
+    for jobID, tqID in matched:
+        assert jobID in (262, 264, 266)
+        assert jobIDs[jobID] == tqID
+
+    # The jobs are taken out of the task queues: only what is left is matched
+    result = tqDB.matchAndGetJobs({"Setup": "aSetup", "CPUTime": 50000, "Site": "LCG.CERN.ch"}, 10)
+    assert result["OK"] is True
+    assert result["Value"]["matchFound"] is True
+    matched += result["Value"]["jobs"]
+    assert sorted(jobID for jobID, _tqID in matched) == list(range(261, 267))
+
+    result = tqDB.matchAndGetJobs({"Setup": "aSetup", "CPUTime": 50000, "Site": "LCG.CERN.ch"}, 10)
+    assert result["OK"] is True
+    assert result["Value"]["matchFound"] is False
+    assert result["Value"]["jobs"] == []
+
+    for tqID in set(jobIDs.values()):
+        result = tqDB.deleteTaskQueueIfEmpty(tqID)
+        assert result["OK"] is True
+    result = tqDB.cleanOrphanedTaskQueues()
+    assert result["OK"] is True
+
+
+def test_matchAndGetJobsWithJobID():
+    """a resource asking for a given job only gets that one"""
+    tqDefDict = {"OwnerDN": "/my/DN", "OwnerGroup": "myGroup", "Setup": "aSetup", "CPUTime": 5000}
+    for jobID in (271, 272):
+        result = tqDB.insertJob(jobID, tqDefDict, 10)
+        assert result["OK"] is True
+
+    result = tqDB.matchAndGetJobs({"Setup": "aSetup", "CPUTime": 50000, "JobID": 272}, 2)
+    assert result["OK"] is True
+    assert [jobID for jobID, _tqID in result["Value"]["jobs"]] == [272]
+
+    result = tqDB.deleteJob(271)
+    assert result["OK"] is True
+    result = tqDB.cleanOrphanedTaskQueues()
+    assert result["OK"] is True
+
+
 def test_chainWithBannedSites():
     """put - remove with parameters including Banned sites"""
     tqDefDict = {
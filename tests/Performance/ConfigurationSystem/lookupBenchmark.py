@@ -0,0 +1,94 @@
+""" Benchmark of the gConfig lookups, with and without the cache of the lookups
+
+    A configuration with a Resources section of about size queues is loaded, and the lookups done by the
+    SiteDirector and the Matcher for each queue are repeated: typed getValue calls with a default, for
+    existing and missing options, and getOptionsDict of the queue sections.
+
+    The number of lookups per second (best of the repetitions) is printed without the cache, as if
+    DIRAC_NO_CFG_LOOKUP_CACHE was set, and with it.
+
+    Run it with::
+
+        python tests/Performance/ConfigurationSystem/lookupBenchmark.py [size] [repetitions]
+
+    By default the configuration has 1000 queues, and each measurement is repeated 5 times.
+"""
+import sys
+import time
+
+from diraccfg import CFG
+
+from DIRAC import gConfig
+from DIRAC.ConfigurationSystem.Client.ConfigurationData import gConfigurationData
+
+
+def loadConfiguration(size):
+    """Load a configuration with about size queues, 5 per CE and 4 CEs per site
+
+    :return: list of the queue sections
+    """
+    lines = ["Resources", "{", "Sites", "{", "LCG", "{"]
+    queueSections = []
+    for siteIndex in range(max(1, size // 20)):
+        siteName = "LCG.Site%d.org" % siteIndex
+        lines += [siteName, "{", "Name = SITE%d" % siteIndex, "CEs", "{"]
+        for ceIndex in range(4):
+            ceName = "ce%d.site%d.org" % (ceIndex, siteIndex)
+            lines += [ceName, "{", "CEType = HTCondorCE", "architecture = x86_64", "OS = EL9", "Queues", "{"]
+            for queueIndex in range(5):
+                queueName = "queue%d" % queueIndex
+                lines += [queueName, "{", "maxCPUTime = 2880", "SI00 = 3100", "MaxTotalJobs = 5000"]
+                lines += ["MaxWaitingJobs = 200", "Tag = MultiProcessor, WholeNode", "}"]
+                queueSections.append("/Resources/Sites/LCG/%s/CEs/%s/Queues/%s" % (siteName, ceName, queueName))
+            lines += ["}", "}"]
+        lines += ["}", "}"]
+    lines += ["}", "}", "}"]
+    cfg = CFG()
+    cfg.loadFromBuffer("\n".join(lines))
+    gConfig.loadCFG(cfg)
+    return queueSections
+
+
+def lookups(queueSections):
+    """Lookups done for each queue
+
+    :return: number of lookups
+    """
+    for queueSection in queueSections:
+        gConfig.getValue("%s/maxCPUTime" % queueSection, 0)
+        gConfig.getValue("%s/SI00" % queueSection, 0.0)
+        gConfig.getValue("%s/MaxTotalJobs" % queueSection, 10)
+        gConfig.getValue("%s/Tag" % queueSection, [])
+        gConfig.getValue("%s/LocalCEType" % queueSection, "")
+        gConfig.getValue("%s/WholeNode" % queueSection, False)
+        gConfig.getOptionsDict(queueSection)
+    return 7 * len(queueSections)
+
+
+def lookupRate(queueSections, repetitions):
+    """Best number of lookups per second"""
+    best = None
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        count = lookups(queueSections)
+        rate = count / (time.perf_counter() - start)
+        best = rate if best is None else max(best, rate)
+    return best
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    repetitions = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    queueSections = loadConfiguration(size)
+    print("%-10s %10s %16s" % ("Cache", "Queues", "Lookups/s"))
+    for enabled in (False, True):
+        gConfigurationData.lookupCacheEnabled = enabled
+        print(
+            "%-10s %10d %16.0f"
+            % ("yes" if enabled else "no", len(queueSections), lookupRate(queueSections, repetitions))
+        )
+
+
+if __name__ == "__main__":
+    main()
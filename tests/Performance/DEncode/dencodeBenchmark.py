@@ -0,0 +1,141 @@
+""" Benchmark of the DEncode encoding and decoding, on payloads looking like real RPC replies:
+
+    * replicas: reply of getReplicas, {lfn: {SE: url}}
+    * jobs: reply of getJobsAttributes, {jobID: {attribute: value}}
+    * cs: nested dump of the Resources section of a configuration
+
+    For each of them, the throughput (MB of encoded data per second, best of the repetitions)
+    and the peak of memory allocated (traced with tracemalloc, in a separate run) are printed.
+
+    Run it with::
+
+        python tests/Performance/DEncode/dencodeBenchmark.py [size] [repetitions]
+
+    By default the payloads have 100000 entries, and each measurement is repeated 5 times.
+"""
+import datetime
+import sys
+import time
+import tracemalloc
+
+from DIRAC.Core.Utilities.DEncode import encode, decode
+
+
+def replicasPayload(size):
+    """Reply of getReplicas for size LFNs with 2 replicas each"""
+    lfnTemplate = "/lhcb/MC/2018/ALLSTREAMS.DST/00085678/0000/00085678_%08d_7.AllStreams.dst"
+    successful = {
+        lfnTemplate
+        % i: {
+            "CERN-DST-EOS": "root://eoslhcb.cern.ch//eos/lhcb/grid/prod" + lfnTemplate % i,
+            "GRIDKA-DST": "root://f01-080-123-e.gridka.de:1094/pnfs/gridka.de/lhcb" + lfnTemplate % i,
+        }
+        for i in range(size)
+    }
+    return {"OK": True, "Value": {"Successful": successful, "Failed": {}}}
+
+
+def jobsPayload(size):
+    """Reply of getJobsAttributes for size jobs"""
+    submission = datetime.datetime(2022, 3, 14, 15, 9, 26)
+    jobs = {
+        jobID: {
+            "JobID": jobID,
+            "JobName": "MCSimulation_%d" % jobID,
+            "Status": "Running",
+            "MinorStatus": "Application",
+            "ApplicationStatus": "Gauss step 1",
+            "Site": "LCG.CERN.cern",
+            "Owner": "lhcb_mc",
+            "OwnerGroup": "lhcb_mc",
+            "JobType": "MCSimulation",
+            "SubmissionTime": submission,
+            "LastUpdateTime": submission + datetime.timedelta(seconds=jobID),
+            "RescheduleCounter": 0,
+            "UserPriority": 1,
+            "VerifiedFlag": True,
+            "CPUTime": 1234.5,
+        }
+        for jobID in range(size)
+    }
+    return {"OK": True, "Value": jobs}
+
+
+def csPayload(size):
+    """Nested dump of a Resources section with about size queues"""
+    sites = {}
+    for siteIndex in range(max(1, size // 20)):
+        ces = {}
+        for ceIndex in range(4):
+            queues = {
+                "queue%d"
+                % queueIndex: {
+                    "maxCPUTime": "2880",
+                    "SI00": "3100",
+                    "MaxTotalJobs": "5000",
+                    "MaxWaitingJobs": "200",
+                    "Tag": ["MultiProcessor", "WholeNode"],
+                }
+                for queueIndex in range(5)
+            }
+            ces["ce%d.site%d.org" % (ceIndex, siteIndex)] = {
+                "CEType": "HTCondorCE",
+                "architecture": "x86_64",
+                "OS": "EL9",
+                "Queues": queues,
+            }
+        sites["LCG.Site%d.org" % siteIndex] = {"Name": "SITE%d" % siteIndex, "CE": list(ces), "CEs": ces}
+    return {"OK": True, "Value": {"Sites": {"LCG": sites}}}
+
+
+def throughput(func, arg, size, repetitions):
+    """Best throughput, in MB/s, of repeated calls"""
+    best = min(_timeCall(func, arg) for _ in range(repetitions))
+    return size / best / 1e6
+
+
+def _timeCall(func, arg):
+    start = time.perf_counter()
+    func(arg)
+    return time.perf_counter() - start
+
+
+def peakMemory(func, arg):
+    """Peak of memory allocated by a call, in MB"""
+    tracemalloc.start()
+    try:
+        func(arg)
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    repetitions = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    print(
+        "%-10s %10s %14s %14s %14s %14s"
+        % ("Payload", "Size (MB)", "Enc. (MB/s)", "Dec. (MB/s)", "Enc. peak (MB)", "Dec. peak (MB)")
+    )
+    for name, payloadFunc in (("replicas", replicasPayload), ("jobs", jobsPayload), ("cs", csPayload)):
+        payload = payloadFunc(size)
+        data = encode(payload)
+        decoded, length = decode(data)
+        assert decoded == payload and length == len(data), "%s does not survive encoding" % name
+        del decoded
+        print(
+            "%-10s %10.1f %14.1f %14.1f %14.1f %14.1f"
+            % (
+                name,
+                len(data) / 1e6,
+                throughput(encode, payload, len(data), repetitions),
+                throughput(decode, data, len(data), repetitions),
+                peakMemory(encode, payload),
+                peakMemory(decode, data),
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+""" Benchmark of the ExecutorDispatcher with a synthetic load, to size the Optimization Mind.
+
+    Each task goes through the 4 optimizers of the Optimization Mind (JobPath, JobSanity, InputData
+    and JobScheduling), each of them with a few executors taking several tasks at a time.
+    The executors answer as soon as they receive a task. One task out of 10 is frozen for an hour
+    by InputData, so that the freezer fills up as it does when the input data are not available.
+
+    For each number of tasks, the number of executor answers handled per second is printed.
+
+    Run it with::
+
+        python tests/Performance/ExecutorDispatcher/dispatchBenchmark.py [numTasks ...]
+
+    By default it is run with 10000, 100000 and 1000000 tasks.
+"""
+import collections
+import sys
+import time
+
+from DIRAC import S_OK, gLogger
+from DIRAC.Core.Utilities.ExecutorDispatcher import ExecutorDispatcher, ExecutorDispatcherCallbacks
+
+OPTIMIZERS = ["JobPath", "JobSanity", "InputData", "JobScheduling"]
+EXECUTORS_PER_OPTIMIZER = 4
+TASKS_PER_EXECUTOR = 10
+FREEZE_EVERY = 10
+
+
+class BenchmarkCallbacks(ExecutorDispatcherCallbacks):
+    """Tasks going through all the optimizers, sent to executors which answer immediately"""
+
+    def __init__(self):
+        self.sent = collections.deque()
+
+    def cbDispatch(self, taskId, taskObj, pathExecuted):
+        if len(pathExecuted) >= len(OPTIMIZERS):
+            return S_OK()
+        return S_OK(OPTIMIZERS[len(pathExecuted)])
+
+    def cbSendTask(self, taskId, taskObj, eId, eType):
+        self.sent.append((eId, eType, taskId))
+        return S_OK()
+
+    def cbDisconectExecutor(self, eId):
+        return S_OK()
+
+    def cbTaskError(self, taskId, taskObj, errorMsg):
+        return S_OK()
+
+
+def runDispatcher(numTasks):
+    """Push numTasks tasks through the dispatcher
+
+    :return: (number of executor answers, number of frozen tasks, seconds)
+    """
+    dispatcher = ExecutorDispatcher()
+    callbacks = BenchmarkCallbacks()
+    dispatcher.setCallbacks(callbacks)
+    for eType in OPTIMIZERS:
+        for index in range(EXECUTORS_PER_OPTIMIZER):
+            dispatcher.addExecutor("%s_%d" % (eType, index), [eType], maxTasks=TASKS_PER_EXECUTOR)
+
+    answers = 0
+    frozen = 0
+    start = time.perf_counter()
+    for taskId in range(numTasks):
+        dispatcher.addTask(taskId, {"JobID": taskId})
+    while callbacks.sent:
+        eId, eType, taskId = callbacks.sent.popleft()
+        answers += 1
+        if eType == "InputData" and taskId % FREEZE_EVERY == 0:
+            dispatcher.freezeTask(eId, taskId, 3600)
+            frozen += 1
+        else:
+            dispatcher.taskProcessed(eId, taskId)
+    return answers, frozen, time.perf_counter() - start
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000, 100000, 1000000]
+    gLogger.setLevel("error")
+
+    print("%10s %10s %10s %12s" % ("Tasks", "Frozen", "Seconds", "Answers/s"))
+    for numTasks in sizes:
+        answers, frozen, seconds = runDispatcher(numTasks)
+        print("%10d %10d %10.1f %12.0f" % (numTasks, frozen, seconds, answers / seconds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+""" Benchmark of the gLogger throughput
+
+    * filtered: debug messages while the level is notice, which are not displayed
+    * file: notice messages written in a file by the file backend
+    * file async: the same with the Asynchronous option of the backend
+    * slow: notice messages sent to a backend taking 1 ms per message, as a remote one could
+    * slow async: the same with the Asynchronous option of the backend
+
+    For each of them, the number of messages logged per second by the calling threads is printed.
+
+    Run it with::
+
+        python tests/Performance/Logging/loggingBenchmark.py [messages] [threads]
+
+    By default each of the 4 threads logs 20000 messages, 200 for the slow backends.
+"""
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from DIRAC import gLogger
+from DIRAC.FrameworkSystem.private.standardLogging.Handler.AsynchronousHandler import AsynchronousHandler
+
+
+class SlowHandler(logging.Handler):
+    """Handler taking 1 ms per record"""
+
+    def emit(self, record):
+        self.format(record)
+        time.sleep(0.001)
+
+
+def logMessages(logMethod, messages, threads):
+    """Log messages from several threads
+
+    :return: number of messages logged per second
+    """
+
+    def worker():
+        for index in range(messages):
+            logMethod("Benchmark message", index)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return messages * threads / (time.perf_counter() - start)
+
+
+def withHandler(log, handler, messages, threads):
+    """Log notice messages with a given handler attached to the logger, closed at the end"""
+    log._logger.addHandler(handler)  # pylint: disable=protected-access
+    try:
+        return logMessages(log.notice, messages, threads)
+    finally:
+        log._logger.removeHandler(handler)  # pylint: disable=protected-access
+        handler.close()
+
+
+def main():
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    log = gLogger.getSubLogger("Benchmark")
+    # only the handlers of the benchmark are used
+    log._logger.propagate = False  # pylint: disable=protected-access
+    log.setLevel("notice")
+    fileName = os.path.join(tempfile.mkdtemp(), "benchmark.log")
+
+    print("%-12s %12s" % ("Backend", "Messages/s"))
+    print("%-12s %12.0f" % ("filtered", logMessages(log.debug, messages, threads)))
+    print("%-12s %12.0f" % ("file", withHandler(log, logging.FileHandler(fileName), messages, threads)))
+    asyncHandler = AsynchronousHandler(logging.FileHandler(fileName), queueSize=messages * threads)
+    print("%-12s %12.0f" % ("file async", withHandler(log, asyncHandler, messages, threads)))
+    slowMessages = max(1, messages // 100)
+    print("%-12s %12.0f" % ("slow", withHandler(log, SlowHandler(), slowMessages, threads)))
+    asyncHandler = AsynchronousHandler(SlowHandler(), queueSize=slowMessages * threads)
+    print("%-12s %12.0f" % ("slow async", withHandler(log, asyncHandler, slowMessages, threads)))
+    os.remove(fileName)
+
+
+if __name__ == "__main__":
+    main()
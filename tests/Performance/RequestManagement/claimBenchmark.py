@@ -0,0 +1,124 @@
+""" Benchmark of the claiming of the requests by concurrent executors,
+    with SELECT ... FOR UPDATE SKIP LOCKED and with the previous queries.
+
+    It needs a ReqDB (properly defined in the configuration) without Waiting requests,
+    because the script fills it with requests and then removes them.
+    SKIP LOCKED needs MySQL >= 8.0.1 or MariaDB >= 10.6.
+
+    Each executor has its own RequestDB, as the RequestExecutingAgents have, and claims requests
+    with getRequest (single) or getBulkRequests (bulk) until there are no more Waiting requests.
+    For each method, the number of requests claimed per second and the number of requests
+    claimed more than once are printed, with and without the StatusLastUpdateNotBefore index
+    of the Request table, which is dropped for the second run and created again afterwards.
+
+    Run it with::
+
+        python tests/Performance/RequestManagement/claimBenchmark.py [numRequests] [executors] [bulkSize]
+
+    By default 2000 requests are claimed by 10 executors, 10 at a time for the bulk methods.
+"""
+import collections
+import sys
+import threading
+import time
+
+import DIRAC
+
+DIRAC.initialize()  # Initialize configuration
+
+from DIRAC.RequestManagementSystem.Client.Request import Request
+from DIRAC.RequestManagementSystem.Client.Operation import Operation
+from DIRAC.RequestManagementSystem.Client.File import File
+from DIRAC.RequestManagementSystem.DB.RequestDB import RequestDB, requestTable
+
+
+def putRequests(reqDB, numRequests):
+    """Create requests with 2 operations of 10 files each
+
+    :return: list of request IDs
+    """
+    reqIDs = []
+    for i in range(numRequests):
+        request = Request({"RequestName": "claimBenchmark-%d" % i})
+        for opType in ("ReplicateAndRegister", "RemoveReplica"):
+            op = Operation({"Type": opType, "TargetSE": "CERN-USER"})
+            for j in range(10):
+                op += File({"LFN": "/vo/benchmark/%d/file%d" % (i, j)})
+            request += op
+        result = reqDB.putRequest(request)
+        if not result["OK"]:
+            raise RuntimeError(result["Message"])
+        reqIDs.append(result["Value"])
+    # NotBefore is set to the submission time, to the second
+    time.sleep(1)
+    return reqIDs
+
+
+def claim(skipLocked, bulkSize, executors, numRequests):
+    """Claim the requests with concurrent executors
+
+    :return: (requests claimed per second, number of requests claimed more than once)
+    """
+    reqIDs = putRequests(RequestDB(), numRequests)
+    claims = collections.Counter()
+    claimsLock = threading.Lock()
+
+    def executor():
+        reqDB = RequestDB()
+        reqDB._RequestDB__skipLockedSupported = skipLocked  # pylint: disable=protected-access
+        while True:
+            if bulkSize:
+                result = reqDB.getBulkRequests(bulkSize, True)
+                claimed = list(result["Value"]) if result["OK"] else []
+            else:
+                result = reqDB.getRequest()
+                claimed = [result["Value"].RequestID] if result["OK"] and result["Value"] else []
+            if not result["OK"]:
+                print("Error: %s" % result["Message"])
+                return
+            if not claimed:
+                return
+            with claimsLock:
+                claims.update(claimed)
+
+    threads = [threading.Thread(target=executor) for _ in range(executors)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    reqDB = RequestDB()
+    for reqID in reqIDs:
+        reqDB.deleteRequest(reqID)
+    return len(claims) / elapsed, sum(1 for count in claims.values() if count > 1)
+
+
+def main():
+    numRequests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    executors = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    bulkSize = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+
+    engine = RequestDB().engine
+    (claimIndex,) = [index for index in requestTable.indexes if index.name == "StatusLastUpdateNotBefore"]
+    print("%-22s %-6s %12s %14s" % ("Method", "Index", "Requests/s", "Claimed twice"))
+    for name, skipLocked, size in (
+        ("single", False, 0),
+        ("single SKIP LOCKED", True, 0),
+        ("bulk", False, bulkSize),
+        ("bulk SKIP LOCKED", True, bulkSize),
+    ):
+        for withIndex in (True, False):
+            if not withIndex:
+                claimIndex.drop(engine)
+            try:
+                rate, duplicates = claim(skipLocked, size, executors, numRequests)
+            finally:
+                if not withIndex:
+                    claimIndex.create(engine)
+            print("%-22s %-6s %12.1f %14d" % (name, "yes" if withIndex else "no", rate, duplicates))
+
+
+if __name__ == "__main__":
+    main()
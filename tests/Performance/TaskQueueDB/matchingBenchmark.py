@@ -0,0 +1,122 @@
+""" Benchmark of the task queue matching: SQL match vs in-memory TaskQueueIndex.
+
+    It needs a TaskQueueDB (properly defined in the configuration) that should be empty,
+    because the script fills it with one job per task queue and then removes them.
+
+    Run it with::
+
+        python tests/Performance/TaskQueueDB/matchingBenchmark.py [numTaskQueues] [numMatches]
+
+    By default 10000 task queues are created and 1000 matches done for each of the methods.
+"""
+import random
+import sys
+import time
+
+import DIRAC
+
+DIRAC.initialize()  # Initialize configuration
+
+from DIRAC.WorkloadManagementSystem.DB.TaskQueueDB import TaskQueueDB
+
+FIRST_JOB_ID = 10000000
+SITES = ["LCG.Site%d.org" % i for i in range(200)]
+PLATFORMS = ["x86_64-centos7", "x86_64-el9", "x86_64-slc6"]
+TAGS = ["MultiProcessor", "GPU", "WholeNode", "8Processors"]
+JOB_TYPES = ["User", "MCSimulation", "DataReconstruction", "Merge"]
+OWNERS = [("/DC=org/CN=user%d" % i, "group%d" % (i % 10)) for i in range(100)]
+
+
+def randomTQDefinition():
+    """A random task queue definition, vaguely looking like a real one"""
+    ownerDN, ownerGroup = random.choice(OWNERS)
+    tqDefDict = {
+        "OwnerDN": ownerDN,
+        "OwnerGroup": ownerGroup,
+        "Setup": "aSetup",
+        "CPUTime": random.randint(60, 86400 * 3),
+    }
+    if random.random() < 0.7:
+        tqDefDict["Sites"] = random.sample(SITES, random.randint(1, 5))
+    if random.random() < 0.1:
+        tqDefDict["BannedSites"] = random.sample(SITES, 2)
+    if random.random() < 0.5:
+        tqDefDict["Platforms"] = random.sample(PLATFORMS, random.randint(1, 2))
+    if random.random() < 0.2:
+        tqDefDict["Tags"] = random.sample(TAGS, 1)
+    tqDefDict["JobTypes"] = [random.choice(JOB_TYPES)]
+    return tqDefDict
+
+
+def randomResource():
+    """A random resource description, as sent by a pilot"""
+    return {
+        "Setup": "aSetup",
+        "CPUTime": random.randint(3600, 86400 * 3),
+        "Site": random.choice(SITES),
+        "GridCE": "ce.%s" % random.choice(SITES).lower(),
+        "Platform": random.sample(PLATFORMS, 2),
+        "Tag": random.sample(TAGS, random.randint(0, 2)),
+    }
+
+
+def timeMatches(tqDB, resources, numQueuesToGet=10):
+    """Match all the resources and return the latencies (in seconds)"""
+    latencies = []
+    for resource in resources:
+        start = time.time()
+        result = tqDB.matchAndGetTaskQueue(resource, numQueuesToGet=numQueuesToGet)
+        latencies.append(time.time() - start)
+        if not result["OK"]:
+            print("Match failed: %s" % result["Message"])
+    return latencies
+
+
+def report(name, latencies):
+    latencies = sorted(latencies)
+    print(
+        "%-8s matches: %6d  mean: %8.2f ms  median: %8.2f ms  p95: %8.2f ms  max: %8.2f ms"
+        % (
+            name,
+            len(latencies),
+            1000 * sum(latencies) / len(latencies),
+            1000 * latencies[len(latencies) // 2],
+            1000 * latencies[int(len(latencies) * 0.95)],
+            1000 * latencies[-1],
+        )
+    )
+
+
+def main():
+    numTaskQueues = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    numMatches = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    tqDB = TaskQueueDB()
+    print("Creating %d task queues" % numTaskQueues)
+    start = time.time()
+    for jobID in range(FIRST_JOB_ID, FIRST_JOB_ID + numTaskQueues):
+        result = tqDB.insertJob(jobID, randomTQDefinition(), 1)
+        if not result["OK"]:
+            print("Could not insert job %s: %s" % (jobID, result["Message"]))
+    print("... done in %.1f s, %s task queues in the DB" % (time.time() - start, tqDB.getNumTaskQueues()["Value"]))
+
+    resources = [randomResource() for _ in range(numMatches)]
+    try:
+        tqDB.enableMatchingIndex(False)
+        report("SQL", timeMatches(tqDB, resources))
+
+        tqDB.enableMatchingIndex(True, refreshInterval=30)
+        start = time.time()
+        tqDB.matchAndGetTaskQueue(resources[0])
+        print("Index loaded in %.2f s" % (time.time() - start))
+        report("Index", timeMatches(tqDB, resources))
+        print("Index statistics: %s" % tqDB.getMatchingIndexStats()["Value"])
+    finally:
+        print("Cleaning")
+        for jobID in range(FIRST_JOB_ID, FIRST_JOB_ID + numTaskQueues):
+            tqDB.deleteJob(jobID)
+        tqDB.cleanOrphanedTaskQueues()
+
+
+if __name__ == "__main__":
+    main()